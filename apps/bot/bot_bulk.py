@@ -0,0 +1,750 @@
+"""
+Modo bulk offline con la Batch API de OpenAI
+
+Para re-evaluar el backlog de noche no hace falta latencia interactiva:
+llamar a OpenAI CV por CV gasta el rate limit del tráfico en vivo y cuesta
+el doble que la Batch API. Cuatro pasos:
+
+1. prepare: extrae y compacta los PDFs de una carpeta (el pre-screen local
+   descarta sin LLM, igual que la API)
+2. emit: escribe los pedidos pendientes en JSONL con el formato de la
+   Batch API (custom_id, method, url, body)
+3. submit: sube cada JSONL con un backend: "openai" o "local" (corre los
+   pedidos contra OPENAI_BASE_URL, p. ej. benchmarks/fake_openai.py)
+4. ingest: baja los resultados, los valida contra CVAnalysis y arma la
+   respuesta con build_result (calculate_overall_score); queda en el
+   historial de candidatos. Al cache de análisis solo va lo que la API
+   respondería igual: --model es el modelo de la API (sin cascada), o es
+   OPENAI_MODEL con cascada y el score no escala. El resto se cuenta en
+   "not_cached" del resumen
+
+custom_id = sha256 del PDF + versión del prompt + modelo (la misma clave
+del cache): repetir un paso no duplica trabajo y una corrida cortada se
+retoma donde quedó. Lo que falla (error de la API, respuesta fuera del
+schema, batch vencido) vuelve a salir en el próximo emit, hasta
+BULK_MAX_ATTEMPTS fallos; después queda failed. Sin cascada: todo va al
+modelo de --model.
+
+Uso:
+    python -m apps.bot.bot_bulk run [CARPETA] [--backend local] [--wait]
+    python -m apps.bot.bot_bulk prepare [CARPETA] [--model gpt-4o-mini]
+    python -m apps.bot.bot_bulk emit
+    python -m apps.bot.bot_bulk submit [--backend openai]
+    python -m apps.bot.bot_bulk ingest [--wait]
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import os
+import shutil
+import threading
+import time
+import uuid
+from abc import ABC, abstractmethod
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+from pydantic import ValidationError
+
+from apps.bot.bot_cache import AnalysisCache
+from apps.bot.bot_ingest import iter_pdfs
+from apps.bot.bot_schemas import CVFeedbackResponse
+from apps.bot.bot_service import TIER_FAST, TIER_STRONG, BotService
+from core.database import connect
+from core.settings import settings
+
+logger = logging.getLogger(__name__)
+
+# Estados de cada pedido
+PREPARED = "prepared"
+EMITTED = "emitted"
+SUBMITTED = "submitted"
+DONE = "done"
+FAILED = "failed"
+
+ENDPOINT = "/v1/chat/completions"
+# La Batch API acepta hasta 200 MB por archivo
+MAX_FILE_BYTES = 190 * 1024 * 1024
+# Estados finales de un batch (con o sin resultados parciales)
+FINAL_STATUSES = ("completed", "failed", "expired", "cancelled")
+
+
+class BulkStore:
+    """
+    Pedidos y batches del modo bulk en SQLite
+
+    El texto del CV y el body quedan guardados hasta que el pedido termina:
+    emit e ingest no vuelven a leer los PDFs.
+    """
+
+    def __init__(self, db_path: str):
+        self._lock = threading.Lock()
+        self._db = connect(db_path)
+        self._db.execute("""
+            CREATE TABLE IF NOT EXISTS bulk_requests (
+                custom_id TEXT PRIMARY KEY,
+                path TEXT NOT NULL,
+                filename TEXT NOT NULL,
+                sha256 TEXT NOT NULL,
+                model TEXT NOT NULL,
+                status TEXT NOT NULL,
+                body TEXT,
+                cv_text TEXT,
+                years_experience INTEGER NOT NULL DEFAULT 0,
+                input_file TEXT,
+                batch_id TEXT,
+                result TEXT,
+                error TEXT,
+                attempts INTEGER NOT NULL DEFAULT 0,
+                updated_at REAL NOT NULL
+            )
+            """)
+        # Bases creadas antes del tope de intentos
+        columns = {
+            row["name"] for row in self._db.execute("PRAGMA table_info(bulk_requests)")
+        }
+        if "attempts" not in columns:
+            self._db.execute(
+                "ALTER TABLE bulk_requests ADD COLUMN attempts INTEGER NOT NULL DEFAULT 0"
+            )
+        self._db.execute("""
+            CREATE TABLE IF NOT EXISTS bulk_batches (
+                id TEXT PRIMARY KEY,
+                backend TEXT NOT NULL,
+                input_file TEXT NOT NULL UNIQUE,
+                status TEXT NOT NULL,
+                created_at REAL NOT NULL,
+                updated_at REAL NOT NULL
+            )
+            """)
+        self._db.execute(
+            "CREATE INDEX IF NOT EXISTS idx_bulk_requests_status "
+            "ON bulk_requests (status, input_file)"
+        )
+        self._db.execute(
+            "CREATE INDEX IF NOT EXISTS idx_bulk_requests_batch "
+            "ON bulk_requests (batch_id)"
+        )
+        self._db.commit()
+
+    def get(self, custom_id: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            row = self._db.execute(
+                "SELECT * FROM bulk_requests WHERE custom_id = ?", (custom_id,)
+            ).fetchone()
+        return dict(row) if row is not None else None
+
+    def add(
+        self,
+        custom_id: str,
+        path: str,
+        filename: str,
+        sha256: str,
+        model: str,
+        body: Optional[str] = None,
+        cv_text: Optional[str] = None,
+        years_experience: int = 0,
+        result: Optional[Dict[str, Any]] = None,
+    ) -> None:
+        """Pedido nuevo: PREPARED con body, o DONE si ya hay resultado"""
+        with self._lock:
+            self._db.execute(
+                """
+                INSERT OR IGNORE INTO bulk_requests
+                    (custom_id, path, filename, sha256, model, status, body,
+                     cv_text, years_experience, result, updated_at)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                """,
+                (
+                    custom_id,
+                    path,
+                    filename,
+                    sha256,
+                    model,
+                    DONE if result is not None else PREPARED,
+                    body,
+                    cv_text,
+                    years_experience,
+                    json.dumps(result, ensure_ascii=False) if result else None,
+                    time.time(),
+                ),
+            )
+            self._db.commit()
+
+    def pending(self) -> Iterator[Tuple[str, str]]:
+        """(custom_id, body) de lo que falta mandar (nuevo o fallido con intentos)"""
+        with self._lock:
+            rows = self._db.execute(
+                """
+                SELECT custom_id, body FROM bulk_requests
+                WHERE (status = ? OR (status = ? AND attempts < ?))
+                  AND body IS NOT NULL
+                ORDER BY custom_id
+                """,
+                (PREPARED, FAILED, settings.BULK_MAX_ATTEMPTS),
+            ).fetchall()
+        for row in rows:
+            yield row["custom_id"], row["body"]
+
+    def mark_emitted(self, custom_ids: List[str], input_file: str) -> None:
+        with self._lock:
+            self._db.executemany(
+                """
+                UPDATE bulk_requests
+                SET status = ?, input_file = ?, batch_id = NULL, updated_at = ?
+                WHERE custom_id = ?
+                """,
+                [(EMITTED, input_file, time.time(), cid) for cid in custom_ids],
+            )
+            self._db.commit()
+
+    def unsubmitted_files(self) -> List[str]:
+        """JSONL emitidos que todavía no se subieron"""
+        with self._lock:
+            rows = self._db.execute(
+                """
+                SELECT DISTINCT input_file FROM bulk_requests
+                WHERE status = ? ORDER BY input_file
+                """,
+                (EMITTED,),
+            ).fetchall()
+        return [row["input_file"] for row in rows]
+
+    def mark_submitted(self, input_file: str, batch_id: str, backend: str) -> None:
+        now = time.time()
+        with self._lock:
+            self._db.execute(
+                """
+                INSERT INTO bulk_batches
+                    (id, backend, input_file, status, created_at, updated_at)
+                VALUES (?, ?, ?, 'submitted', ?, ?)
+                """,
+                (batch_id, backend, input_file, now, now),
+            )
+            self._db.execute(
+                """
+                UPDATE bulk_requests SET status = ?, batch_id = ?, updated_at = ?
+                WHERE status = ? AND input_file = ?
+                """,
+                (SUBMITTED, batch_id, now, EMITTED, input_file),
+            )
+            self._db.commit()
+
+    def open_batches(self) -> List[Dict[str, Any]]:
+        """Batches subidos cuyos resultados todavía no se ingirieron"""
+        with self._lock:
+            rows = self._db.execute(
+                f"""
+                SELECT id, backend, status FROM bulk_batches
+                WHERE status NOT IN ({', '.join('?' * len(FINAL_STATUSES))})
+                ORDER BY created_at
+                """,
+                FINAL_STATUSES,
+            ).fetchall()
+        return [dict(row) for row in rows]
+
+    def set_batch_status(self, batch_id: str, status: str) -> None:
+        with self._lock:
+            self._db.execute(
+                "UPDATE bulk_batches SET status = ?, updated_at = ? WHERE id = ?",
+                (status, time.time(), batch_id),
+            )
+            self._db.commit()
+
+    def finish(self, custom_id: str, result: Dict[str, Any]) -> None:
+        """DONE con el resultado; el body y el texto ya no hacen falta"""
+        with self._lock:
+            self._db.execute(
+                """
+                UPDATE bulk_requests
+                SET status = ?, result = ?, error = NULL, body = NULL,
+                    cv_text = NULL, updated_at = ?
+                WHERE custom_id = ?
+                """,
+                (DONE, json.dumps(result, ensure_ascii=False), time.time(), custom_id),
+            )
+            self._db.commit()
+
+    def fail(self, custom_id: str, error: str) -> None:
+        with self._lock:
+            self._db.execute(
+                """
+                UPDATE bulk_requests
+                SET status = ?, error = ?, attempts = attempts + 1, updated_at = ?
+                WHERE custom_id = ? AND status != ?
+                """,
+                (FAILED, error, time.time(), custom_id, DONE),
+            )
+            self._db.commit()
+
+    def fail_unanswered(self, batch_id: str, error: str) -> int:
+        """Lo que el batch no respondió (vencido, cancelado) vuelve a emitirse"""
+        with self._lock:
+            cursor = self._db.execute(
+                """
+                UPDATE bulk_requests
+                SET status = ?, error = ?, attempts = attempts + 1, updated_at = ?
+                WHERE batch_id = ? AND status = ?
+                """,
+                (FAILED, error, time.time(), batch_id, SUBMITTED),
+            )
+            self._db.commit()
+        return cursor.rowcount
+
+    def counts(self) -> Dict[str, int]:
+        with self._lock:
+            rows = self._db.execute(
+                "SELECT status, COUNT(*) AS n FROM bulk_requests GROUP BY status"
+            ).fetchall()
+        return {row["status"]: row["n"] for row in rows}
+
+
+class BulkBackend(ABC):
+    """
+    Dónde corre un JSONL de la Batch API
+
+    submit retorna el id del batch; status y results lo siguen. results
+    emite las líneas de salida y de error con el formato de la Batch API.
+    """
+
+    @abstractmethod
+    def submit(self, input_path: str) -> str:
+        """Encola el JSONL y retorna el id del batch"""
+
+    @abstractmethod
+    def status(self, batch_id: str) -> str:
+        """Estado del batch con los nombres de la Batch API (completed, ...)"""
+
+    @abstractmethod
+    def results(self, batch_id: str) -> Iterator[Dict[str, Any]]:
+        """Líneas de salida y de error del batch"""
+
+
+class OpenAIBulkBackend(BulkBackend):
+    """Batch API de OpenAI (ventana de 24h, mitad de precio)"""
+
+    def __init__(self, client: Any):
+        self.client = client
+
+    def submit(self, input_path: str) -> str:
+        with open(input_path, "rb") as f:
+            uploaded = self.client.files.create(file=f, purpose="batch")
+        batch = self.client.batches.create(
+            input_file_id=uploaded.id,
+            endpoint=ENDPOINT,
+            completion_window="24h",
+            metadata={"input_file": os.path.basename(input_path)},
+        )
+        return batch.id
+
+    def status(self, batch_id: str) -> str:
+        return self.client.batches.retrieve(batch_id).status
+
+    def results(self, batch_id: str) -> Iterator[Dict[str, Any]]:
+        batch = self.client.batches.retrieve(batch_id)
+        # Un batch vencido o cancelado también deja lo que llegó a terminar
+        for file_id in (batch.output_file_id, batch.error_file_id):
+            if file_id:
+                content = self.client.files.content(file_id).text
+                for line in content.splitlines():
+                    if line.strip():
+                        yield json.loads(line)
+
+
+class LocalBulkBackend(BulkBackend):
+    """
+    Stand-in de la Batch API en archivos locales (pruebas y benchmarks)
+
+    Copia el JSONL a directory/<batch_id>/ y al primer status corre cada
+    pedido contra el cliente (OPENAI_BASE_URL), dejando output.jsonl y
+    errors.jsonl con el mismo formato que la API.
+    """
+
+    def __init__(self, directory: str, client: Any):
+        self.directory = directory
+        self.client = client
+
+    def submit(self, input_path: str) -> str:
+        batch_id = f"batch_local_{uuid.uuid4().hex}"
+        folder = os.path.join(self.directory, batch_id)
+        os.makedirs(folder)
+        shutil.copyfile(input_path, os.path.join(folder, "input.jsonl"))
+        return batch_id
+
+    def status(self, batch_id: str) -> str:
+        folder = os.path.join(self.directory, batch_id)
+        if not os.path.isdir(folder):
+            return "failed"
+        if not os.path.exists(os.path.join(folder, "output.jsonl")):
+            self._run(folder)
+        return "completed"
+
+    def results(self, batch_id: str) -> Iterator[Dict[str, Any]]:
+        folder = os.path.join(self.directory, batch_id)
+        for name in ("output.jsonl", "errors.jsonl"):
+            path = os.path.join(folder, name)
+            if os.path.exists(path):
+                with open(path, encoding="utf-8") as f:
+                    for line in f:
+                        if line.strip():
+                            yield json.loads(line)
+
+    def _run(self, folder: str) -> None:
+        output, errors = [], []
+        with open(os.path.join(folder, "input.jsonl"), encoding="utf-8") as f:
+            for line in f:
+                if not line.strip():
+                    continue
+                request = json.loads(line)
+                entry: Dict[str, Any] = {
+                    "id": f"batch_req_{uuid.uuid4().hex}",
+                    "custom_id": request["custom_id"],
+                    "response": None,
+                    "error": None,
+                }
+                try:
+                    completion = self.client.chat.completions.create(**request["body"])
+                    entry["response"] = {
+                        "status_code": 200,
+                        "body": completion.model_dump(),
+                    }
+                    output.append(entry)
+                except Exception as e:
+                    status_code = getattr(e, "status_code", None)
+                    if status_code is None:
+                        entry["error"] = {"code": "local_error", "message": str(e)}
+                    else:
+                        entry["response"] = {
+                            "status_code": status_code,
+                            "body": getattr(e, "body", None) or {"error": str(e)},
+                        }
+                    errors.append(entry)
+
+        # output.jsonl se escribe al final: si se corta, el próximo status repite
+        for name, entries in (("errors.jsonl", errors), ("output.jsonl", output)):
+            tmp_path = os.path.join(folder, name + ".tmp")
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                for entry in entries:
+                    f.write(json.dumps(entry, ensure_ascii=False) + "\n")
+            os.replace(tmp_path, os.path.join(folder, name))
+
+
+BACKENDS: Dict[str, Callable[[BotService], BulkBackend]] = {
+    "openai": lambda service: OpenAIBulkBackend(service.client),
+    "local": lambda service: LocalBulkBackend(
+        os.path.join(settings.BULK_DIR, "local"), service.client
+    ),
+}
+
+
+def make_backend(name: str, service: BotService) -> BulkBackend:
+    if name not in BACKENDS:
+        raise ValueError(
+            f"Backend desconocido: {name} (disponibles: {', '.join(BACKENDS)})"
+        )
+    return BACKENDS[name](service)
+
+
+class BulkRunner:
+    """Los cuatro pasos del modo bulk sobre un BulkStore"""
+
+    def __init__(
+        self,
+        service: BotService,
+        store: BulkStore,
+        model: str,
+        concurrency: int,
+    ):
+        self.service = service
+        self.store = store
+        self.model = model
+        self.concurrency = concurrency
+
+    def custom_id(self, sha256: str) -> str:
+        return AnalysisCache.make_key(sha256, self.service.template.version, self.model)
+
+    async def prepare(self, folder: str) -> Dict[str, int]:
+        """Paso 1: extrae y compacta los PDFs que todavía no tienen pedido"""
+        summary = {"scanned": 0, "known": 0, "prepared": 0, "screened": 0, "failed": 0}
+        semaphore = asyncio.Semaphore(self.concurrency)
+
+        async def run(path: str) -> str:
+            async with semaphore:
+                try:
+                    return await self._prepare(path)
+                except Exception as e:
+                    logger.warning("Bulk: no se pudo preparar %s: %s", path, e)
+                    return "failed"
+
+        paths = [path for path, _, _ in iter_pdfs(os.path.abspath(folder))]
+        summary["scanned"] = len(paths)
+        tasks = [asyncio.create_task(run(path)) for path in paths]
+        try:
+            for next_done in asyncio.as_completed(tasks):
+                summary[await next_done] += 1
+        finally:
+            for task in tasks:
+                task.cancel()
+        return summary
+
+    async def _prepare(self, path: str) -> str:
+        sha256 = await asyncio.to_thread(self.service.hash_pdf, path)
+        custom_id = self.custom_id(sha256)
+        if await asyncio.to_thread(self.store.get, custom_id) is not None:
+            return "known"
+
+        cv_text = await self.service.extract_text(path)
+        if not cv_text or len(cv_text) < 200:
+            raise Exception("CV demasiado corto")
+
+        filename = os.path.basename(path)
+        screened = self.service.prescreen(cv_text)
+        if screened is not None:
+            await asyncio.to_thread(
+                self.store.add,
+                custom_id,
+                path,
+                filename,
+                sha256,
+                self.model,
+                result=screened.model_dump(),
+            )
+            await asyncio.to_thread(
+                self.service.record_candidate, screened, sha256, filename
+            )
+            return "screened"
+
+        years_experience = self.service.extract_years_of_experience(cv_text)
+        messages = self.service.build_messages(
+            await self.service.compact_for_prompt_async(cv_text), years_experience
+        )
+        body = self.service.completion_params(messages, self.model)
+        await asyncio.to_thread(
+            self.store.add,
+            custom_id,
+            path,
+            filename,
+            sha256,
+            self.model,
+            body=json.dumps(body, ensure_ascii=False),
+            cv_text=cv_text,
+            years_experience=years_experience,
+        )
+        return "prepared"
+
+    def emit(self) -> Dict[str, Any]:
+        """Paso 2: JSONL de la Batch API con lo pendiente (varios si no entra)"""
+        os.makedirs(settings.BULK_DIR, exist_ok=True)
+        files: List[str] = []
+        batch: List[str] = []
+        lines: List[str] = []
+        size = 0
+
+        def flush() -> None:
+            nonlocal size
+            stamp = time.strftime("%Y%m%d-%H%M%S")
+            path = os.path.join(
+                settings.BULK_DIR, f"requests-{stamp}-{uuid.uuid4().hex[:8]}.jsonl"
+            )
+            with open(path, "w", encoding="utf-8") as f:
+                f.writelines(lines)
+            self.store.mark_emitted(batch, path)
+            files.append(path)
+            batch.clear()
+            lines.clear()
+            size = 0
+
+        total = 0
+        for custom_id, body in self.store.pending():
+            # body ya es JSON: no se vuelve a parsear
+            line = (
+                f'{{"custom_id": "{custom_id}", "method": "POST", '
+                f'"url": "{ENDPOINT}", "body": {body}}}\n'
+            )
+            line_size = len(line.encode())
+            if batch and (
+                len(batch) >= settings.BULK_MAX_REQUESTS_PER_FILE
+                or size + line_size > MAX_FILE_BYTES
+            ):
+                flush()
+            batch.append(custom_id)
+            lines.append(line)
+            size += line_size
+            total += 1
+        if batch:
+            flush()
+        return {"files": files, "requests": total}
+
+    def submit(self, backend_name: str) -> Dict[str, Any]:
+        """Paso 3: sube los JSONL emitidos que todavía no tienen batch"""
+        backend = make_backend(backend_name, self.service)
+        batches = []
+        for input_file in self.store.unsubmitted_files():
+            batch_id = backend.submit(input_file)
+            self.store.mark_submitted(input_file, batch_id, backend_name)
+            logger.info("Bulk: %s subido como %s", input_file, batch_id)
+            batches.append(batch_id)
+        return {"backend": backend_name, "batches": batches}
+
+    def ingest(self, wait: bool = False) -> Dict[str, int]:
+        """Paso 4: ingiere los batches terminados (wait: hasta que no quede ninguno)"""
+        summary = {"done": 0, "not_cached": 0, "failed": 0, "skipped": 0, "open": 0}
+        while True:
+            summary["open"] = 0
+            for batch in self.store.open_batches():
+                backend = make_backend(batch["backend"], self.service)
+                status = backend.status(batch["id"])
+                if status not in FINAL_STATUSES:
+                    summary["open"] += 1
+                    if status != batch["status"]:
+                        self.store.set_batch_status(batch["id"], status)
+                    continue
+
+                for line in backend.results(batch["id"]):
+                    outcome = self._ingest_line(line)
+                    if outcome == "not_cached":
+                        # Ingerido igual: solo no queda en el cache online
+                        summary["done"] += 1
+                    summary[outcome] += 1
+                summary["failed"] += self.store.fail_unanswered(
+                    batch["id"], f"Sin respuesta en el batch ({status})"
+                )
+                self.store.set_batch_status(batch["id"], status)
+
+            if not wait or summary["open"] == 0:
+                if summary["not_cached"]:
+                    logger.warning(
+                        "Bulk: %d resultados de %s no van al cache de análisis "
+                        "(la API responde con %s)",
+                        summary["not_cached"],
+                        self.model,
+                        self.service.cache_model,
+                    )
+                return summary
+            time.sleep(settings.BULK_POLL_SECONDS)
+
+    def _ingest_line(self, line: Dict[str, Any]) -> str:
+        custom_id = line.get("custom_id", "")
+        request = self.store.get(custom_id)
+        # Ya ingerido (batch repetido o corrida anterior) o ajeno
+        if request is None or request["status"] == DONE:
+            return "skipped"
+
+        response = line.get("response") or {}
+        body = response.get("body") or {}
+        if line.get("error") or response.get("status_code") != 200:
+            error = line.get("error") or body.get("error") or response
+            self.store.fail(custom_id, f"Error de la API: {error}")
+            return "failed"
+
+        try:
+            analysis = self.service.parse_analysis(
+                body["choices"][0]["message"]["content"]
+            )
+        except (KeyError, IndexError, ValidationError) as e:
+            self.store.fail(custom_id, f"Respuesta fuera del schema: {e}")
+            return "failed"
+
+        tier = (
+            TIER_STRONG
+            if request["model"] == settings.OPENAI_STRONG_MODEL
+            else TIER_FAST
+        )
+        result = self.service.build_result(
+            analysis,
+            request["cv_text"],
+            request["years_experience"],
+            model_tier=tier,
+        )
+        self.store.finish(custom_id, result.model_dump())
+        self.service.record_candidate(result, request["sha256"], request["filename"])
+        if self.service.cache is not None and not self._cache_result(
+            request, analysis, result
+        ):
+            return "not_cached"
+        return "done"
+
+    def _cache_result(
+        self,
+        request: Dict[str, Any],
+        analysis: Dict[str, Any],
+        result: CVFeedbackResponse,
+    ) -> bool:
+        """
+        Guarda el resultado en el cache de la API si es lo que ella respondería
+
+        Así el próximo upload del PDF es hit. Con cascada la API responde con
+        el modelo rápido salvo que el score escale: un resultado de
+        OPENAI_MODEL que no escala vale igual.
+        """
+        model = request["model"]
+        same_answer = model == self.service.cache_model or (
+            settings.OPENAI_STRONG_MODEL
+            and model == settings.OPENAI_MODEL
+            and self.service.escalation_reason(analysis) is None
+        )
+        if not same_answer:
+            logger.debug("Bulk: %s no va al cache (%s)", request["filename"], model)
+            return False
+
+        version = self.service.template.version
+        self.service.cache.set(
+            AnalysisCache.make_key(
+                request["sha256"], version, self.service.cache_model
+            ),
+            result.model_dump(),
+            version,
+            self.service.cache_model,
+        )
+        return True
+
+
+async def _main(args: argparse.Namespace) -> Dict[str, Any]:
+    service = BotService()
+    runner = BulkRunner(
+        service, BulkStore(settings.BULK_DB_PATH), args.model, args.concurrency
+    )
+    summary: Dict[str, Any] = {}
+    try:
+        if args.command in ("prepare", "run"):
+            summary["prepare"] = await runner.prepare(args.folder)
+        if args.command in ("emit", "run"):
+            summary["emit"] = runner.emit()
+        if args.command in ("submit", "run"):
+            summary["submit"] = await asyncio.to_thread(runner.submit, args.backend)
+        if args.command in ("ingest", "run"):
+            summary["ingest"] = await asyncio.to_thread(runner.ingest, args.wait)
+    finally:
+        service.pdf_engine.shutdown()
+    summary["requests"] = runner.store.counts()
+    return summary
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Re-evaluación offline de CVs con la Batch API de OpenAI"
+    )
+    parser.add_argument(
+        "command", choices=("run", "prepare", "emit", "submit", "ingest")
+    )
+    parser.add_argument("folder", nargs="?", default=settings.INGEST_DIR)
+    parser.add_argument(
+        "--model", default=settings.OPENAI_MODEL, help="Modelo de los pedidos"
+    )
+    parser.add_argument(
+        "--backend", choices=list(BACKENDS), default=settings.BULK_BACKEND
+    )
+    parser.add_argument("--concurrency", type=int, default=settings.INGEST_CONCURRENCY)
+    parser.add_argument(
+        "--wait",
+        action="store_true",
+        help=f"Esperar los batches (consulta cada {settings.BULK_POLL_SECONDS:g}s)",
+    )
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    start = time.perf_counter()
+    summary = asyncio.run(_main(args))
+    summary["seconds"] = round(time.perf_counter() - start, 2)
+    print(json.dumps(summary))
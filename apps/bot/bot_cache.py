@@ -0,0 +1,161 @@
+import hashlib
+import json
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+
+from core.database import connect
+
+
+class AnalysisCache:
+    """
+    Cache de resultados de análisis en dos niveles
+
+    - Memoria: LRU con TTL, límite de entradas y de bytes
+    - SQLite (opcional): compartido entre workers y reinicios
+
+    La clave es sha256(PDF) + versión del prompt + modelo, así que cambiar
+    el prompt o el modelo invalida todo automáticamente.
+    """
+
+    def __init__(
+        self,
+        ttl_seconds: int,
+        max_entries: int,
+        max_bytes: int,
+        db_path: Optional[str] = None,
+    ):
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+
+        # clave -> (expira_en, json)
+        self._memory: "OrderedDict[str, Tuple[float, str]]" = OrderedDict()
+        self._memory_bytes = 0
+        self._lock = threading.Lock()
+
+        self._db = None
+        if db_path:
+            self._db = connect(db_path)
+            self._db.execute("""
+                CREATE TABLE IF NOT EXISTS analysis_cache (
+                    key TEXT PRIMARY KEY,
+                    prompt_version TEXT NOT NULL,
+                    model TEXT NOT NULL,
+                    value TEXT NOT NULL,
+                    expires_at REAL NOT NULL
+                )
+                """)
+            self._db.execute(
+                "CREATE INDEX IF NOT EXISTS idx_analysis_cache_expires "
+                "ON analysis_cache (expires_at)"
+            )
+            self._db.commit()
+
+    @staticmethod
+    def make_key(pdf_sha256: str, prompt_version: str, model: str) -> str:
+        """Clave de cache: contenido + versión del prompt + modelo"""
+        raw = f"{pdf_sha256}:{prompt_version}:{model}"
+        return hashlib.sha256(raw.encode()).hexdigest()
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        """Busca en memoria y luego en SQLite (promueve a memoria)"""
+        now = time.time()
+
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                expires_at, value = entry
+                if expires_at > now:
+                    self._memory.move_to_end(key)
+                    return json.loads(value)
+                self._remove(key)
+
+        if self._db is None:
+            return None
+
+        with self._lock:
+            row = self._db.execute(
+                "SELECT value, expires_at FROM analysis_cache WHERE key = ?", (key,)
+            ).fetchone()
+
+        if row is None or row["expires_at"] <= now:
+            return None
+
+        with self._lock:
+            self._put_memory(key, row["value"], row["expires_at"])
+        return json.loads(row["value"])
+
+    def set(
+        self, key: str, value: Dict[str, Any], prompt_version: str, model: str
+    ) -> None:
+        """Guarda el resultado en ambos niveles"""
+        expires_at = time.time() + self.ttl_seconds
+        serialized = json.dumps(value, ensure_ascii=False)
+
+        with self._lock:
+            self._put_memory(key, serialized, expires_at)
+
+            if self._db is not None:
+                self._db.execute(
+                    """
+                    INSERT OR REPLACE INTO analysis_cache
+                        (key, prompt_version, model, value, expires_at)
+                    VALUES (?, ?, ?, ?, ?)
+                    """,
+                    (key, prompt_version, model, serialized, expires_at),
+                )
+                self._db.commit()
+
+    def clear(self) -> int:
+        """Invalida TODO (p. ej. al cambiar el prompt). Retorna entradas borradas"""
+        with self._lock:
+            removed = len(self._memory)
+            self._memory.clear()
+            self._memory_bytes = 0
+
+            if self._db is not None:
+                cursor = self._db.execute("DELETE FROM analysis_cache")
+                self._db.commit()
+                removed = max(removed, cursor.rowcount)
+
+        return removed
+
+    def purge_stale(self, prompt_version: str, model: str) -> int:
+        """Borra del nivel SQLite lo expirado o de otra versión de prompt/modelo"""
+        if self._db is None:
+            return 0
+
+        with self._lock:
+            cursor = self._db.execute(
+                """
+                DELETE FROM analysis_cache
+                WHERE expires_at <= ? OR prompt_version != ? OR model != ?
+                """,
+                (time.time(), prompt_version, model),
+            )
+            self._db.commit()
+        return cursor.rowcount
+
+    def _put_memory(self, key: str, value: str, expires_at: float) -> None:
+        """Inserta en el LRU y expulsa lo más antiguo (llamar con el lock)"""
+        size = len(value)
+        if size > self.max_bytes:
+            return
+
+        if key in self._memory:
+            self._remove(key)
+
+        self._memory[key] = (expires_at, value)
+        self._memory_bytes += size
+
+        while (
+            len(self._memory) > self.max_entries or self._memory_bytes > self.max_bytes
+        ):
+            oldest = next(iter(self._memory))
+            self._remove(oldest)
+
+    def _remove(self, key: str) -> None:
+        _, value = self._memory.pop(key)
+        self._memory_bytes -= len(value)
@@ -0,0 +1,314 @@
+import base64
+import json
+import threading
+import time
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from core.database import connect
+
+# Columnas del listado (el resultado completo queda en result)
+SUMMARY_COLUMNS = (
+    "id",
+    "filename",
+    "candidate_email",
+    "overall_score",
+    "is_valid_candidate",
+    "is_software_developer",
+    "is_from_peru",
+    "has_github",
+    "years_experience",
+    "model_tier",
+    "created_at",
+)
+# Sub-scores crudos del LLM: con ellos se recalcula overall_score sin
+# volver a analizar (apps/bot/bot_rescoring.py)
+SCORE_COLUMNS = (
+    "education_score",
+    "format_score",
+    "experience_score",
+    "skills_score",
+    "extras_score",
+)
+BOOLEAN_COLUMNS = (
+    "is_valid_candidate",
+    "is_software_developer",
+    "is_from_peru",
+    "has_github",
+)
+
+# Ranking: índice (score, id) descendente que además trae las columnas de
+# los filtros. Los filtros se evalúan leyendo solo el índice y la tabla se
+# toca únicamente para las filas devueltas; con LIMIT corta apenas junta N.
+# El filtro más común (solo developers) tiene su propio índice ordenado,
+# y la fecha de carga uno aparte para los rangos de tiempo.
+INDEXES = {
+    "idx_candidates_ranking": (
+        "overall_score DESC, id DESC, is_software_developer, is_from_peru, "
+        "has_github, years_experience, created_at"
+    ),
+    "idx_candidates_developer_ranking": (
+        "is_software_developer, overall_score DESC, id DESC, is_from_peru, "
+        "has_github, years_experience"
+    ),
+    "idx_candidates_created": "created_at",
+}
+
+
+class InvalidCursorError(Exception):
+    """Cursor de paginación corrupto o de otra consulta"""
+
+
+class CandidateStore:
+    """
+    Análisis guardados en SQLite para rankear y comparar candidatos
+
+    Una fila por PDF (sha256): subir el mismo archivo de nuevo actualiza el
+    análisis y la fecha de carga. Paginación por keyset sobre
+    (overall_score, id): cada página cuesta lo mismo sin importar qué tan
+    profundo se pida, a diferencia de OFFSET.
+    """
+
+    def __init__(self, db_path: str):
+        self._lock = threading.Lock()
+        self._db = connect(db_path)
+        self._db.execute("""
+            CREATE TABLE IF NOT EXISTS candidates (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                pdf_sha256 TEXT NOT NULL UNIQUE,
+                filename TEXT,
+                candidate_email TEXT,
+                overall_score REAL NOT NULL,
+                is_valid_candidate INTEGER NOT NULL,
+                is_software_developer INTEGER NOT NULL,
+                is_from_peru INTEGER NOT NULL,
+                has_github INTEGER NOT NULL,
+                years_experience INTEGER NOT NULL,
+                education_score REAL NOT NULL,
+                format_score REAL NOT NULL,
+                experience_score REAL NOT NULL,
+                skills_score REAL NOT NULL,
+                extras_score REAL NOT NULL,
+                model_tier TEXT,
+                result TEXT NOT NULL,
+                created_at REAL NOT NULL
+            )
+            """)
+        # Bases de antes de los sub-scores: se agregan y se llenan desde result
+        columns = {
+            row["name"] for row in self._db.execute("PRAGMA table_info(candidates)")
+        }
+        missing = [column for column in SCORE_COLUMNS if column not in columns]
+        for column in missing:
+            self._db.execute(
+                f"ALTER TABLE candidates ADD COLUMN {column} REAL NOT NULL DEFAULT 0"
+            )
+        if missing:
+            self._db.execute(
+                "UPDATE candidates SET "
+                + ", ".join(
+                    f"{column} = COALESCE(json_extract(result, '$.{column}'), 0)"
+                    for column in missing
+                )
+            )
+        create_indexes(self._db)
+        # Estadísticas para el planner (barato: solo analiza lo que cambió)
+        self._db.execute("PRAGMA optimize=0x10002")
+        self._db.commit()
+
+    def save(
+        self, pdf_sha256: str, filename: Optional[str], result: Dict[str, Any]
+    ) -> int:
+        """Guarda (o actualiza) el análisis del PDF y retorna su id"""
+        with self._lock:
+            row = self._db.execute(
+                """
+                INSERT INTO candidates (
+                    pdf_sha256, filename, candidate_email, overall_score,
+                    is_valid_candidate, is_software_developer, is_from_peru,
+                    has_github, years_experience, education_score, format_score,
+                    experience_score, skills_score, extras_score, model_tier,
+                    result, created_at
+                )
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                ON CONFLICT (pdf_sha256) DO UPDATE SET
+                    filename = COALESCE(excluded.filename, filename),
+                    candidate_email = excluded.candidate_email,
+                    overall_score = excluded.overall_score,
+                    is_valid_candidate = excluded.is_valid_candidate,
+                    is_software_developer = excluded.is_software_developer,
+                    is_from_peru = excluded.is_from_peru,
+                    has_github = excluded.has_github,
+                    years_experience = excluded.years_experience,
+                    education_score = excluded.education_score,
+                    format_score = excluded.format_score,
+                    experience_score = excluded.experience_score,
+                    skills_score = excluded.skills_score,
+                    extras_score = excluded.extras_score,
+                    model_tier = excluded.model_tier,
+                    result = excluded.result,
+                    created_at = excluded.created_at
+                RETURNING id
+                """,
+                (
+                    pdf_sha256,
+                    filename,
+                    result.get("candidate_email"),
+                    result["overall_score"],
+                    bool(result.get("is_valid_candidate")),
+                    bool(result.get("is_software_developer")),
+                    bool(result.get("is_from_peru")),
+                    bool(result.get("has_github")),
+                    int(result.get("years_experience") or 0),
+                    *(result.get(column, 0) for column in SCORE_COLUMNS),
+                    result.get("model_tier"),
+                    json.dumps(result, ensure_ascii=False),
+                    time.time(),
+                ),
+            ).fetchone()
+            self._db.commit()
+        return row["id"]
+
+    def get(self, candidate_id: int) -> Optional[Dict[str, Any]]:
+        """Fila completa con el resultado del análisis"""
+        with self._lock:
+            row = self._db.execute(
+                f"SELECT {', '.join(SUMMARY_COLUMNS)}, result FROM candidates "
+                "WHERE id = ?",
+                (candidate_id,),
+            ).fetchone()
+        if row is None:
+            return None
+        candidate = _summary(row)
+        candidate["result"] = json.loads(row["result"])
+        return candidate
+
+    def top(
+        self,
+        limit: int,
+        cursor: Optional[str] = None,
+        min_score: Optional[float] = None,
+        is_software_developer: Optional[bool] = None,
+        is_from_peru: Optional[bool] = None,
+        has_github: Optional[bool] = None,
+        min_years: Optional[int] = None,
+        uploaded_after: Optional[float] = None,
+        uploaded_before: Optional[float] = None,
+    ) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+        """Mejores candidatos por score con filtros. Retorna (página, next_cursor)"""
+        sql, params = top_query(
+            limit + 1,  # Una fila de más para saber si hay página siguiente
+            cursor,
+            min_score=min_score,
+            is_software_developer=is_software_developer,
+            is_from_peru=is_from_peru,
+            has_github=has_github,
+            min_years=min_years,
+            uploaded_after=uploaded_after,
+            uploaded_before=uploaded_before,
+        )
+        with self._lock:
+            rows = self._db.execute(sql, params).fetchall()
+
+        page = [_summary(row) for row in rows[:limit]]
+        next_cursor = None
+        if len(rows) > limit:
+            last = page[-1]
+            next_cursor = encode_cursor(last["overall_score"], last["id"])
+        return page, next_cursor
+
+    def scoring_inputs(self) -> List[Tuple]:
+        """(id, has_github, overall_score, *SCORE_COLUMNS) de todos, por id"""
+        with self._lock:
+            cursor = self._db.cursor()
+            # Tuplas planas: se cargan directo en arrays de NumPy
+            cursor.row_factory = None
+            return cursor.execute(
+                f"SELECT id, has_github, overall_score, {', '.join(SCORE_COLUMNS)} "
+                "FROM candidates ORDER BY id"
+            ).fetchall()
+
+    def update_scores(self, scores: Iterable[Tuple[float, int]]) -> None:
+        """Escribe (overall_score, id) en la columna y en el resultado guardado"""
+        with self._lock:
+            self._db.executemany(
+                """
+                UPDATE candidates
+                SET overall_score = ?1,
+                    result = json_set(result, '$.overall_score', ?1)
+                WHERE id = ?2
+                """,
+                scores,
+            )
+            self._db.commit()
+
+
+def top_query(
+    limit: int,
+    cursor: Optional[str] = None,
+    min_score: Optional[float] = None,
+    is_software_developer: Optional[bool] = None,
+    is_from_peru: Optional[bool] = None,
+    has_github: Optional[bool] = None,
+    min_years: Optional[int] = None,
+    uploaded_after: Optional[float] = None,
+    uploaded_before: Optional[float] = None,
+) -> Tuple[str, List[Any]]:
+    """SQL y parámetros del ranking (también para EXPLAIN en el benchmark)"""
+    where: List[str] = []
+    params: List[Any] = []
+    for column, value in (
+        ("is_software_developer", is_software_developer),
+        ("is_from_peru", is_from_peru),
+        ("has_github", has_github),
+    ):
+        if value is not None:
+            where.append(f"{column} = ?")
+            params.append(value)
+    if min_score is not None:
+        where.append("overall_score >= ?")
+        params.append(min_score)
+    if min_years is not None:
+        where.append("years_experience >= ?")
+        params.append(min_years)
+    if uploaded_after is not None:
+        where.append("created_at >= ?")
+        params.append(uploaded_after)
+    if uploaded_before is not None:
+        where.append("created_at < ?")
+        params.append(uploaded_before)
+    if cursor is not None:
+        where.append("(overall_score, id) < (?, ?)")
+        params.extend(decode_cursor(cursor))
+
+    sql = f"SELECT {', '.join(SUMMARY_COLUMNS)} FROM candidates"
+    if where:
+        sql += " WHERE " + " AND ".join(where)
+    sql += " ORDER BY overall_score DESC, id DESC LIMIT ?"
+    params.append(limit)
+    return sql, params
+
+
+def create_indexes(db) -> None:
+    for name, columns in INDEXES.items():
+        db.execute(f"CREATE INDEX IF NOT EXISTS {name} ON candidates ({columns})")
+
+
+def encode_cursor(score: float, candidate_id: int) -> str:
+    raw = json.dumps([score, candidate_id]).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Tuple[float, int]:
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        score, candidate_id = json.loads(base64.urlsafe_b64decode(padded))
+        return float(score), int(candidate_id)
+    except (ValueError, TypeError):
+        raise InvalidCursorError("Cursor inválido")
+
+
+def _summary(row) -> Dict[str, Any]:
+    candidate = {column: row[column] for column in SUMMARY_COLUMNS}
+    for column in BOOLEAN_COLUMNS:
+        candidate[column] = bool(candidate[column])
+    return candidate
@@ -0,0 +1,274 @@
+import logging
+import re
+from collections import Counter
+from functools import lru_cache
+from typing import List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Separador de páginas que deja la extracción (convención de pdftotext)
+PAGE_BREAK = "\f"
+
+# (cid:123), caracteres de control y de uso privado que deja pypdf
+GARBAGE_PATTERN = re.compile(
+    r"\(cid:\d+\)|[\x00-\x08\x0b\x0e-\x1f\x7f\ue000-\uf8ff\ufffd]+"
+)
+SPACES_PATTERN = re.compile(r"[ \t\u00a0\u2000-\u200b]+")
+BLANK_LINES_PATTERN = re.compile(r"\n{3,}")
+PAGE_NUMBER_PATTERN = re.compile(
+    r"^\s*(?:(?:p[áa]gina|page|p[áa]g\.?)\s*)?\d{1,3}(?:\s*(?:/|de|of)\s*\d{1,3})?\s*$",
+    re.IGNORECASE,
+)
+
+# Palabra clave del título -> sección
+SECTION_KEYWORDS = [
+    (
+        "experience",
+        r"experiencia|experience|trayectoria|historial laboral|proyectos|projects",
+    ),
+    (
+        "skills",
+        r"habilidades|competencias|skills|tecnolog[íi]as|technologies|"
+        r"conocimientos|stack|herramientas|tools",
+    ),
+    (
+        "education",
+        r"educaci[óo]n|formaci[óo]n|education|estudios|"
+        r"certificaciones|certifications|cursos|courses",
+    ),
+]
+# "EXPERIENCIA PROFESIONAL" (mayúsculas) o solo la palabra clave ("Skills:")
+UPPER_HEADINGS = [
+    (name, re.compile(rf"^(?:{keywords})\b", re.IGNORECASE))
+    for name, keywords in SECTION_KEYWORDS
+]
+PLAIN_HEADINGS = [
+    (name, re.compile(rf"^(?:{keywords}):?$", re.IGNORECASE))
+    for name, keywords in SECTION_KEYWORDS
+]
+MAX_HEADING_LENGTH = 60
+
+# Qué se conserva primero cuando no alcanza el presupuesto
+SECTION_PRIORITY = ["header", "experience", "skills", "education", "other"]
+
+# Encabezados/pies: se buscan en las primeras/últimas N líneas de cada página
+EDGE_LINES = 3
+
+
+class CompactionResult:
+    """Texto compactado y tokens antes/después"""
+
+    def __init__(
+        self,
+        text: str,
+        tokens_before: int,
+        tokens_after: int,
+        sections: List[Tuple[str, str]],
+        truncated: List[str],
+    ):
+        self.text = text
+        self.tokens_before = tokens_before
+        self.tokens_after = tokens_after
+        self.sections = sections
+        self.truncated = truncated
+
+
+@lru_cache(maxsize=8)
+def _encoding(model: str):
+    """Tokenizer real si tiktoken está disponible (None si no)"""
+    try:
+        import tiktoken
+    except ImportError:
+        return None
+
+    try:
+        try:
+            return tiktoken.encoding_for_model(model)
+        except KeyError:
+            return tiktoken.get_encoding("o200k_base")
+    except Exception as e:
+        # Sin red tiktoken no puede bajar el BPE: se usa la estimación
+        logger.warning("tiktoken no disponible (%s), se estiman tokens", e)
+        return None
+
+
+def load_encoding(model: str) -> bool:
+    """
+    Carga el tokenizer del modelo una vez (True si hay tiktoken)
+
+    La primera vez tiktoken puede bajar el BPE de la red: llamar fuera del
+    event loop (asyncio.to_thread).
+    """
+    return _encoding(model) is not None
+
+
+def count_tokens(text: str, model: str) -> int:
+    """Tokens del texto (estimación ~4 caracteres/token sin tiktoken)"""
+    encoding = _encoding(model)
+    if encoding is None:
+        return (len(text) + 3) // 4
+    return len(encoding.encode(text, disallowed_special=()))
+
+
+def truncate_to_tokens(text: str, max_tokens: int, model: str) -> str:
+    """Corta el texto a max_tokens, sin partir líneas cuando se puede"""
+    if max_tokens <= 0:
+        return ""
+
+    encoding = _encoding(model)
+    if encoding is None:
+        cut = text[: max_tokens * 4]
+    else:
+        cut = encoding.decode(encoding.encode(text, disallowed_special=())[:max_tokens])
+
+    if len(cut) < len(text) and "\n" in cut:
+        cut = cut[: cut.rindex("\n")]
+    return cut.rstrip()
+
+
+def normalize_whitespace(text: str) -> str:
+    """Quita basura de glifos, espacios repetidos y números de página sueltos"""
+    text = GARBAGE_PATTERN.sub("", text)
+    text = text.replace("\r\n", "\n").replace("\r", "\n")
+
+    lines = []
+    for line in text.split("\n"):
+        line = SPACES_PATTERN.sub(" ", line).strip()
+        if PAGE_NUMBER_PATTERN.match(line):
+            continue
+        lines.append(line)
+
+    return BLANK_LINES_PATTERN.sub("\n\n", "\n".join(lines)).strip()
+
+
+def remove_repeated_edges(pages: List[str]) -> List[str]:
+    """Quita encabezados y pies que se repiten en la mayoría de páginas"""
+    if len(pages) < 2:
+        return pages
+
+    page_lines = [page.split("\n") for page in pages]
+    counts: Counter = Counter()
+    for lines in page_lines:
+        edges = {line for line in lines[:EDGE_LINES] + lines[-EDGE_LINES:] if line}
+        counts.update(edges)
+
+    threshold = max(2, (len(pages) + 1) // 2)
+    repeated = {line for line, count in counts.items() if count >= threshold}
+    if not repeated:
+        return pages
+
+    # La 1ra aparición se conserva (suele ser el nombre/contacto)
+    seen = set()
+    cleaned = []
+    for lines in page_lines:
+        edge = set(range(min(EDGE_LINES, len(lines))))
+        edge |= set(range(max(0, len(lines) - EDGE_LINES), len(lines)))
+        kept = []
+        for index, line in enumerate(lines):
+            if index in edge and line in repeated:
+                if line in seen:
+                    continue
+                seen.add(line)
+            kept.append(line)
+        cleaned.append("\n".join(kept))
+    return cleaned
+
+
+def segment_sections(text: str) -> List[Tuple[str, str]]:
+    """
+    Divide el CV en secciones (header, experience, skills, education, other)
+
+    Todo lo anterior al primer título es 'header' (contacto y resumen).
+    """
+    sections: List[Tuple[str, List[str]]] = [("header", [])]
+
+    for line in text.split("\n"):
+        section = _heading_section(line, in_header=len(sections) == 1)
+        if section is not None:
+            sections.append((section, [line]))
+        else:
+            sections[-1][1].append(line)
+
+    return [
+        (name, "\n".join(lines).strip())
+        for name, lines in sections
+        if any(line.strip() for line in lines)
+    ]
+
+
+def _heading_section(line: str, in_header: bool) -> Optional[str]:
+    stripped = line.strip(" :•-●")
+    if not stripped or len(stripped) > MAX_HEADING_LENGTH:
+        return None
+
+    words = len(stripped.split())
+    if stripped.isupper() and words <= 5:
+        for name, pattern in UPPER_HEADINGS:
+            if pattern.match(stripped):
+                return name
+        # Título en MAYÚSCULAS no reconocido (IDIOMAS, LOGROS...): baja
+        # prioridad. En el header suele ser el nombre del candidato
+        if not in_header and words <= 3:
+            return "other"
+        return None
+
+    for name, pattern in PLAIN_HEADINGS:
+        if pattern.match(line.strip(" •-●")):
+            return name
+    return None
+
+
+def compact_cv_text(text: str, token_budget: int, model: str) -> CompactionResult:
+    """
+    Prepara el texto del CV para el prompt
+
+    1. Normaliza espacios y quita basura
+    2. Quita encabezados/pies repetidos entre páginas
+    3. Segmenta en secciones
+    4. Si pasa el presupuesto, recorta por prioridad de sección
+    """
+    tokens_before = count_tokens(text, model)
+
+    pages = [normalize_whitespace(page) for page in text.split(PAGE_BREAK)]
+    pages = remove_repeated_edges([page for page in pages if page])
+    sections = segment_sections("\n\n".join(pages))
+
+    section_tokens = [count_tokens(body, model) for _, body in sections]
+    truncated: List[str] = []
+
+    if sum(section_tokens) > token_budget:
+        # Presupuesto por prioridad; el orden del documento se conserva
+        remaining = token_budget
+        kept = [""] * len(sections)
+        order = sorted(
+            range(len(sections)),
+            key=lambda i: (_priority(sections[i][0]), i),
+        )
+        for i in order:
+            name, body = sections[i]
+            if section_tokens[i] <= remaining:
+                kept[i] = body
+                remaining -= section_tokens[i]
+            else:
+                kept[i] = truncate_to_tokens(body, remaining, model)
+                remaining -= count_tokens(kept[i], model)
+                if name not in truncated:
+                    truncated.append(name)
+        sections = [(name, body) for (name, _), body in zip(sections, kept) if body]
+
+    compacted = BLANK_LINES_PATTERN.sub(
+        "\n\n", "\n\n".join(body for _, body in sections)
+    )
+    tokens_after = count_tokens(compacted, model)
+
+    return CompactionResult(
+        text=compacted,
+        tokens_before=tokens_before,
+        tokens_after=tokens_after,
+        sections=sections,
+        truncated=truncated,
+    )
+
+
+def _priority(section: str) -> int:
+    return SECTION_PRIORITY.index(section)
@@ -0,0 +1,30 @@
+from fastapi import HTTPException, Request
+
+from apps.bot.bot_candidates import CandidateStore
+from apps.bot.bot_ingest import DirectoryIngestor
+from apps.bot.bot_jobs import JobQueue
+from apps.bot.bot_service import BotService
+
+# Los servicios se crean en el lifespan de main.py (no al importar) y viven
+# en app.state; los endpoints los reciben con Depends
+
+
+def get_service(request: Request) -> BotService:
+    return request.app.state.service
+
+
+def get_job_queue(request: Request) -> JobQueue:
+    return request.app.state.job_queue
+
+
+def get_ingestor(request: Request) -> DirectoryIngestor:
+    return request.app.state.ingestor
+
+
+def get_candidates(request: Request) -> CandidateStore:
+    store = request.app.state.service.candidates
+    if store is None:
+        raise HTTPException(
+            status_code=404, detail="Historial de candidatos deshabilitado"
+        )
+    return store
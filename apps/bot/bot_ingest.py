@@ -0,0 +1,312 @@
+"""
+Ingesta incremental de una carpeta de PDFs
+
+Mantiene un manifest (ruta, mtime, tamaño, sha256) y solo analiza lo nuevo
+o modificado; el resultado queda guardado y /feedback-cv lo sirve al toque.
+
+Uso (corrida nocturna sobre miles de archivos):
+    python -m apps.bot.bot_ingest [CARPETA] [--concurrency N] [--notify]
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import os
+import threading
+import time
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from apps.bot.bot_schemas import CVFeedbackResponse
+from apps.bot.bot_service import BotService
+from core.database import connect
+from core.settings import settings
+
+logger = logging.getLogger(__name__)
+
+
+class ManifestStore:
+    """
+    Manifest de archivos ingeridos en SQLite
+
+    analysis_key = sha256:versión del prompt:modelo. Cambiar el prompt o el
+    modelo vuelve a marcar todo como pendiente sin tocar los archivos.
+    """
+
+    def __init__(self, db_path: str):
+        self._lock = threading.Lock()
+        self._db = connect(db_path)
+        self._db.execute("""
+            CREATE TABLE IF NOT EXISTS manifest (
+                path TEXT PRIMARY KEY,
+                mtime REAL NOT NULL,
+                size INTEGER NOT NULL,
+                sha256 TEXT NOT NULL,
+                analysis_key TEXT NOT NULL,
+                status TEXT NOT NULL,
+                result TEXT,
+                error TEXT,
+                analyzed_at REAL NOT NULL
+            )
+            """)
+        self._db.commit()
+
+    def get(self, path: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            row = self._db.execute(
+                "SELECT * FROM manifest WHERE path = ?", (path,)
+            ).fetchone()
+        if row is None:
+            return None
+        entry = dict(row)
+        entry["result"] = json.loads(entry["result"]) if entry["result"] else None
+        return entry
+
+    def entries(self, folder: str) -> Dict[str, Dict[str, Any]]:
+        """ruta -> mtime, size, analysis_key y status de lo que hay bajo folder"""
+        prefix = os.path.join(folder, "")
+        with self._lock:
+            rows = self._db.execute(
+                """
+                SELECT path, mtime, size, analysis_key, status FROM manifest
+                WHERE substr(path, 1, ?) = ?
+                """,
+                (len(prefix), prefix),
+            ).fetchall()
+        return {row["path"]: dict(row) for row in rows}
+
+    def save(
+        self,
+        path: str,
+        mtime: float,
+        size: int,
+        sha256: str,
+        analysis_key: str,
+        result: Optional[Dict[str, Any]] = None,
+        error: Optional[str] = None,
+    ) -> None:
+        with self._lock:
+            self._db.execute(
+                """
+                INSERT OR REPLACE INTO manifest
+                    (path, mtime, size, sha256, analysis_key, status, result,
+                     error, analyzed_at)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+                """,
+                (
+                    path,
+                    mtime,
+                    size,
+                    sha256,
+                    analysis_key,
+                    "failed" if error else "done",
+                    json.dumps(result, ensure_ascii=False) if result else None,
+                    error,
+                    time.time(),
+                ),
+            )
+            self._db.commit()
+
+    def touch(self, path: str, mtime: float, size: int) -> None:
+        """Mismo contenido con otro mtime (copiado, touch): no se re-analiza"""
+        with self._lock:
+            self._db.execute(
+                "UPDATE manifest SET mtime = ?, size = ? WHERE path = ?",
+                (mtime, size, path),
+            )
+            self._db.commit()
+
+    def invalidate(self, key_suffix: str) -> int:
+        """Borra las entradas analizadas con ese prompt/modelo. Retorna cuántas"""
+        with self._lock:
+            cursor = self._db.execute(
+                "DELETE FROM manifest WHERE substr(analysis_key, -?) = ?",
+                (len(key_suffix), key_suffix),
+            )
+            self._db.commit()
+        return cursor.rowcount
+
+    def remove(self, paths: List[str]) -> None:
+        with self._lock:
+            self._db.executemany(
+                "DELETE FROM manifest WHERE path = ?", [(path,) for path in paths]
+            )
+            self._db.commit()
+
+
+class DirectoryIngestor:
+    """
+    Analiza una carpeta comparando contra el manifest
+
+    - mtime y tamaño iguales: ni se lee el archivo
+    - Distintos: se hashea; si el contenido es el mismo solo se actualiza
+      el manifest, si no se analiza (con cache y single-flight)
+    - Concurrencia acotada; un PDF malo queda "failed" y se reintenta en
+      la próxima corrida
+    """
+
+    def __init__(self, service, store: ManifestStore, concurrency: int):
+        self.service = service
+        self.store = store
+        self.concurrency = concurrency
+
+    async def ingest_folder(self, folder: str, notify: bool = False) -> Dict[str, int]:
+        """Corre una pasada incremental. Retorna el resumen de la corrida"""
+        folder = os.path.abspath(folder)
+        known = await asyncio.to_thread(self.store.entries, folder)
+        summary = {"scanned": 0, "unchanged": 0, "analyzed": 0, "failed": 0}
+
+        pending: List[Tuple[str, float, int]] = []
+        seen = set()
+        for path, mtime, size in iter_pdfs(folder):
+            summary["scanned"] += 1
+            seen.add(path)
+            entry = known.get(path)
+            if entry is not None and self._is_fresh(entry, mtime, size):
+                summary["unchanged"] += 1
+            else:
+                pending.append((path, mtime, size))
+
+        removed = [path for path in known if path not in seen]
+        if removed:
+            await asyncio.to_thread(self.store.remove, removed)
+        summary["removed"] = len(removed)
+
+        semaphore = asyncio.Semaphore(self.concurrency)
+
+        async def run(path: str, mtime: float, size: int) -> str:
+            async with semaphore:
+                try:
+                    return await self._ingest(path, mtime, size, notify)
+                except Exception as e:
+                    logger.warning("Ingesta %s falló: %s", path, e)
+                    return "failed"
+
+        tasks = [asyncio.create_task(run(*item)) for item in pending]
+        try:
+            for next_done in asyncio.as_completed(tasks):
+                summary[await next_done] += 1
+        finally:
+            for task in tasks:
+                task.cancel()
+        return summary
+
+    async def ingest_file(self, path: str) -> Tuple[CVFeedbackResponse, bool]:
+        """
+        Resultado guardado del archivo, analizándolo solo si cambió
+
+        Retorna (resultado, guardado). Si el análisis falla lanza su excepción.
+        """
+        path = os.path.abspath(path)
+        stat = os.stat(path)
+        entry = await asyncio.to_thread(self.store.get, path)
+        if entry is not None and self._is_fresh(entry, stat.st_mtime, stat.st_size):
+            return CVFeedbackResponse.model_validate(entry["result"]), True
+
+        await self._ingest(path, stat.st_mtime, stat.st_size, notify=False)
+        entry = await asyncio.to_thread(self.store.get, path)
+        return CVFeedbackResponse.model_validate(entry["result"]), False
+
+    def _is_fresh(self, entry: Dict[str, Any], mtime: float, size: int) -> bool:
+        """Analizado OK, mismo archivo en disco y mismo prompt/modelo"""
+        return (
+            entry["status"] == "done"
+            and entry["mtime"] == mtime
+            and entry["size"] == size
+            and entry["analysis_key"].endswith(self._key_suffix())
+        )
+
+    async def _ingest(self, path: str, mtime: float, size: int, notify: bool) -> str:
+        sha256 = await asyncio.to_thread(self.service.hash_pdf, path)
+        analysis_key = self._analysis_key(sha256)
+
+        entry = await asyncio.to_thread(self.store.get, path)
+        if (
+            entry is not None
+            and entry["status"] == "done"
+            and entry["analysis_key"] == analysis_key
+        ):
+            await asyncio.to_thread(self.store.touch, path, mtime, size)
+            return "unchanged"
+
+        try:
+            filename = os.path.basename(path)
+            if notify:
+                result, _ = await self.service.process_cv(path, sha256, filename)
+            else:
+                result, _ = await self.service.analyze_cv_cached(path, sha256)
+                await asyncio.to_thread(
+                    self.service.record_candidate, result, sha256, filename
+                )
+        except Exception as e:
+            # Queda "failed" y la próxima corrida lo reintenta
+            await asyncio.to_thread(
+                self.store.save, path, mtime, size, sha256, analysis_key, error=str(e)
+            )
+            raise
+
+        await asyncio.to_thread(
+            self.store.save,
+            path,
+            mtime,
+            size,
+            sha256,
+            analysis_key,
+            result=result.model_dump(),
+        )
+        return "analyzed"
+
+    def invalidate(self) -> int:
+        """La próxima corrida re-analiza lo hecho con el prompt/modelo actuales"""
+        return self.store.invalidate(self._key_suffix())
+
+    def _key_suffix(self) -> str:
+        return f":{self.service.template.version}:{self.service.cache_model}"
+
+    def _analysis_key(self, sha256: str) -> str:
+        return sha256 + self._key_suffix()
+
+
+def iter_pdfs(folder: str) -> Iterator[Tuple[str, float, int]]:
+    """(ruta, mtime, tamaño) de cada PDF bajo folder, sin seguir symlinks"""
+    stack = [folder]
+    while stack:
+        with os.scandir(stack.pop()) as it:
+            for entry in it:
+                is_pdf = entry.name.lower().endswith(".pdf")
+                if entry.is_dir(follow_symlinks=False):
+                    stack.append(entry.path)
+                elif is_pdf and entry.is_file(follow_symlinks=False):
+                    stat = entry.stat(follow_symlinks=False)
+                    yield entry.path, stat.st_mtime, stat.st_size
+
+
+async def _main(folder: str, concurrency: int, notify: bool) -> Dict[str, int]:
+    service = BotService()
+    ingestor = DirectoryIngestor(
+        service, ManifestStore(settings.INGEST_DB_PATH), concurrency
+    )
+    try:
+        return await ingestor.ingest_folder(folder, notify=notify)
+    finally:
+        service.pdf_engine.shutdown()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Analiza solo los PDFs nuevos o modificados de una carpeta"
+    )
+    parser.add_argument("folder", nargs="?", default=settings.INGEST_DIR)
+    parser.add_argument("--concurrency", type=int, default=settings.INGEST_CONCURRENCY)
+    parser.add_argument(
+        "--notify",
+        action="store_true",
+        help="Encolar el email de aceptación (lo entrega el outbox de la API)",
+    )
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    start = time.perf_counter()
+    summary = asyncio.run(_main(args.folder, args.concurrency, args.notify))
+    summary["seconds"] = round(time.perf_counter() - start, 2)
+    print(json.dumps(summary))
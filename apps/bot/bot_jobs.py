@@ -0,0 +1,469 @@
+import asyncio
+import json
+import logging
+import os
+import random
+import shutil
+import threading
+import time
+import uuid
+from typing import Any, Dict, List, Optional, Union
+
+from core.database import connect
+from core.settings import settings
+
+logger = logging.getLogger(__name__)
+
+
+class JobQueueFullError(Exception):
+    """La cola alcanzó JOB_QUEUE_MAXSIZE"""
+
+
+class JobStore:
+    """
+    Estado de los jobs en SQLite
+
+    El PDF no va a la base: se guarda en pdf_dir con su sha256 como nombre
+    (el mismo CV encolado dos veces es un solo archivo) mientras el job
+    está pendiente, para poder retomarlo tras un reinicio, y se borra al
+    terminar. Los jobs de bases anteriores traen el PDF en la columna pdf.
+
+    Con varios workers de uvicorn la base es compartida: cada job running
+    tiene dueño (owner) y un lease que el dueño renueva mientras trabaja.
+    Un job solo se toma con un UPDATE condicional (claim); los de un worker
+    muerto vuelven a estar disponibles cuando vence su lease.
+
+    Un job que falla vuelve a queued con backoff exponencial + jitter hasta
+    JOB_MAX_ATTEMPTS intentos; recién ahí queda failed.
+    """
+
+    # queued y vencido, o running con lease vencido (o sin lease: base anterior)
+    _AVAILABLE = (
+        "(status = 'queued' AND next_attempt_at <= ?) OR (status = 'running' "
+        "AND (lease_until IS NULL OR lease_until < ?))"
+    )
+
+    def __init__(self, db_path: str, pdf_dir: str, lease_seconds: float = 300.0):
+        self.pdf_dir = pdf_dir
+        self.lease_seconds = lease_seconds
+        self._owner = f"{os.getpid()}-{uuid.uuid4().hex[:8]}"
+        self._lock = threading.Lock()
+        os.makedirs(pdf_dir, exist_ok=True)
+        self._db = connect(db_path)
+        self._db.execute("""
+            CREATE TABLE IF NOT EXISTS jobs (
+                id TEXT PRIMARY KEY,
+                status TEXT NOT NULL,
+                filename TEXT,
+                pdf BLOB,
+                result TEXT,
+                error TEXT,
+                created_at REAL NOT NULL,
+                updated_at REAL NOT NULL,
+                owner TEXT,
+                lease_until REAL,
+                pdf_sha256 TEXT,
+                attempts INTEGER NOT NULL DEFAULT 0,
+                next_attempt_at REAL NOT NULL DEFAULT 0
+            )
+            """)
+        # Bases creadas antes de los leases, del PDF en disco y los reintentos
+        columns = {row["name"] for row in self._db.execute("PRAGMA table_info(jobs)")}
+        for name, kind in (
+            ("owner", "TEXT"),
+            ("lease_until", "REAL"),
+            ("pdf_sha256", "TEXT"),
+            ("attempts", "INTEGER NOT NULL DEFAULT 0"),
+            ("next_attempt_at", "REAL NOT NULL DEFAULT 0"),
+        ):
+            if name not in columns:
+                self._db.execute(f"ALTER TABLE jobs ADD COLUMN {name} {kind}")
+        self._db.execute(
+            "CREATE INDEX IF NOT EXISTS idx_jobs_status ON jobs (status, created_at)"
+        )
+        self._db.commit()
+
+    def create(
+        self, filename: Optional[str], pdf: Union[bytes, str], pdf_sha256: str
+    ) -> str:
+        """Guarda el PDF (bytes o ruta, se copia) y registra el job en queued"""
+        self._store_pdf(pdf, pdf_sha256)
+
+        job_id = uuid.uuid4().hex
+        now = time.time()
+        with self._lock:
+            self._db.execute(
+                """
+                INSERT INTO jobs
+                    (id, status, filename, pdf_sha256, created_at, updated_at)
+                VALUES (?, 'queued', ?, ?, ?, ?)
+                """,
+                (job_id, filename, pdf_sha256, now, now),
+            )
+            self._db.commit()
+        # Otro job con el mismo PDF pudo terminar y borrarlo en el medio
+        self._store_pdf(pdf, pdf_sha256)
+        return job_id
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """Estado público del job (sin el PDF)"""
+        with self._lock:
+            row = self._db.execute(
+                """
+                SELECT id, status, filename, result, error, attempts, created_at,
+                    updated_at
+                FROM jobs WHERE id = ?
+                """,
+                (job_id,),
+            ).fetchone()
+
+        if row is None:
+            return None
+
+        return {
+            "job_id": row["id"],
+            "status": row["status"],
+            "filename": row["filename"],
+            "attempts": row["attempts"],
+            "created_at": row["created_at"],
+            "updated_at": row["updated_at"],
+            "result": json.loads(row["result"]) if row["result"] else None,
+            "error": row["error"],
+        }
+
+    def get_pdf(self, job_id: str) -> Optional[Union[bytes, str]]:
+        """Ruta del PDF del job (bytes si es de una base anterior; None = no está)"""
+        with self._lock:
+            row = self._db.execute(
+                "SELECT pdf, pdf_sha256 FROM jobs WHERE id = ?", (job_id,)
+            ).fetchone()
+        if row is None:
+            return None
+        if row["pdf_sha256"] is not None:
+            path = self._pdf_path(row["pdf_sha256"])
+            return path if os.path.isfile(path) else None
+        return row["pdf"]
+
+    def get_sha256(self, job_id: str) -> Optional[str]:
+        with self._lock:
+            row = self._db.execute(
+                "SELECT pdf_sha256 FROM jobs WHERE id = ?", (job_id,)
+            ).fetchone()
+        return row["pdf_sha256"] if row else None
+
+    def count_queued(self) -> int:
+        with self._lock:
+            row = self._db.execute(
+                "SELECT COUNT(*) AS n FROM jobs WHERE status = 'queued'"
+            ).fetchone()
+        return row["n"]
+
+    def claim_next(self) -> Optional[str]:
+        """
+        Toma el job disponible más antiguo para este worker (None = no hay)
+
+        Disponible = queued, o running con el lease vencido (su worker
+        murió). El UPDATE solo afecta la fila si sigue disponible: si otro
+        worker la tomó primero se prueba con la siguiente.
+        """
+        now = time.time()
+        with self._lock:
+            candidates = self._db.execute(
+                f"""
+                SELECT id FROM jobs WHERE {self._AVAILABLE}
+                ORDER BY created_at LIMIT 10
+                """,
+                (now, now),
+            ).fetchall()
+            for row in candidates:
+                cursor = self._db.execute(
+                    f"""
+                    UPDATE jobs
+                    SET status = 'running', owner = ?, lease_until = ?,
+                        updated_at = ?
+                    WHERE id = ? AND ({self._AVAILABLE})
+                    """,
+                    (self._owner, now + self.lease_seconds, now, row["id"], now, now),
+                )
+                self._db.commit()
+                if cursor.rowcount == 1:
+                    return row["id"]
+        return None
+
+    def renew(self, job_id: str) -> bool:
+        """Extiende el lease; False si el job ya no es de este worker"""
+        with self._lock:
+            cursor = self._db.execute(
+                """
+                UPDATE jobs SET lease_until = ?
+                WHERE id = ? AND owner = ? AND status = 'running'
+                """,
+                (time.time() + self.lease_seconds, job_id, self._owner),
+            )
+            self._db.commit()
+        return cursor.rowcount == 1
+
+    def mark_done(self, job_id: str, result: Dict[str, Any]) -> None:
+        self._finish(job_id, "done", result=json.dumps(result, ensure_ascii=False))
+
+    def mark_failed(self, job_id: str, error: str) -> None:
+        """Falla definitiva (sin reintentos)"""
+        self._finish(job_id, "failed", error=error)
+
+    def mark_retry(self, job_id: str, error: str) -> bool:
+        """
+        Vuelve a queued con backoff exponencial + jitter, o failed si se agotó
+
+        Retorna True si queda para reintentar.
+        """
+        with self._lock:
+            row = self._db.execute(
+                "SELECT attempts FROM jobs WHERE id = ? AND owner = ?",
+                (job_id, self._owner),
+            ).fetchone()
+        if row is None:
+            logger.warning("Job %s: el lease pasó a otro worker", job_id)
+            return False
+
+        attempts = row["attempts"] + 1
+        if attempts >= settings.JOB_MAX_ATTEMPTS:
+            self._finish(job_id, "failed", error=error, attempts=attempts)
+            return False
+
+        delay = settings.JOB_BACKOFF_SECONDS * 2 ** (attempts - 1)
+        delay = min(delay, settings.JOB_MAX_BACKOFF_SECONDS)
+        now = time.time()
+        with self._lock:
+            self._db.execute(
+                """
+                UPDATE jobs
+                SET status = 'queued', error = ?, attempts = ?, next_attempt_at = ?,
+                    owner = NULL, lease_until = NULL, updated_at = ?
+                WHERE id = ? AND owner = ? AND status = 'running'
+                """,
+                (
+                    error,
+                    attempts,
+                    now + random.uniform(delay / 2, delay),
+                    now,
+                    job_id,
+                    self._owner,
+                ),
+            )
+            self._db.commit()
+        return True
+
+    def next_due_in(self) -> Optional[float]:
+        """Segundos hasta el próximo reintento en queued (None si no hay)"""
+        with self._lock:
+            row = self._db.execute(
+                "SELECT MIN(next_attempt_at) AS at FROM jobs WHERE status = 'queued'"
+            ).fetchone()
+        if row["at"] is None:
+            return None
+        return max(0.0, row["at"] - time.time())
+
+    def release(self, job_id: str) -> None:
+        """Apagado: devuelve el job a queued para que lo tome otro worker"""
+        with self._lock:
+            self._db.execute(
+                """
+                UPDATE jobs
+                SET status = 'queued', owner = NULL, lease_until = NULL,
+                    updated_at = ?
+                WHERE id = ? AND owner = ? AND status = 'running'
+                """,
+                (time.time(), job_id, self._owner),
+            )
+            self._db.commit()
+
+    def _finish(
+        self,
+        job_id: str,
+        status: str,
+        result: Optional[str] = None,
+        error: Optional[str] = None,
+        attempts: Optional[int] = None,
+    ) -> None:
+        """Solo el dueño del lease cierra el job (y se borra el PDF)"""
+        with self._lock:
+            cursor = self._db.execute(
+                """
+                UPDATE jobs
+                SET status = ?, result = ?, error = ?, updated_at = ?,
+                    attempts = COALESCE(?, attempts), pdf = NULL, lease_until = NULL
+                WHERE id = ? AND owner = ?
+                RETURNING pdf_sha256
+                """,
+                (status, result, error, time.time(), attempts, job_id, self._owner),
+            )
+            row = cursor.fetchone()
+            self._db.commit()
+            if row is None:
+                logger.warning("Job %s: el lease pasó a otro worker", job_id)
+                return
+            # El archivo es por contenido: solo si ningún otro job lo espera
+            sha256 = row["pdf_sha256"]
+            if (
+                sha256 is not None
+                and not self._db.execute(
+                    """
+                SELECT 1 FROM jobs
+                WHERE pdf_sha256 = ? AND status IN ('queued', 'running')
+                """,
+                    (sha256,),
+                ).fetchone()
+            ):
+                try:
+                    os.remove(self._pdf_path(sha256))
+                except FileNotFoundError:
+                    pass
+
+    def _pdf_path(self, sha256: str) -> str:
+        return os.path.join(self.pdf_dir, f"{sha256}.pdf")
+
+    def _store_pdf(self, pdf: Union[bytes, str], sha256: str) -> None:
+        """Copia el PDF a pdf_dir (temporal + rename: nunca queda a medias)"""
+        path = self._pdf_path(sha256)
+        if os.path.isfile(path):
+            return
+        partial = f"{path}.{uuid.uuid4().hex[:8]}.part"
+        try:
+            if isinstance(pdf, bytes):
+                with open(partial, "wb") as f:
+                    f.write(pdf)
+            else:
+                # Por bloques: el upload volcado a disco no pasa por memoria
+                shutil.copyfile(pdf, partial)
+            os.replace(partial, path)
+        except BaseException:
+            try:
+                os.remove(partial)
+            except FileNotFoundError:
+                pass
+            raise
+
+
+class JobQueue:
+    """
+    Cola de análisis con un pool de workers async en el mismo proceso
+
+    - submit() registra el job y retorna el id al instante
+    - Los workers toman jobs de la base con claim (nunca dos el mismo) y
+      corren process_cv (análisis + email), renovando el lease mientras
+    - Un job que falla se reintenta con backoff (JOB_MAX_ATTEMPTS)
+    - Sin trabajo duermen hasta un submit local, el próximo reintento o
+      poll_seconds: así también retoman los jobs de otro worker que murió
+    - JobStore es SQLite: se llama en un hilo, nunca en el event loop
+    """
+
+    def __init__(
+        self,
+        service,
+        store: JobStore,
+        workers: int,
+        maxsize: int,
+        poll_seconds: float = 5.0,
+    ):
+        self.service = service
+        self.store = store
+        self.workers = workers
+        self.maxsize = maxsize
+        self.poll_seconds = poll_seconds
+        self._wakeup = asyncio.Event()
+        self._tasks: List[asyncio.Task] = []
+
+    async def start(self) -> None:
+        """Lanza los workers (lo pendiente de antes lo toman ellos)"""
+        self._tasks = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+
+    async def stop(self) -> None:
+        """Cancela los workers; lo que estaba en curso vuelve a queued"""
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    async def submit(
+        self, filename: Optional[str], pdf: Union[bytes, str], pdf_sha256: str
+    ) -> str:
+        """Encola un CV (bytes o ruta). Lanza JobQueueFullError si no hay espacio"""
+        if await asyncio.to_thread(self.store.count_queued) >= self.maxsize:
+            raise JobQueueFullError("Cola de análisis llena")
+
+        job_id = await asyncio.to_thread(self.store.create, filename, pdf, pdf_sha256)
+        self._wakeup.set()
+        return job_id
+
+    async def _worker(self) -> None:
+        while True:
+            # clear antes del claim: un submit en el medio no se pierde
+            self._wakeup.clear()
+            try:
+                job_id = await asyncio.to_thread(self.store.claim_next)
+            except Exception as e:
+                logger.warning("No se pudo tomar un job: %s", e)
+                job_id = None
+
+            if job_id is None:
+                await self._sleep()
+                continue
+
+            await self._run(job_id)
+
+    async def _sleep(self) -> None:
+        """Hasta un submit, el próximo reintento o poll_seconds"""
+        try:
+            wait = await asyncio.to_thread(self.store.next_due_in)
+        except Exception:
+            wait = None
+        if wait is None or wait > self.poll_seconds:
+            wait = self.poll_seconds
+        try:
+            await asyncio.wait_for(self._wakeup.wait(), timeout=wait)
+        except asyncio.TimeoutError:
+            pass
+
+    async def _run(self, job_id: str) -> None:
+        heartbeat = asyncio.create_task(self._heartbeat(job_id))
+        try:
+            pdf = await asyncio.to_thread(self.store.get_pdf, job_id)
+            if pdf is None:
+                await asyncio.to_thread(
+                    self.store.mark_failed, job_id, "PDF no disponible"
+                )
+                return
+            job = await asyncio.to_thread(self.store.get, job_id)
+            pdf_sha256 = await asyncio.to_thread(self.store.get_sha256, job_id)
+            result, _ = await self.service.process_cv(
+                pdf, pdf_sha256, filename=job["filename"] if job else None
+            )
+            await asyncio.to_thread(self.store.mark_done, job_id, result.model_dump())
+        except asyncio.CancelledError:
+            # Apagado: otro worker (o este al reiniciar) lo retoma
+            self.store.release(job_id)
+            raise
+        except Exception as e:
+            try:
+                retry = await asyncio.to_thread(self.store.mark_retry, job_id, str(e))
+            except Exception as store_error:
+                # Queda running: al vencer el lease lo retoma otro worker
+                logger.warning(
+                    "Job %s: no se pudo registrar el error: %s", job_id, store_error
+                )
+                return
+            logger.warning(
+                "Job %s falló (%s): %s", job_id, "se reintenta" if retry else "final", e
+            )
+        finally:
+            heartbeat.cancel()
+
+    async def _heartbeat(self, job_id: str) -> None:
+        """Renueva el lease cada tercio de su duración mientras el job corre"""
+        while True:
+            await asyncio.sleep(self.store.lease_seconds / 3)
+            try:
+                if not await asyncio.to_thread(self.store.renew, job_id):
+                    return
+            except Exception as e:
+                logger.warning("No se pudo renovar el lease del job %s: %s", job_id, e)
@@ -0,0 +1,337 @@
+import asyncio
+import logging
+import random
+import time
+from collections import deque
+from contextlib import asynccontextmanager
+from email.utils import parsedate_to_datetime
+from functools import lru_cache
+from typing import TYPE_CHECKING, Any, AsyncIterator, Deque, Dict, Optional, Tuple
+
+from core.metrics import LLM_HEDGES, LLM_RETRIES
+
+if TYPE_CHECKING:
+    import openai
+
+logger = logging.getLogger(__name__)
+
+# Estimación de tokens de salida cuando la request no trae max_tokens
+DEFAULT_COMPLETION_TOKENS = 800
+# Muestras mínimas antes de calcular el p99 para el hedge
+HEDGE_MIN_SAMPLES = 20
+
+
+class LLMUnavailableError(Exception):
+    """OpenAI sigue respondiendo 429/5xx después de todos los reintentos"""
+
+    def __init__(self, message: str, retry_after: float):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class TokenBucket:
+    """
+    Token bucket por minuto (requests o tokens)
+
+    Se rellena de forma continua a `per_minute` / 60 por segundo y acumula
+    como máximo `burst_seconds` de cuota (OpenAI aplica los límites por
+    minuto también en ventanas más cortas). acquire() espera en orden de
+    llegada hasta que hay saldo. El saldo puede quedar negativo con
+    adjust() (cuando el consumo real superó la estimación).
+    """
+
+    def __init__(self, per_minute: float, burst_seconds: float = 60.0):
+        self.rate = per_minute / 60.0
+        self.capacity = max(1.0, self.rate * burst_seconds)
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    async def acquire(self, amount: float) -> None:
+        # Una request más grande que el bucket nunca pasaría
+        amount = min(amount, self.capacity)
+        async with self._lock:
+            while True:
+                self._refill()
+                if self.tokens >= amount:
+                    self.tokens -= amount
+                    return
+                await asyncio.sleep((amount - self.tokens) / self.rate)
+
+    def try_acquire(self, amount: float) -> bool:
+        """Sin esperar (para el hedge: solo si sobra cupo)"""
+        if self._lock.locked():
+            return False
+        self._refill()
+        if self.tokens < amount:
+            return False
+        self.tokens -= amount
+        return True
+
+    def adjust(self, amount: float) -> None:
+        """Devuelve (positivo) o cobra (negativo) la diferencia con lo estimado"""
+        self._refill()
+        self.tokens = min(self.capacity, self.tokens + amount)
+
+
+class LLMClient:
+    """
+    Capa sobre chat.completions.create compartida por todo el worker
+
+    - Semáforo de llamadas en vuelo (un stream ocupa su lugar hasta que se
+      consume o se cierra)
+    - Token buckets de requests/min y tokens/min (estimados antes de la
+      llamada, corregidos con usage al terminar)
+    - Reintentos con backoff exponencial con jitter; respeta Retry-After y
+      ante un 429 frena a TODAS las llamadas hasta que vence
+    - Hedge opcional: si la llamada supera el p99 observado se lanza una
+      segunda igual y gana la primera que responde
+    """
+
+    def __init__(
+        self,
+        client: "openai.AsyncOpenAI",
+        max_concurrency: int,
+        rpm: int,
+        tpm: int,
+        max_retries: int,
+        backoff_seconds: float,
+        max_backoff_seconds: float,
+        burst_seconds: float = 60.0,
+        hedge: bool = False,
+        hedge_min_seconds: float = 5.0,
+    ):
+        self.client = client
+        self.semaphore = asyncio.Semaphore(max_concurrency)
+        self.rpm = TokenBucket(rpm, burst_seconds) if rpm > 0 else None
+        self.tpm = TokenBucket(tpm, burst_seconds) if tpm > 0 else None
+        self.max_retries = max_retries
+        self.backoff_seconds = backoff_seconds
+        self.max_backoff_seconds = max_backoff_seconds
+        self.hedge = hedge
+        self.hedge_min_seconds = hedge_min_seconds
+        self._latencies: Deque[float] = deque(maxlen=500)
+        self._blocked_until = 0.0
+
+    async def create(self, **kwargs: Any) -> Any:
+        """Mismos argumentos que chat.completions.create (sin stream)"""
+        if kwargs.get("stream"):
+            raise ValueError("Para streaming usar LLMClient.stream()")
+        estimated = self._estimate_tokens(kwargs)
+        if not self.hedge:
+            return await self._create_with_retries(kwargs, estimated)
+        return await self._create_hedged(kwargs, estimated)
+
+    @asynccontextmanager
+    async def stream(self, **kwargs: Any) -> AsyncIterator[Any]:
+        """
+        chat.completions.create(stream=True) como context manager
+
+        El lugar en el semáforo se libera al salir del bloque (stream
+        consumido, error o cliente que corta), no cuando llega el 1er chunk.
+        Sin hedge: no se puede duplicar sin duplicar la salida al cliente.
+        """
+        estimated = self._estimate_tokens(kwargs)
+        stream = await self._create_with_retries(
+            {**kwargs, "stream": True}, estimated, hold=True
+        )
+        try:
+            yield stream
+        finally:
+            try:
+                await stream.close()
+            finally:
+                self.semaphore.release()
+
+    async def _create_with_retries(
+        self, kwargs: Dict[str, Any], estimated: int, hold: bool = False
+    ) -> Any:
+        """Con hold=True el lugar del semáforo queda tomado al retornar"""
+        import openai
+
+        retryable = _retryable_errors()
+        delay = 0.0
+        for attempt in range(self.max_retries + 1):
+            await self._wait_turn(estimated)
+
+            await self.semaphore.acquire()
+            held = False
+            try:
+                start = time.monotonic()
+                response = await self.client.chat.completions.create(**kwargs)
+            except retryable as e:
+                error = e
+            else:
+                self._settle(response, estimated, time.monotonic() - start)
+                held = hold
+                return response
+            finally:
+                if not held:
+                    self.semaphore.release()
+
+            if _is_quota_exhausted(error):
+                # Sin saldo en la cuenta: reintentar no sirve
+                raise error
+
+            delay = self._retry_delay(error, attempt)
+            reason = type(error).__name__
+            if attempt == self.max_retries:
+                break
+
+            if isinstance(error, openai.RateLimitError):
+                # Frenar a todos: si no, el resto de la ráfaga también recibe 429
+                self._blocked_until = max(self._blocked_until, time.monotonic() + delay)
+            LLM_RETRIES.labels(reason).inc()
+            logger.warning(
+                "OpenAI %s, reintento %d/%d en %.2fs",
+                reason,
+                attempt + 1,
+                self.max_retries,
+                delay,
+            )
+            await asyncio.sleep(delay)
+
+        raise LLMUnavailableError(
+            f"OpenAI no disponible tras {self.max_retries} reintentos ({reason})",
+            retry_after=delay,
+        )
+
+    async def _create_hedged(self, kwargs: Dict[str, Any], estimated: int) -> Any:
+        primary = asyncio.create_task(self._create_with_retries(kwargs, estimated))
+        pending = {primary}
+        try:
+            hedge_delay = self._hedge_delay()
+            if hedge_delay is None:
+                return await primary
+            await asyncio.wait(pending, timeout=hedge_delay)
+            if primary.done() or not self._reserve_hedge(estimated):
+                return await primary
+
+            LLM_HEDGES.labels("sent").inc()
+            hedge = asyncio.create_task(self._create_once(kwargs, estimated))
+            pending.add(hedge)
+            while pending:
+                done, pending = await asyncio.wait(
+                    pending, return_when=asyncio.FIRST_COMPLETED
+                )
+                for task in done:
+                    if task.exception() is None:
+                        if task is hedge:
+                            LLM_HEDGES.labels("won").inc()
+                        return task.result()
+            # Fallaron las dos: el error de la principal es el que vale
+            return primary.result()
+        finally:
+            # La perdedora (o ambas si cancelan la request) no sigue gastando
+            for task in pending:
+                task.cancel()
+
+    async def _create_once(self, kwargs: Dict[str, Any], estimated: int) -> Any:
+        async with self.semaphore:
+            start = time.monotonic()
+            response = await self.client.chat.completions.create(**kwargs)
+            self._settle(response, estimated, time.monotonic() - start)
+            return response
+
+    def _reserve_hedge(self, estimated: int) -> bool:
+        """El hedge solo sale si hay cupo libre: nunca espera ni provoca 429"""
+        if self.semaphore.locked() or time.monotonic() < self._blocked_until:
+            return False
+        if self.rpm is not None and not self.rpm.try_acquire(1):
+            return False
+        if self.tpm is not None and not self.tpm.try_acquire(estimated):
+            if self.rpm is not None:
+                self.rpm.adjust(1)
+            return False
+        return True
+
+    def _hedge_delay(self) -> Optional[float]:
+        if len(self._latencies) < HEDGE_MIN_SAMPLES:
+            return None
+        ordered = sorted(self._latencies)
+        p99 = ordered[min(len(ordered) - 1, int(len(ordered) * 0.99))]
+        return max(p99, self.hedge_min_seconds)
+
+    async def _wait_turn(self, estimated: int) -> None:
+        wait = self._blocked_until - time.monotonic()
+        if wait > 0:
+            await asyncio.sleep(wait)
+        if self.rpm is not None:
+            await self.rpm.acquire(1)
+        if self.tpm is not None:
+            await self.tpm.acquire(estimated)
+
+    def _settle(self, response: Any, estimated: int, elapsed: float) -> None:
+        self._latencies.append(elapsed)
+        usage = getattr(response, "usage", None)
+        if self.tpm is not None and usage is not None:
+            self.tpm.adjust(estimated - usage.total_tokens)
+
+    def _retry_delay(self, error: Exception, attempt: int) -> float:
+        retry_after = _retry_after_seconds(error)
+        if retry_after is not None:
+            # Un poco de jitter para que la ráfaga no vuelva toda junta
+            return min(retry_after, self.max_backoff_seconds) + random.uniform(0, 0.25)
+        # Full jitter: uniforme entre 0 y el exponencial
+        ceiling = min(self.max_backoff_seconds, self.backoff_seconds * 2**attempt)
+        return random.uniform(0, ceiling)
+
+    @staticmethod
+    def _estimate_tokens(kwargs: Dict[str, Any]) -> int:
+        prompt_chars = sum(
+            len(message.get("content") or "") for message in kwargs.get("messages", [])
+        )
+        completion = (
+            kwargs.get("max_completion_tokens")
+            or kwargs.get("max_tokens")
+            or DEFAULT_COMPLETION_TOKENS
+        )
+        return prompt_chars // 4 + completion
+
+
+@lru_cache(maxsize=1)
+def _retryable_errors() -> Tuple[type, ...]:
+    """Errores transitorios: se reintentan. El resto (400, auth...) falla al toque"""
+    # openai pesa ~0.5s de import: se carga con la primera llamada, no al arrancar
+    import openai
+
+    return (
+        openai.RateLimitError,
+        openai.InternalServerError,
+        openai.APIConnectionError,
+    )
+
+
+def _retry_after_seconds(error: Exception) -> Optional[float]:
+    response = getattr(error, "response", None)
+    if response is None:
+        return None
+
+    headers = response.headers
+    value = headers.get("retry-after-ms")
+    if value:
+        try:
+            return float(value) / 1000
+        except ValueError:
+            pass
+
+    value = headers.get("retry-after")
+    if not value:
+        return None
+    try:
+        return float(value)
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+def _is_quota_exhausted(error: Exception) -> bool:
+    return getattr(error, "code", None) == "insufficient_quota"
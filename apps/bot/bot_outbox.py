@@ -0,0 +1,420 @@
+import asyncio
+import logging
+import os
+import random
+import threading
+import time
+import uuid
+from email.message import EmailMessage
+from typing import TYPE_CHECKING, Any, Dict, List, Optional, Tuple
+
+from core.database import connect
+from core.metrics import COALESCED, track_stage
+from core.settings import settings
+
+if TYPE_CHECKING:
+    import aiosmtplib
+
+logger = logging.getLogger(__name__)
+
+
+class EmailOutbox:
+    """
+    Outbox de emails en SQLite
+
+    El request solo encola; EmailSender entrega en segundo plano.
+    Estados: pending -> sending -> sent | failed (tras OUTBOX_MAX_ATTEMPTS)
+    Con dedupe_key, un mismo email sale una sola vez por ventana (también
+    entre workers: la reserva y el encolado van en la misma transacción).
+    Si el email termina failed la reserva se libera: se puede volver a encolar.
+
+    Con varios workers de uvicorn cada sender toma su lote con un UPDATE
+    condicional (sending + owner + lease): nadie más lo envía. Si el worker
+    muere, al vencer el lease el email vuelve a pending.
+    """
+
+    def __init__(self, db_path: str, lease_seconds: float = 900.0):
+        self.lease_seconds = lease_seconds
+        self._owner = f"{os.getpid()}-{uuid.uuid4().hex[:8]}"
+        self._lock = threading.Lock()
+        self._db = connect(db_path)
+        self._db.execute("""
+            CREATE TABLE IF NOT EXISTS outbox (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                to_email TEXT NOT NULL,
+                subject TEXT NOT NULL,
+                body TEXT NOT NULL,
+                status TEXT NOT NULL DEFAULT 'pending',
+                attempts INTEGER NOT NULL DEFAULT 0,
+                next_attempt_at REAL NOT NULL,
+                last_error TEXT,
+                created_at REAL NOT NULL,
+                sent_at REAL,
+                owner TEXT,
+                lease_until REAL,
+                dedupe_key TEXT
+            )
+            """)
+        # Bases creadas antes de los leases / de liberar reservas
+        columns = {row["name"] for row in self._db.execute("PRAGMA table_info(outbox)")}
+        for name, kind in (
+            ("owner", "TEXT"),
+            ("lease_until", "REAL"),
+            ("dedupe_key", "TEXT"),
+        ):
+            if name not in columns:
+                self._db.execute(f"ALTER TABLE outbox ADD COLUMN {name} {kind}")
+        self._db.execute(
+            "CREATE INDEX IF NOT EXISTS idx_outbox_due "
+            "ON outbox (status, next_attempt_at)"
+        )
+        self._db.execute("""
+            CREATE TABLE IF NOT EXISTS outbox_dedupe (
+                dedupe_key TEXT PRIMARY KEY,
+                created_at REAL NOT NULL
+            )
+            """)
+        self._db.execute(
+            "CREATE INDEX IF NOT EXISTS idx_outbox_dedupe_created "
+            "ON outbox_dedupe (created_at)"
+        )
+        self._db.commit()
+
+        # Despierta al sender apenas llega un email. enqueue corre en un hilo
+        # (asyncio.to_thread): el set se agenda en el loop del sender
+        self.new_message = asyncio.Event()
+        self.loop: Optional[asyncio.AbstractEventLoop] = None
+
+    def enqueue(
+        self,
+        to_email: str,
+        subject: str,
+        body: str,
+        dedupe_key: Optional[str] = None,
+        dedupe_seconds: float = 0.0,
+    ) -> Optional[int]:
+        """Encola un email y retorna su id (None si ya salió en la ventana)"""
+        now = time.time()
+        with self._lock:
+            if dedupe_key is not None and not self._reserve(
+                dedupe_key, now, dedupe_seconds
+            ):
+                self._db.commit()
+                COALESCED.labels("email").inc()
+                return None
+
+            cursor = self._db.execute(
+                """
+                INSERT INTO outbox
+                    (to_email, subject, body, next_attempt_at, created_at, dedupe_key)
+                VALUES (?, ?, ?, ?, ?, ?)
+                """,
+                (to_email, subject, body, now, now, dedupe_key),
+            )
+            self._db.commit()
+        self._wake_sender()
+        return cursor.lastrowid
+
+    def _wake_sender(self) -> None:
+        loop = self.loop
+        if loop is None or loop.is_closed():
+            self.new_message.set()
+            return
+        loop.call_soon_threadsafe(self.new_message.set)
+
+    def get(self, message_id: int) -> Optional[Dict[str, Any]]:
+        """Estado de entrega de un email"""
+        with self._lock:
+            row = self._db.execute(
+                """
+                SELECT id, to_email, status, attempts, last_error, created_at, sent_at
+                FROM outbox WHERE id = ?
+                """,
+                (message_id,),
+            ).fetchone()
+        return dict(row) if row else None
+
+    def _reserve(self, dedupe_key: str, now: float, window: float) -> bool:
+        """Marca la clave como enviada salvo que ya lo esté (llamar con el lock)"""
+        self._db.execute(
+            "DELETE FROM outbox_dedupe WHERE created_at <= ?", (now - window,)
+        )
+        cursor = self._db.execute(
+            "INSERT OR IGNORE INTO outbox_dedupe (dedupe_key, created_at) VALUES (?, ?)",
+            (dedupe_key, now),
+        )
+        return cursor.rowcount == 1
+
+    def claim_due(self, limit: int) -> List[Dict[str, Any]]:
+        """
+        Toma para este sender hasta `limit` emails pendientes ya vencidos
+
+        Antes devuelve a pending los lotes con el lease vencido (su worker
+        murió). El UPDATE ... RETURNING es atómico: un email tomado por otro
+        worker no aparece acá.
+        """
+        now = time.time()
+        with self._lock:
+            self._db.execute(
+                """
+                UPDATE outbox SET status = 'pending', owner = NULL, lease_until = NULL
+                WHERE status = 'sending' AND lease_until < ?
+                """,
+                (now,),
+            )
+            rows = self._db.execute(
+                """
+                UPDATE outbox SET status = 'sending', owner = ?, lease_until = ?
+                WHERE status = 'pending' AND id IN (
+                    SELECT id FROM outbox
+                    WHERE status = 'pending' AND next_attempt_at <= ?
+                    ORDER BY next_attempt_at LIMIT ?
+                )
+                RETURNING id, to_email, subject, body, attempts
+                """,
+                (self._owner, now + self.lease_seconds, now, limit),
+            ).fetchall()
+            self._db.commit()
+        return [dict(row) for row in rows]
+
+    def release(self, message_ids: List[int]) -> None:
+        """Devuelve a pending emails tomados y no intentados (sender detenido)"""
+        if not message_ids:
+            return
+        marks = ", ".join("?" * len(message_ids))
+        with self._lock:
+            self._db.execute(
+                f"""
+                UPDATE outbox SET status = 'pending', owner = NULL, lease_until = NULL
+                WHERE id IN ({marks}) AND owner = ? AND status = 'sending'
+                """,
+                (*message_ids, self._owner),
+            )
+            self._db.commit()
+
+    def next_due_in(self) -> Optional[float]:
+        """Segundos hasta el próximo reintento pendiente (None si no hay)"""
+        with self._lock:
+            row = self._db.execute(
+                "SELECT MIN(next_attempt_at) AS at FROM outbox WHERE status = 'pending'"
+            ).fetchone()
+        if row["at"] is None:
+            return None
+        return max(0.0, row["at"] - time.time())
+
+    def mark_sent(self, message_ids: List[int]) -> None:
+        """Marca enviados los emails de un lote (una sola transacción)"""
+        if not message_ids:
+            return
+        marks = ", ".join("?" * len(message_ids))
+        with self._lock:
+            self._db.execute(
+                f"""
+                UPDATE outbox SET status = 'sent', attempts = attempts + 1,
+                    last_error = NULL, sent_at = ?, owner = NULL, lease_until = NULL
+                WHERE id IN ({marks}) AND owner = ? AND status = 'sending'
+                """,
+                (time.time(), *message_ids, self._owner),
+            )
+            self._db.commit()
+
+    def mark_retry(self, failures: List[Tuple[int, int, str]]) -> None:
+        """
+        Reintento con backoff exponencial + jitter, o failed si se agotó
+
+        failures = (id, intentos previos, error) de cada email del lote. Los
+        que quedan failed liberan su reserva de dedupe_key.
+        """
+        if not failures:
+            return
+        now = time.time()
+        updates = []
+        for message_id, attempts, error in failures:
+            attempts += 1
+            if attempts >= settings.OUTBOX_MAX_ATTEMPTS:
+                status, next_attempt_at = "failed", now
+            else:
+                delay = settings.OUTBOX_BACKOFF_SECONDS * 2 ** (attempts - 1)
+                delay = min(delay, settings.OUTBOX_MAX_BACKOFF_SECONDS)
+                status, next_attempt_at = "pending", now + random.uniform(
+                    delay / 2, delay
+                )
+            updates.append(
+                (status, attempts, next_attempt_at, error, message_id, self._owner)
+            )
+
+        with self._lock:
+            released = []
+            for update in updates:
+                row = self._db.execute(
+                    """
+                    UPDATE outbox SET status = ?, attempts = ?, next_attempt_at = ?,
+                        last_error = ?, owner = NULL, lease_until = NULL
+                    WHERE id = ? AND owner = ? AND status = 'sending'
+                    RETURNING status, dedupe_key, created_at
+                    """,
+                    update,
+                ).fetchone()
+                if row and row["status"] == "failed" and row["dedupe_key"]:
+                    released.append((row["dedupe_key"], row["created_at"]))
+            # Solo la reserva de este email (misma clave y mismo instante)
+            self._db.executemany(
+                "DELETE FROM outbox_dedupe WHERE dedupe_key = ? AND created_at = ?",
+                released,
+            )
+            self._db.commit()
+
+
+class EmailSender:
+    """
+    Entrega el outbox en lotes sobre UNA conexión SMTP autenticada
+
+    La conexión se reutiliza entre lotes y se cierra tras
+    OUTBOX_IDLE_SECONDS sin trabajo.
+    """
+
+    def __init__(self, outbox: EmailOutbox):
+        self.outbox = outbox
+        self._smtp: Optional["aiosmtplib.SMTP"] = None
+        self._last_used = 0.0
+        self._task: Optional[asyncio.Task] = None
+
+    async def start(self) -> None:
+        self.outbox.loop = asyncio.get_running_loop()
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+        await self._disconnect()
+
+    async def _run(self) -> None:
+        failures = 0
+        while True:
+            try:
+                await self._step()
+                failures = 0
+            except Exception:
+                # Un "database is locked" o un bug no puede apagar la entrega
+                failures += 1
+                delay = min(
+                    settings.OUTBOX_BACKOFF_SECONDS * 2 ** (failures - 1),
+                    settings.OUTBOX_MAX_BACKOFF_SECONDS,
+                )
+                logger.exception(
+                    "Error en el envío de emails (%d seguidos), reintento en %.1fs",
+                    failures,
+                    delay,
+                )
+                await self._disconnect()
+                await asyncio.sleep(delay)
+
+    async def _step(self) -> None:
+        """Entrega un lote o duerme hasta que haya algo que entregar"""
+        # SQLite en un hilo: el sender comparte el event loop con la API
+        batch = await asyncio.to_thread(
+            self.outbox.claim_due, settings.OUTBOX_BATCH_SIZE
+        )
+        if batch:
+            await self._deliver(batch)
+            return
+
+        if self._smtp is not None and (
+            time.monotonic() - self._last_used > settings.OUTBOX_IDLE_SECONDS
+        ):
+            await self._disconnect()
+
+        # Dormir hasta un email nuevo, el próximo reintento o el poll
+        wait = await asyncio.to_thread(self.outbox.next_due_in)
+        if wait is None or wait > settings.OUTBOX_POLL_SECONDS:
+            wait = settings.OUTBOX_POLL_SECONDS
+        self.outbox.new_message.clear()
+        try:
+            await asyncio.wait_for(self.outbox.new_message.wait(), timeout=wait)
+        except asyncio.TimeoutError:
+            pass
+
+    async def _deliver(self, batch: List[Dict[str, Any]]) -> None:
+        """
+        Envía el lote tomado por claim_due (solo esos emails)
+
+        Todo el lote sale por la conexión abierta, uno tras otro, y el
+        resultado se guarda al final en una transacción por estado (no un
+        commit por email).
+        """
+        import aiosmtplib
+
+        untried = [item["id"] for item in batch]
+        sent: List[int] = []
+        failures: List[Tuple[int, int, str]] = []
+        recorded = False
+        try:
+            with track_stage("smtp"):
+                for item in batch:
+                    untried.remove(item["id"])
+                    try:
+                        smtp = await self._connection()
+                        await smtp.send_message(self._build_message(item))
+                        sent.append(item["id"])
+                    except (
+                        aiosmtplib.SMTPRecipientsRefused,
+                        aiosmtplib.SMTPDataError,
+                    ) as e:
+                        # Error del mensaje: la conexión sigue sirviendo
+                        logger.warning("Email %s rechazado: %s", item["id"], e)
+                        failures.append((item["id"], item["attempts"], str(e)))
+                    except Exception as e:
+                        # Error de conexión/auth: se reconecta para el siguiente
+                        logger.warning("Error enviando email %s: %s", item["id"], e)
+                        failures.append((item["id"], item["attempts"], str(e)))
+                        await self._disconnect()
+            if sent:
+                self._last_used = time.monotonic()
+            await asyncio.to_thread(self.outbox.mark_sent, sent)
+            await asyncio.to_thread(self.outbox.mark_retry, failures)
+            recorded = True
+        finally:
+            # Detenido a mitad del lote: se registra lo intentado y lo que no
+            # se intentó queda para otro
+            if not recorded:
+                self.outbox.mark_sent(sent)
+                self.outbox.mark_retry(failures)
+            self.outbox.release(untried)
+
+    async def _connection(self) -> "aiosmtplib.SMTP":
+        if self._smtp is not None and self._smtp.is_connected:
+            return self._smtp
+
+        import aiosmtplib
+
+        smtp = aiosmtplib.SMTP(
+            hostname=settings.MAILER_SERVICE,
+            port=settings.MAILER_PORT,
+            start_tls=settings.MAILER_STARTTLS,
+            timeout=settings.OUTBOX_SMTP_TIMEOUT,
+        )
+        await smtp.connect()
+        if settings.MAILER_PASSWORD:
+            await smtp.login(settings.MAILER_EMAIL, settings.MAILER_PASSWORD)
+
+        self._smtp = smtp
+        return smtp
+
+    async def _disconnect(self) -> None:
+        smtp, self._smtp = self._smtp, None
+        if smtp is None:
+            return
+        try:
+            await smtp.quit()
+        except Exception:
+            smtp.close()
+
+    def _build_message(self, item: Dict[str, Any]) -> EmailMessage:
+        message = EmailMessage()
+        message["From"] = settings.MAILER_EMAIL
+        message["To"] = item["to_email"]
+        message["Subject"] = item["subject"]
+        message.set_content(item["body"], subtype="html")
+        return message
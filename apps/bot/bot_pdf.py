@@ -0,0 +1,306 @@
+import asyncio
+import logging
+import multiprocessing
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+from multiprocessing.connection import Connection
+from typing import Any, Callable, List, Optional, Set, Tuple, Union
+
+from apps.bot.bot_compaction import PAGE_BREAK
+from core.metrics import record_pdf
+
+logger = logging.getLogger(__name__)
+
+# PDF en memoria o ruta a un archivo (uploads grandes volcados a disco)
+PdfSource = Union[bytes, str]
+
+
+class PdfExtractionError(Exception):
+    """PDF ilegible, demasiado grande o que excedió el tiempo límite"""
+
+
+def _limit_worker_memory(max_memory_mb: int) -> None:
+    """Tope de memoria del worker (solo Linux/macOS)"""
+    if not max_memory_mb:
+        return
+    try:
+        import resource
+
+        limit = max_memory_mb * 1024 * 1024
+        resource.setrlimit(resource.RLIMIT_AS, (limit, limit))
+    except (ImportError, ValueError, OSError):
+        pass
+
+
+def _extract_pages(
+    source: PdfSource, start: int, end: Optional[int], max_chars: int
+) -> Tuple[int, List[str]]:
+    """
+    Corre en el worker: extrae las páginas [start, end)
+
+    Retorna (total de páginas, textos). Deja de extraer al llegar a max_chars.
+    """
+    # Solo los workers necesitan pypdf: la API arranca sin importarlo
+    from pypdf import PdfReader
+
+    reader = PdfReader(BytesIO(source) if isinstance(source, bytes) else source)
+    total_pages = len(reader.pages)
+    end = total_pages if end is None else min(end, total_pages)
+
+    texts = []
+    chars = 0
+    for index in range(start, end):
+        text = reader.pages[index].extract_text() or ""
+        texts.append(text)
+        chars += len(text)
+        if chars >= max_chars:
+            break
+    return total_pages, texts
+
+
+def _import_pypdf() -> None:
+    import pypdf  # noqa: F401
+
+
+def _worker_main(conn: Connection, max_memory_mb: int) -> None:
+    """Loop del proceso worker: una tarea a la vez por su pipe"""
+    _limit_worker_memory(max_memory_mb)
+    while True:
+        try:
+            task = conn.recv()
+        except (EOFError, OSError):
+            return
+        if task is None:
+            return
+        fn, args = task
+        try:
+            reply = (True, fn(*args))
+        except Exception as e:
+            reply = (False, str(e))
+        conn.send(reply)
+
+
+class _Worker:
+    """Un proceso de extracción con su propio pipe: se mata sin tocar a los demás"""
+
+    def __init__(self, context: Any, max_memory_mb: int):
+        self.conn, child = context.Pipe()
+        self.process = context.Process(
+            target=_worker_main, args=(child, max_memory_mb), daemon=True
+        )
+        self.process.start()
+        child.close()
+        self.tasks = 0
+
+    @property
+    def alive(self) -> bool:
+        return self.process.is_alive()
+
+    def call(self, fn: Callable, args: tuple, timeout: float) -> Tuple[bool, Any]:
+        """
+        Corre fn(*args) en el proceso
+
+        TimeoutError si no responde en `timeout`; EOFError/OSError si murió.
+        """
+        self.tasks += 1
+        self.conn.send((fn, args))
+        if not self.conn.poll(timeout):
+            raise TimeoutError
+        return self.conn.recv()
+
+    def kill(self) -> None:
+        if self.process.is_alive():
+            self.process.kill()
+        self.process.join(timeout=1)
+        self.conn.close()
+
+
+class PdfExtractionEngine:
+    """
+    Extracción de texto en procesos worker
+
+    - Paralelismo por páginas en documentos grandes
+    - Timeout por documento: solo se matan los workers que siguen con ese
+      documento; los demás siguen atendiendo
+    - Topes de páginas y caracteres
+    - Cada worker se recicla tras recycle_after tareas
+    - Un PDF malicioso solo tumba su worker, nunca el proceso de la API
+    """
+
+    def __init__(
+        self,
+        workers: int,
+        max_pages: int,
+        max_chars: int,
+        timeout_seconds: float,
+        pages_per_task: int,
+        recycle_after: int,
+        max_memory_mb: int = 0,
+    ):
+        self.workers = workers
+        self.max_pages = max_pages
+        self.max_chars = max_chars
+        self.timeout_seconds = timeout_seconds
+        self.pages_per_task = pages_per_task
+        self.recycle_after = recycle_after
+        self.max_memory_mb = max_memory_mb
+
+        self._context = multiprocessing.get_context("spawn")
+        # Un hilo de despacho por worker: acota los procesos vivos a `workers`
+        self._threads: Optional[ThreadPoolExecutor] = None
+        self._idle: List[_Worker] = []
+        self._busy: Set[_Worker] = set()
+        self._lock = threading.Lock()
+
+    def _dispatcher(self) -> ThreadPoolExecutor:
+        """Hilos perezosos: se crean en el primer uso"""
+        with self._lock:
+            if self._threads is None:
+                self._threads = ThreadPoolExecutor(
+                    max_workers=self.workers, thread_name_prefix="pdf-worker"
+                )
+            return self._threads
+
+    def _checkout(self) -> _Worker:
+        """Un worker libre y sano, o uno nuevo"""
+        worker = None
+        stale = []
+        with self._lock:
+            while self._idle and worker is None:
+                candidate = self._idle.pop()
+                if candidate.alive and candidate.tasks < self.recycle_after:
+                    worker = candidate
+                else:
+                    stale.append(candidate)
+        for old in stale:
+            old.kill()
+
+        if worker is None:
+            worker = _Worker(self._context, self.max_memory_mb)
+        with self._lock:
+            self._busy.add(worker)
+        return worker
+
+    def _release(self, worker: _Worker, healthy: bool) -> None:
+        with self._lock:
+            self._busy.discard(worker)
+            if healthy:
+                self._idle.append(worker)
+                return
+        worker.kill()
+
+    def _call(self, deadline: float, fn: Callable, *args: Any) -> Any:
+        """
+        Corre en un hilo de despacho: fn en un worker, hasta `deadline`
+
+        Si el worker no responde a tiempo se mata SOLO ese proceso.
+        """
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            raise TimeoutError
+
+        worker = self._checkout()
+        try:
+            ok, value = worker.call(fn, args, remaining)
+        except TimeoutError:
+            logger.warning("Worker de PDF %s colgado: se reemplaza", worker.process.pid)
+            self._release(worker, healthy=False)
+            raise
+        except (EOFError, OSError):
+            self._release(worker, healthy=False)
+            raise PdfExtractionError(
+                "Error al leer PDF: el PDF tumbó el proceso de extracción"
+            )
+        self._release(worker, healthy=True)
+
+        if not ok:
+            raise PdfExtractionError(f"Error al leer PDF: {value}")
+        return value
+
+    async def warm_up(self) -> None:
+        """Levanta los workers (spawn + import de pypdf) antes de la primera request"""
+        loop = asyncio.get_running_loop()
+        threads = self._dispatcher()
+        deadline = time.monotonic() + max(self.timeout_seconds, 60)
+        await asyncio.gather(
+            *(
+                loop.run_in_executor(threads, self._call, deadline, _import_pypdf)
+                for _ in range(self.workers)
+            )
+        )
+
+    def shutdown(self) -> None:
+        with self._lock:
+            threads, self._threads = self._threads, None
+            workers = self._idle + list(self._busy)
+            self._idle = []
+            self._busy = set()
+        # Sin esperar: al salir la API no deja workers huérfanos
+        for worker in workers:
+            worker.kill()
+        if threads is not None:
+            threads.shutdown(wait=False, cancel_futures=True)
+
+    async def extract(self, source: PdfSource) -> str:
+        """Extrae el texto del PDF"""
+        threads = self._dispatcher()
+        loop = asyncio.get_running_loop()
+        deadline = time.monotonic() + self.timeout_seconds
+
+        async def run(start: int, end: Optional[int]) -> Tuple[int, List[str]]:
+            return await loop.run_in_executor(
+                threads,
+                self._call,
+                deadline,
+                _extract_pages,
+                source,
+                start,
+                end,
+                self.max_chars,
+            )
+
+        async def extract_all() -> List[str]:
+            # 1er bloque: también dice cuántas páginas tiene el documento
+            total_pages, texts = await run(0, self.pages_per_task)
+            if total_pages > self.max_pages:
+                raise PdfExtractionError(
+                    f"Error al leer PDF: {total_pages} páginas "
+                    f"(máximo {self.max_pages})"
+                )
+
+            chars = sum(len(text) for text in texts)
+            if total_pages <= self.pages_per_task or chars >= self.max_chars:
+                return texts
+
+            # Resto de páginas en paralelo
+            chunks = await asyncio.gather(
+                *(
+                    run(start, start + self.pages_per_task)
+                    for start in range(
+                        self.pages_per_task, total_pages, self.pages_per_task
+                    )
+                )
+            )
+            for _, chunk_texts in chunks:
+                texts.extend(chunk_texts)
+            return texts
+
+        try:
+            # Los hilos cortan en el mismo deadline y matan a su worker colgado
+            texts = await asyncio.wait_for(extract_all(), timeout=self.timeout_seconds)
+        except TimeoutError:
+            logger.warning("Extracción de PDF excedió %ss", self.timeout_seconds)
+            raise PdfExtractionError(
+                f"Error al leer PDF: excedió {self.timeout_seconds}s de procesamiento"
+            )
+        except PdfExtractionError:
+            raise
+        except Exception as e:
+            raise PdfExtractionError(f"Error al leer PDF: {str(e)}")
+
+        # Armado en un solo join; \f marca el corte de página
+        text = PAGE_BREAK.join(texts)[: self.max_chars]
+        record_pdf(len(texts), len(text))
+        return text.strip()
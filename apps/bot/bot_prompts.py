@@ -0,0 +1,253 @@
+from typing import Any, Dict, List
+
+from apps.bot.bot_schemas import CVAnalysis, strict_json_schema
+
+# Todo lo estático (rubric + formato JSON) va en el mensaje system: es un
+# prefijo idéntico entre requests y el cache de prompts de OpenAI lo reutiliza.
+# Lo variable (años detectados + CV) va al final, en el mensaje user.
+
+
+# Structured outputs estricto: OpenAI solo puede generar JSON que cumpla el
+# schema (tipos, claves, scores 0-10). Sale de CVAnalysis en bot_schemas.py
+ANALYSIS_SCHEMA = strict_json_schema(CVAnalysis)
+RESPONSE_FORMAT = {
+    "type": "json_schema",
+    "json_schema": {"name": "cv_analysis", "strict": True, "schema": ANALYSIS_SCHEMA},
+}
+# Templates anteriores a v4: JSON libre, el formato solo lo describe el prompt
+JSON_OBJECT_FORMAT = {"type": "json_object"}
+
+
+def describe_schema(schema: Dict[str, Any]) -> str:
+    """Bloque de formato del prompt, generado del schema (no se escribe a mano)"""
+    fields = list(schema["properties"].items())
+    lines = []
+    for index, (name, prop) in enumerate(fields):
+        line = f'    "{name}": {_type_name(prop)}'
+        if index < len(fields) - 1:
+            line += ","
+        if "description" in prop:
+            line += f"  // {prop['description']}"
+        lines.append(line)
+    return "{\n" + "\n".join(lines) + "\n}"
+
+
+def _type_name(prop: Dict[str, Any]) -> str:
+    if "anyOf" in prop:
+        return " o ".join(_type_name(option) for option in prop["anyOf"])
+    kind = prop["type"]
+    if kind == "array":
+        return f"[{_type_name(prop['items'])}, ...]"
+    if "minimum" in prop and "maximum" in prop:
+        return f"{kind} ({prop['minimum']}-{prop['maximum']})"
+    return kind
+
+
+ANALYSIS_FORMAT = describe_schema(ANALYSIS_SCHEMA)
+
+
+class PromptTemplate:
+    """Rubric versionado: prompt, formato de respuesta y pesos del score"""
+
+    def __init__(
+        self,
+        version: str,
+        system: str,
+        weights: Dict[str, float],
+        github_penalty: float,
+        response_format: Dict[str, Any] = JSON_OBJECT_FORMAT,
+    ):
+        self.version = version
+        self.system = system
+        self.weights = weights
+        self.github_penalty = github_penalty
+        self.response_format = response_format
+
+    def build_messages(
+        self, cv_text: str, years_experience: int
+    ) -> List[Dict[str, str]]:
+        """Prefijo estable (system) + parte variable (user) al final"""
+        return [
+            {"role": "system", "content": self.system},
+            {
+                "role": "user",
+                "content": (
+                    f"AÑOS DE EXPERIENCIA DETECTADOS: {years_experience} años\n\n"
+                    f"CV:\n\n{cv_text}"
+                ),
+            },
+        ]
+
+
+EVIDENCE_CRITERIA = """Eres un reclutador senior que valora EVIDENCIA REAL sobre títulos. GitHub es crítico.
+
+Analiza el CV que envía el usuario.
+
+CRITERIOS:
+
+1. FORMACIÓN (15%)
+- Técnica o universitaria (ambas valen)
+- ⚠️ Técnico con GitHub > Universitario sin proyectos
+
+2. PRESENTACIÓN (10%)
+- Estructura clara
+
+3. EXPERIENCIA (40%) - MÁS IMPORTANTE
+- Proyectos reales
+- Impacto demostrado
+
+4. COMPETENCIAS TÉCNICAS (25%)
+- Stack actualizado
+- ⚠️ DEBE tener GitHub
+
+5. EVIDENCIA (10%)
+- GitHub (+3 puntos)
+- ⚠️ Sin GitHub = -2 puntos
+
+IMPORTANTE: Todos los scores deben estar entre 0 y 10 (máximo 10).
+
+Responde en JSON:
+"""
+
+# v3: formato escrito a mano, con response_format json_object
+EVIDENCE_RUBRIC = EVIDENCE_CRITERIA + """{
+    "is_university_graduate": boolean,
+    "is_software_developer": boolean,
+    "is_from_peru": boolean,
+    "has_github": boolean,
+    "has_portfolio": boolean,
+    "education_institution": "nombre o null",
+    "professional_summary": "resumen",
+
+    "education_score": number (0-10, MÁXIMO 10),
+    "format_score": number (0-10, MÁXIMO 10),
+    "experience_score": number (0-10, MÁXIMO 10),
+    "skills_score": number (0-10, MÁXIMO 10),
+    "extras_score": number (0-10, MÁXIMO 10),
+
+    "positive_points": ["fortaleza 1", "fortaleza 2"],
+    "improvements": ["mejora 1", "mejora 2"],
+    "critical_errors": ["error si existe"],
+    "suggestions": ["recomendación 1"]
+}"""
+
+# v4: mismo rubric, formato generado del schema estricto (no se escribe a mano)
+EVIDENCE_RUBRIC_STRICT = EVIDENCE_CRITERIA + ANALYSIS_FORMAT
+
+
+# Rubric original de bot_serviceV0.py
+PROFESSIONAL_RUBRIC = """Eres un reclutador senior de una empresa de tecnología evaluando candidatos para posiciones de desarrollo de software. Evalúas de forma objetiva y profesional.
+
+Analiza el CV que envía el usuario de forma profesional y objetiva.
+
+INFORMACIÓN A IDENTIFICAR:
+- Nivel de formación: universitaria, técnica, o experiencia autodidacta
+- Perfil: ¿Es desarrollador de software?
+- Ubicación: ¿Es de Perú?
+
+EVALUACIÓN PROFESIONAL (escala 1-10):
+
+1. FORMACIÓN (peso 20%):
+- Educación formal o técnica
+- Capacitación relevante
+- Formación continua
+
+2. PRESENTACIÓN (peso 15%):
+- Estructura clara y profesional
+- Información completa
+- Formato adecuado
+
+3. EXPERIENCIA PROFESIONAL (peso 35%):
+- Trayectoria en desarrollo de software
+- Proyectos realizados
+- Responsabilidades y logros
+- Años de experiencia
+
+4. COMPETENCIAS TÉCNICAS (peso 25%):
+- Tecnologías y herramientas
+- Frameworks utilizados
+- Nivel técnico demostrado
+
+5. ADICIONALES (peso 5%):
+- Portfolio o repositorios
+- Proyectos destacados
+- Información complementaria
+
+Evalúa de forma objetiva basándote en la experiencia y capacidades demostradas.
+
+Responde en JSON con esta estructura:
+{
+    "is_university_graduate": boolean,
+    "is_software_developer": boolean,
+    "is_from_peru": boolean,
+    "has_github": boolean,
+    "has_portfolio": boolean,
+    "education_institution": "nombre institución o null",
+    "professional_summary": "resumen objetivo del perfil",
+
+    "education_score": number,
+    "format_score": number,
+    "experience_score": number,
+    "skills_score": number,
+    "extras_score": number,
+
+    "positive_points": ["fortaleza 1", "fortaleza 2", "fortaleza 3"],
+    "improvements": ["área de mejora 1", "área de mejora 2"],
+    "critical_errors": ["solo si hay errores graves"],
+    "suggestions": ["recomendación profesional 1", "recomendación 2"]
+}"""
+
+
+PROMPT_TEMPLATES: Dict[str, PromptTemplate] = {
+    # v0: rubric de bot_serviceV0.py (sin penalización por GitHub)
+    "v0": PromptTemplate(
+        version="v0",
+        system=PROFESSIONAL_RUBRIC,
+        weights={
+            "education_score": 0.20,
+            "format_score": 0.15,
+            "experience_score": 0.35,
+            "skills_score": 0.25,
+            "extras_score": 0.05,
+        },
+        github_penalty=0.0,
+    ),
+    # v3: rubric de evidencia con prefijo estable (v1/v2 tenían el CV al inicio)
+    "v3": PromptTemplate(
+        version="v3",
+        system=EVIDENCE_RUBRIC,
+        weights={
+            "education_score": 0.15,
+            "format_score": 0.10,
+            "experience_score": 0.40,
+            "skills_score": 0.25,
+            "extras_score": 0.10,
+        },
+        github_penalty=1.5,
+    ),
+    # v4: v3 con structured outputs estricto (formato generado de CVAnalysis)
+    "v4": PromptTemplate(
+        version="v4",
+        system=EVIDENCE_RUBRIC_STRICT,
+        weights={
+            "education_score": 0.15,
+            "format_score": 0.10,
+            "experience_score": 0.40,
+            "skills_score": 0.25,
+            "extras_score": 0.10,
+        },
+        github_penalty=1.5,
+        response_format=RESPONSE_FORMAT,
+    ),
+}
+
+
+def get_prompt_template(version: str) -> PromptTemplate:
+    """Template por versión (PROMPT_VERSION en settings)"""
+    try:
+        return PROMPT_TEMPLATES[version]
+    except KeyError:
+        raise ValueError(
+            f"PROMPT_VERSION '{version}' no existe "
+            f"(disponibles: {', '.join(PROMPT_TEMPLATES)})"
+        )
@@ -0,0 +1,153 @@
+"""
+Re-scoring masivo de los candidatos guardados
+
+Cuando cambian los pesos del rubric (apps/bot/bot_prompts.py) recalcula
+overall_score de todo el historial con los sub-scores guardados, sin volver
+a subir los CVs ni pagar el LLM. Una sola pasada vectorizada con NumPy que
+da exactamente lo mismo que BotService.calculate_overall_score.
+
+El cache de análisis sigue con el score viejo hasta que venza: limpiarlo
+con DELETE /api/bot/cache si se re-scorea sin subir PROMPT_VERSION.
+
+Uso:
+    python -m apps.bot.bot_rescoring [--prompt-version v3]
+        [--weight experience_score=0.45 ...] [--github-penalty 1.0] [--dry-run]
+"""
+
+import argparse
+import json
+import time
+from typing import Any, Dict, Sequence, Tuple
+
+import numpy as np
+
+from apps.bot.bot_candidates import SCORE_COLUMNS, CandidateStore
+from apps.bot.bot_prompts import get_prompt_template
+from core.settings import settings
+
+# Columnas de CandidateStore.scoring_inputs antes de los sub-scores
+ID, HAS_GITHUB, OVERALL_SCORE = 0, 1, 2
+
+
+def score_matrix(
+    scores: np.ndarray,
+    has_github: np.ndarray,
+    weights: Sequence[float],
+    github_penalty: float,
+) -> np.ndarray:
+    """
+    overall_score de n candidatos. scores es (n, k) en el orden de weights
+
+    Repite calculate_overall_score operación por operación: suma columna a
+    columna en el orden de los pesos (un producto matricial reordena las
+    sumas y cambia el último bit), penaliza, acota y redondea a 2 decimales.
+    """
+    total = np.zeros(len(scores))
+    for column, weight in enumerate(weights):
+        total += np.minimum(scores[:, column], 10) * weight
+    total[~has_github] -= github_penalty
+    return _round2(np.clip(total, 0, 10))
+
+
+def _round2(values: np.ndarray) -> np.ndarray:
+    """round(x, 2) de Python sobre un array"""
+    rounded = np.round(values, 2)
+    # np.round escala por 100 y redondea ese producto (inexacto); round()
+    # redondea el decimal exacto. Solo difieren cerca de un empate x.xx5:
+    # esos pocos se resuelven con round()
+    scaled = values * 100
+    near_tie = np.flatnonzero(np.abs(scaled - np.floor(scaled) - 0.5) < 1e-6)
+    rounded[near_tie] = [round(value, 2) for value in values[near_tie].tolist()]
+    return rounded
+
+
+def rescore_candidates(
+    store: CandidateStore,
+    weights: Dict[str, float],
+    github_penalty: float,
+    dry_run: bool = False,
+) -> Dict[str, Any]:
+    """Recalcula y guarda overall_score de todos. Retorna el resumen"""
+    unknown = [key for key in weights if key not in SCORE_COLUMNS]
+    if unknown:
+        raise ValueError(
+            f"Pesos desconocidos: {', '.join(unknown)} "
+            f"(disponibles: {', '.join(SCORE_COLUMNS)})"
+        )
+
+    rows = store.scoring_inputs()
+    summary: Dict[str, Any] = {"candidates": len(rows), "changed": 0}
+    if not rows:
+        return summary
+
+    data = np.array(rows, dtype=np.float64)
+    columns = [OVERALL_SCORE + 1 + SCORE_COLUMNS.index(key) for key in weights]
+    previous = data[:, OVERALL_SCORE]
+    scores = score_matrix(
+        data[:, columns],
+        data[:, HAS_GITHUB] != 0,
+        list(weights.values()),
+        github_penalty,
+    )
+
+    changed = np.flatnonzero(scores != previous)
+    if not dry_run and len(changed):
+        ids = data[changed, ID].astype(np.int64)
+        store.update_scores(zip(scores[changed].tolist(), ids.tolist()))
+
+    summary.update(
+        changed=len(changed),
+        mean_before=round(float(previous.mean()), 2),
+        mean_after=round(float(scores.mean()), 2),
+    )
+    return summary
+
+
+def _parse_weight(value: str) -> Tuple[str, float]:
+    key, _, weight = value.partition("=")
+    try:
+        return key, float(weight)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"Peso inválido: {value} (usar clave=valor)")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Recalcula overall_score de los candidatos guardados"
+    )
+    parser.add_argument(
+        "--prompt-version",
+        default=settings.PROMPT_VERSION,
+        help="Pesos y penalización de este template",
+    )
+    parser.add_argument(
+        "--weight",
+        type=_parse_weight,
+        action="append",
+        default=[],
+        help="Reemplaza un peso del template, p. ej. experience_score=0.45",
+    )
+    parser.add_argument("--github-penalty", type=float, default=None)
+    parser.add_argument(
+        "--dry-run", action="store_true", help="Solo reporta, no escribe"
+    )
+    args = parser.parse_args()
+
+    template = get_prompt_template(args.prompt_version)
+    weights = {**template.weights, **dict(args.weight)}
+    github_penalty = (
+        template.github_penalty if args.github_penalty is None else args.github_penalty
+    )
+
+    start = time.perf_counter()
+    try:
+        summary = rescore_candidates(
+            CandidateStore(settings.CANDIDATES_DB_PATH),
+            weights,
+            github_penalty,
+            dry_run=args.dry_run,
+        )
+    except ValueError as e:
+        parser.error(str(e))
+    summary["seconds"] = round(time.perf_counter() - start, 2)
+    print(json.dumps(summary))
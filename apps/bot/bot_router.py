@@ -1,13 +1,61 @@
+import asyncio
+import math
 import os
+import zipfile
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
 
-from fastapi import APIRouter, File, HTTPException, UploadFile, status
-from fastapi.responses import JSONResponse
+from fastapi import APIRouter, Depends, File, HTTPException, Query, UploadFile, status
+from fastapi.responses import StreamingResponse
 
-from apps.bot.bot_schemas import CVFeedbackResponse, ErrorResponse
+from apps.bot.bot_candidates import CandidateStore, InvalidCursorError
+from apps.bot.bot_dependencies import (
+    get_candidates,
+    get_ingestor,
+    get_job_queue,
+    get_service,
+)
+from apps.bot.bot_ingest import DirectoryIngestor
+from apps.bot.bot_jobs import JobQueue, JobQueueFullError
+from apps.bot.bot_llm import LLMUnavailableError
+from apps.bot.bot_schemas import (
+    CandidateDetail,
+    CandidatePage,
+    CVFeedbackResponse,
+    ErrorResponse,
+    JobResponse,
+)
 from apps.bot.bot_service import BotService
+from apps.bot.bot_stream import format_sse
+from apps.bot.bot_upload import (
+    IngestedUpload,
+    InvalidPdfError,
+    UploadTooLargeError,
+    ingest_upload,
+)
+from core.metrics import track_stage
+from core.responses import FastJSONResponse, encode_json
+from core.settings import settings
 
 router = APIRouter()
-service = BotService()
+
+# ?fields= de los endpoints de análisis
+FIELDS_DESCRIPTION = (
+    "Campos del resultado separados por coma, p. ej. "
+    "overall_score,is_valid_candidate,has_github (por defecto todos)"
+)
+
+
+def _parse_fields(fields: Optional[str]) -> Optional[Dict[str, bool]]:
+    """?fields= -> include de Pydantic (400 si algún campo no existe)"""
+    if not fields:
+        return None
+    names = [name.strip() for name in fields.split(",") if name.strip()]
+    unknown = [name for name in names if name not in CVFeedbackResponse.model_fields]
+    if unknown:
+        raise HTTPException(
+            status_code=400, detail=f"Campos desconocidos: {', '.join(unknown)}"
+        )
+    return dict.fromkeys(names, True)
 
 
 @router.post(
@@ -18,45 +66,374 @@ service = BotService()
         200: {"model": CVFeedbackResponse},
         400: {"model": ErrorResponse},
         500: {"model": ErrorResponse},
+        503: {"model": ErrorResponse},
     },
 )
-async def analyze_cv(file: UploadFile = File(...)):
+async def analyze_cv(
+    file: UploadFile = File(...),
+    fields: Optional[str] = Query(None, description=FIELDS_DESCRIPTION),
+    service: BotService = Depends(get_service),
+):
     """
     Analiza CV y envía email SOLO si cumple requisitos
 
     IMPORTANTE:
-    - async def porque usa await para file.read() y send_email()
-    - NO guarda archivo en disco
-    - Email SOLO si is_valid_candidate == True
+    - async def porque usa await para leer el upload y el análisis
+    - El upload se lee por bloques: valida %PDF-, corta en UPLOAD_MAX_BYTES
+      y pasado UPLOAD_SPILL_BYTES lo vuelca a un temporal (se borra al final)
+    - pypdf corre en un pool de procesos y OpenAI con el cliente async:
+      una llamada lenta al LLM no bloquea al resto de requests del worker
+    - Email SOLO si is_valid_candidate == True (se encola, no espera al SMTP)
+    - ?fields= devuelve solo esos campos
     """
 
     # Validar PDF
     if not file.filename.endswith(".pdf"):
         raise HTTPException(status_code=400, detail="Solo PDF")
+    include = _parse_fields(fields)
+
+    # 1. Leer por bloques (memoria acotada por request)
+    upload = await _ingest(file)
 
     try:
-        # 1. Leer EN MEMORIA (await obligatorio)
-        pdf_bytes = await file.read()
+        # 2. Analizar CV (await, no bloquea el event loop). Usa cache por sha256
+        # 3. SI CUMPLE → Enviar email (email_sent queda en el resultado)
+        result, cache_hit = await service.process_cv(
+            upload.source, upload.sha256, file.filename
+        )
 
-        # 2. Analizar CV (este método NO es async)
-        result = service.analyze_cv_from_bytes(pdf_bytes)
+        return FastJSONResponse(
+            result,
+            include=include,
+            headers={"X-Cache": "HIT" if cache_hit else "MISS"},
+        )
 
-        # 3. SI CUMPLE → Enviar email (await porque send_email SÍ es async)
-        email_sent = False
-        if result["is_valid_candidate"] and result["candidate_email"]:
-            email_sent = await service.send_acceptance_email(
-                result["candidate_email"], result["overall_score"]
+    except LLMUnavailableError as e:
+        # Cuota de OpenAI agotada: el cliente puede reintentar más tarde
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail=str(e),
+            headers={"Retry-After": str(max(1, math.ceil(e.retry_after)))},
+        )
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=f"Error: {str(e)}"
+        )
+    finally:
+        upload.close()
+
+
+async def _ingest(file: UploadFile):
+    """Lee el upload por bloques y traduce los errores a 400/413"""
+    try:
+        with track_stage("upload"):
+            return await ingest_upload(
+                file,
+                max_bytes=settings.UPLOAD_MAX_BYTES,
+                spill_bytes=settings.UPLOAD_SPILL_BYTES,
+                chunk_bytes=settings.UPLOAD_CHUNK_BYTES,
             )
+    except InvalidPdfError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except UploadTooLargeError as e:
+        raise HTTPException(
+            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE, detail=str(e)
+        )
 
-        # Agregar info de email enviado
-        result["email_sent"] = email_sent
 
-        return JSONResponse(status_code=status.HTTP_200_OK, content=result)
+@router.post(
+    "/analyze-cv/stream",
+    status_code=status.HTTP_200_OK,
+    responses={
+        200: {"content": {"text/event-stream": {}}},
+        400: {"model": ErrorResponse},
+    },
+)
+async def analyze_cv_stream(
+    file: UploadFile = File(...), service: BotService = Depends(get_service)
+):
+    """
+    Igual que /analyze-cv pero en Server-Sent Events
 
-    except Exception as e:
+    Cada campo del análisis sale apenas el modelo lo termina de generar:
+    - event: field  -> {"name", "value"} (booleanos, scores, textos)
+    - event: item   -> {"name", "index", "value"} (cada punto de las listas)
+    - event: cascade -> {"model_tier", "reason"} el CV era dudoso y se repite
+      con el modelo fuerte: descartar los campos recibidos hasta acá
+    - event: result -> {"cache", "result"} respuesta final con overall_score
+    - event: error  -> {"detail"} si algo falla a mitad del stream
+    """
+    if not file.filename.endswith(".pdf"):
+        raise HTTPException(status_code=400, detail="Solo PDF")
+
+    upload = await _ingest(file)
+
+    async def stream():
+        try:
+            async for event, data in service.process_cv_stream(
+                upload.source, upload.sha256, file.filename
+            ):
+                yield format_sse(event, data)
+        except Exception as e:
+            yield format_sse("error", {"detail": f"Error: {str(e)}"})
+        finally:
+            upload.close()
+
+    return StreamingResponse(
+        stream(),
+        media_type="text/event-stream",
+        # Sin buffering en proxies (nginx) para que cada evento salga al toque
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+def _open_zip(
+    file: UploadFile, room: int, budget: int
+) -> Tuple[zipfile.ZipFile, List[zipfile.ZipInfo]]:
+    """
+    Abre un zip y elige sus PDFs (ignora carpetas y otros archivos)
+
+    Lee del temporal del upload (no lo carga entero) y revisa cantidad y
+    tamaños con el índice del zip, sin descomprimir nada: room es cuántos
+    CVs entran todavía en el batch y budget cuántos bytes.
+    """
+    try:
+        archive = zipfile.ZipFile(file.file)
+    except zipfile.BadZipFile:
+        raise HTTPException(status_code=400, detail=f"{file.filename}: zip inválido")
+    members = []
+    try:
+        for info in archive.infolist():
+            if info.is_dir() or not info.filename.lower().endswith(".pdf"):
+                continue
+            if len(members) >= room:
+                raise _too_many_files()
+            # file_size también acota lo que se descomprime (zip bombs)
+            if info.file_size > settings.BATCH_MAX_FILE_BYTES:
+                raise HTTPException(
+                    status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+                    detail=f"{info.filename} excede el tamaño máximo",
+                )
+            budget -= info.file_size
+            if budget < 0:
+                raise _batch_too_large()
+            members.append(info)
+    except BaseException:
+        archive.close()
+        raise
+    return archive, members
+
+
+async def _extract_zip(
+    archive: zipfile.ZipFile,
+    members: List[zipfile.ZipInfo],
+    rejected: List[Dict[str, str]],
+) -> AsyncIterator[IngestedUpload]:
+    """
+    Descomprime cada PDF recién cuando se lo pide (a un temporal, por bloques)
+
+    Un miembro que no es PDF o está corrupto va a rejected y se sigue.
+    """
+    with archive:
+        for info in members:
+            member = UploadFile(archive.open(info), filename=info.filename)
+            try:
+                upload = await ingest_upload(
+                    member,
+                    max_bytes=settings.BATCH_MAX_FILE_BYTES,
+                    spill_bytes=0,
+                    chunk_bytes=settings.UPLOAD_CHUNK_BYTES,
+                )
+            except (InvalidPdfError, UploadTooLargeError, zipfile.BadZipFile) as e:
+                rejected.append(
+                    {"filename": info.filename, "status": "error", "detail": str(e)}
+                )
+                continue
+            finally:
+                await member.close()
+            yield upload
+
+
+def _too_many_files() -> HTTPException:
+    return HTTPException(
+        status_code=400, detail=f"Máximo {settings.BATCH_MAX_FILES} CVs por batch"
+    )
+
+
+def _batch_too_large() -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+        detail=f"El batch supera el máximo de "
+        f"{settings.BATCH_MAX_BYTES // (1024 * 1024)} MB",
+    )
+
+
+@router.post(
+    "/analyze-cv/batch",
+    status_code=status.HTTP_200_OK,
+    responses={
+        200: {"content": {"application/x-ndjson": {}}},
+        400: {"model": ErrorResponse},
+    },
+)
+async def analyze_cv_batch(
+    files: List[UploadFile] = File(...),
+    fields: Optional[str] = Query(None, description=FIELDS_DESCRIPTION),
+    service: BotService = Depends(get_service),
+):
+    """
+    Analiza varios CVs (varios PDFs o un solo .zip)
+
+    - Concurrencia acotada por BATCH_CONCURRENCY
+    - Responde NDJSON: una línea por CV apenas termina
+    - Un PDF malo solo falla su propia línea
+    - ?fields= recorta el result de cada línea (listados: scores y flags)
+    - Topes antes de leer cada archivo: BATCH_MAX_FILES CVs, cada uno hasta
+      BATCH_MAX_FILE_BYTES y en total BATCH_MAX_BYTES (zips descomprimidos)
+    """
+    selected = _parse_fields(fields)
+    include: Optional[Dict[str, Any]] = None
+    if selected:
+        # Las claves de la línea quedan; solo se recorta result
+        include = dict.fromkeys(("filename", "status", "cache", "detail"), True)
+        include["result"] = selected
+    rejected: List[Dict[str, str]] = []
+    uploads: List[IngestedUpload] = []
+    zips: List[Tuple[zipfile.ZipFile, List[zipfile.ZipInfo]]] = []
+    budget = settings.BATCH_MAX_BYTES
+    try:
+        for file in files:
+            name = file.filename or ""
+            count = len(uploads) + len(rejected) + sum(len(m) for _, m in zips)
+            room = settings.BATCH_MAX_FILES - count
+            if name.lower().endswith(".zip"):
+                # Solo el índice: los PDFs se descomprimen al procesarlos
+                archive, members = await asyncio.to_thread(
+                    _open_zip, file, room, budget
+                )
+                zips.append((archive, members))
+                budget -= sum(info.file_size for info in members)
+                continue
+            if room <= 0:
+                raise _too_many_files()
+            if not name.lower().endswith(".pdf"):
+                rejected.append(
+                    {"filename": name, "status": "error", "detail": "Solo PDF"}
+                )
+                continue
+            # Por bloques como /analyze-cv: los grandes quedan en disco
+            try:
+                upload = await ingest_upload(
+                    file,
+                    max_bytes=min(settings.BATCH_MAX_FILE_BYTES, budget),
+                    spill_bytes=settings.UPLOAD_SPILL_BYTES,
+                    chunk_bytes=settings.UPLOAD_CHUNK_BYTES,
+                )
+            except InvalidPdfError as e:
+                # Un PDF malo solo falla su propia línea
+                rejected.append({"filename": name, "status": "error", "detail": str(e)})
+                continue
+            except UploadTooLargeError:
+                if budget < settings.BATCH_MAX_FILE_BYTES:
+                    raise _batch_too_large()
+                raise HTTPException(
+                    status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+                    detail=f"{name} excede el tamaño máximo",
+                )
+            uploads.append(upload)
+            budget -= upload.size
+
+        if not uploads and not rejected and not any(m for _, m in zips):
+            raise HTTPException(status_code=400, detail="Sin PDFs")
+    except BaseException:
+        for upload in uploads:
+            upload.close()
+        for archive, _ in zips:
+            archive.close()
+        raise
+
+    async def sources() -> AsyncIterator[IngestedUpload]:
+        for upload in uploads:
+            yield upload
+        for archive, members in zips:
+            async for upload in _extract_zip(archive, members, rejected):
+                yield upload
+
+    def drain() -> bytes:
+        lines = [encode_json(line) + b"\n" for line in rejected]
+        rejected.clear()
+        return b"".join(lines)
+
+    async def stream():
+        try:
+            if rejected:
+                yield drain()
+            async for line in service.process_many(
+                sources(), settings.BATCH_CONCURRENCY
+            ):
+                yield drain() + encode_json(line, include) + b"\n"
+            if rejected:
+                yield drain()
+        finally:
+            for upload in uploads:
+                upload.close()
+            for archive, _ in zips:
+                archive.close()
+
+    return StreamingResponse(stream(), media_type="application/x-ndjson")
+
+
+@router.post(
+    "/jobs",
+    status_code=status.HTTP_202_ACCEPTED,
+    response_model=JobResponse,
+    responses={
+        400: {"model": ErrorResponse},
+        503: {"model": ErrorResponse},
+    },
+)
+async def create_job(
+    file: UploadFile = File(...), job_queue: JobQueue = Depends(get_job_queue)
+):
+    """
+    Encola un CV y retorna el job_id al instante
+
+    El análisis y el email corren en los workers de la cola.
+    Consultar el resultado con GET /jobs/{job_id}
+    """
+    if not file.filename.endswith(".pdf"):
+        raise HTTPException(status_code=400, detail="Solo PDF")
+
+    # El PDF se copia por bloques a JOBS_DIR (nombre = sha256), no a la base
+    upload = await _ingest(file)
+    try:
+        job_id = await job_queue.submit(file.filename, upload.source, upload.sha256)
+    except JobQueueFullError as e:
         raise HTTPException(
-            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=f"Error: {str(e)}"
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE, detail=str(e)
         )
+    finally:
+        upload.close()
+
+    job = await asyncio.to_thread(job_queue.store.get, job_id)
+    return FastJSONResponse(
+        JobResponse.model_validate(job), status_code=status.HTTP_202_ACCEPTED
+    )
+
+
+@router.get(
+    "/jobs/{job_id}",
+    status_code=status.HTTP_200_OK,
+    response_model=JobResponse,
+    responses={404: {"model": ErrorResponse}},
+)
+def get_job(job_id: str, job_queue: JobQueue = Depends(get_job_queue)):
+    """Estado del job y resultado cuando termina"""
+    job = job_queue.store.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job no encontrado")
+
+    return FastJSONResponse(JobResponse.model_validate(job))
 
 
 @router.post(
@@ -66,14 +443,21 @@ async def analyze_cv(file: UploadFile = File(...)):
     responses={
         200: {"model": CVFeedbackResponse},
         400: {"model": ErrorResponse},
+        404: {"model": ErrorResponse},
         500: {"model": ErrorResponse},
     },
 )
-def analyze_cv():
+async def feedback_cv(
+    filename: str = "CV-valerio.pdf",
+    fields: Optional[str] = Query(None, description=FIELDS_DESCRIPTION),
+    ingestor: DirectoryIngestor = Depends(get_ingestor),
+):
     """
-    Analiza el CV desde la carpeta /pdf
+    Analiza un CV de la carpeta INGEST_DIR (por defecto /pdf)
 
-    Evalúa de forma profesional y objetiva el perfil del candidato.
+    El resultado se guarda en el manifest de ingesta: mientras el archivo
+    no cambie (mtime/tamaño) se sirve al instante sin leerlo. Para cargar
+    la carpeta entera de antemano: python -m apps.bot.bot_ingest
 
     Returns:
         - Score general (0-10)
@@ -83,21 +467,119 @@ def analyze_cv():
         - Áreas de mejora
         - Sugerencias profesionales
     """
-    try:
-        pdf_path = os.path.join("pdf", "CV-valerio.pdf")
-
-        if not os.path.exists(pdf_path):
-            raise HTTPException(
-                status_code=404, detail="CV no encontrado en /pdf/CV-valerio.pdf"
-            )
-        result = service.analyze_cv(pdf_path)
+    # Solo el nombre: nada de salir de la carpeta con ../
+    name = os.path.basename(filename)
+    if not name.lower().endswith(".pdf"):
+        raise HTTPException(status_code=400, detail="Solo PDF")
+    include = _parse_fields(fields)
 
-        return JSONResponse(status_code=status.HTTP_200_OK, content=result)
+    pdf_path = os.path.join(settings.INGEST_DIR, name)
+    if not os.path.isfile(pdf_path):
+        raise HTTPException(
+            status_code=404,
+            detail=f"CV no encontrado en /{settings.INGEST_DIR}/{name}",
+        )
 
-    except HTTPException as he:
-        raise he
+    try:
+        result, stored = await ingestor.ingest_file(pdf_path)
+    except LLMUnavailableError as e:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail=str(e),
+            headers={"Retry-After": str(max(1, math.ceil(e.retry_after)))},
+        )
     except Exception as e:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"Error al analizar CV: {str(e)}",
         )
+
+    return FastJSONResponse(
+        result, include=include, headers={"X-Cache": "HIT" if stored else "MISS"}
+    )
+
+
+@router.get(
+    "/candidates",
+    status_code=status.HTTP_200_OK,
+    response_model=CandidatePage,
+    responses={400: {"model": ErrorResponse}, 404: {"model": ErrorResponse}},
+)
+def list_candidates(
+    limit: int = Query(20, ge=1, le=settings.CANDIDATES_MAX_PAGE),
+    cursor: Optional[str] = None,
+    min_score: Optional[float] = Query(None, ge=0, le=10),
+    is_software_developer: Optional[bool] = None,
+    is_from_peru: Optional[bool] = None,
+    has_github: Optional[bool] = None,
+    min_years: Optional[int] = Query(None, ge=0),
+    uploaded_after: Optional[float] = Query(None, description="Epoch"),
+    uploaded_before: Optional[float] = Query(None, description="Epoch"),
+    candidates: CandidateStore = Depends(get_candidates),
+):
+    """
+    Mejores candidatos analizados, de mayor a menor overall_score
+
+    - Filtros opcionales por perfil, años de experiencia y fecha de carga
+    - Paginación por cursor: pasar next_cursor como ?cursor= con los MISMOS
+      filtros; null = no hay más páginas
+    """
+    try:
+        items, next_cursor = candidates.top(
+            limit,
+            cursor,
+            min_score=min_score,
+            is_software_developer=is_software_developer,
+            is_from_peru=is_from_peru,
+            has_github=has_github,
+            min_years=min_years,
+            uploaded_after=uploaded_after,
+            uploaded_before=uploaded_before,
+        )
+    except InvalidCursorError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    return FastJSONResponse(CandidatePage(items=items, next_cursor=next_cursor))
+
+
+@router.get(
+    "/candidates/{candidate_id}",
+    status_code=status.HTTP_200_OK,
+    response_model=CandidateDetail,
+    responses={404: {"model": ErrorResponse}},
+)
+def get_candidate(
+    candidate_id: int, candidates: CandidateStore = Depends(get_candidates)
+):
+    """Candidato con el análisis completo"""
+    candidate = candidates.get(candidate_id)
+    if candidate is None:
+        raise HTTPException(status_code=404, detail="Candidato no encontrado")
+
+    return FastJSONResponse(CandidateDetail.model_validate(candidate))
+
+
+@router.delete("/cache", status_code=status.HTTP_200_OK)
+def clear_cache(
+    service: BotService = Depends(get_service),
+    ingestor: DirectoryIngestor = Depends(get_ingestor),
+):
+    """
+    Invalida los análisis guardados
+
+    Usar al cambiar el prompt/rubric sin subir PROMPT_VERSION:
+    - Cache de análisis: SQLite completo y el LRU en memoria
+    - Firmas de near-duplicates del prompt/modelo actuales
+    - Manifest de ingesta del prompt/modelo actuales (se re-analiza)
+
+    El LRU en memoria es por proceso: con varios workers de uvicorn solo se
+    vacía el de quien atiende este request y los demás pueden servir lo
+    viejo hasta CACHE_TTL_SECONDS o un reinicio. Ahí conviene subir
+    PROMPT_VERSION en lugar de usar este endpoint.
+    """
+    removed = service.cache.clear() if service.cache else 0
+    return {
+        "removed": removed,
+        "near_duplicates": service.clear_near_duplicates(),
+        "ingest_manifest": ingestor.invalidate(),
+    }
@@ -1,10 +1,51 @@
-from typing import List, Optional
+from typing import Any, Dict, List, Optional, Type
 
 from pydantic import BaseModel, Field
 
 
+class CVAnalysis(BaseModel):
+    """
+    Lo que responde el LLM
+
+    Fuente única del formato: de acá salen el JSON schema estricto que se
+    manda a OpenAI (strict_json_schema) y el bloque de formato del prompt
+    (bot_prompts.py). Sin defaults: una clave faltante es un error, no un
+    valor inventado.
+    """
+
+    is_university_graduate: bool
+    is_software_developer: bool
+    is_from_peru: bool
+    has_github: bool
+    has_portfolio: bool
+    education_institution: Optional[str] = Field(
+        ..., description="nombre de la institución o null"
+    )
+    professional_summary: str = Field(..., description="resumen objetivo del perfil")
+
+    # Scores
+    education_score: float = Field(..., ge=0, le=10)
+    format_score: float = Field(..., ge=0, le=10)
+    experience_score: float = Field(..., ge=0, le=10)
+    skills_score: float = Field(..., ge=0, le=10)
+    extras_score: float = Field(..., ge=0, le=10)
+
+    # Feedback
+    positive_points: List[str] = Field(..., description="fortalezas")
+    improvements: List[str] = Field(..., description="áreas de mejora")
+    critical_errors: List[str] = Field(
+        ..., description="solo si hay errores graves (si no, lista vacía)"
+    )
+    suggestions: List[str] = Field(..., description="recomendaciones profesionales")
+
+
 class CVFeedbackResponse(BaseModel):
-    """Respuesta del análisis de CV"""
+    """
+    Respuesta del análisis de CV
+
+    Las claves de CVAnalysis más las calculadas, en el orden público de
+    siempre: no hereda de CVAnalysis porque eso cambiaría el orden del JSON.
+    """
 
     overall_score: float = Field(..., ge=0, le=10)
     is_valid_candidate: bool
@@ -15,7 +56,9 @@ class CVFeedbackResponse(BaseModel):
     has_portfolio: bool
     years_experience: int = Field(..., ge=0)
     candidate_email: Optional[str] = None
-    email_sent: bool = Field(default=False, description="Email enviado SOLO si cumple")
+    email_sent: bool = Field(
+        default=False, description="Email encolado en el outbox SOLO si cumple"
+    )
 
     # Scores
     education_score: float = Field(..., ge=0, le=10)
@@ -33,9 +76,92 @@ class CVFeedbackResponse(BaseModel):
     education_institution: Optional[str] = None
     professional_summary: str
 
+    screened_locally: bool = Field(
+        default=False,
+        description="Descartado por el pre-screen local, sin llamar al LLM",
+    )
+    model_tier: str = Field(
+        default="fast",
+        description="Quién produjo el análisis: local | fast | strong",
+    )
+
+
+def strict_json_schema(model: Type[BaseModel]) -> Dict[str, Any]:
+    """
+    JSON schema del modelo en el subconjunto de structured outputs estricto
+
+    Todas las propiedades requeridas, additionalProperties false y sin
+    title/default (la API los rechaza o los ignora).
+    """
+    schema = _strict(model.model_json_schema())
+    # El docstring es para el código, no para el modelo
+    schema.pop("description", None)
+    return schema
+
+
+def _strict(node: Any) -> Any:
+    if isinstance(node, list):
+        return [_strict(item) for item in node]
+    if not isinstance(node, dict):
+        return node
+
+    node = {
+        key: _strict(value)
+        for key, value in node.items()
+        if key not in ("title", "default")
+    }
+    if node.get("type") == "object" and "properties" in node:
+        node["required"] = list(node["properties"])
+        node["additionalProperties"] = False
+    return node
+
 
 class ErrorResponse(BaseModel):
     """Respuesta de error"""
 
     error: str
     detail: Optional[str] = None
+
+
+class JobResponse(BaseModel):
+    """Estado de un análisis en segundo plano"""
+
+    job_id: str
+    status: str = Field(..., description="queued | running | done | failed")
+    filename: Optional[str] = None
+    attempts: int = Field(0, description="Intentos fallidos (se reintenta con backoff)")
+    created_at: float
+    updated_at: float
+    result: Optional[CVFeedbackResponse] = None
+    error: Optional[str] = None
+
+
+class CandidateSummary(BaseModel):
+    """Candidato en el ranking (sin el feedback completo)"""
+
+    id: int
+    filename: Optional[str] = None
+    candidate_email: Optional[str] = None
+    overall_score: float = Field(..., ge=0, le=10)
+    is_valid_candidate: bool
+    is_software_developer: bool
+    is_from_peru: bool
+    has_github: bool
+    years_experience: int = Field(..., ge=0)
+    model_tier: Optional[str] = None
+    created_at: float = Field(..., description="Última carga del PDF (epoch)")
+
+
+class CandidatePage(BaseModel):
+    """Página del ranking de candidatos"""
+
+    items: List[CandidateSummary]
+    next_cursor: Optional[str] = Field(
+        default=None, description="Pasar como ?cursor= para la siguiente página"
+    )
+
+
+class CandidateDetail(CandidateSummary):
+    """Candidato con el análisis completo"""
+
+    result: CVFeedbackResponse
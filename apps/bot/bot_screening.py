@@ -0,0 +1,174 @@
+import re
+from datetime import date
+from typing import Dict, List, Optional, Set
+
+# Léxico técnico: palabra clave -> peso (cuánto indica perfil de desarrollo)
+TECH_KEYWORDS: Dict[str, float] = {
+    # Rol
+    "desarrollador": 3,
+    "developer": 3,
+    "programador": 3,
+    "programmer": 3,
+    "software engineer": 3,
+    "ingeniero de software": 3,
+    "full stack": 3,
+    "fullstack": 3,
+    "backend": 3,
+    "back-end": 3,
+    "frontend": 3,
+    "front-end": 3,
+    "devops": 2,
+    # Lenguajes
+    "python": 3,
+    "java": 3,
+    "javascript": 3,
+    "typescript": 3,
+    "php": 3,
+    "c#": 3,
+    "c++": 3,
+    "golang": 3,
+    "rust": 2,
+    "kotlin": 3,
+    "swift": 1,
+    "ruby": 2,
+    "dart": 2,
+    # Frameworks y herramientas
+    "fastapi": 3,
+    "django": 3,
+    "flask": 3,
+    "spring boot": 3,
+    ".net": 3,
+    "node.js": 3,
+    "nodejs": 3,
+    "express": 1,
+    "react": 3,
+    "angular": 3,
+    "vue": 2,
+    "laravel": 3,
+    "flutter": 3,
+    "docker": 2,
+    "kubernetes": 2,
+    "git": 2,
+    "github": 2,
+    "gitlab": 2,
+    "api rest": 2,
+    "rest api": 2,
+    "microservicios": 2,
+    "microservices": 2,
+    # Señales débiles (también aparecen en perfiles no técnicos)
+    "sql": 1,
+    "postgresql": 1,
+    "mysql": 1,
+    "mongodb": 1,
+    "linux": 1,
+    "aws": 1,
+    "azure": 1,
+    "html": 1,
+    "css": 1,
+    "scrum": 0.5,
+    "ingeniería de sistemas": 1,
+    "ingenieria de sistemas": 1,
+}
+
+# Suma de pesos a partir de la cual la confianza es 1.0
+CONFIDENCE_SATURATION = 10.0
+GITHUB_WEIGHT = 3.0
+
+COUNTRY_MARKERS = r"\b(?:per[úu]|lima|arequipa|cusco|trujillo|chiclayo|piura)\b|\+51\b"
+
+# Un solo regex con grupos con nombre: se recorre el texto UNA vez
+SCREEN_PATTERN = re.compile(
+    "|".join(
+        [
+            r"(?P<github>github\.com/[A-Za-z0-9_.-]+)",
+            r"(?P<linkedin>linkedin\.com/in/[A-Za-z0-9_%-]+)",
+            r"(?P<email>\b[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Za-z]{2,}\b)",
+            r"(?P<url>\bhttps?://[^\s]+|\bwww\.[^\s]+|\b[a-z0-9-]+\.(?:dev|io|me|app|vercel\.app|netlify\.app)\b)",
+            r"(?P<range>\b(?:19|20)\d{2}\s*[-–—]\s*(?:(?:19|20)\d{2}\b|actualidad|presente|actual|present|hoy))",
+            r"(?P<year>\b(?:19|20)\d{2}\b)",
+            rf"(?P<country>{COUNTRY_MARKERS})",
+            # Palabras clave: las más largas primero ("java" no gana a "javascript")
+            r"(?P<tech>(?<![\w.+#-])(?:"
+            + "|".join(
+                re.escape(k) for k in sorted(TECH_KEYWORDS, key=len, reverse=True)
+            )
+            + r")(?![\w+#-]))",
+        ]
+    ),
+    re.IGNORECASE,
+)
+YEAR_PATTERN = re.compile(r"\b(?:19|20)\d{2}\b")
+PORTFOLIO_HINTS = ("portfolio", "portafolio", ".dev", "vercel.app", "netlify.app")
+
+
+class ScreeningResult:
+    """Señales del pre-screen local y confianza de que es perfil de desarrollo"""
+
+    def __init__(self):
+        self.github_urls: List[str] = []
+        self.linkedin_urls: List[str] = []
+        self.portfolio_urls: List[str] = []
+        self.emails: List[str] = []
+        self.years: List[int] = []
+        self.year_ranges: List[str] = []
+        self.is_from_peru = False
+        self.keywords: Set[str] = set()
+        self.confidence = 0.0
+
+    @property
+    def has_github(self) -> bool:
+        return bool(self.github_urls)
+
+    @property
+    def has_portfolio(self) -> bool:
+        return bool(self.portfolio_urls)
+
+    @property
+    def email(self) -> Optional[str]:
+        return self.emails[0] if self.emails else None
+
+    @property
+    def years_experience(self) -> int:
+        """Rango entre el año más antiguo y el más reciente (tope 30)"""
+        if len(self.years) < 2:
+            return 0
+        return max(0, min(max(self.years) - min(self.years), 30))
+
+
+def screen_cv(text: str) -> ScreeningResult:
+    """Recorre el CV una vez y calcula la confianza (0-1) de perfil developer"""
+    result = ScreeningResult()
+
+    for match in SCREEN_PATTERN.finditer(text):
+        kind = match.lastgroup
+        value = match.group(kind)
+
+        if kind == "tech":
+            result.keywords.add(value.lower())
+        elif kind == "github":
+            result.github_urls.append(value)
+        elif kind == "linkedin":
+            result.linkedin_urls.append(value)
+        elif kind == "email":
+            result.emails.append(value)
+        elif kind == "url":
+            if any(hint in value.lower() for hint in PORTFOLIO_HINTS):
+                result.portfolio_urls.append(value)
+        elif kind == "range":
+            result.year_ranges.append(value)
+            years = [int(y) for y in YEAR_PATTERN.findall(value)]
+            if len(years) == 1:
+                # "2021 - actualidad"
+                years.append(date.today().year)
+            result.years.extend(years)
+        elif kind == "year":
+            result.years.append(int(value))
+        elif kind == "country":
+            result.is_from_peru = True
+
+    weight = sum(TECH_KEYWORDS[k] for k in result.keywords)
+    if result.has_github:
+        weight += GITHUB_WEIGHT
+    result.confidence = round(min(weight / CONFIDENCE_SATURATION, 1.0), 3)
+
+    return result
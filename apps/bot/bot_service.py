@@ -1,45 +1,202 @@
-import json
+import asyncio
+import hashlib
+import logging
 import re
+from functools import cached_property
 from io import BytesIO
-from typing import Any, Dict, Optional
+from typing import (
+    TYPE_CHECKING,
+    Any,
+    AsyncIterable,
+    AsyncIterator,
+    Dict,
+    List,
+    Optional,
+    Tuple,
+)
+
+from pydantic import ValidationError
+
+from apps.bot.bot_cache import AnalysisCache
+from apps.bot.bot_candidates import CandidateStore
+from apps.bot.bot_compaction import PAGE_BREAK, compact_cv_text, load_encoding
+from apps.bot.bot_llm import LLMClient, LLMUnavailableError
+from apps.bot.bot_outbox import EmailOutbox
+from apps.bot.bot_pdf import PdfExtractionEngine, PdfSource
+from apps.bot.bot_prompts import get_prompt_template
+from apps.bot.bot_schemas import CVAnalysis, CVFeedbackResponse
+from apps.bot.bot_screening import YEAR_PATTERN, ScreeningResult, screen_cv
+from apps.bot.bot_singleflight import SingleFlight
+from apps.bot.bot_stream import IncrementalJSONParser, StreamEvent
+from core.metrics import (
+    CASCADE_ESCALATIONS,
+    LLM_RETRIES,
+    NEAR_DUPLICATES,
+    record_pdf,
+    record_tokens,
+    track_stage,
+)
+from core.settings import settings
 
-from fastapi_mail import ConnectionConfig, FastMail, MessageSchema
-from openai import OpenAI
-from pypdf import PdfReader
+if TYPE_CHECKING:
+    from openai import AsyncOpenAI, OpenAI
 
-from core.settings import settings
+    from apps.bot.bot_similarity import Fingerprint
+    from apps.bot.bot_upload import IngestedUpload
+
+logger = logging.getLogger(__name__)
+
+# Quién produjo el resultado: pre-screen, modelo rápido o modelo fuerte
+TIER_LOCAL = "local"
+TIER_FAST = "fast"
+TIER_STRONG = "strong"
 
 
 class BotService:
     def __init__(self):
-        self.client = OpenAI(api_key=settings.OPENAI_API_KEY)
-
-        # Configurar email
-        self.mail_config = ConnectionConfig(
-            MAIL_USERNAME=settings.MAILER_EMAIL,
-            MAIL_PASSWORD=settings.MAILER_PASSWORD,
-            MAIL_FROM=settings.MAILER_EMAIL,
-            MAIL_PORT=587,
-            MAIL_SERVER=settings.MAILER_SERVICE,
-            MAIL_STARTTLS=True,
-            MAIL_SSL_TLS=False,
-            USE_CREDENTIALS=True,
-            VALIDATE_CERTS=True,
-        )
-        self.fast_mail = FastMail(self.mail_config)
+        # Rubric versionado: la versión entra en la key del cache
+        self.template = get_prompt_template(settings.PROMPT_VERSION)
+        # Con cascada el resultado depende de los dos modelos
+        self.cache_model = settings.OPENAI_MODEL
+        if settings.OPENAI_STRONG_MODEL:
+            self.cache_model += f">{settings.OPENAI_STRONG_MODEL}"
+        # Agrupa las requests con el mismo prefijo en el cache de OpenAI
+        self.prompt_cache_key = f"cv-analysis-{self.template.version}"
+
+        # Extracción de PDF en procesos aparte (pool perezoso)
+        self.pdf_engine = PdfExtractionEngine(
+            workers=settings.PDF_WORKERS,
+            max_pages=settings.PDF_MAX_PAGES,
+            max_chars=settings.PDF_MAX_CHARS,
+            timeout_seconds=settings.PDF_TIMEOUT_SECONDS,
+            pages_per_task=settings.PDF_PAGES_PER_TASK,
+            recycle_after=settings.PDF_RECYCLE_AFTER_DOCS,
+            max_memory_mb=settings.PDF_WORKER_MAX_MEMORY_MB,
+        )
+
+        # Emails: se encolan aquí y EmailSender los entrega en segundo plano
+        self.outbox = EmailOutbox(
+            settings.OUTBOX_DB_PATH, lease_seconds=settings.OUTBOX_LEASE_SECONDS
+        )
+
+        # Cache de resultados
+        self.cache: Optional[AnalysisCache] = None
+        if settings.CACHE_ENABLED:
+            self.cache = AnalysisCache(
+                ttl_seconds=settings.CACHE_TTL_SECONDS,
+                max_entries=settings.CACHE_MAX_ENTRIES,
+                max_bytes=settings.CACHE_MAX_BYTES,
+                db_path=settings.CACHE_DB_PATH or None,
+            )
+            self.cache.purge_stale(self.template.version, self.cache_model)
+
+        # Mismo PDF en paralelo (doble click, reintentos): un solo análisis
+        self.flights: Optional[SingleFlight] = None
+        if settings.SINGLEFLIGHT_ENABLED:
+            self.flights = SingleFlight(
+                db_path=settings.SINGLEFLIGHT_DB_PATH or None,
+                lease_seconds=settings.SINGLEFLIGHT_LEASE_SECONDS,
+                poll_seconds=settings.SINGLEFLIGHT_POLL_SECONDS,
+            )
+
+        # CVs casi idénticos a uno ya analizado (import perezoso: NumPy)
+        self.near_duplicates: Optional["NearDuplicateIndex"] = None
+        if settings.NEAR_DUP_ENABLED:
+            from apps.bot.bot_similarity import NearDuplicateIndex
+
+            self.near_duplicates = NearDuplicateIndex(
+                settings.NEAR_DUP_DB_PATH,
+                settings.NEAR_DUP_THRESHOLD,
+                max_documents=settings.NEAR_DUP_MAX_DOCUMENTS,
+                ttl_seconds=settings.NEAR_DUP_TTL_SECONDS,
+            )
+
+        # Historial de análisis para el ranking (GET /candidates)
+        self.candidates: Optional[CandidateStore] = None
+        if settings.CANDIDATES_DB_PATH:
+            self.candidates = CandidateStore(settings.CANDIDATES_DB_PATH)
+
+    # Clientes de OpenAI: se crean (e importan, ~0.5s) en la primera llamada
+    # o en warm_up(), no al arrancar. Sin OPENAI_API_KEY la app igual levanta
+
+    @cached_property
+    def client(self) -> "OpenAI":
+        """Cliente síncrono: solo para la Batch API de bot_bulk"""
+        from openai import OpenAI
+
+        return OpenAI(
+            api_key=settings.OPENAI_API_KEY, base_url=settings.OPENAI_BASE_URL
+        )
+
+    @cached_property
+    def async_client(self) -> "AsyncOpenAI":
+        """Cliente async compartido por todas las requests del worker"""
+        from openai import AsyncOpenAI
+
+        # Sin reintentos propios del SDK: los maneja LLMClient
+        return AsyncOpenAI(
+            api_key=settings.OPENAI_API_KEY,
+            base_url=settings.OPENAI_BASE_URL,
+            max_retries=0,
+            timeout=settings.LLM_TIMEOUT_SECONDS,
+        )
+
+    @cached_property
+    def llm(self) -> LLMClient:
+        """Concurrencia, rate limit RPM/TPM, reintentos y hedge"""
+        return LLMClient(
+            self.async_client,
+            max_concurrency=settings.LLM_MAX_CONCURRENCY,
+            rpm=settings.LLM_RPM,
+            tpm=settings.LLM_TPM,
+            max_retries=settings.LLM_MAX_RETRIES,
+            backoff_seconds=settings.LLM_BACKOFF_SECONDS,
+            max_backoff_seconds=settings.LLM_MAX_BACKOFF_SECONDS,
+            burst_seconds=settings.LLM_BURST_SECONDS,
+            hedge=settings.LLM_HEDGE_ENABLED,
+            hedge_min_seconds=settings.LLM_HEDGE_MIN_SECONDS,
+        )
+
+    async def warm_up(self) -> None:
+        """
+        Adelanta lo que si no paga la primera request
+
+        Import de openai y clientes, workers de PDF y tokenizer. Lo lanza
+        el lifespan en segundo plano con WARMUP_ENABLED.
+        """
+        try:
+            self.llm
+            await self.pdf_engine.warm_up()
+            await self.load_tokenizer()
+        except Exception as e:
+            # No es fatal: la primera request paga lo que falte
+            logger.warning("Warm-up incompleto: %s", e)
+            return
+        logger.info("Warm-up completo")
+
+    async def load_tokenizer(self) -> None:
+        """Carga tiktoken en un hilo: la primera vez puede bajar el BPE de la red"""
+        if not await asyncio.to_thread(load_encoding, settings.OPENAI_MODEL):
+            logger.info("Sin tokenizer: los tokens del prompt se estiman")
 
     def extract_text_from_pdf_bytes(self, pdf_bytes: bytes) -> str:
         """Extrae texto del PDF desde bytes (NO GUARDA)"""
+        from pypdf import PdfReader
+
         try:
-            pdf_file = BytesIO(pdf_bytes)
-            reader = PdfReader(pdf_file)
-            text = ""
-            for page in reader.pages:
-                text += page.extract_text() + "\n"
+            with track_stage("extraction"):
+                reader = PdfReader(BytesIO(pdf_bytes))
+                text = PAGE_BREAK.join(page.extract_text() for page in reader.pages)
+            record_pdf(len(reader.pages), len(text))
             return text.strip()
         except Exception as e:
             raise Exception(f"Error al leer PDF: {str(e)}")
 
+    async def extract_text(self, pdf: PdfSource) -> str:
+        """Extrae texto en el pool de procesos (bytes o ruta)"""
+        with track_stage("extraction"):
+            return await self.pdf_engine.extract(pdf)
+
     def extract_email_from_text(self, text: str) -> Optional[str]:
         """Extrae email del CV"""
         email_pattern = r"\b[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Z|a-z]{2,}\b"
@@ -48,7 +205,7 @@ class BotService:
 
     def extract_years_of_experience(self, text: str) -> int:
         """Detecta años de experiencia"""
-        years_found = re.findall(r"\b(19|20)\d{2}\b", text)
+        years_found = YEAR_PATTERN.findall(text)
 
         if len(years_found) >= 2:
             years = [int(y) for y in years_found]
@@ -59,113 +216,221 @@ class BotService:
 
         return 0
 
-    def analyze_cv_with_openai(
+    def build_messages(
         self, cv_text: str, years_experience: int
+    ) -> List[Dict[str, str]]:
+        """Construye los mensajes del prompt (rubric fijo primero, CV al final)"""
+        return self.template.build_messages(cv_text, years_experience)
+
+    def completion_params(
+        self, messages: List[Dict[str, str]], model: Optional[str] = None
     ) -> Dict[str, Any]:
-        """Analiza CV con OpenAI"""
-
-        prompt = f"""
-                Eres un reclutador senior que valora EVIDENCIA REAL sobre títulos.
-
-                Analiza este CV:
-
-                {cv_text}
-
-                AÑOS DE EXPERIENCIA DETECTADOS: {years_experience} años
-
-                CRITERIOS:
-
-                1. FORMACIÓN (15%)
-                - Técnica o universitaria (ambas valen)
-                - ⚠️ Técnico con GitHub > Universitario sin proyectos
-
-                2. PRESENTACIÓN (10%)
-                - Estructura clara
-
-                3. EXPERIENCIA (40%) - MÁS IMPORTANTE
-                - Proyectos reales
-                - Impacto demostrado
-
-                4. COMPETENCIAS TÉCNICAS (25%)
-                - Stack actualizado
-                - ⚠️ DEBE tener GitHub
-
-                5. EVIDENCIA (10%)
-                - GitHub (+3 puntos)
-                - ⚠️ Sin GitHub = -2 puntos
-
-                IMPORTANTE: Todos los scores deben estar entre 0 y 10 (máximo 10).
-
-                Responde en JSON:
-                {{
-                    "is_university_graduate": boolean,
-                    "is_software_developer": boolean,
-                    "is_from_peru": boolean,
-                    "has_github": boolean,
-                    "has_portfolio": boolean,
-                    "education_institution": "nombre o null",
-                    "professional_summary": "resumen",
-                    
-                    "education_score": number (0-10, MÁXIMO 10),
-                    "format_score": number (0-10, MÁXIMO 10),
-                    "experience_score": number (0-10, MÁXIMO 10),
-                    "skills_score": number (0-10, MÁXIMO 10),
-                    "extras_score": number (0-10, MÁXIMO 10),
-                    
-                    "positive_points": ["fortaleza 1", "fortaleza 2"],
-                    "improvements": ["mejora 1", "mejora 2"],
-                    "critical_errors": ["error si existe"],
-                    "suggestions": ["recomendación 1"]
-                }}
-                """
+        """Parámetros de chat.completions del análisis (también los usa bot_bulk)"""
+        return {
+            "model": model or settings.OPENAI_MODEL,
+            "messages": messages,
+            "response_format": self.template.response_format,
+            "temperature": 0.3,
+            "prompt_cache_key": self.prompt_cache_key,
+        }
 
-        try:
-            response = self.client.chat.completions.create(
-                model="gpt-4o-mini",
-                messages=[
-                    {
-                        "role": "system",
-                        "content": "Reclutador que valora EVIDENCIA. GitHub es crítico.",
-                    },
-                    {"role": "user", "content": prompt},
-                ],
-                response_format={"type": "json_object"},
-                temperature=0.3,
-            )
+    def _record_usage(self, response: Any) -> None:
+        """Loguea tokens del prompt y cuántos salieron del cache de OpenAI"""
+        usage = getattr(response, "usage", None)
+        if usage is None:
+            return
+
+        details = getattr(usage, "prompt_tokens_details", None)
+        cached_tokens = getattr(details, "cached_tokens", None) or 0
+        record_tokens(usage.prompt_tokens, usage.completion_tokens, cached_tokens)
+        logger.info(
+            "OpenAI uso (%s): prompt=%d (cache=%d) completion=%d",
+            self.template.version,
+            usage.prompt_tokens,
+            cached_tokens,
+            usage.completion_tokens,
+        )
 
-            result = json.loads(response.choices[0].message.content)
-            return result
+    def parse_analysis(self, content: Optional[str]) -> Dict[str, Any]:
+        """Valida la respuesta contra CVAnalysis (ValidationError si no cumple)"""
+        return CVAnalysis.model_validate_json(content or "").model_dump()
+
+    def _repair(
+        self,
+        messages: List[Dict[str, str]],
+        content: Optional[str],
+        error: ValidationError,
+        attempt: int,
+    ) -> List[Dict[str, str]]:
+        """
+        Mensajes para pedirle al modelo que corrija su respuesta
+
+        Solo se repite la llamada al LLM (el PDF ya está extraído) y el
+        prefijo es el mismo, así que el cache de prompts de OpenAI aplica.
+        """
+        problems = "; ".join(
+            f"{'.'.join(str(part) for part in item['loc']) or 'json'}: {item['msg']}"
+            for item in error.errors()[:10]
+        )
+        if attempt >= settings.LLM_SCHEMA_RETRIES:
+            raise Exception(f"Respuesta fuera del schema: {problems}")
+
+        LLM_RETRIES.labels("schema").inc()
+        logger.warning("Respuesta fuera del schema, se pide corregir: %s", problems)
+        return [
+            *messages,
+            {"role": "assistant", "content": content or ""},
+            {
+                "role": "user",
+                "content": (
+                    f"La respuesta no cumple el formato ({problems}). "
+                    "Responde de nuevo el JSON completo y corregido."
+                ),
+            },
+        ]
+
+    async def analyze_cv_with_openai_async(
+        self, cv_text: str, years_experience: int, model: Optional[str] = None
+    ) -> Dict[str, Any]:
+        """Analiza CV con OpenAI sin bloquear el event loop"""
+        messages = self.build_messages(cv_text, years_experience)
+        try:
+            for attempt in range(settings.LLM_SCHEMA_RETRIES + 1):
+                with track_stage("llm"):
+                    response = await self.llm.create(
+                        **self.completion_params(messages, model)
+                    )
+                self._record_usage(response)
+
+                content = response.choices[0].message.content
+                try:
+                    return self.parse_analysis(content)
+                except ValidationError as e:
+                    messages = self._repair(messages, content, e, attempt)
+
+        except LLMUnavailableError:
+            raise
+        except Exception as e:
+            raise Exception(f"Error al analizar con OpenAI: {str(e)}")
 
+    async def stream_cv_with_openai(
+        self, cv_text: str, years_experience: int, model: Optional[str] = None
+    ) -> AsyncIterator[StreamEvent]:
+        """
+        Analiza CV con OpenAI en streaming
+
+        Emite ("field"/"item", ...) apenas cada campo del JSON queda completo
+        y al final ("analysis", dict) con el JSON entero ya validado. Sin
+        reparación: los campos ya salieron; si no cumple el schema falla
+        (y la cascada, si está activa, lo repite con el modelo fuerte).
+        """
+        parser = IncrementalJSONParser()
+        try:
+            with track_stage("llm"):
+                # El lugar en el semáforo del LLM dura lo que dura el stream
+                async with self.llm.stream(
+                    **self.completion_params(
+                        self.build_messages(cv_text, years_experience), model
+                    ),
+                    stream_options={"include_usage": True},
+                ) as stream:
+                    async for chunk in stream:
+                        # El último chunk trae solo usage (sin choices)
+                        if chunk.usage is not None:
+                            self._record_usage(chunk)
+                        if not chunk.choices:
+                            continue
+                        delta = chunk.choices[0].delta.content
+                        if delta:
+                            for event in parser.feed(delta):
+                                yield event
+
+            analysis = self.parse_analysis(parser.buffer)
+
+        except LLMUnavailableError:
+            raise
         except Exception as e:
             raise Exception(f"Error al analizar con OpenAI: {str(e)}")
 
-    def calculate_overall_score(self, analysis: Dict[str, Any]) -> float:
-        """Calcula score ponderado (máximo 10)"""
-        weights = {
-            "education_score": 0.15,
-            "format_score": 0.10,
-            "experience_score": 0.40,
-            "skills_score": 0.25,
-            "extras_score": 0.10,
-        }
+        yield "analysis", analysis
+
+    def escalation_reason(self, analysis: Optional[Dict[str, Any]]) -> Optional[str]:
+        """
+        Motivo para repetir con OPENAI_STRONG_MODEL (None = el resultado sirve)
+
+        - "incomplete": la respuesta no cumplió el schema ni tras corregirla
+        - "borderline": el score cae en [CASCADE_SCORE_LOW, CASCADE_SCORE_HIGH]
+        """
+        if not settings.OPENAI_STRONG_MODEL:
+            return None
+        if analysis is None:
+            return "incomplete"
+        score = self.calculate_overall_score(analysis)
+        if settings.CASCADE_SCORE_LOW <= score <= settings.CASCADE_SCORE_HIGH:
+            return "borderline"
+        return None
+
+    def _log_escalation(self, reason: str) -> None:
+        CASCADE_ESCALATIONS.labels(reason).inc()
+        logger.info(
+            "Cascada: %s -> %s (%s)",
+            settings.OPENAI_MODEL,
+            settings.OPENAI_STRONG_MODEL,
+            reason,
+        )
+
+    async def analyze_with_cascade_async(
+        self, cv_text: str, years_experience: int
+    ) -> Tuple[Dict[str, Any], str]:
+        """Modelo rápido primero; el fuerte solo si hace falta. Retorna (análisis, tier)"""
+        try:
+            analysis = await self.analyze_cv_with_openai_async(
+                cv_text, years_experience
+            )
+        except LLMUnavailableError:
+            raise
+        except Exception:
+            # Fuera del schema aun corregida: sin cascada no hay plan B
+            if not settings.OPENAI_STRONG_MODEL:
+                raise
+            analysis = None
+
+        reason = self.escalation_reason(analysis)
+        if reason is None:
+            return analysis, TIER_FAST
+
+        self._log_escalation(reason)
+        strong = await self.analyze_cv_with_openai_async(
+            cv_text, years_experience, model=settings.OPENAI_STRONG_MODEL
+        )
+        return strong, TIER_STRONG
 
+    def calculate_overall_score(self, analysis: Dict[str, Any]) -> float:
+        """Calcula score ponderado (máximo 10) con los pesos del template"""
         score = 0.0
-        for key, weight in weights.items():
+        for key, weight in self.template.weights.items():
             # Asegurar que cada score individual no pase de 10
             individual_score = min(analysis.get(key, 0), 10)
             score += individual_score * weight
 
         # Penalización sin GitHub
         if not analysis.get("has_github", False):
-            score -= 1.5
+            score -= self.template.github_penalty
 
         # Asegurar que el score final esté entre 0 y 10
         score = max(0, min(score, 10))
 
         return round(score, 2)
 
-    async def send_acceptance_email(self, to_email: str, score: float) -> bool:
-        """Envía email SOLO si cumple requisitos"""
+    def queue_acceptance_email(
+        self, to_email: str, score: float, dedupe_key: Optional[str] = None
+    ) -> bool:
+        """
+        Encola email SOLO si cumple requisitos (no espera al SMTP)
+
+        Con dedupe_key no se repite dentro de EMAIL_DEDUPE_SECONDS (cuenta
+        como enviado: el candidato ya lo tiene en camino).
+        """
         try:
             subject = "🎉 ¡Felicidades! Fuiste seleccionado"
             body = f"""
@@ -181,56 +446,542 @@ class BotService:
             </html>
             """
 
-            message = MessageSchema(
-                subject=subject, recipients=[to_email], body=body, subtype="html"
-            )
-
-            await self.fast_mail.send_message(message)
+            with track_stage("email"):
+                message_id = self.outbox.enqueue(
+                    to_email,
+                    subject,
+                    body,
+                    dedupe_key=dedupe_key,
+                    dedupe_seconds=settings.EMAIL_DEDUPE_SECONDS,
+                )
+            if message_id is None:
+                logger.info(
+                    "Email de aceptación ya encolado (%s), se omite", dedupe_key
+                )
             return True
 
         except Exception as e:
-            print(f"Error enviando email: {str(e)}")
+            logger.error("Error encolando email: %s", e)
             return False
 
-    def analyze_cv_from_bytes(self, pdf_bytes: bytes) -> Dict[str, Any]:
-        """Analiza CV - NO guarda - SIN async"""
-        # 1. Extraer texto
-        cv_text = self.extract_text_from_pdf_bytes(pdf_bytes)
+    def build_result(
+        self,
+        analysis: Dict[str, Any],
+        cv_text: str,
+        years_experience: int,
+        screened_locally: bool = False,
+        model_tier: str = TIER_FAST,
+    ) -> CVFeedbackResponse:
+        """Arma la respuesta final validada (sin email todavía)"""
+        with track_stage("scoring"):
+            candidate_email = self.extract_email_from_text(cv_text)
+            is_valid_candidate = analysis.get("is_software_developer", False)
+            overall_score = self.calculate_overall_score(analysis)
+
+        return CVFeedbackResponse(
+            overall_score=overall_score,
+            is_valid_candidate=is_valid_candidate,
+            is_university_graduate=analysis.get("is_university_graduate", False),
+            is_software_developer=analysis.get("is_software_developer", False),
+            is_from_peru=analysis.get("is_from_peru", False),
+            has_github=analysis.get("has_github", False),
+            has_portfolio=analysis.get("has_portfolio", False),
+            years_experience=years_experience,
+            candidate_email=candidate_email,
+            education_institution=analysis.get("education_institution"),
+            professional_summary=analysis.get("professional_summary", ""),
+            education_score=analysis.get("education_score", 0),
+            format_score=analysis.get("format_score", 0),
+            experience_score=analysis.get("experience_score", 0),
+            skills_score=analysis.get("skills_score", 0),
+            extras_score=analysis.get("extras_score", 0),
+            positive_points=analysis.get("positive_points", []),
+            improvements=analysis.get("improvements", []),
+            critical_errors=analysis.get("critical_errors", []),
+            suggestions=analysis.get("suggestions", []),
+            screened_locally=screened_locally,
+            model_tier=model_tier,
+        )
+
+    def prescreen(
+        self, cv_text: str, screening: Optional[ScreeningResult] = None
+    ) -> Optional[CVFeedbackResponse]:
+        """
+        Pre-screen local antes de pagar el LLM
+
+        Si la confianza de perfil developer queda bajo SCREENING_THRESHOLD
+        retorna la respuesta armada localmente; si no, None (va al LLM).
+        screening = screen_cv(cv_text) si ya se calculó.
+        """
+        if not settings.SCREENING_ENABLED:
+            return None
+
+        if screening is None:
+            screening = screen_cv(cv_text)
+        if screening.confidence >= settings.SCREENING_THRESHOLD:
+            return None
+
+        logger.info(
+            "Pre-screen: descartado sin LLM (confianza %.2f < %.2f)",
+            screening.confidence,
+            settings.SCREENING_THRESHOLD,
+        )
+        analysis = {
+            "is_university_graduate": False,
+            "is_software_developer": False,
+            "is_from_peru": screening.is_from_peru,
+            "has_github": screening.has_github,
+            "has_portfolio": screening.has_portfolio,
+            "education_institution": None,
+            "professional_summary": (
+                "Pre-screen automático: el CV no muestra señales de un perfil "
+                f"de desarrollo de software (confianza {screening.confidence:.2f})."
+            ),
+            "education_score": 0,
+            "format_score": 0,
+            "experience_score": 0,
+            "skills_score": 0,
+            "extras_score": 0,
+            "positive_points": [],
+            "improvements": [],
+            "critical_errors": [
+                "No se encontraron tecnologías, proyectos ni repositorios de software"
+            ],
+            "suggestions": [
+                "Si postulas a desarrollo, detalla tu stack, proyectos y enlace a GitHub"
+            ],
+        }
+        return self.build_result(
+            analysis,
+            cv_text,
+            self.extract_years_of_experience(cv_text),
+            screened_locally=True,
+            model_tier=TIER_LOCAL,
+        )
+
+    def compact_for_prompt(self, cv_text: str) -> str:
+        """Texto compactado dentro de PROMPT_TOKEN_BUDGET (loguea tokens antes/después)"""
+        compaction = compact_cv_text(
+            cv_text, settings.PROMPT_TOKEN_BUDGET, settings.OPENAI_MODEL
+        )
+        logger.info(
+            "Compactación CV: %d -> %d tokens%s",
+            compaction.tokens_before,
+            compaction.tokens_after,
+            (
+                f" (recortado: {', '.join(compaction.truncated)})"
+                if compaction.truncated
+                else ""
+            ),
+        )
+        return compaction.text
+
+    async def compact_for_prompt_async(self, cv_text: str) -> str:
+        """compact_for_prompt en un hilo: tiktoken no corre en el event loop"""
+        return await asyncio.to_thread(self.compact_for_prompt, cv_text)
+
+    async def analyze_cv_from_bytes_async(self, pdf: PdfSource) -> CVFeedbackResponse:
+        """Analiza CV (bytes o ruta) - pypdf en pool de procesos y OpenAI async"""
+        # 1. Extraer texto fuera del proceso API (pypdf es CPU-bound)
+        cv_text = await self.extract_text(pdf)
 
         if not cv_text or len(cv_text) < 200:
             raise Exception("CV demasiado corto")
 
-        # 2. Extraer datos
-        candidate_email = self.extract_email_from_text(cv_text)
+        # 2. Descarte local de perfiles obvios (sin costo de LLM). Las señales
+        # se calculan una vez: las usa también la firma de casi duplicados
+        screening = screen_cv(cv_text)
+        screened = self.prescreen(cv_text, screening)
+        if screened is not None:
+            return screened
+
+        # 3. Extraer datos (del texto completo)
         years_experience = self.extract_years_of_experience(cv_text)
 
-        # 3. Analizar con IA
-        analysis = self.analyze_cv_with_openai(cv_text, years_experience)
+        # 4. Reenvío con cambios menores: se reutiliza el análisis anterior
+        fingerprint, reused = await asyncio.to_thread(
+            self.find_near_duplicate, cv_text, years_experience, screening
+        )
+        if reused is not None:
+            return reused
 
-        # 4. Calcular score
-        is_valid_candidate = analysis.get("is_software_developer", False)
-        overall_score = self.calculate_overall_score(analysis)
+        # 5. Analizar con IA (texto compactado; await, no bloquea otras requests).
+        # Modelo rápido primero, el fuerte solo para CVs dudosos
+        analysis, tier = await self.analyze_with_cascade_async(
+            await self.compact_for_prompt_async(cv_text), years_experience
+        )
 
-        # 5. Respuesta (sin email todavía)
-        return {
-            "overall_score": overall_score,
-            "is_valid_candidate": is_valid_candidate,
-            "is_university_graduate": analysis.get("is_university_graduate", False),
-            "is_software_developer": analysis.get("is_software_developer", False),
-            "is_from_peru": analysis.get("is_from_peru", False),
-            "has_github": analysis.get("has_github", False),
-            "has_portfolio": analysis.get("has_portfolio", False),
-            "years_experience": years_experience,
-            "candidate_email": candidate_email,
-            "education_institution": analysis.get("education_institution"),
-            "professional_summary": analysis.get("professional_summary", ""),
-            "education_score": analysis.get("education_score", 0),
-            "format_score": analysis.get("format_score", 0),
-            "experience_score": analysis.get("experience_score", 0),
-            "skills_score": analysis.get("skills_score", 0),
-            "extras_score": analysis.get("extras_score", 0),
-            "positive_points": analysis.get("positive_points", []),
-            "improvements": analysis.get("improvements", []),
-            "critical_errors": analysis.get("critical_errors", []),
-            "suggestions": analysis.get("suggestions", []),
+        # 6. Calcular score y armar respuesta
+        result = self.build_result(analysis, cv_text, years_experience, model_tier=tier)
+        await asyncio.to_thread(self.remember_analysis, fingerprint, result)
+        return result
+
+    def find_near_duplicate(
+        self,
+        cv_text: str,
+        years_experience: int,
+        screening: Optional[ScreeningResult] = None,
+    ) -> Tuple[Optional["Fingerprint"], Optional[CVFeedbackResponse]]:
+        """
+        Busca un análisis anterior de un CV casi idéntico
+
+        Retorna (firma del CV, resultado reutilizado o None). La firma se
+        pasa a remember_analysis si hubo que analizar. screening = el
+        pre-screen del mismo texto, para no recorrerlo otra vez.
+        """
+        if self.near_duplicates is None:
+            return None, None
+
+        from apps.bot.bot_similarity import fingerprint
+
+        with track_stage("similarity"):
+            cv_fingerprint = fingerprint(cv_text, years_experience, screening)
+            match = self.near_duplicates.lookup(cv_fingerprint, self._near_version())
+        if match is None:
+            return cv_fingerprint, None
+
+        reason = match.rerun_reason
+        NEAR_DUPLICATES.labels(reason or "reused").inc()
+        if reason is not None:
+            logger.info(
+                "CV parecido (Jaccard ~%.2f) al análisis %d pero cambió %s: se analiza",
+                match.similarity,
+                match.document_id,
+                ", ".join(match.changed_sections + match.changed_signals),
+            )
+            return cv_fingerprint, None
+
+        logger.info(
+            "CV casi idéntico (Jaccard ~%.2f) al análisis %d: se reutiliza",
+            match.similarity,
+            match.document_id,
+        )
+        # El contacto puede haber cambiado (está en el header)
+        result = CVFeedbackResponse.model_validate(match.result)
+        result.candidate_email = self.extract_email_from_text(cv_text)
+        return cv_fingerprint, result
+
+    def remember_analysis(
+        self, cv_fingerprint: Optional["Fingerprint"], result: CVFeedbackResponse
+    ) -> None:
+        """Guarda la firma para reconocer reenvíos del mismo CV"""
+        if self.near_duplicates is None or cv_fingerprint is None:
+            return
+        try:
+            self.near_duplicates.add(
+                cv_fingerprint, self._near_version(), result.model_dump()
+            )
+        except Exception as e:
+            logger.warning("No se pudo guardar la firma del CV: %s", e)
+
+    def clear_near_duplicates(self) -> int:
+        """Olvida las firmas del prompt/modelo actuales. Retorna cuántas"""
+        if self.near_duplicates is None:
+            return 0
+        return self.near_duplicates.clear(self._near_version())
+
+    def _near_version(self) -> str:
+        return f"{self.template.version}:{self.cache_model}"
+
+    @staticmethod
+    def hash_pdf(pdf: PdfSource) -> str:
+        """sha256 del PDF (bytes o ruta, leyendo por bloques)"""
+        if isinstance(pdf, bytes):
+            return hashlib.sha256(pdf).hexdigest()
+
+        digest = hashlib.sha256()
+        with open(pdf, "rb") as f:
+            for chunk in iter(lambda: f.read(1024 * 1024), b""):
+                digest.update(chunk)
+        return digest.hexdigest()
+
+    async def analyze_cv_cached(
+        self, pdf: PdfSource, pdf_sha256: Optional[str] = None
+    ) -> Tuple[CVFeedbackResponse, bool]:
+        """
+        Analiza CV usando el cache. Retorna (resultado, hit)
+
+        Si el mismo PDF ya se está analizando, espera ese resultado (cuenta
+        como hit: no hubo otra llamada a OpenAI). SQLite (cache, leases) se
+        consulta en un hilo: con la base bloqueada por otro worker espera
+        hasta busy_timeout sin frenar el event loop.
+        """
+        if self.cache is None and self.flights is None:
+            return await self.analyze_cv_from_bytes_async(pdf), False
+
+        if pdf_sha256 is None:
+            pdf_sha256 = await asyncio.to_thread(self.hash_pdf, pdf)
+        key = AnalysisCache.make_key(
+            pdf_sha256, self.template.version, self.cache_model
+        )
+
+        cached = await asyncio.to_thread(self._cached, key)
+        if cached is not None:
+            return cached, True
+
+        async def analyze() -> CVFeedbackResponse:
+            result = await self.analyze_cv_from_bytes_async(pdf)
+            await asyncio.to_thread(self._cache_result, key, result)
+            return result
+
+        if self.flights is None:
+            return await analyze(), False
+
+        result, shared = await self.flights.run(key, analyze, lambda: self._cached(key))
+        # Copia: cada request marca su propio email_sent
+        return (result.model_copy(), True) if shared else (result, False)
+
+    def _cached(self, key: str) -> Optional[CVFeedbackResponse]:
+        if self.cache is None:
+            return None
+        value = self.cache.get(key)
+        return CVFeedbackResponse.model_validate(value) if value is not None else None
+
+    def _cache_result(self, key: str, result: CVFeedbackResponse) -> None:
+        if self.cache is not None:
+            self.cache.set(
+                key, result.model_dump(), self.template.version, self.cache_model
+            )
+
+    async def process_cv(
+        self,
+        pdf: PdfSource,
+        pdf_sha256: Optional[str] = None,
+        filename: Optional[str] = None,
+    ) -> Tuple[CVFeedbackResponse, bool]:
+        """Analiza (con cache) y envía email SOLO si cumple. Retorna (resultado, hit)"""
+        if pdf_sha256 is None:
+            pdf_sha256 = await asyncio.to_thread(self.hash_pdf, pdf)
+        result, cache_hit = await self.analyze_cv_cached(pdf, pdf_sha256)
+        # Outbox y candidatos son SQLite: en un hilo, como el cache
+        await asyncio.to_thread(self.notify_candidate, result, pdf_sha256)
+        await asyncio.to_thread(self.record_candidate, result, pdf_sha256, filename)
+        return result, cache_hit
+
+    def record_candidate(
+        self,
+        result: CVFeedbackResponse,
+        pdf_sha256: str,
+        filename: Optional[str] = None,
+    ) -> None:
+        """Guarda el análisis en el store de candidatos (una fila por PDF)"""
+        if self.candidates is None:
+            return
+        try:
+            self.candidates.save(pdf_sha256, filename, result.model_dump())
+        except Exception as e:
+            # El ranking es secundario: no tumba el análisis
+            logger.warning("No se pudo guardar el candidato: %s", e)
+
+    def notify_candidate(
+        self, result: CVFeedbackResponse, pdf_sha256: Optional[str] = None
+    ) -> None:
+        """
+        Encola el email SOLO si cumple y lo marca en result.email_sent
+
+        Con pdf_sha256 el email sale una sola vez por PDF en la ventana
+        EMAIL_DEDUPE_SECONDS, aunque lo suban varias veces.
+        """
+        email_sent = False
+        if result.is_valid_candidate and result.candidate_email:
+            email_sent = self.queue_acceptance_email(
+                result.candidate_email,
+                result.overall_score,
+                dedupe_key=f"acceptance:{pdf_sha256}" if pdf_sha256 else None,
+            )
+        result.email_sent = email_sent
+
+    async def process_cv_stream(
+        self,
+        pdf: PdfSource,
+        pdf_sha256: Optional[str] = None,
+        filename: Optional[str] = None,
+    ) -> AsyncIterator[StreamEvent]:
+        """
+        Igual que process_cv pero emitiendo eventos mientras el modelo genera
+
+        - "field"/"item": campos del análisis apenas se completan
+        - "result": {"cache", "result"} con overall_score y email_sent
+        Con cache hit (o si el mismo PDF ya se está analizando) solo se
+        emite "result".
+        """
+        if pdf_sha256 is None:
+            pdf_sha256 = await asyncio.to_thread(self.hash_pdf, pdf)
+        async for event, data in self._stream_cv(pdf, pdf_sha256):
+            if event == "result":
+                await asyncio.to_thread(
+                    self.record_candidate, data["result"], pdf_sha256, filename
+                )
+            yield event, data
+
+    async def _stream_cv(
+        self, pdf: PdfSource, pdf_sha256: str
+    ) -> AsyncIterator[StreamEvent]:
+        """process_cv_stream con cache y single-flight"""
+        key = AnalysisCache.make_key(
+            pdf_sha256, self.template.version, self.cache_model
+        )
+
+        cached = await asyncio.to_thread(self._cached, key)
+        if cached is None and self.flights is not None:
+            cached = await self.flights.follow(key, lambda: self._cached(key))
+            if cached is None:
+                # Líder: libera la clave pase lo que pase (error, desconexión)
+                result = None
+                try:
+                    async for event, data in self._stream_analysis(
+                        pdf, pdf_sha256, key
+                    ):
+                        if event == "result":
+                            result = data["result"]
+                        yield event, data
+                finally:
+                    self.flights.finish(key, result)
+                return
+            cached = cached.model_copy()
+        if cached is not None:
+            await asyncio.to_thread(self.notify_candidate, cached, pdf_sha256)
+            yield "result", {"cache": "HIT", "result": cached}
+            return
+
+        async for event, data in self._stream_analysis(pdf, pdf_sha256, key):
+            yield event, data
+
+    async def _stream_analysis(
+        self, pdf: PdfSource, pdf_sha256: str, key: str
+    ) -> AsyncIterator[StreamEvent]:
+        """Análisis sin cache de process_cv_stream (el último evento es "result")"""
+        cv_text = await self.extract_text(pdf)
+        if not cv_text or len(cv_text) < 200:
+            raise Exception("CV demasiado corto")
+
+        screening = screen_cv(cv_text)
+        screened = self.prescreen(cv_text, screening)
+        if screened is not None:
+            await asyncio.to_thread(self._cache_result, key, screened)
+            await asyncio.to_thread(self.notify_candidate, screened, pdf_sha256)
+            yield "result", {"cache": "MISS", "result": screened}
+            return
+
+        years_experience = self.extract_years_of_experience(cv_text)
+        fingerprint, reused = await asyncio.to_thread(
+            self.find_near_duplicate, cv_text, years_experience, screening
+        )
+        if reused is not None:
+            await asyncio.to_thread(self._cache_result, key, reused)
+            await asyncio.to_thread(self.notify_candidate, reused, pdf_sha256)
+            yield "result", {"cache": "MISS", "result": reused}
+            return
+
+        # Datos locales: salen antes que el primer token del modelo
+        yield "field", {"name": "years_experience", "value": years_experience}
+        yield "field", {
+            "name": "candidate_email",
+            "value": self.extract_email_from_text(cv_text),
         }
+
+        prompt_text = await self.compact_for_prompt_async(cv_text)
+        analysis: Optional[Dict[str, Any]] = None
+        tier = TIER_FAST
+        try:
+            async for event, data in self.stream_cv_with_openai(
+                prompt_text, years_experience
+            ):
+                if event == "analysis":
+                    analysis = data
+                else:
+                    yield event, data
+        except LLMUnavailableError:
+            raise
+        except Exception:
+            if not settings.OPENAI_STRONG_MODEL:
+                raise
+
+        reason = self.escalation_reason(analysis)
+        if reason is not None:
+            # El cliente descarta lo recibido: los campos llegan de nuevo
+            self._log_escalation(reason)
+            tier = TIER_STRONG
+            yield "cascade", {"model_tier": tier, "reason": reason}
+            async for event, data in self.stream_cv_with_openai(
+                prompt_text, years_experience, model=settings.OPENAI_STRONG_MODEL
+            ):
+                if event == "analysis":
+                    analysis = data
+                else:
+                    yield event, data
+
+        result = self.build_result(analysis, cv_text, years_experience, model_tier=tier)
+        await asyncio.to_thread(self.remember_analysis, fingerprint, result)
+        await asyncio.to_thread(self._cache_result, key, result)
+
+        await asyncio.to_thread(self.notify_candidate, result, pdf_sha256)
+        yield "result", {"cache": "MISS", "result": result}
+
+    async def process_many(
+        self, uploads: AsyncIterable["IngestedUpload"], concurrency: int
+    ) -> AsyncIterator[Dict[str, Any]]:
+        """
+        Procesa varios CVs con concurrencia acotada
+
+        Emite cada resultado apenas termina (no en orden de entrada).
+        Pide el siguiente upload recién cuando hay lugar (un zip se
+        descomprime de a uno) y cierra cada upload al terminarlo.
+        Un PDF malo solo falla su propia línea.
+        """
+        semaphore = asyncio.Semaphore(concurrency)
+        lines: asyncio.Queue = asyncio.Queue()
+        tasks: List[asyncio.Task] = []
+
+        async def run(upload: "IngestedUpload") -> None:
+            try:
+                result, cache_hit = await self.process_cv(
+                    upload.source, upload.sha256, filename=upload.filename
+                )
+                line = {
+                    "filename": upload.filename,
+                    "status": "ok",
+                    "cache": "HIT" if cache_hit else "MISS",
+                    "result": result,
+                }
+            except Exception as e:
+                line = {
+                    "filename": upload.filename,
+                    "status": "error",
+                    "detail": str(e),
+                }
+            finally:
+                upload.close()
+                semaphore.release()
+            lines.put_nowait(line)
+
+        async def feed() -> None:
+            iterator = uploads.__aiter__()
+            try:
+                while True:
+                    await semaphore.acquire()
+                    try:
+                        upload = await iterator.__anext__()
+                    except StopAsyncIteration:
+                        break
+                    tasks.append(asyncio.create_task(run(upload)))
+                await asyncio.gather(*tasks)
+            finally:
+                if hasattr(iterator, "aclose"):
+                    await iterator.aclose()
+                # Fin de la lista (también si feed falló: el error sale abajo)
+                lines.put_nowait(None)
+
+        feeder = asyncio.create_task(feed())
+        try:
+            while True:
+                line = await lines.get()
+                if line is None:
+                    break
+                yield line
+            await feeder
+        finally:
+            # Cliente desconectado: no seguir gastando en OpenAI
+            feeder.cancel()
+            for task in tasks:
+                task.cancel()
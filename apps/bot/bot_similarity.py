@@ -0,0 +1,333 @@
+"""
+Detección de CVs casi idénticos (MinHash + LSH)
+
+El cache exacto (sha256 del PDF) no sirve cuando el candidato corrige un
+typo o cambia el teléfono y vuelve a subir el CV. Acá cada análisis deja
+una firma MinHash del texto; un upload nuevo busca por LSH los anteriores
+parecidos y, si supera el umbral de Jaccard, reutiliza ese resultado.
+
+Solo se reutiliza si lo que cambió no afecta el score:
+- Las secciones que puntúan (experience, skills, education, other) son
+  idénticas; los cambios en el header (contacto, resumen) no cuentan
+- Las señales locales (GitHub, portfolio, Perú, años de experiencia) son
+  las mismas
+Si no, se vuelve a analizar.
+"""
+
+import hashlib
+import json
+import random
+import re
+import threading
+import time
+import zlib
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+from apps.bot.bot_compaction import PAGE_BREAK, normalize_whitespace, segment_sections
+from apps.bot.bot_screening import ScreeningResult, screen_cv
+from core.database import connect
+
+# Shingles de 3 palabras: un typo o un teléfono nuevo cambian ~3 de cientos
+SHINGLE_WORDS = 3
+NUM_PERM = 128
+# 16 bandas x 8 filas: un CV con Jaccard 0.9 cae en algún bucket con
+# probabilidad > 0.9999; con 0.5 solo ~6% llega a compararse
+BANDS = 16
+ROWS = NUM_PERM // BANDS
+
+MERSENNE_PRIME = (1 << 61) - 1
+MAX_HASH = (1 << 32) - 1
+# Semilla fija: las firmas guardadas deben valer entre procesos y reinicios
+_rng = random.Random(20240601)
+PERM_A = np.array(
+    [_rng.randint(1, MERSENNE_PRIME - 1) for _ in range(NUM_PERM)], dtype=np.uint64
+)
+PERM_B = np.array(
+    [_rng.randint(0, MERSENNE_PRIME - 1) for _ in range(NUM_PERM)], dtype=np.uint64
+)
+
+WORD_PATTERN = re.compile(r"\w+")
+SCORED_SECTIONS = ("experience", "skills", "education", "other")
+
+
+class Fingerprint:
+    """Firma MinHash, hash por sección y señales locales de un CV"""
+
+    def __init__(
+        self, signature: np.ndarray, sections: Dict[str, str], signals: Dict[str, Any]
+    ):
+        self.signature = signature
+        self.sections = sections
+        self.signals = signals
+
+    def buckets(self) -> List[int]:
+        """Un bucket LSH por banda (entero con signo para SQLite)"""
+        buckets = []
+        for band in range(BANDS):
+            rows = self.signature[band * ROWS : (band + 1) * ROWS].tobytes()
+            digest = hashlib.blake2b(
+                rows, digest_size=8, person=band.to_bytes(2, "big")
+            ).digest()
+            buckets.append(int.from_bytes(digest, "big", signed=True))
+        return buckets
+
+
+class NearDuplicateMatch:
+    """Análisis anterior parecido y si su resultado se puede reutilizar"""
+
+    def __init__(
+        self,
+        document_id: int,
+        similarity: float,
+        changed_sections: List[str],
+        changed_signals: List[str],
+        result: Dict[str, Any],
+    ):
+        self.document_id = document_id
+        self.similarity = similarity
+        self.changed_sections = changed_sections
+        self.changed_signals = changed_signals
+        self.result = result
+
+    @property
+    def rerun_reason(self) -> Optional[str]:
+        """None = reutilizable; si no, "scored_sections" o "signals" """
+        if any(section in SCORED_SECTIONS for section in self.changed_sections):
+            return "scored_sections"
+        if self.changed_signals:
+            return "signals"
+        return None
+
+
+def fingerprint(
+    cv_text: str, years_experience: int, screening: Optional[ScreeningResult] = None
+) -> Fingerprint:
+    """
+    Firma del texto extraído (normalizado: mayúsculas y espacios no cuentan)
+
+    screening = el pre-screen ya hecho sobre el mismo texto (si no, se corre)
+    """
+    pages = [normalize_whitespace(page) for page in cv_text.split(PAGE_BREAK)]
+    text = "\n\n".join(page for page in pages if page)
+
+    sections: Dict[str, List[str]] = {}
+    for name, body in segment_sections(text):
+        sections.setdefault(name, []).extend(_words(body))
+
+    if screening is None:
+        screening = screen_cv(cv_text)
+    return Fingerprint(
+        signature=minhash(_shingles(_words(text))),
+        sections={
+            name: hashlib.blake2b(" ".join(words).encode(), digest_size=8).hexdigest()
+            for name, words in sections.items()
+        },
+        signals={
+            "has_github": screening.has_github,
+            "has_portfolio": screening.has_portfolio,
+            "is_from_peru": screening.is_from_peru,
+            "years_experience": years_experience,
+        },
+    )
+
+
+def minhash(shingles: np.ndarray) -> np.ndarray:
+    """Firma de NUM_PERM mínimos (uint32) con hashing universal (a*x + b) mod p"""
+    if len(shingles) == 0:
+        return np.full(NUM_PERM, MAX_HASH, dtype=np.uint32)
+    # El producto desborda 64 bits a propósito (mismo esquema que datasketch)
+    with np.errstate(over="ignore"):
+        hashed = (np.outer(PERM_A, shingles) + PERM_B[:, None]) % MERSENNE_PRIME
+    return (hashed & MAX_HASH).min(axis=1).astype(np.uint32)
+
+
+def similarity(a: np.ndarray, b: np.ndarray) -> float:
+    """Jaccard estimado: fracción de mínimos iguales"""
+    return float(np.count_nonzero(a == b)) / NUM_PERM
+
+
+def _words(text: str) -> List[str]:
+    return WORD_PATTERN.findall(text.lower())
+
+
+def _shingles(words: List[str]) -> np.ndarray:
+    if len(words) < SHINGLE_WORDS:
+        words = words + [""] * (SHINGLE_WORDS - len(words))
+    shingles = {
+        " ".join(words[i : i + SHINGLE_WORDS])
+        for i in range(len(words) - SHINGLE_WORDS + 1)
+    }
+    return np.fromiter(
+        (zlib.crc32(shingle.encode()) for shingle in shingles),
+        dtype=np.uint64,
+        count=len(shingles),
+    )
+
+
+class NearDuplicateIndex:
+    """
+    Firmas de los CVs analizados y tabla LSH en SQLite
+
+    version = versión del prompt + modelo: solo se reutilizan análisis
+    hechos con el mismo rubric. Buscar cuesta BANDS lecturas de índice,
+    no recorrer la tabla.
+
+    Acotado: cada add borra las firmas de más de ttl_seconds y las más
+    viejas si pasan de max_documents (0 = sin tope).
+    """
+
+    def __init__(
+        self,
+        db_path: str,
+        threshold: float,
+        max_documents: int = 0,
+        ttl_seconds: float = 0,
+    ):
+        self.threshold = threshold
+        self.max_documents = max_documents
+        self.ttl_seconds = ttl_seconds
+        self._lock = threading.Lock()
+        self._db = connect(db_path)
+        self._db.execute("""
+            CREATE TABLE IF NOT EXISTS near_documents (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                version TEXT NOT NULL,
+                signature BLOB NOT NULL,
+                sections TEXT NOT NULL,
+                signals TEXT NOT NULL,
+                result TEXT NOT NULL,
+                created_at REAL NOT NULL
+            )
+            """)
+        self._db.execute("""
+            CREATE TABLE IF NOT EXISTS near_buckets (
+                bucket INTEGER NOT NULL,
+                document_id INTEGER NOT NULL,
+                PRIMARY KEY (bucket, document_id)
+            ) WITHOUT ROWID
+            """)
+        # Para borrar por documento y por antigüedad sin recorrer las tablas
+        self._db.execute(
+            "CREATE INDEX IF NOT EXISTS near_buckets_document"
+            " ON near_buckets (document_id)"
+        )
+        self._db.execute(
+            "CREATE INDEX IF NOT EXISTS near_documents_created"
+            " ON near_documents (created_at)"
+        )
+        self._db.commit()
+
+    def lookup(self, fp: Fingerprint, version: str) -> Optional[NearDuplicateMatch]:
+        """Análisis anterior más parecido sobre el umbral (o None)"""
+        buckets = fp.buckets()
+        with self._lock:
+            rows = self._db.execute(
+                f"""
+                SELECT DISTINCT d.id, d.signature FROM near_buckets b
+                JOIN near_documents d ON d.id = b.document_id
+                WHERE b.bucket IN ({', '.join('?' * len(buckets))})
+                  AND d.version = ? AND d.created_at > ?
+                """,
+                (*buckets, version, self._expired_before(time.time())),
+            ).fetchall()
+
+        # Más parecido; a igual parecido el más reciente
+        best, best_id = max(
+            (
+                (
+                    similarity(
+                        fp.signature, np.frombuffer(row["signature"], dtype=np.uint32)
+                    ),
+                    row["id"],
+                )
+                for row in rows
+            ),
+            default=(0.0, None),
+        )
+        if best_id is None or best < self.threshold:
+            return None
+
+        with self._lock:
+            row = self._db.execute(
+                "SELECT sections, signals, result FROM near_documents WHERE id = ?",
+                (best_id,),
+            ).fetchone()
+        sections = json.loads(row["sections"])
+        signals = json.loads(row["signals"])
+        names = set(sections) | set(fp.sections)
+        return NearDuplicateMatch(
+            document_id=best_id,
+            similarity=best,
+            changed_sections=sorted(
+                name for name in names if sections.get(name) != fp.sections.get(name)
+            ),
+            changed_signals=sorted(
+                key for key in fp.signals if signals.get(key) != fp.signals[key]
+            ),
+            result=json.loads(row["result"]),
+        )
+
+    def clear(self, version: str) -> int:
+        """Borra las firmas de esa versión (y sus buckets). Retorna cuántas"""
+        with self._lock:
+            self._db.execute(
+                """
+                DELETE FROM near_buckets WHERE document_id IN (
+                    SELECT id FROM near_documents WHERE version = ?
+                )
+                """,
+                (version,),
+            )
+            cursor = self._db.execute(
+                "DELETE FROM near_documents WHERE version = ?", (version,)
+            )
+            self._db.commit()
+        return cursor.rowcount
+
+    def add(self, fp: Fingerprint, version: str, result: Dict[str, Any]) -> int:
+        """Guarda la firma y el resultado; retorna el id del documento"""
+        now = time.time()
+        with self._lock:
+            document_id = self._db.execute(
+                """
+                INSERT INTO near_documents
+                    (version, signature, sections, signals, result, created_at)
+                VALUES (?, ?, ?, ?, ?, ?)
+                """,
+                (
+                    version,
+                    fp.signature.tobytes(),
+                    json.dumps(fp.sections),
+                    json.dumps(fp.signals),
+                    json.dumps(result, ensure_ascii=False),
+                    now,
+                ),
+            ).lastrowid
+            self._db.executemany(
+                "INSERT OR IGNORE INTO near_buckets (bucket, document_id) VALUES (?, ?)",
+                [(bucket, document_id) for bucket in fp.buckets()],
+            )
+            self._evict(document_id, now)
+            self._db.commit()
+        return document_id
+
+    def _expired_before(self, now: float) -> float:
+        return now - self.ttl_seconds if self.ttl_seconds > 0 else float("-inf")
+
+    def _evict(self, last_id: int, now: float) -> None:
+        """Borra lo expirado y lo que excede max_documents (llamar con el lock)"""
+        # Los ids son crecientes: los últimos max_documents son id > last_id - max
+        oldest_id = last_id - self.max_documents if self.max_documents > 0 else 0
+        where = "id <= ? OR created_at <= ?"
+        params = (oldest_id, self._expired_before(now))
+        self._db.execute(
+            f"""
+            DELETE FROM near_buckets WHERE document_id IN (
+                SELECT id FROM near_documents WHERE {where}
+            )
+            """,
+            params,
+        )
+        self._db.execute(f"DELETE FROM near_documents WHERE {where}", params)
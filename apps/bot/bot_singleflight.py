@@ -0,0 +1,162 @@
+import asyncio
+import os
+import threading
+import time
+import uuid
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+
+from core.database import connect
+from core.metrics import COALESCED
+
+# Busca el resultado que dejó otro worker (el cache compartido)
+Lookup = Callable[[], Optional[Any]]
+
+
+class SingleFlight:
+    """
+    Un solo análisis en vuelo por clave (sha256 del PDF + prompt + modelo)
+
+    Las requests idénticas que llegan mientras el primero (el "líder")
+    trabaja esperan su resultado en vez de llamar de nuevo a OpenAI. Si el
+    líder termina sin resultado (error o cancelación) el siguiente toma la
+    posta.
+
+    - Sin db_path: solo dentro del worker (futures de asyncio)
+    - Con db_path: además un lease en SQLite por clave; los otros workers
+      esperan a que el líder deje el resultado en el cache compartido
+      (requiere CACHE_DB_PATH) o a que el lease venza
+
+    SQLite (lease y lookup) corre en hilos: con la base bloqueada por otro
+    worker se espera hasta busy_timeout sin frenar el event loop.
+    """
+
+    def __init__(
+        self,
+        db_path: Optional[str] = None,
+        lease_seconds: float = 300.0,
+        poll_seconds: float = 0.5,
+    ):
+        self.lease_seconds = lease_seconds
+        self.poll_seconds = poll_seconds
+        self._flights: Dict[str, asyncio.Future] = {}
+        self._owner = f"{os.getpid()}-{uuid.uuid4().hex[:8]}"
+        self._lock = threading.Lock()
+
+        self._db = None
+        if db_path:
+            self._db = connect(db_path)
+            self._db.execute("""
+                CREATE TABLE IF NOT EXISTS singleflight (
+                    key TEXT PRIMARY KEY,
+                    owner TEXT NOT NULL,
+                    expires_at REAL NOT NULL
+                )
+                """)
+            self._db.commit()
+
+    async def follow(self, key: str, lookup: Lookup) -> Optional[Any]:
+        """
+        Resultado de un análisis idéntico en curso
+
+        None = no hay ninguno: el que llama pasa a ser el líder y DEBE
+        llamar a finish(key, ...) al terminar (con o sin resultado).
+        """
+        while True:
+            flight = self._flights.get(key)
+            if flight is not None:
+                result = await asyncio.shield(flight)
+                if result is not None:
+                    COALESCED.labels("analysis").inc()
+                    return result
+                continue
+
+            if self._db is None or await asyncio.to_thread(self._try_lease, key):
+                self._flights[key] = asyncio.get_running_loop().create_future()
+                return None
+            if key in self._flights:
+                # Otra request de este worker tomó el lease mientras tanto
+                continue
+
+            # Otro worker lo está analizando
+            result = await self._wait_remote(key, lookup)
+            if result is not None:
+                COALESCED.labels("analysis").inc()
+                return result
+
+    def finish(self, key: str, result: Optional[Any] = None) -> None:
+        """Libera la clave; sin resultado los que esperan lo intentan ellos"""
+        flight = self._flights.pop(key, None)
+        if flight is not None and not flight.done():
+            flight.set_result(result)
+        if self._db is None:
+            return
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            self._release(key)
+            return
+        # Sin esperar: los demás ya tienen el resultado (o el lease vence)
+        loop.run_in_executor(None, self._release, key)
+
+    async def run(
+        self, key: str, fn: Callable[[], Awaitable[Any]], lookup: Lookup
+    ) -> Tuple[Any, bool]:
+        """Ejecuta fn() una sola vez por clave. Retorna (resultado, compartido)"""
+        shared = await self.follow(key, lookup)
+        if shared is not None:
+            return shared, True
+
+        # En una task aparte: si el líder se desconecta, los demás igual reciben
+        task = asyncio.ensure_future(fn())
+        task.add_done_callback(
+            lambda t: self.finish(
+                key, None if t.cancelled() or t.exception() else t.result()
+            )
+        )
+        return await asyncio.shield(task), False
+
+    async def _wait_remote(self, key: str, lookup: Lookup) -> Optional[Any]:
+        while True:
+            result = await asyncio.to_thread(lookup)
+            if result is not None or key in self._flights:
+                return result
+            if not await asyncio.to_thread(self._lease_active, key):
+                return None
+            await asyncio.sleep(self.poll_seconds)
+
+    def _try_lease(self, key: str) -> bool:
+        if self._db is None:
+            return True
+        now = time.time()
+        with self._lock:
+            cursor = self._db.execute(
+                """
+                INSERT INTO singleflight (key, owner, expires_at) VALUES (?, ?, ?)
+                ON CONFLICT (key) DO UPDATE SET
+                    owner = excluded.owner, expires_at = excluded.expires_at
+                WHERE singleflight.expires_at <= ?
+                """,
+                (key, self._owner, now + self.lease_seconds, now),
+            )
+            self._db.commit()
+        return cursor.rowcount == 1
+
+    def _lease_active(self, key: str) -> bool:
+        if self._db is None:
+            return False
+        with self._lock:
+            row = self._db.execute(
+                "SELECT 1 FROM singleflight WHERE key = ? AND expires_at > ?",
+                (key, time.time()),
+            ).fetchone()
+        return row is not None
+
+    def _release(self, key: str) -> None:
+        if self._db is None:
+            return
+        with self._lock:
+            self._db.execute(
+                "DELETE FROM singleflight WHERE key = ? AND owner = ?",
+                (key, self._owner),
+            )
+            self._db.commit()
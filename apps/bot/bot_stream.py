@@ -0,0 +1,151 @@
+import json
+from typing import Any, Dict, List, Optional, Tuple
+
+from core.responses import encode_json
+
+# (evento, payload): ("field", {"name", "value"}) o ("item", {"name", "index", "value"})
+StreamEvent = Tuple[str, Dict[str, Any]]
+
+WHITESPACE = " \t\r\n"
+
+
+class IncrementalJSONParser:
+    """
+    Parser incremental del objeto JSON que genera el modelo
+
+    Recibe el texto por pedazos (deltas del stream) y avisa apenas se
+    completa cada campo del primer nivel. Los campos lista avisan cada
+    elemento por separado, sin esperar al cierre de la lista, y al cerrar
+    emiten el campo con la lista completa.
+
+    No valida: el JSON completo se vuelve a parsear con json.loads al final.
+    """
+
+    def __init__(self):
+        self.buffer = ""
+        self._pos = 0
+        self._depth = 0
+        self._in_string = False
+        self._escape = False
+        self._expect_key = True
+        self._key_start: Optional[int] = None
+        self._key: Optional[str] = None
+        self._value_start: Optional[int] = None
+        self._in_list = False
+        self._item_start: Optional[int] = None
+        self._item_index = 0
+        self.done = False
+
+    def feed(self, chunk: str) -> List[StreamEvent]:
+        """Agrega texto y retorna los eventos que quedaron completos"""
+        self.buffer += chunk
+        events: List[StreamEvent] = []
+        buf = self.buffer
+
+        for i in range(self._pos, len(buf)):
+            c = buf[i]
+
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif c == "\\":
+                    self._escape = True
+                elif c == '"':
+                    self._in_string = False
+                    if self._depth == 1 and self._expect_key:
+                        self._key = json.loads(buf[self._key_start : i + 1])
+                continue
+
+            if c in WHITESPACE or self.done:
+                continue
+
+            if c == '"':
+                self._in_string = True
+                if self._depth == 1 and self._expect_key:
+                    self._key_start = i
+                else:
+                    self._mark_value_start(i)
+
+            elif c == ":" and self._depth == 1:
+                self._expect_key = False
+                self._value_start = None
+
+            elif c in "{[":
+                self._mark_value_start(i)
+                if self._depth == 1 and c == "[":
+                    self._in_list = True
+                    self._item_index = 0
+                self._depth += 1
+
+            elif c in "}]":
+                # Elemento escalar pendiente de la lista ("a", 1, true])
+                if self._depth == 2 and self._in_list:
+                    self._emit_item(events, buf[self._item_start : i])
+
+                # Fin del objeto raíz: el último campo escalar queda completo
+                if self._depth == 1:
+                    self._emit_field(events, buf[self._value_start : i])
+                    self.done = True
+
+                self._depth -= 1
+                if self._depth == 2 and self._in_list:
+                    # Terminó un elemento objeto/lista dentro de la lista
+                    self._emit_item(events, buf[self._item_start : i + 1])
+                elif self._depth == 1 and self._value_start is not None:
+                    # Las listas además cierran con la lista completa (puede ser [])
+                    self._in_list = False
+                    self._emit_field(events, buf[self._value_start : i + 1])
+
+            elif c == ",":
+                if self._depth == 1:
+                    self._emit_field(events, buf[self._value_start : i])
+                    self._expect_key = True
+                elif self._depth == 2 and self._in_list:
+                    self._emit_item(events, buf[self._item_start : i])
+
+            else:
+                # Números, true/false/null
+                self._mark_value_start(i)
+
+        self._pos = len(buf)
+        return events
+
+    def _mark_value_start(self, index: int) -> None:
+        if self._depth == 1 and not self._expect_key and self._value_start is None:
+            self._value_start = index
+        elif self._depth == 2 and self._in_list and self._item_start is None:
+            self._item_start = index
+
+    def _emit_field(self, events: List[StreamEvent], raw: str) -> None:
+        if self._value_start is None or self._key is None:
+            return
+        self._value_start = None
+        value = _loads(raw)
+        if value is not _INVALID:
+            events.append(("field", {"name": self._key, "value": value}))
+
+    def _emit_item(self, events: List[StreamEvent], raw: str) -> None:
+        if self._item_start is None:
+            return
+        self._item_start = None
+        value = _loads(raw)
+        if value is not _INVALID:
+            events.append(
+                ("item", {"name": self._key, "index": self._item_index, "value": value})
+            )
+        self._item_index += 1
+
+
+_INVALID = object()
+
+
+def _loads(raw: str) -> Any:
+    try:
+        return json.loads(raw)
+    except ValueError:
+        return _INVALID
+
+
+def format_sse(event: str, data: Dict[str, Any]) -> str:
+    """Un evento Server-Sent Events (data puede traer el CVFeedbackResponse)"""
+    return f"event: {event}\ndata: {encode_json(data).decode()}\n\n"
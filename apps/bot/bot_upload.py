@@ -0,0 +1,109 @@
+import hashlib
+import os
+import tempfile
+from io import BytesIO
+from typing import Optional, Union
+
+from fastapi import UploadFile
+
+PDF_MAGIC = b"%PDF-"
+
+
+class InvalidPdfError(Exception):
+    """El archivo no empieza con %PDF-"""
+
+
+class UploadTooLargeError(Exception):
+    """El archivo supera UPLOAD_MAX_BYTES"""
+
+
+class IngestedUpload:
+    """
+    Upload ya validado y hasheado
+
+    Hasta spill_bytes vive en memoria; más grande queda en un archivo
+    temporal y se pasa por ruta (el worker de PDF lo lee de disco).
+    """
+
+    def __init__(self, filename: Optional[str]):
+        self.filename = filename
+        self.size = 0
+        self.sha256 = ""
+        self._buffer: Optional[BytesIO] = BytesIO()
+        self._path: Optional[str] = None
+
+    @property
+    def source(self) -> Union[bytes, str]:
+        """bytes si está en memoria, ruta si se volcó a disco"""
+        if self._path is not None:
+            return self._path
+        return self._buffer.getvalue()
+
+    def close(self) -> None:
+        """Borra el temporal (si hubo)"""
+        self._buffer = None
+        if self._path is not None:
+            try:
+                os.remove(self._path)
+            except FileNotFoundError:
+                pass
+            self._path = None
+
+
+async def ingest_upload(
+    file: UploadFile, max_bytes: int, spill_bytes: int, chunk_bytes: int
+) -> IngestedUpload:
+    """
+    Lee el upload por bloques
+
+    - Valida %PDF- en el primer bloque
+    - Corta apenas se supera max_bytes
+    - Calcula el sha256 mientras lee
+    - Pasado spill_bytes vuelca a un archivo temporal
+    """
+    upload = IngestedUpload(file.filename)
+    digest = hashlib.sha256()
+    spill = None
+
+    try:
+        while True:
+            chunk = await file.read(chunk_bytes)
+            if not chunk:
+                break
+
+            if upload.size == 0 and not chunk.startswith(PDF_MAGIC):
+                raise InvalidPdfError("El archivo no es un PDF válido")
+
+            upload.size += len(chunk)
+            if upload.size > max_bytes:
+                raise UploadTooLargeError(
+                    f"El archivo supera el máximo de {max_bytes // (1024 * 1024)} MB"
+                )
+
+            digest.update(chunk)
+
+            if spill is None and upload.size > spill_bytes:
+                spill = tempfile.NamedTemporaryFile(suffix=".pdf", delete=False)
+                upload._path = spill.name
+                spill.write(upload._buffer.getvalue())
+                upload._buffer = None
+            elif spill is None:
+                upload._buffer.write(chunk)
+                continue
+
+            spill.write(chunk)
+
+        if upload.size == 0:
+            raise InvalidPdfError("El archivo está vacío")
+
+    except BaseException:
+        if spill is not None:
+            spill.close()
+        upload.close()
+        raise
+
+    if spill is not None:
+        spill.close()
+
+    upload.sha256 = digest.hexdigest()
+    return upload
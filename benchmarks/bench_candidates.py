@@ -0,0 +1,168 @@
+"""
+Consultas de ranking sobre el store de candidatos
+
+Llena una base temporal con N candidatos sintéticos y mide las consultas
+típicas del endpoint /candidates (top-N, con filtros, página profunda)
+en tres escenarios:
+
+- sin índices (solo la PK)
+- con los índices de CandidateStore
+- OFFSET en vez de keyset para la página profunda, con índices
+
+Imprime además el EXPLAIN QUERY PLAN de cada consulta: con índices
+ninguna debe ordenar en un B-tree temporal ("USE TEMP B-TREE FOR ORDER BY").
+
+Uso:
+    python -m benchmarks.bench_candidates [N] [REPETICIONES]
+"""
+
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+from typing import Any, Callable, Dict, List
+
+from apps.bot.bot_candidates import (
+    INDEXES,
+    CandidateStore,
+    create_indexes,
+    encode_cursor,
+    top_query,
+)
+
+PAGE = 20
+DAY = 86400
+
+
+def fill(store: CandidateStore, n: int, now: float) -> None:
+    """Inserta n filas con distribuciones parecidas a las reales"""
+    rng = random.Random(42)
+    rows = []
+    for i in range(n):
+        developer = rng.random() < 0.35
+        rows.append(
+            (
+                f"{i:064x}",
+                f"cv-{i}.pdf",
+                f"candidato{i}@example.com",
+                round(min(10.0, max(0.0, rng.gauss(5.5, 1.6))), 2),
+                rng.random() < 0.5,
+                developer,
+                rng.random() < 0.6,
+                developer and rng.random() < 0.7,
+                rng.randint(0, 15),
+                *(rng.randint(0, 10) for _ in range(5)),
+                "fast",
+                "{}",
+                now - rng.random() * 365 * DAY,
+            )
+        )
+    db = store._db
+    db.executemany(
+        """
+        INSERT INTO candidates (
+            pdf_sha256, filename, candidate_email, overall_score,
+            is_valid_candidate, is_software_developer, is_from_peru,
+            has_github, years_experience, education_score, format_score,
+            experience_score, skills_score, extras_score, model_tier, result,
+            created_at
+        )
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+        """,
+        rows,
+    )
+    db.commit()
+    db.execute("ANALYZE")
+
+
+def deep_cursor(store: CandidateStore, depth: int) -> str:
+    """Cursor equivalente a OFFSET depth sin filtros"""
+    row = store._db.execute(
+        "SELECT overall_score, id FROM candidates "
+        "ORDER BY overall_score DESC, id DESC LIMIT 1 OFFSET ?",
+        (depth - 1,),
+    ).fetchone()
+    return encode_cursor(row["overall_score"], row["id"])
+
+
+def queries(store: CandidateStore, now: float, n: int) -> Dict[str, Dict[str, Any]]:
+    """Filtros de store.top por consulta"""
+    depth = n // 2
+    return {
+        "top 20": {},
+        "developers": {"is_software_developer": True},
+        "dev + perú + github + 3 años": {
+            "is_software_developer": True,
+            "is_from_peru": True,
+            "has_github": True,
+            "min_years": 3,
+        },
+        "últimos 7 días": {"uploaded_after": now - 7 * DAY},
+        "score >= 8": {"min_score": 8.0},
+        f"página en fila {depth} (keyset)": {"cursor": deep_cursor(store, depth)},
+    }
+
+
+def measure(fn: Callable[[], Any], runs: int) -> float:
+    """Mediana en ms"""
+    times: List[float] = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        fn()
+        times.append((time.perf_counter() - start) * 1000)
+    return statistics.median(times)
+
+
+def run_all(store: CandidateStore, now: float, n: int, runs: int) -> Dict[str, float]:
+    depth = n // 2
+    times = {
+        label: measure(lambda: store.top(PAGE, **filters), runs)
+        for label, filters in queries(store, now, n).items()
+    }
+    times[f"página en fila {depth} (OFFSET)"] = measure(
+        lambda: store._db.execute(
+            "SELECT id FROM candidates ORDER BY overall_score DESC, id DESC "
+            "LIMIT ? OFFSET ?",
+            (PAGE, depth),
+        ).fetchall(),
+        runs,
+    )
+    return times
+
+
+def main() -> None:
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 200_000
+    runs = int(sys.argv[2]) if len(sys.argv) > 2 else 50
+    now = time.time()
+
+    with tempfile.TemporaryDirectory() as data_dir:
+        store = CandidateStore(os.path.join(data_dir, "candidates.db"))
+        start = time.perf_counter()
+        fill(store, n, now)
+        print(f"{n} candidatos insertados en {time.perf_counter() - start:.1f}s\n")
+
+        for name in INDEXES:
+            store._db.execute(f"DROP INDEX {name}")
+        store._db.execute("ANALYZE")
+        # Sin índices cada consulta recorre la tabla: menos repeticiones
+        without = run_all(store, now, n, max(3, runs // 10))
+
+        create_indexes(store._db)
+        store._db.execute("ANALYZE")
+        with_indexes = run_all(store, now, n, runs)
+
+        print(f"{'consulta':<34}{'sin índices':>14}{'con índices':>14}")
+        for label, ms in without.items():
+            print(f"{label:<34}{ms:>12.2f}ms{with_indexes[label]:>12.2f}ms")
+
+        print("\nEXPLAIN QUERY PLAN (con índices)")
+        for label, filters in queries(store, now, n).items():
+            sql, params = top_query(PAGE + 1, **filters)
+            rows = store._db.execute("EXPLAIN QUERY PLAN " + sql, params).fetchall()
+            print(f"  {label}: {'; '.join(row['detail'] for row in rows)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,123 @@
+"""
+Concurrencia de /api/bot/analyze-cv
+
+Lanza N uploads simultáneos contra la app (ASGI en memoria) con un LLM
+falso que tarda LLM_LATENCY segundos. Con el pipeline async el total
+debe quedar cerca de UNA latencia del LLM (más el CPU de pypdf), no de N.
+
+Lo mismo con assert (python -m pytest) está en tests/test_concurrency.py.
+
+Uso:
+    python -m benchmarks.bench_concurrency [N] [LLM_LATENCY]
+"""
+
+import asyncio
+import json
+import os
+import sys
+import tempfile
+import time
+from types import SimpleNamespace
+from typing import Tuple
+
+os.environ.setdefault("OPENAI_API_KEY", "sk-bench")
+os.environ.setdefault("MAILER_SERVICE", "localhost")
+os.environ.setdefault("MAILER_EMAIL", "bench@example.com")
+os.environ.setdefault("MAILER_PASSWORD", "bench")
+# Mismo PDF N veces: sin cache ni single-flight para medir el pipeline real
+os.environ.setdefault("CACHE_ENABLED", "False")
+os.environ.setdefault("SINGLEFLIGHT_ENABLED", "False")
+os.environ.setdefault("NEAR_DUP_ENABLED", "False")
+# Bases SQLite descartables: no tocar las de data/
+DATA_DIR = tempfile.mkdtemp(prefix="bench-concurrency-")
+for name in ("OUTBOX", "CACHE", "NEAR_DUP", "CANDIDATES", "JOBS", "INGEST"):
+    os.environ.setdefault(f"{name}_DB_PATH", os.path.join(DATA_DIR, f"{name}.db"))
+
+import httpx  # noqa: E402
+
+from apps.bot.bot_service import BotService  # noqa: E402
+from main import app  # noqa: E402
+
+PDF_PATH = os.path.join("pdf", "CV-valerio.pdf")
+
+FAKE_ANALYSIS = {
+    "is_university_graduate": False,
+    "is_software_developer": False,
+    "is_from_peru": True,
+    "has_github": True,
+    "has_portfolio": False,
+    "education_institution": None,
+    "professional_summary": "bench",
+    "education_score": 7,
+    "format_score": 7,
+    "experience_score": 7,
+    "skills_score": 7,
+    "extras_score": 7,
+    "positive_points": [],
+    "improvements": [],
+    "critical_errors": [],
+    "suggestions": [],
+}
+
+
+def install_fake_llm(service: BotService, latency: float) -> None:
+    """Reemplaza la llamada a OpenAI por un sleep de `latency` segundos"""
+
+    async def create(**kwargs):
+        await asyncio.sleep(latency)
+        message = SimpleNamespace(content=json.dumps(FAKE_ANALYSIS))
+        return SimpleNamespace(choices=[SimpleNamespace(message=message)])
+
+    service.async_client.chat.completions.create = create
+
+
+async def run(n: int, latency: float) -> Tuple[float, float]:
+    with open(PDF_PATH, "rb") as f:
+        pdf_bytes = f.read()
+
+    transport = httpx.ASGITransport(app=app)
+    # ASGITransport no corre el lifespan: los servicios se crean acá
+    async with app.router.lifespan_context(app), httpx.AsyncClient(
+        transport=transport, base_url="http://bench"
+    ) as c:
+        service = app.state.service
+        install_fake_llm(service, latency)
+        extraction = measure_extraction(service, pdf_bytes)
+
+        async def upload():
+            files = {"file": ("cv.pdf", pdf_bytes, "application/pdf")}
+            response = await c.post("/api/bot/analyze-cv", files=files)
+            response.raise_for_status()
+
+        start = time.perf_counter()
+        await asyncio.gather(*(upload() for _ in range(n)))
+        return time.perf_counter() - start, extraction
+
+
+def measure_extraction(service: BotService, pdf_bytes: bytes) -> float:
+    """Costo de CPU de extraer el PDF de ejemplo una vez"""
+    start = time.perf_counter()
+    service.extract_text_from_pdf_bytes(pdf_bytes)
+    return time.perf_counter() - start
+
+
+def main() -> None:
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 20
+    latency = float(sys.argv[2]) if len(sys.argv) > 2 else 1.0
+
+    elapsed, extraction = asyncio.run(run(n, latency))
+
+    # El CPU de pypdf no se solapa entre sí (GIL), el LLM sí
+    expected = latency + n * extraction
+    serialized = n * (latency + extraction)
+
+    print(f"{n} uploads concurrentes, latencia LLM {latency:.2f}s")
+    print(f"extracción PDF: {extraction * 1000:.0f}ms por CV")
+    print(f"total: {elapsed:.2f}s ({elapsed / latency:.1f}x latencia LLM)")
+    print(f"esperado ~{expected:.2f}s, serializado sería {serialized:.2f}s")
+    if elapsed > expected * 1.5 + 0.5:
+        sys.exit("FALLO: las requests se están serializando")
+
+
+if __name__ == "__main__":
+    main()
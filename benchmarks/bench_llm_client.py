@@ -0,0 +1,153 @@
+"""
+LLMClient contra un OpenAI falso con cuota, 429 y cola lenta
+
+1. Ráfaga de N llamadas contra una cuota de FAKE_RPM requests/min:
+   - directo (sin LLMClient, sin reintentos): cuántas terminan en 429
+   - con LLMClient (rate limit a la misma cuota): 429 recibidos, fallas,
+     tiempo total y throughput frente al techo de la cuota
+2. Cola lenta (SLOW_RATE de llamadas tardan +SLOW_SECONDS):
+   p50/p99 sin hedge y con hedge
+
+Uso:
+    python -m benchmarks.bench_llm_client [N]
+"""
+
+import asyncio
+import statistics
+import sys
+import time
+from typing import List
+
+import openai
+import uvicorn
+
+from apps.bot.bot_llm import LLMClient
+from benchmarks import fake_openai
+
+PORT = 8767
+FAKE_RPM = 600
+BURST_SECONDS = 5
+SLOW_RATE = 0.01
+SLOW_SECONDS = 2.0
+
+MESSAGES = [
+    {"role": "system", "content": "rubric " * 200},
+    {"role": "user", "content": "cv " * 500},
+]
+
+
+async def serve() -> uvicorn.Server:
+    server = uvicorn.Server(
+        uvicorn.Config(
+            fake_openai.app,
+            host="127.0.0.1",
+            port=PORT,
+            log_level="error",
+            lifespan="off",
+        )
+    )
+    asyncio.create_task(server.serve())
+    while not server.started:
+        await asyncio.sleep(0.01)
+    return server
+
+
+def new_client() -> openai.AsyncOpenAI:
+    return openai.AsyncOpenAI(
+        api_key="sk-bench", base_url=f"http://127.0.0.1:{PORT}/v1", max_retries=0
+    )
+
+
+def new_llm(client: openai.AsyncOpenAI, hedge: bool = False) -> LLMClient:
+    return LLMClient(
+        client,
+        max_concurrency=64,
+        rpm=FAKE_RPM,
+        tpm=0,
+        max_retries=8,
+        backoff_seconds=0.5,
+        max_backoff_seconds=10,
+        burst_seconds=BURST_SECONDS,
+        hedge=hedge,
+        hedge_min_seconds=0.3,
+    )
+
+
+async def call(create) -> float:
+    start = time.perf_counter()
+    await create(
+        model="fake", messages=MESSAGES, response_format={"type": "json_object"}
+    )
+    return time.perf_counter() - start
+
+
+async def burst(n: int) -> None:
+    fake_openai.TTFT, fake_openai.TOKEN_DELAY = 0.2, 0.0
+    fake_openai.RPM, fake_openai.WINDOW = FAKE_RPM, BURST_SECONDS
+    fake_openai.SLOW_RATE = 0.0
+    ceiling = FAKE_RPM / 60
+
+    # Directo: sin coordinación
+    fake_openai.reset()
+    client = new_client()
+    results = await asyncio.gather(
+        *(call(client.chat.completions.create) for _ in range(n)),
+        return_exceptions=True,
+    )
+    failed = sum(isinstance(r, openai.RateLimitError) for r in results)
+    print(f"Ráfaga de {n} llamadas, cuota {FAKE_RPM} RPM (ráfaga {BURST_SECONDS}s)")
+    print(f"  directo:   {failed} fallidas por 429")
+
+    # Esperar a que la cuota se recupere
+    await asyncio.sleep(BURST_SECONDS + 1)
+
+    fake_openai.reset()
+    llm = new_llm(new_client())
+    start = time.perf_counter()
+    results = await asyncio.gather(
+        *(call(llm.create) for _ in range(n)), return_exceptions=True
+    )
+    elapsed = time.perf_counter() - start
+    failed = sum(isinstance(r, Exception) for r in results)
+    # Las primeras BURST_SECONDS de cuota salen de una
+    expected = max(0.0, (n - ceiling * BURST_SECONDS) / ceiling)
+    print(
+        f"  LLMClient: {failed} fallidas, {fake_openai.stats['rate_limited']} 429 "
+        f"recibidos, {elapsed:.1f}s (mínimo por cuota {expected:.1f}s), "
+        f"{n / elapsed:.1f} req/s"
+    )
+
+
+async def tail(n: int) -> None:
+    fake_openai.TTFT, fake_openai.TOKEN_DELAY = 0.1, 0.0
+    fake_openai.RPM = 0
+    fake_openai.SLOW_RATE, fake_openai.SLOW_SECONDS = SLOW_RATE, SLOW_SECONDS
+
+    print(f"\nCola lenta: {SLOW_RATE:.0%} de llamadas +{SLOW_SECONDS}s, {n} llamadas")
+    for hedge in (False, True):
+        llm = new_llm(new_client(), hedge=hedge)
+        latencies: List[float] = []
+        # De a 8 en paralelo para que el p99 se vaya aprendiendo
+        for start in range(0, n, 8):
+            batch = min(8, n - start)
+            latencies += await asyncio.gather(*(call(llm.create) for _ in range(batch)))
+        latencies.sort()
+        p99 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))]
+        print(
+            f"  hedge={'sí' if hedge else 'no'}: p50 {statistics.median(latencies):.2f}s"
+            f"  p99 {p99:.2f}s  máx {latencies[-1]:.2f}s"
+        )
+
+
+async def main(n: int) -> None:
+    server = await serve()
+    try:
+        await burst(n)
+        await tail(n)
+    finally:
+        server.should_exit = True
+        await asyncio.sleep(0.1)
+
+
+if __name__ == "__main__":
+    asyncio.run(main(int(sys.argv[1]) if len(sys.argv) > 1 else 150))
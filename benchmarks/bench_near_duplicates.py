@@ -0,0 +1,159 @@
+"""
+Detección de CVs casi idénticos: decisiones y latencia del lookup
+
+1. Variantes del CV de ejemplo (teléfono, email, typo en el resumen, typo
+   en la experiencia, GitHub borrado) contra el original: Jaccard exacto,
+   estimado por MinHash y decisión (reutilizar o re-analizar)
+2. Los CVs de benchmarks/fixtures/screening_cvs.jsonl contra el original:
+   ninguno debe pasar el umbral
+3. Latencia de lookup con N firmas guardadas (aleatorias, para llenar
+   rápido): un CV casi idéntico a uno guardado y uno nuevo
+
+Uso:
+    python -m benchmarks.bench_near_duplicates [N]
+"""
+
+import json
+import os
+import statistics
+import sys
+import tempfile
+import time
+from typing import Callable, List
+
+import numpy as np
+
+from apps.bot.bot_similarity import (
+    NUM_PERM,
+    Fingerprint,
+    NearDuplicateIndex,
+    _shingles,
+    _words,
+    fingerprint,
+    similarity,
+)
+
+PDF_PATH = os.path.join("pdf", "CV-valerio.pdf")
+FIXTURES_PATH = os.path.join(
+    os.path.dirname(__file__), "fixtures", "screening_cvs.jsonl"
+)
+THRESHOLD = 0.9
+VERSION = "bench"
+
+
+def sample_text() -> str:
+    from pypdf import PdfReader
+
+    return "\f".join(page.extract_text() for page in PdfReader(PDF_PATH).pages)
+
+
+def variants(text: str) -> dict:
+    return {
+        "teléfono nuevo": text.replace("9044431024", "987654321"),
+        "email nuevo": text.replace("vquispealarcon@gmail.com", "otro@mail.com"),
+        "typo en el resumen": text.replace("Soy Técnico", "Soy Tecnico"),
+        "typo en experiencia": text.replace("Desarrollador", "Desarolador"),
+        "sin GitHub": text.replace("https://github.com/ValerioDev6", ""),
+    }
+
+
+def exact_jaccard(a: str, b: str) -> float:
+    sa, sb = set(_shingles(_words(a)).tolist()), set(_shingles(_words(b)).tolist())
+    return len(sa & sb) / len(sa | sb)
+
+
+def measure(fn: Callable[[], object], runs: int) -> List[float]:
+    times = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        fn()
+        times.append((time.perf_counter() - start) * 1000)
+    return times
+
+
+def fill_random(index: NearDuplicateIndex, n: int) -> None:
+    """n firmas aleatorias (sin secciones ni resultado reales)"""
+    rng = np.random.default_rng(1)
+    signatures = rng.integers(0, 2**32, size=(n, NUM_PERM), dtype=np.uint32)
+    db = index._db
+    for start in range(0, n, 10_000):
+        documents, buckets = [], []
+        for signature in signatures[start : start + 10_000]:
+            documents.append((VERSION, signature.tobytes(), "{}", "{}", "{}", 0))
+            buckets.append(Fingerprint(signature, {}, {}).buckets())
+        first = db.execute("SELECT COALESCE(MAX(id), 0) + 1 FROM near_documents")
+        first_id = first.fetchone()[0]
+        db.executemany(
+            """
+            INSERT INTO near_documents
+                (version, signature, sections, signals, result, created_at)
+            VALUES (?, ?, ?, ?, ?, ?)
+            """,
+            documents,
+        )
+        db.executemany(
+            "INSERT OR IGNORE INTO near_buckets (bucket, document_id) VALUES (?, ?)",
+            (
+                (bucket, first_id + offset)
+                for offset, document_buckets in enumerate(buckets)
+                for bucket in document_buckets
+            ),
+        )
+        db.commit()
+
+
+def main() -> None:
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 200_000
+    text = sample_text()
+    original = fingerprint(text, 3)
+
+    with tempfile.TemporaryDirectory() as data_dir:
+        index = NearDuplicateIndex(os.path.join(data_dir, "near.db"), THRESHOLD)
+        index.add(original, VERSION, {"overall_score": 7.25})
+
+        print(f"{'variante':<22}{'Jaccard':>9}{'MinHash':>9}  decisión")
+        for name, variant in variants(text).items():
+            match = index.lookup(fingerprint(variant, 3), VERSION)
+            if match is None:
+                decision = "bajo el umbral"
+            elif match.rerun_reason is None:
+                decision = "reutiliza"
+            else:
+                changed = ", ".join(match.changed_sections + match.changed_signals)
+                decision = f"re-analiza ({changed})"
+            estimate = similarity(original.signature, fingerprint(variant, 3).signature)
+            print(
+                f"{name:<22}{exact_jaccard(text, variant):>9.3f}{estimate:>9.3f}"
+                f"  {decision}"
+            )
+
+        with open(FIXTURES_PATH, encoding="utf-8") as f:
+            others = [json.loads(line)["text"] for line in f if line.strip()]
+        false_matches = sum(
+            1 for other in others if index.lookup(fingerprint(other, 0), VERSION)
+        )
+        print(f"\nCVs distintos sobre el umbral: {false_matches} de {len(others)}")
+
+        fingerprint_ms = statistics.median(measure(lambda: fingerprint(text, 3), 50))
+        print(f"fingerprint del CV de ejemplo: {fingerprint_ms:.2f}ms")
+
+        start = time.perf_counter()
+        fill_random(index, n)
+        print(f"\n{n} firmas guardadas en {time.perf_counter() - start:.1f}s")
+
+        near = fingerprint(variants(text)["teléfono nuevo"], 3)
+        rng = np.random.default_rng(2)
+        fresh = Fingerprint(
+            rng.integers(0, 2**32, size=NUM_PERM, dtype=np.uint32), {}, {}
+        )
+        for label, fp in (("casi idéntico", near), ("CV nuevo", fresh)):
+            times = measure(lambda: index.lookup(fp, VERSION), 500)
+            p99 = sorted(times)[int(len(times) * 0.99)]
+            print(
+                f"lookup {label:<14} mediana {statistics.median(times):.3f}ms"
+                f"  p99 {p99:.3f}ms"
+            )
+
+
+if __name__ == "__main__":
+    main()
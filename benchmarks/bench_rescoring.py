@@ -0,0 +1,161 @@
+"""
+Re-scoring vectorizado vs calculate_overall_score uno por uno
+
+Genera N análisis sintéticos (sub-scores enteros, medios puntos, dos
+decimales y alguno fuera de rango) y para cada juego de pesos:
+
+1. Recorre los dicts con BotService.calculate_overall_score
+2. Calcula lo mismo con score_matrix sobre arrays
+3. Verifica que los dos den exactamente los mismos floats
+
+Al final mide rescore_candidates completo (carga de SQLite + cálculo +
+escritura) sobre un CandidateStore temporal.
+
+Uso:
+    python -m benchmarks.bench_rescoring [N]
+"""
+
+import os
+import random
+import sys
+import tempfile
+import time
+from types import SimpleNamespace
+from typing import Any, Dict, List
+
+import numpy as np
+
+from apps.bot.bot_candidates import SCORE_COLUMNS, CandidateStore
+from apps.bot.bot_prompts import PROMPT_TEMPLATES, PromptTemplate
+from apps.bot.bot_rescoring import rescore_candidates, score_matrix
+from apps.bot.bot_service import BotService
+
+# Pesos "raros" además de los templates: muchos empates x.xx5 y tercios
+EXTRA_TEMPLATES = [
+    PromptTemplate(
+        version="tercios",
+        system="",
+        weights={key: 1 / 3 for key in SCORE_COLUMNS},
+        github_penalty=0.35,
+    ),
+    PromptTemplate(
+        version="empates",
+        system="",
+        weights=dict(zip(SCORE_COLUMNS, (0.05, 0.15, 0.45, 0.25, 0.1))),
+        github_penalty=1.25,
+    ),
+]
+
+
+def synthetic_results(n: int) -> List[Dict[str, Any]]:
+    rng = random.Random(7)
+    kinds = (
+        lambda: rng.randint(0, 10),
+        lambda: rng.randint(0, 20) / 2,
+        lambda: round(rng.uniform(0, 10), 2),
+        lambda: rng.choice((11, 12.5, -1)),
+    )
+    results = []
+    for _ in range(n):
+        result = {
+            key: rng.choices(kinds, (50, 30, 19, 1))[0]() for key in SCORE_COLUMNS
+        }
+        result["has_github"] = rng.random() < 0.6
+        results.append(result)
+    return results
+
+
+def loop_scores(template: PromptTemplate, results: List[Dict[str, Any]]) -> List[float]:
+    # calculate_overall_score solo usa self.template
+    service = SimpleNamespace(template=template)
+    return [BotService.calculate_overall_score(service, result) for result in results]
+
+
+def vector_scores(
+    template: PromptTemplate, scores: np.ndarray, has_github: np.ndarray
+) -> np.ndarray:
+    columns = [SCORE_COLUMNS.index(key) for key in template.weights]
+    return score_matrix(
+        scores[:, columns],
+        has_github,
+        list(template.weights.values()),
+        template.github_penalty,
+    )
+
+
+def main() -> None:
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 200_000
+    results = synthetic_results(n)
+    scores = np.array(
+        [[result[key] for key in SCORE_COLUMNS] for result in results], dtype=float
+    )
+    has_github = np.array([result["has_github"] for result in results])
+
+    print(f"{n} candidatos")
+    print(f"{'pesos':<10}{'loop':>10}{'NumPy':>10}{'speedup':>10}  iguales")
+    for template in [*PROMPT_TEMPLATES.values(), *EXTRA_TEMPLATES]:
+        start = time.perf_counter()
+        expected = loop_scores(template, results)
+        loop_seconds = time.perf_counter() - start
+
+        start = time.perf_counter()
+        actual = vector_scores(template, scores, has_github)
+        vector_seconds = time.perf_counter() - start
+
+        mismatches = sum(1 for a, b in zip(expected, actual.tolist()) if a != b)
+        print(
+            f"{template.version:<10}{loop_seconds * 1000:>8.0f}ms"
+            f"{vector_seconds * 1000:>8.1f}ms{loop_seconds / vector_seconds:>9.0f}x"
+            f"  {'sí' if mismatches == 0 else f'NO ({mismatches} distintos)'}"
+        )
+        if mismatches:
+            sys.exit("FALLO: el re-scoring vectorizado no coincide")
+
+    with tempfile.TemporaryDirectory() as data_dir:
+        store = CandidateStore(os.path.join(data_dir, "candidates.db"))
+        v0, v3 = PROMPT_TEMPLATES["v0"], PROMPT_TEMPLATES["v3"]
+        with store._lock:
+            store._db.executemany(
+                f"""
+                INSERT INTO candidates (
+                    pdf_sha256, overall_score, is_valid_candidate,
+                    is_software_developer, is_from_peru, has_github,
+                    years_experience, {', '.join(SCORE_COLUMNS)}, result, created_at
+                )
+                VALUES (?, ?, 1, 1, 1, ?, 0, ?, ?, ?, ?, ?, ?, ?)
+                """,
+                (
+                    (
+                        f"{i:064x}",
+                        score,
+                        result["has_github"],
+                        *(result[key] for key in SCORE_COLUMNS),
+                        f'{{"overall_score": {score}}}',
+                        0,
+                    )
+                    for i, (result, score) in enumerate(
+                        zip(results, loop_scores(v3, results))
+                    )
+                ),
+            )
+            store._db.commit()
+
+        start = time.perf_counter()
+        summary = rescore_candidates(store, v0.weights, v0.github_penalty)
+        seconds = time.perf_counter() - start
+        print(
+            f"\nrescore_candidates v3 -> v0 (SQLite): {seconds:.2f}s, "
+            f"{summary['changed']} de {summary['candidates']} cambiaron"
+        )
+
+        stored = [row[2] for row in store.scoring_inputs()]
+        if stored != loop_scores(v0, results):
+            sys.exit("FALLO: lo guardado no coincide con calculate_overall_score")
+        row = store.get(1)
+        if row["result"]["overall_score"] != row["overall_score"]:
+            sys.exit("FALLO: result.overall_score no se actualizó")
+        print("guardado == calculate_overall_score: sí")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,175 @@
+"""
+Serialización de respuestas: costo por request y tamaño del payload
+
+1. Un CVFeedbackResponse por cuatro caminos:
+   - dict + JSONResponse (lo de antes: sin validar)
+   - jsonable_encoder + JSONResponse (lo que hace response_model si el
+     endpoint retorna el modelo)
+   - FastJSONResponse (pydantic-core)
+   - FastJSONResponse con ?fields= de listado
+2. Un batch de N líneas NDJSON: json.dumps vs encode_json
+3. Tamaño en bytes (crudo, gzip, brotli) y costo de comprimir, con los
+   niveles de CompressionMiddleware
+
+Uso:
+    python -m benchmarks.bench_responses [N] [REPETICIONES]
+"""
+
+import gzip
+import json
+import random
+import statistics
+import sys
+import time
+from typing import Any, Callable, Dict, List
+
+import brotli
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+
+from apps.bot.bot_schemas import CVFeedbackResponse
+from benchmarks.fake_openai import FAKE_ANALYSIS
+from core.responses import FastJSONResponse, encode_json
+from core.settings import settings
+
+# Lo que usan los listados: scores y flags
+LISTING_FIELDS = (
+    "overall_score",
+    "is_valid_candidate",
+    "is_software_developer",
+    "is_from_peru",
+    "has_github",
+    "has_portfolio",
+    "years_experience",
+    "education_score",
+    "format_score",
+    "experience_score",
+    "skills_score",
+    "extras_score",
+)
+
+
+def synthetic_result(rng: random.Random) -> CVFeedbackResponse:
+    """Resultado con scores y listas distintos (no comprime de más)"""
+    points = FAKE_ANALYSIS["positive_points"] + FAKE_ANALYSIS["improvements"]
+    return CVFeedbackResponse(
+        **{
+            **FAKE_ANALYSIS,
+            **{
+                key: rng.randint(0, 20) / 2
+                for key in FAKE_ANALYSIS
+                if key.endswith("_score")
+            },
+            "positive_points": rng.sample(points, 3),
+            "improvements": rng.sample(points, 2),
+        },
+        overall_score=round(rng.uniform(0, 10), 2),
+        is_valid_candidate=rng.random() < 0.5,
+        years_experience=rng.randint(0, 15),
+        candidate_email=f"candidato{rng.randint(1, 10**6)}@mail.com",
+        email_sent=rng.random() < 0.3,
+    )
+
+
+def measure_us(fn: Callable[[], Any], repeat: int) -> float:
+    """Mediana en microsegundos"""
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        times.append((time.perf_counter() - start) * 1e6)
+    return statistics.median(times)
+
+
+def sizes(body: bytes, repeat: int) -> Dict[str, Any]:
+    gzip_level = settings.COMPRESSION_GZIP_LEVEL
+    quality = settings.COMPRESSION_BROTLI_QUALITY
+    return {
+        "raw": len(body),
+        "gzip": len(gzip.compress(body, compresslevel=gzip_level)),
+        "br": len(brotli.compress(body, quality=quality)),
+        "gzip_us": measure_us(lambda: gzip.compress(body, gzip_level), repeat),
+        "br_us": measure_us(lambda: brotli.compress(body, quality=quality), repeat),
+    }
+
+
+def main() -> None:
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 100
+    repeat = int(sys.argv[2]) if len(sys.argv) > 2 else 2000
+    rng = random.Random(3)
+    result = synthetic_result(rng)
+    as_dict = result.model_dump()
+    listing = dict.fromkeys(LISTING_FIELDS, True)
+
+    paths: Dict[str, Callable[[], bytes]] = {
+        "dict + JSONResponse": lambda: JSONResponse(as_dict).body,
+        "response_model (jsonable_encoder)": lambda: JSONResponse(
+            jsonable_encoder(CVFeedbackResponse.model_validate(as_dict))
+        ).body,
+        "FastJSONResponse": lambda: FastJSONResponse(result).body,
+        "FastJSONResponse ?fields=": lambda: FastJSONResponse(
+            result, include=listing
+        ).body,
+    }
+    print(f"Un resultado ({repeat} repeticiones)")
+    print(f"{'camino':<36}{'mediana':>10}{'bytes':>8}")
+    for name, fn in paths.items():
+        print(f"{name:<36}{measure_us(fn, repeat):>8.1f}us{len(fn()):>8}")
+
+    if json.loads(FastJSONResponse(result).body) != json.loads(
+        JSONResponse(as_dict).body
+    ):
+        sys.exit("FALLO: FastJSONResponse no da el mismo JSON")
+
+    lines: List[Dict[str, Any]] = [
+        {
+            "filename": f"cv{i}.pdf",
+            "status": "ok",
+            "cache": "MISS",
+            "result": synthetic_result(rng),
+        }
+        for i in range(n)
+    ]
+    dict_lines = [{**line, "result": line["result"].model_dump()} for line in lines]
+    line_include = dict.fromkeys(("filename", "status", "cache", "detail"), True)
+    line_include["result"] = listing
+    batch_repeat = max(10, repeat // n)
+
+    def ndjson_dumps() -> bytes:
+        return b"".join(
+            (json.dumps(line, ensure_ascii=False) + "\n").encode()
+            for line in dict_lines
+        )
+
+    def ndjson_encode(include: Any = None) -> bytes:
+        return b"".join(encode_json(line, include) + b"\n" for line in lines)
+
+    print(f"\nBatch NDJSON de {n} líneas ({batch_repeat} repeticiones)")
+    for name, fn in (
+        ("json.dumps (dicts)", ndjson_dumps),
+        ("encode_json (modelos)", ndjson_encode),
+        ("encode_json ?fields=", lambda: ndjson_encode(line_include)),
+    ):
+        print(f"{name:<36}{measure_us(fn, batch_repeat) / 1000:>8.2f}ms{len(fn()):>8}")
+
+    print(
+        f"\nCompresión (gzip {settings.COMPRESSION_GZIP_LEVEL}, "
+        f"brotli {settings.COMPRESSION_BROTLI_QUALITY}; "
+        f"mínimo {settings.COMPRESSION_MIN_BYTES} bytes)"
+    )
+    print(f"{'payload':<26}{'crudo':>8}{'gzip':>8}{'br':>8}{'gzip':>10}{'br':>10}")
+    for name, body in (
+        ("resultado completo", FastJSONResponse(result).body),
+        ("resultado ?fields=", FastJSONResponse(result, include=listing).body),
+        (f"batch {n} completo", ndjson_encode()),
+        (f"batch {n} ?fields=", ndjson_encode(line_include)),
+    ):
+        s = sizes(body, batch_repeat)
+        print(
+            f"{name:<26}{s['raw']:>8}{s['gzip']:>8}{s['br']:>8}"
+            f"{s['gzip_us']:>8.0f}us{s['br_us']:>8.0f}us"
+        )
+
+
+if __name__ == "__main__":
+    main()
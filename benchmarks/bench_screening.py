@@ -0,0 +1,93 @@
+"""
+Precisión del pre-screen local sobre CVs etiquetados
+
+benchmarks/fixtures/screening_cvs.jsonl trae CVs con label "developer"
+(debe ir al LLM) u "other" (descarte obvio). Para cada umbral reporta:
+- precisión del descarte: de los descartados, cuántos eran "other"
+- recall del descarte: de los "other", cuántos se ahorran el LLM
+- tráfico ahorrado: % de CVs que no llegan al LLM
+Además mide el tiempo de screen_cv sobre el CV de ejemplo.
+
+Uso:
+    python -m benchmarks.bench_screening [UMBRAL ...]
+"""
+
+import json
+import os
+import sys
+import time
+from typing import Dict, List
+
+from apps.bot.bot_screening import screen_cv
+
+FIXTURES_PATH = os.path.join(
+    os.path.dirname(__file__), "fixtures", "screening_cvs.jsonl"
+)
+PDF_PATH = os.path.join("pdf", "CV-valerio.pdf")
+
+
+def load_fixtures() -> List[Dict[str, str]]:
+    with open(FIXTURES_PATH, encoding="utf-8") as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def evaluate(fixtures: List[Dict[str, str]], threshold: float) -> Dict[str, float]:
+    rejected_ok = rejected_wrong = kept_other = 0
+    wrong: List[str] = []
+    for item in fixtures:
+        rejected = screen_cv(item["text"]).confidence < threshold
+        if rejected and item["label"] == "other":
+            rejected_ok += 1
+        elif rejected:
+            rejected_wrong += 1
+            wrong.append(item["id"])
+        elif item["label"] == "other":
+            kept_other += 1
+
+    rejected = rejected_ok + rejected_wrong
+    return {
+        "threshold": threshold,
+        "precision": rejected_ok / rejected if rejected else 1.0,
+        "recall": (
+            rejected_ok / (rejected_ok + kept_other)
+            if rejected_ok + kept_other
+            else 0.0
+        ),
+        "saved": rejected / len(fixtures),
+        "false_rejects": wrong,
+    }
+
+
+def screening_speed(iterations: int = 200) -> float:
+    """ms por CV sobre el texto del PDF de ejemplo"""
+    from pypdf import PdfReader
+
+    reader = PdfReader(PDF_PATH)
+    text = "\f".join(page.extract_text() for page in reader.pages)
+
+    start = time.perf_counter()
+    for _ in range(iterations):
+        screen_cv(text)
+    return (time.perf_counter() - start) / iterations * 1000
+
+
+if __name__ == "__main__":
+    thresholds = [float(t) for t in sys.argv[1:]] or [0.1, 0.2, 0.3, 0.4]
+    fixtures = load_fixtures()
+
+    print(f"{len(fixtures)} CVs etiquetados")
+    for item in fixtures:
+        print(
+            f"  {screen_cv(item['text']).confidence:.2f}  {item['label']:<9} {item['id']}"
+        )
+
+    print("\numbral  precisión  recall  tráfico ahorrado  descartes erróneos")
+    for threshold in thresholds:
+        r = evaluate(fixtures, threshold)
+        print(
+            f"{r['threshold']:<7} {r['precision']:<10.2f} {r['recall']:<7.2f} "
+            f"{r['saved']:<17.0%} {', '.join(r['false_rejects']) or '-'}"
+        )
+
+    if os.path.exists(PDF_PATH):
+        print(f"\nscreen_cv: {screening_speed():.3f} ms por CV ({PDF_PATH})")
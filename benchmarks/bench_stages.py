@@ -0,0 +1,140 @@
+"""
+Micro-benchmarks por etapa del pipeline (sin red ni LLM)
+
+Mide en microsegundos (p50/p95/p99) lo que corre en cada request:
+1. extract_text_from_pdf_bytes para CVs sintéticos de 1, 3 y 10 páginas
+   y uno de 1 página con una foto de 2 MB
+2. extract_email_from_text y extract_years_of_experience sobre el texto
+   de cada uno
+3. calculate_overall_score con el análisis del OpenAI falso
+
+Cada muestra repite la llamada hasta juntar ~1ms y divide: así las
+funciones de pocos µs no quedan dominadas por el reloj. --compare solo
+mira la mediana.
+
+Uso:
+    python -m benchmarks.bench_stages [--repeat 200] [--out results/stages.json]
+    python -m benchmarks.bench_stages --compare results/stages-v1.json
+"""
+
+import argparse
+import os
+import random
+import sys
+import time
+from types import SimpleNamespace
+from typing import Any, Callable, Dict, List
+
+os.environ.setdefault("OPENAI_API_KEY", "sk-bench")
+
+from apps.bot.bot_prompts import get_prompt_template  # noqa: E402
+from apps.bot.bot_service import BotService  # noqa: E402
+from benchmarks.fake_openai import FAKE_ANALYSIS  # noqa: E402
+from benchmarks.reporting import (  # noqa: E402
+    compare_results,
+    save_results,
+    summarize,
+)
+from benchmarks.synthetic_pdfs import build_pdf, cv_lines  # noqa: E402
+from core.settings import settings  # noqa: E402
+
+# nombre -> (páginas, bytes de foto)
+PDF_CASES = {
+    "pages_1": (1, 0),
+    "pages_3": (3, 0),
+    "pages_10": (10, 0),
+    "pages_1_photo_2mb": (1, 2 * 1024 * 1024),
+}
+
+SAMPLE_SECONDS = 0.001
+
+
+def measure_us(fn: Callable[[], Any], repeat: int) -> Dict[str, float]:
+    """summarize() de repeat muestras, en µs por llamada"""
+    start = time.perf_counter()
+    fn()
+    loops = max(1, int(SAMPLE_SECONDS / max(time.perf_counter() - start, 1e-9)))
+
+    samples: List[float] = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for _ in range(loops):
+            fn()
+        samples.append((time.perf_counter() - start) / loops * 1e6)
+    return summarize(samples)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Micro-benchmarks por etapa")
+    parser.add_argument("--repeat", type=int, default=200)
+    parser.add_argument("--out", help="Guardar resultados en este JSON")
+    parser.add_argument("--compare", help="JSON de una corrida anterior")
+    parser.add_argument("--tolerance", type=float, default=0.2)
+    args = parser.parse_args()
+
+    # Los métodos no usan el resto del servicio (ni cliente ni pool)
+    service = SimpleNamespace(template=get_prompt_template(settings.PROMPT_VERSION))
+
+    rng = random.Random(11)
+    pdfs: Dict[str, bytes] = {}
+    for name, (pages, image_bytes) in PDF_CASES.items():
+        pdfs[name] = build_pdf(cv_lines(rng, True, pages), image_bytes, rng)
+    texts = {
+        name: BotService.extract_text_from_pdf_bytes(service, pdf)
+        for name, pdf in pdfs.items()
+    }
+    inputs = {
+        name: {"bytes": len(pdfs[name]), "chars": len(texts[name])} for name in pdfs
+    }
+
+    results: Dict[str, Dict[str, Dict[str, float]]] = {
+        "extract_text_from_pdf_bytes": {},
+        "extract_email_from_text": {},
+        "extract_years_of_experience": {},
+    }
+    # Las extracciones de PDF cuestan ms: menos muestras alcanzan
+    pdf_repeat = max(10, args.repeat // 10)
+    for name in PDF_CASES:
+        pdf, text = pdfs[name], texts[name]
+        results["extract_text_from_pdf_bytes"][name] = measure_us(
+            lambda: BotService.extract_text_from_pdf_bytes(service, pdf), pdf_repeat
+        )
+        results["extract_email_from_text"][name] = measure_us(
+            lambda: BotService.extract_email_from_text(service, text), args.repeat
+        )
+        results["extract_years_of_experience"][name] = measure_us(
+            lambda: BotService.extract_years_of_experience(service, text),
+            args.repeat,
+        )
+    results["calculate_overall_score"] = {
+        "fake_analysis": measure_us(
+            lambda: BotService.calculate_overall_score(service, FAKE_ANALYSIS),
+            args.repeat,
+        )
+    }
+
+    print(f"{'µs':<52}{'p50':>10}{'p95':>10}{'p99':>10}")
+    for stage, cases in results.items():
+        for name, s in cases.items():
+            label = f"{stage} [{name}]"
+            print(f"{label:<52}{s['p50']:>10.1f}{s['p95']:>10.1f}{s['p99']:>10.1f}")
+    print("\nEntradas:")
+    for name, sizes in inputs.items():
+        print(f"  {name:<20}{sizes['bytes']:>10} bytes{sizes['chars']:>8} caracteres")
+
+    if args.out:
+        config = {"repeat": args.repeat, "prompt_version": settings.PROMPT_VERSION}
+        save_results(args.out, "stages", results, config=config, inputs=inputs)
+    if args.compare:
+        # Las colas de un micro-benchmark son ruido del scheduler
+        regressions = compare_results(
+            args.compare, results, args.tolerance, only=("p50",)
+        )
+        if regressions:
+            sys.exit(
+                f"\nRegresiones (> {args.tolerance:.0%}): {', '.join(regressions)}"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,174 @@
+"""
+Arranque en frío de la app
+
+1. python -X importtime -c "import main": tiempo total de import y los
+   módulos que más pesan (acumulado, incluye sus dependencias)
+2. uvicorn main:app en un proceso nuevo, sin y con WARMUP_ENABLED:
+   - primer 200 en /docs (la app ya atiende)
+   - primer 200 en /api/bot/analyze-cv contra el OpenAI falso, apenas la
+     app atiende (la primera request útil paga lo que quedó perezoso) y
+     su Server-Timing
+
+Cada corrida usa un directorio temporal para las bases SQLite.
+
+Uso:
+    python -m benchmarks.bench_startup [REPETICIONES]
+"""
+
+import os
+import re
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Dict, List, Tuple
+
+import httpx
+
+FAKE_PORT = 8768
+APP_PORT = 8769
+PDF_PATH = os.path.abspath(os.path.join("pdf", "CV-valerio.pdf"))
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+IMPORTTIME_LINE = re.compile(r"import time:\s+(\d+) \|\s+(\d+) \|(\s*)(\S+)")
+
+
+def app_env(data_dir: str, warm_up: bool = False) -> Dict[str, str]:
+    env = dict(os.environ)
+    env.update(
+        PYTHONPATH=ROOT,
+        OPENAI_API_KEY="sk-bench",
+        OPENAI_BASE_URL=f"http://127.0.0.1:{FAKE_PORT}/v1",
+        MAILER_SERVICE="localhost",
+        MAILER_EMAIL="bench@example.com",
+        MAILER_PASSWORD="bench",
+        CACHE_ENABLED="False",
+        OUTBOX_DB_PATH=os.path.join(data_dir, "outbox.db"),
+        JOBS_DB_PATH=os.path.join(data_dir, "jobs.db"),
+        JOBS_DIR=os.path.join(data_dir, "jobs"),
+        WARMUP_ENABLED=str(warm_up),
+    )
+    return env
+
+
+def import_times(runs: int) -> Tuple[float, List[Tuple[str, float]]]:
+    """Mediana del import de main (ms) y los 10 módulos más pesados"""
+    totals: List[float] = []
+    modules: Dict[str, List[float]] = {}
+    with tempfile.TemporaryDirectory() as data_dir:
+        for _ in range(runs):
+            output = subprocess.run(
+                [sys.executable, "-X", "importtime", "-c", "import main"],
+                env=app_env(data_dir),
+                capture_output=True,
+                text=True,
+                check=True,
+            ).stderr
+            for _, cumulative, indent, name in IMPORTTIME_LINE.findall(output):
+                ms = int(cumulative) / 1000
+                if name == "main":
+                    totals.append(ms)
+                # Solo dependencias directas de main y de apps/core
+                elif len(indent) <= 3 or name.startswith(("apps.", "core.")):
+                    modules.setdefault(name, []).append(ms)
+
+    heaviest = sorted(
+        ((name, statistics.median(values)) for name, values in modules.items()),
+        key=lambda item: item[1],
+        reverse=True,
+    )
+    return statistics.median(totals), heaviest[:10]
+
+
+def wait_port(port: int, timeout: float = 30.0) -> None:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        with socket.socket() as s:
+            if s.connect_ex(("127.0.0.1", port)) == 0:
+                return
+        time.sleep(0.05)
+    raise RuntimeError(f"Nada escucha en el puerto {port}")
+
+
+def first_200(pdf: bytes, warm_up: bool) -> Tuple[float, float, str]:
+    """(segundos al primer 200 en /docs, al primer análisis, Server-Timing)"""
+    base_url = f"http://127.0.0.1:{APP_PORT}"
+    with tempfile.TemporaryDirectory() as data_dir:
+        start = time.perf_counter()
+        app = subprocess.Popen(
+            [
+                sys.executable,
+                "-m",
+                "uvicorn",
+                "main:app",
+                "--port",
+                str(APP_PORT),
+                "--log-level",
+                "warning",
+            ],
+            env=app_env(data_dir, warm_up),
+        )
+        try:
+            with httpx.Client(base_url=base_url, timeout=60) as client:
+                while True:
+                    try:
+                        if client.get("/docs").status_code == 200:
+                            break
+                    except httpx.TransportError:
+                        time.sleep(0.01)
+                ready = time.perf_counter() - start
+
+                response = client.post(
+                    "/api/bot/analyze-cv",
+                    files={"file": ("cv.pdf", pdf, "application/pdf")},
+                )
+                response.raise_for_status()
+                analyzed = time.perf_counter() - start
+        finally:
+            app.terminate()
+            app.wait()
+    return ready, analyzed, response.headers.get("server-timing", "")
+
+
+def main(runs: int) -> None:
+    total, heaviest = import_times(runs)
+    print(f"import main: {total:.0f}ms (mediana de {runs})")
+    for name, ms in heaviest:
+        print(f"  {ms:>7.0f}ms  {name}")
+
+    with open(PDF_PATH, "rb") as f:
+        pdf = f.read()
+
+    fake = subprocess.Popen(
+        [sys.executable, "-m", "benchmarks.fake_openai", str(FAKE_PORT)],
+        # Latencia mínima: acá interesa el arranque, no el modelo
+        env={
+            **os.environ,
+            "PYTHONPATH": ROOT,
+            "FAKE_OPENAI_TTFT": "0.05",
+            "FAKE_OPENAI_TOKEN_DELAY": "0",
+        },
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+    try:
+        wait_port(FAKE_PORT)
+        for warm_up in (False, True):
+            results = [first_200(pdf, warm_up) for _ in range(runs)]
+            ready = statistics.median(r[0] for r in results)
+            analyzed = statistics.median(r[1] for r in results)
+            print(
+                f"\nuvicorn main:app, warm-up {'sí' if warm_up else 'no'} (mediana de {runs})"
+            )
+            print(f"  primer 200 /docs:          {ready:.2f}s")
+            print(f"  primer 200 /analyze-cv:    {analyzed:.2f}s")
+            print(f"  Server-Timing (última):    {results[-1][2]}")
+    finally:
+        fake.terminate()
+        fake.wait()
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 5)
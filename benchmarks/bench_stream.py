@@ -0,0 +1,127 @@
+"""
+Tiempo al primer dato útil: /analyze-cv vs /analyze-cv/stream
+
+Levanta el servidor falso de OpenAI y la app con uvicorn (sockets reales,
+para medir el streaming de verdad) y compara:
+- /analyze-cv: el primer byte llega con la respuesta completa
+- /analyze-cv/stream: primer evento, primer campo del modelo y total
+
+Uso:
+    python -m benchmarks.bench_stream [REPETICIONES]
+"""
+
+import asyncio
+import os
+import socket
+import statistics
+import sys
+import time
+
+FAKE_PORT = 8765
+APP_PORT = 8766
+
+os.environ.setdefault("OPENAI_API_KEY", "sk-bench")
+os.environ.setdefault("OPENAI_BASE_URL", f"http://127.0.0.1:{FAKE_PORT}/v1")
+os.environ.setdefault("MAILER_SERVICE", "localhost")
+os.environ.setdefault("MAILER_EMAIL", "bench@example.com")
+os.environ.setdefault("MAILER_PASSWORD", "bench")
+os.environ.setdefault("CACHE_ENABLED", "False")
+
+import httpx  # noqa: E402
+import uvicorn  # noqa: E402
+
+from benchmarks import fake_openai  # noqa: E402
+from main import app  # noqa: E402
+
+PDF_PATH = os.path.join("pdf", "CV-valerio.pdf")
+# Campos que la app calcula localmente (no esperan al modelo)
+LOCAL_FIELDS = {"years_experience", "candidate_email"}
+
+
+async def serve(asgi_app, port: int) -> uvicorn.Server:
+    server = uvicorn.Server(
+        uvicorn.Config(asgi_app, host="127.0.0.1", port=port, log_level="warning")
+    )
+    asyncio.create_task(server.serve())
+    while not server.started:
+        await asyncio.sleep(0.01)
+    return server
+
+
+async def measure_plain(client: httpx.AsyncClient, pdf: bytes) -> float:
+    start = time.perf_counter()
+    response = await client.post(
+        "/api/bot/analyze-cv", files={"file": ("cv.pdf", pdf, "application/pdf")}
+    )
+    response.raise_for_status()
+    return time.perf_counter() - start
+
+
+async def measure_stream(client: httpx.AsyncClient, pdf: bytes):
+    start = time.perf_counter()
+    first_event = first_model_field = None
+    event = None
+    async with client.stream(
+        "POST",
+        "/api/bot/analyze-cv/stream",
+        files={"file": ("cv.pdf", pdf, "application/pdf")},
+    ) as response:
+        response.raise_for_status()
+        async for line in response.aiter_lines():
+            now = time.perf_counter() - start
+            if line.startswith("event: "):
+                event = line[len("event: ") :]
+                if first_event is None:
+                    first_event = now
+            elif line.startswith("data: ") and event == "error":
+                raise RuntimeError(line)
+            elif line.startswith("data: ") and first_model_field is None:
+                if event in ("field", "item") and not any(
+                    f'"name": "{name}"' in line for name in LOCAL_FIELDS
+                ):
+                    first_model_field = now
+    return first_event, first_model_field, time.perf_counter() - start
+
+
+async def main(repetitions: int) -> None:
+    with open(PDF_PATH, "rb") as f:
+        pdf = f.read()
+
+    fake = await serve(fake_openai.app, FAKE_PORT)
+    api = await serve(app, APP_PORT)
+
+    plain, events, fields, totals = [], [], [], []
+    async with httpx.AsyncClient(
+        base_url=f"http://127.0.0.1:{APP_PORT}", timeout=60
+    ) as client:
+        # Calienta el pool de PDF y la conexión al fake
+        await measure_plain(client, pdf)
+        for _ in range(repetitions):
+            plain.append(await measure_plain(client, pdf))
+            first_event, first_field, total = await measure_stream(client, pdf)
+            events.append(first_event)
+            fields.append(first_field)
+            totals.append(total)
+
+    api.should_exit = fake.should_exit = True
+    await asyncio.sleep(0.2)
+
+    print(
+        f"LLM falso: TTFT={fake_openai.TTFT}s, "
+        f"{fake_openai.TOKEN_DELAY}s/token, {repetitions} repeticiones (mediana)"
+    )
+    print(f"/analyze-cv          primer byte = total: {statistics.median(plain):.3f}s")
+    print(f"/analyze-cv/stream   primer evento:       {statistics.median(events):.3f}s")
+    print(f"                     primer campo modelo: {statistics.median(fields):.3f}s")
+    print(f"                     total:               {statistics.median(totals):.3f}s")
+
+
+def _port_free(port: int) -> bool:
+    with socket.socket() as s:
+        return s.connect_ex(("127.0.0.1", port)) != 0
+
+
+if __name__ == "__main__":
+    if not (_port_free(FAKE_PORT) and _port_free(APP_PORT)):
+        sys.exit(f"Puertos {FAKE_PORT}/{APP_PORT} ocupados")
+    asyncio.run(main(int(sys.argv[1]) if len(sys.argv) > 1 else 5))
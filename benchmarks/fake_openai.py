@@ -0,0 +1,251 @@
+"""
+Servidor falso de OpenAI (chat.completions) para pruebas y benchmarks
+
+Responde siempre el mismo análisis, con latencia configurable:
+- FAKE_OPENAI_TTFT: segundos hasta el primer token
+- FAKE_OPENAI_TOKEN_DELAY: segundos entre tokens (~4 caracteres)
+Soporta stream=True (SSE con chunks y usage al final, como la API real).
+
+Fallas inyectables (también se pueden cambiar en caliente, son globales):
+- FAKE_OPENAI_RPM: cuota de requests/min como token bucket que acumula
+  hasta FAKE_OPENAI_WINDOW segundos de cuota; sin saldo responde 429 con
+  retry-after-ms
+- FAKE_OPENAI_ERROR_RATE: probabilidad de un 429 al azar
+- FAKE_OPENAI_QUOTA_EXHAUSTED: toda request responde 429 insufficient_quota
+  (cuenta sin saldo: no se debe reintentar)
+- FAKE_OPENAI_SLOW_RATE / FAKE_OPENAI_SLOW_SECONDS: cola lenta (p99)
+- FAKE_OPENAI_INVALID_RATE: probabilidad de un análisis fuera del schema
+  (score > 10, número como string, clave faltante); el pedido de
+  corrección que sigue siempre sale bien
+
+GET /stats devuelve los contadores (requests, 429, lentos, inválidos):
+el load test los lee antes y después de la corrida.
+
+Uso:
+    python -m benchmarks.fake_openai [PUERTO]
+    OPENAI_BASE_URL=http://127.0.0.1:PUERTO/v1 uvicorn main:app
+"""
+
+import asyncio
+import json
+import os
+import random
+import sys
+import time
+import uuid
+from typing import Any, Dict, List, Optional
+
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+
+TTFT = float(os.getenv("FAKE_OPENAI_TTFT", "0.3"))
+TOKEN_DELAY = float(os.getenv("FAKE_OPENAI_TOKEN_DELAY", "0.01"))
+CHARS_PER_TOKEN = 4
+
+RPM = int(os.getenv("FAKE_OPENAI_RPM", "0"))
+WINDOW = float(os.getenv("FAKE_OPENAI_WINDOW", "5"))
+ERROR_RATE = float(os.getenv("FAKE_OPENAI_ERROR_RATE", "0"))
+QUOTA_EXHAUSTED = os.getenv("FAKE_OPENAI_QUOTA_EXHAUSTED", "False").lower() == "true"
+SLOW_RATE = float(os.getenv("FAKE_OPENAI_SLOW_RATE", "0"))
+SLOW_SECONDS = float(os.getenv("FAKE_OPENAI_SLOW_SECONDS", "3"))
+INVALID_RATE = float(os.getenv("FAKE_OPENAI_INVALID_RATE", "0"))
+
+# Contadores para los benchmarks
+stats = {"requests": 0, "rate_limited": 0, "slow": 0, "invalid": 0}
+_bucket = {"tokens": None, "updated": 0.0}
+
+# Mismo orden que pide el prompt: booleanos, scores y luego listas
+FAKE_ANALYSIS: Dict[str, Any] = {
+    "is_university_graduate": True,
+    "is_software_developer": True,
+    "is_from_peru": True,
+    "has_github": True,
+    "has_portfolio": False,
+    "education_institution": "Universidad Nacional de Ingeniería",
+    "professional_summary": (
+        "Desarrollador backend con experiencia en Python y FastAPI, "
+        "proyectos publicados en GitHub y despliegues en la nube."
+    ),
+    "education_score": 7,
+    "format_score": 8,
+    "experience_score": 7,
+    "skills_score": 8,
+    "extras_score": 6,
+    "positive_points": [
+        "Proyectos reales con código público en GitHub",
+        "Stack actualizado (FastAPI, Docker, PostgreSQL)",
+        "Experiencia demostrable en APIs REST",
+    ],
+    "improvements": [
+        "Cuantificar el impacto de los proyectos",
+        "Agregar un portfolio con demos",
+    ],
+    "critical_errors": [],
+    "suggestions": [
+        "Incluir métricas de rendimiento de los proyectos",
+        "Destacar contribuciones a proyectos open source",
+    ],
+}
+
+# Lo que a veces devuelve json_object sin schema estricto
+INVALID_ANALYSIS: Dict[str, Any] = {
+    **{key: value for key, value in FAKE_ANALYSIS.items() if key != "suggestions"},
+    "experience_score": 12,
+    "skills_score": "8",
+}
+
+app = FastAPI(title="Fake OpenAI")
+
+
+def _tokens(text: str) -> List[str]:
+    return [text[i : i + CHARS_PER_TOKEN] for i in range(0, len(text), CHARS_PER_TOKEN)]
+
+
+def _usage(body: Dict[str, Any], completion: str) -> Dict[str, Any]:
+    prompt_chars = sum(len(m.get("content") or "") for m in body.get("messages", []))
+    prompt_tokens = prompt_chars // CHARS_PER_TOKEN
+    completion_tokens = len(_tokens(completion))
+    return {
+        "prompt_tokens": prompt_tokens,
+        "completion_tokens": completion_tokens,
+        "total_tokens": prompt_tokens + completion_tokens,
+        # Como la API: el cache aplica en bloques de 128 desde 1024 tokens
+        "prompt_tokens_details": {
+            "cached_tokens": (
+                prompt_tokens // 128 * 128 if prompt_tokens >= 1024 else 0
+            )
+        },
+    }
+
+
+def _rate_limited() -> Optional[float]:
+    """Segundos hasta que vuelve a haber cupo (None = hay cupo)"""
+    now = time.monotonic()
+    if RPM > 0:
+        rate = RPM / 60
+        capacity = max(1.0, rate * WINDOW)
+        if _bucket["tokens"] is None:
+            _bucket["tokens"] = capacity
+        elapsed = now - _bucket["updated"]
+        _bucket["tokens"] = min(capacity, _bucket["tokens"] + elapsed * rate)
+        _bucket["updated"] = now
+        if _bucket["tokens"] < 1:
+            return (1 - _bucket["tokens"]) / rate
+        _bucket["tokens"] -= 1
+    if random.random() < ERROR_RATE:
+        return 1.0
+    return None
+
+
+def _error_429(retry_after: float) -> JSONResponse:
+    stats["rate_limited"] += 1
+    return JSONResponse(
+        status_code=429,
+        headers={"retry-after-ms": str(int(retry_after * 1000))},
+        content={
+            "error": {
+                "message": "Rate limit reached for requests",
+                "type": "requests",
+                "code": "rate_limit_exceeded",
+            }
+        },
+    )
+
+
+def _error_quota() -> JSONResponse:
+    stats["rate_limited"] += 1
+    return JSONResponse(
+        status_code=429,
+        content={
+            "error": {
+                "message": "You exceeded your current quota",
+                "type": "insufficient_quota",
+                "code": "insufficient_quota",
+            }
+        },
+    )
+
+
+def reset() -> None:
+    _bucket["tokens"] = None
+    for key in stats:
+        stats[key] = 0
+
+
+@app.get("/stats")
+async def get_stats():
+    return stats
+
+
+@app.post("/v1/chat/completions")
+async def chat_completions(request: Request):
+    body = await request.json()
+    stats["requests"] += 1
+
+    if QUOTA_EXHAUSTED:
+        return _error_quota()
+    retry_after = _rate_limited()
+    if retry_after is not None:
+        return _error_429(retry_after)
+
+    ttft = TTFT
+    if random.random() < SLOW_RATE:
+        stats["slow"] += 1
+        ttft += SLOW_SECONDS
+
+    analysis = FAKE_ANALYSIS
+    # Un pedido de corrección trae la respuesta anterior como assistant
+    repairing = any(m.get("role") == "assistant" for m in body.get("messages", []))
+    if not repairing and random.random() < INVALID_RATE:
+        stats["invalid"] += 1
+        analysis = INVALID_ANALYSIS
+
+    completion = json.dumps(analysis, ensure_ascii=False, indent=2)
+    base = {
+        "id": f"chatcmpl-{uuid.uuid4().hex}",
+        "created": int(time.time()),
+        "model": body.get("model", "fake"),
+    }
+
+    if not body.get("stream"):
+        await asyncio.sleep(ttft + TOKEN_DELAY * len(_tokens(completion)))
+        return JSONResponse(
+            {
+                **base,
+                "object": "chat.completion",
+                "choices": [
+                    {
+                        "index": 0,
+                        "message": {"role": "assistant", "content": completion},
+                        "finish_reason": "stop",
+                    }
+                ],
+                "usage": _usage(body, completion),
+            }
+        )
+
+    include_usage = (body.get("stream_options") or {}).get("include_usage", False)
+
+    async def events():
+        chunk = {**base, "object": "chat.completion.chunk"}
+        await asyncio.sleep(ttft)
+        for token in _tokens(completion):
+            choice = {"index": 0, "delta": {"content": token}, "finish_reason": None}
+            yield f"data: {json.dumps({**chunk, 'choices': [choice]})}\n\n"
+            await asyncio.sleep(TOKEN_DELAY)
+
+        choice = {"index": 0, "delta": {}, "finish_reason": "stop"}
+        yield f"data: {json.dumps({**chunk, 'choices': [choice]})}\n\n"
+        if include_usage:
+            usage = {**chunk, "choices": [], "usage": _usage(body, completion)}
+            yield f"data: {json.dumps(usage)}\n\n"
+        yield "data: [DONE]\n\n"
+
+    return StreamingResponse(events(), media_type="text/event-stream")
+
+
+if __name__ == "__main__":
+    import uvicorn
+
+    port = int(sys.argv[1]) if len(sys.argv) > 1 else 8001
+    uvicorn.run(app, host="127.0.0.1", port=port)
@@ -0,0 +1,132 @@
+"""
+Servidor SMTP falso (sumidero) para pruebas y benchmarks
+
+Acepta todo y no entrega nada: lo justo para que el outbox de la API
+conecte, se autentique (AUTH PLAIN/LOGIN, cualquier clave) y mande sus
+emails. Sin STARTTLS: la app tiene que correr con MAILER_STARTTLS=False.
+
+- FAKE_SMTP_DELAY: segundos que tarda en aceptar cada mensaje (DATA)
+- FAKE_SMTP_REJECT_RATE: probabilidad de un 550 en RCPT (el outbox lo
+  reintenta con backoff)
+
+Sin dependencias (asyncio puro); stats cuenta conexiones, mensajes y
+rechazos.
+
+Uso:
+    python -m benchmarks.fake_smtp [PUERTO]
+    MAILER_SERVICE=127.0.0.1 MAILER_PORT=PUERTO MAILER_STARTTLS=False uvicorn main:app
+"""
+
+import asyncio
+import os
+import random
+import sys
+import threading
+
+DELAY = float(os.getenv("FAKE_SMTP_DELAY", "0"))
+REJECT_RATE = float(os.getenv("FAKE_SMTP_REJECT_RATE", "0"))
+
+stats = {"connections": 0, "messages": 0, "rejected": 0, "bytes": 0}
+
+
+def reset() -> None:
+    for key in stats:
+        stats[key] = 0
+
+
+async def handle(reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+    stats["connections"] += 1
+
+    async def reply(line: str) -> None:
+        writer.write(line.encode() + b"\r\n")
+        await writer.drain()
+
+    await reply("220 fake-smtp ESMTP listo")
+    try:
+        while True:
+            raw = await reader.readline()
+            if not raw:
+                break
+            command, _, argument = raw.decode("utf-8", "replace").strip().partition(" ")
+            command = command.upper()
+
+            if command == "EHLO":
+                await reply("250-fake-smtp")
+                await reply("250-AUTH PLAIN LOGIN")
+                await reply("250-8BITMIME")
+                await reply("250 SMTPUTF8")
+            elif command == "HELO":
+                await reply("250 fake-smtp")
+            elif command == "AUTH":
+                # PLAIN trae las credenciales en la misma línea; LOGIN las pide
+                if argument.upper().startswith("LOGIN"):
+                    await reply("334 VXNlcm5hbWU6")
+                    await reader.readline()
+                    await reply("334 UGFzc3dvcmQ6")
+                    await reader.readline()
+                await reply("235 Autenticado")
+            elif command == "MAIL":
+                await reply("250 OK")
+            elif command == "RCPT":
+                if random.random() < REJECT_RATE:
+                    stats["rejected"] += 1
+                    await reply("550 Buzón no disponible")
+                else:
+                    await reply("250 OK")
+            elif command == "DATA":
+                await reply("354 Terminar con <CRLF>.<CRLF>")
+                size = 0
+                while True:
+                    line = await reader.readline()
+                    if not line or line == b".\r\n":
+                        break
+                    size += len(line)
+                if DELAY:
+                    await asyncio.sleep(DELAY)
+                stats["messages"] += 1
+                stats["bytes"] += size
+                await reply("250 OK encolado")
+            elif command in ("RSET", "NOOP"):
+                await reply("250 OK")
+            elif command == "QUIT":
+                await reply("221 Chau")
+                break
+            else:
+                await reply("502 Comando no implementado")
+    except (ConnectionError, asyncio.IncompleteReadError):
+        pass
+    finally:
+        writer.close()
+
+
+async def serve(port: int) -> asyncio.AbstractServer:
+    return await asyncio.start_server(handle, "127.0.0.1", port)
+
+
+def start_in_thread(port: int) -> None:
+    """Levanta el sumidero en un hilo daemon (stats queda en este proceso)"""
+    ready = threading.Event()
+
+    def run() -> None:
+        loop = asyncio.new_event_loop()
+        loop.run_until_complete(serve(port))
+        ready.set()
+        loop.run_forever()
+
+    threading.Thread(target=run, name="fake-smtp", daemon=True).start()
+    if not ready.wait(timeout=10):
+        raise RuntimeError(f"El SMTP falso no arrancó en el puerto {port}")
+
+
+async def _main(port: int) -> None:
+    server = await serve(port)
+    print(f"SMTP falso en 127.0.0.1:{port}")
+    async with server:
+        await server.serve_forever()
+
+
+if __name__ == "__main__":
+    try:
+        asyncio.run(_main(int(sys.argv[1]) if len(sys.argv) > 1 else 8025))
+    except KeyboardInterrupt:
+        print(stats)
@@ -0,0 +1,366 @@
+"""
+Prueba de carga de punta a punta
+
+N clientes concurrentes (lazo cerrado: cada uno manda el próximo PDF
+apenas recibe la respuesta) contra /analyze-cv o /analyze-cv/stream.
+Reporta throughput, latencia p50/p95/p99, errores por tipo, y de los
+headers Server-Timing el tiempo de cada etapa (pdf, llm, ...).
+
+Con --spawn levanta todo en local, sin red ni credenciales:
+- benchmarks/fake_openai.py con la latencia y tasa de 429 pedidas
+- benchmarks/fake_smtp.py (el outbox entrega ahí los emails)
+- uvicorn main:app con las bases SQLite en un directorio temporal, sin
+  cache (salvo --cache) y sin cuota LLM_RPM/LLM_TPM (el cuello de botella
+  tiene que ser la app, no el token bucket)
+
+Sin --pdfs usa CVs sintéticos (benchmarks/synthetic_pdfs.py).
+
+--out guarda los resultados en JSON; --compare los contrasta con una
+corrida anterior y sale con código 1 si algo empeoró más que --tolerance.
+
+Uso:
+    python -m benchmarks.load_test --spawn --concurrency 32 --requests 500
+    python -m benchmarks.load_test --spawn --endpoint stream --duration 30
+    python -m benchmarks.load_test --url http://127.0.0.1:8000 --pdfs pdf
+    python -m benchmarks.load_test --spawn --out results/load.json \\
+        --compare results/load-v1.json
+"""
+
+import argparse
+import asyncio
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from contextlib import ExitStack
+from typing import Any, Dict, List, NamedTuple, Optional, Tuple
+
+import httpx
+
+from benchmarks import fake_smtp
+from benchmarks.bench_startup import ROOT, wait_port
+from benchmarks.reporting import compare_results, save_results, summarize
+from benchmarks.synthetic_pdfs import generate_pdfs
+
+ENDPOINTS = {
+    "analyze-cv": "/api/bot/analyze-cv",
+    "stream": "/api/bot/analyze-cv/stream",
+}
+
+
+class Sample(NamedTuple):
+    latency: float
+    ttfb: float
+    error: Optional[str]
+    stages: Dict[str, float]
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def parse_server_timing(header: str) -> Dict[str, float]:
+    """Header Server-Timing -> {etapa: ms}"""
+    stages = {}
+    for part in header.split(","):
+        name, _, duration = part.strip().partition(";dur=")
+        if name and duration:
+            stages[name] = float(duration)
+    return stages
+
+
+def load_pdfs(folder: Optional[str], count: int, seed: int) -> List[Tuple[str, bytes]]:
+    if folder is None:
+        return [(pdf.filename, pdf.data) for pdf in generate_pdfs(count, seed)]
+    pdfs = []
+    for name in sorted(os.listdir(folder)):
+        if name.lower().endswith(".pdf"):
+            with open(os.path.join(folder, name), "rb") as f:
+                pdfs.append((name, f.read()))
+    if not pdfs:
+        raise SystemExit(f"No hay PDFs en {folder}")
+    return pdfs
+
+
+async def send(
+    client: httpx.AsyncClient, path: str, stream: bool, pdf: Tuple[str, bytes]
+) -> Sample:
+    files = {"file": (pdf[0], pdf[1], "application/pdf")}
+    start = time.perf_counter()
+    ttfb = 0.0
+    error = None
+    stages: Dict[str, float] = {}
+    try:
+        async with client.stream("POST", path, files=files) as response:
+            ttfb = time.perf_counter() - start
+            body = b""
+            async for chunk in response.aiter_bytes():
+                body += chunk
+            if response.status_code != 200:
+                error = str(response.status_code)
+            elif stream and b"event: error" in body:
+                # El stream ya respondió 200: el error viaja como evento
+                error = "event: error"
+            stages = parse_server_timing(response.headers.get("server-timing", ""))
+    except httpx.HTTPError as e:
+        error = type(e).__name__
+    return Sample(time.perf_counter() - start, ttfb, error, stages)
+
+
+async def run_load(
+    base_url: str,
+    endpoint: str,
+    pdfs: List[Tuple[str, bytes]],
+    concurrency: int,
+    requests: int,
+    duration: Optional[float],
+    timeout: float,
+) -> Tuple[List[Sample], float]:
+    """(muestras, segundos de la corrida) sin contar el warm-up"""
+    path = ENDPOINTS[endpoint]
+    stream = endpoint == "stream"
+    limits = httpx.Limits(max_connections=concurrency)
+    async with httpx.AsyncClient(
+        base_url=base_url, timeout=timeout, limits=limits
+    ) as client:
+        # La primera request paga lo que la app deja perezoso
+        await send(client, path, stream, pdfs[0])
+
+        samples: List[Sample] = []
+        sent = 0
+        deadline = time.monotonic() + duration if duration else None
+
+        async def worker() -> None:
+            nonlocal sent
+            while True:
+                if deadline is not None:
+                    if time.monotonic() >= deadline:
+                        return
+                elif sent >= requests:
+                    return
+                pdf = pdfs[sent % len(pdfs)]
+                sent += 1
+                samples.append(await send(client, path, stream, pdf))
+
+        start = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+        return samples, time.perf_counter() - start
+
+
+def report(samples: List[Sample], seconds: float, stream: bool) -> Dict[str, Any]:
+    ok = [s for s in samples if s.error is None]
+    errors: Dict[str, int] = {}
+    for s in samples:
+        if s.error is not None:
+            errors[s.error] = errors.get(s.error, 0) + 1
+
+    stage_names = sorted({name for s in ok for name in s.stages})
+    results = {
+        "requests": len(samples),
+        "ok": len(ok),
+        "errors": errors,
+        "throughput_rps": len(ok) / seconds if seconds else 0.0,
+        "latency_ms": summarize([s.latency * 1000 for s in ok]),
+        "stages_ms": {
+            name: summarize([s.stages[name] for s in ok if name in s.stages])
+            for name in stage_names
+        },
+    }
+    if stream:
+        results["ttfb_ms"] = summarize([s.ttfb * 1000 for s in ok])
+    return results
+
+
+def print_report(results: Dict[str, Any], seconds: float) -> None:
+    print(
+        f"\n{results['requests']} requests en {seconds:.1f}s: "
+        f"{results['ok']} OK, {results['throughput_rps']:.1f} req/s"
+    )
+    for error, count in sorted(results["errors"].items()):
+        print(f"  error {error}: {count}")
+
+    rows = [("latencia", results["latency_ms"])]
+    if "ttfb_ms" in results:
+        rows.append(("primer byte", results["ttfb_ms"]))
+    rows += [(f"  {name}", s) for name, s in results["stages_ms"].items()]
+    print(f"\n{'ms':<20}{'p50':>9}{'p95':>9}{'p99':>9}{'max':>9}")
+    for name, s in rows:
+        if s:
+            print(
+                f"{name:<20}{s['p50']:>9.1f}{s['p95']:>9.1f}"
+                f"{s['p99']:>9.1f}{s['max']:>9.1f}"
+            )
+
+
+def app_env(
+    data_dir: str, fake_port: int, smtp_port: int, cache: bool
+) -> Dict[str, str]:
+    # Lo del shell gana sobre estos defaults (p. ej. LLM_MAX_CONCURRENCY)
+    defaults = {
+        "LLM_RPM": "0",
+        "LLM_TPM": "0",
+        "CACHE_ENABLED": str(cache),
+        "NEAR_DUP_ENABLED": str(cache),
+    }
+    env = {**defaults, **os.environ}
+    env.update(
+        PYTHONPATH=ROOT,
+        OPENAI_API_KEY="sk-bench",
+        OPENAI_BASE_URL=f"http://127.0.0.1:{fake_port}/v1",
+        MAILER_SERVICE="127.0.0.1",
+        MAILER_PORT=str(smtp_port),
+        MAILER_STARTTLS="False",
+        MAILER_EMAIL="bench@example.com",
+        MAILER_PASSWORD="bench",
+        JOBS_DIR=os.path.join(data_dir, "jobs"),
+        **{
+            name: os.path.join(data_dir, f"{name.lower()}.db")
+            for name in (
+                "OUTBOX_DB_PATH",
+                "CACHE_DB_PATH",
+                "NEAR_DUP_DB_PATH",
+                "INGEST_DB_PATH",
+                "BULK_DB_PATH",
+                "CANDIDATES_DB_PATH",
+                "JOBS_DB_PATH",
+            )
+        },
+    )
+    return env
+
+
+def spawn(stack: ExitStack, args: argparse.Namespace) -> Tuple[str, int]:
+    """Levanta OpenAI falso, SMTP falso y la app. Retorna (url, puerto del falso)"""
+    fake_port, smtp_port, app_port = free_port(), free_port(), free_port()
+    data_dir = stack.enter_context(tempfile.TemporaryDirectory())
+
+    def popen(command: List[str], env: Dict[str, str]) -> None:
+        process = subprocess.Popen(command, env=env, stdout=subprocess.DEVNULL)
+
+        def stop() -> None:
+            process.terminate()
+            process.wait()
+
+        stack.callback(stop)
+
+    popen(
+        [sys.executable, "-m", "benchmarks.fake_openai", str(fake_port)],
+        {
+            **os.environ,
+            "PYTHONPATH": ROOT,
+            "FAKE_OPENAI_TTFT": str(args.llm_ttft),
+            "FAKE_OPENAI_TOKEN_DELAY": str(args.llm_token_delay),
+            "FAKE_OPENAI_ERROR_RATE": str(args.llm_429_rate),
+        },
+    )
+    fake_smtp.start_in_thread(smtp_port)
+    wait_port(fake_port)
+
+    popen(
+        [
+            sys.executable,
+            "-m",
+            "uvicorn",
+            "main:app",
+            "--port",
+            str(app_port),
+            "--log-level",
+            "warning",
+        ],
+        app_env(data_dir, fake_port, smtp_port, args.cache),
+    )
+    wait_port(app_port, timeout=60)
+    return f"http://127.0.0.1:{app_port}", fake_port
+
+
+def wait_outbox(timeout: float = 10.0) -> None:
+    """Espera a que el outbox deje de mandar emails al SMTP falso"""
+    deadline = time.monotonic() + timeout
+    previous = -1
+    while time.monotonic() < deadline and fake_smtp.stats["messages"] != previous:
+        previous = fake_smtp.stats["messages"]
+        time.sleep(1.0)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    target = parser.add_mutually_exclusive_group(required=True)
+    target.add_argument("--url", help="App ya levantada")
+    target.add_argument("--spawn", action="store_true", help="Todo en local")
+    parser.add_argument("--endpoint", choices=ENDPOINTS, default="analyze-cv")
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--duration", type=float, help="Segundos (ignora --requests)")
+    parser.add_argument("--timeout", type=float, default=120)
+    parser.add_argument("--pdfs", help="Carpeta de PDFs (default: sintéticos)")
+    parser.add_argument("--pdf-count", type=int, default=50)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--llm-ttft", type=float, default=0.3)
+    parser.add_argument("--llm-token-delay", type=float, default=0.002)
+    parser.add_argument("--llm-429-rate", type=float, default=0.0)
+    parser.add_argument("--cache", action="store_true", help="Con cache y near-dup")
+    parser.add_argument("--out", help="Guardar resultados en este JSON")
+    parser.add_argument("--compare", help="JSON de una corrida anterior")
+    parser.add_argument("--tolerance", type=float, default=0.2)
+    args = parser.parse_args()
+
+    pdfs = load_pdfs(args.pdfs, args.pdf_count, args.seed)
+    config = {
+        key: value
+        for key, value in vars(args).items()
+        if key not in ("out", "compare", "tolerance")
+    }
+    config["pdfs"] = args.pdfs or f"{len(pdfs)} sintéticos"
+    servers: Dict[str, Any] = {}
+
+    with ExitStack() as stack:
+        if args.spawn:
+            base_url, fake_port = spawn(stack, args)
+            fake_stats = f"http://127.0.0.1:{fake_port}/stats"
+            before = httpx.get(fake_stats).json()
+        else:
+            base_url = args.url.rstrip("/")
+
+        print(
+            f"{args.endpoint} x{args.concurrency} contra {base_url} "
+            f"({len(pdfs)} PDFs)"
+        )
+        samples, seconds = asyncio.run(
+            run_load(
+                base_url,
+                args.endpoint,
+                pdfs,
+                args.concurrency,
+                args.requests,
+                args.duration,
+                args.timeout,
+            )
+        )
+
+        if args.spawn:
+            after = httpx.get(fake_stats).json()
+            servers["fake_openai"] = {key: after[key] - before[key] for key in after}
+            wait_outbox()
+            servers["fake_smtp"] = dict(fake_smtp.stats)
+
+    results = report(samples, seconds, args.endpoint == "stream")
+    print_report(results, seconds)
+    for name, counters in servers.items():
+        print(f"{name}: {counters}")
+
+    if args.out:
+        save_results(args.out, "load_test", results, config=config, servers=servers)
+    if args.compare:
+        regressions = compare_results(args.compare, results, args.tolerance)
+        if regressions:
+            sys.exit(
+                f"\nRegresiones (> {args.tolerance:.0%}): {', '.join(regressions)}"
+            )
+
+
+if __name__ == "__main__":
+    main()
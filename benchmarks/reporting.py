@@ -0,0 +1,136 @@
+"""
+Resultados de benchmarks en JSON, comparables entre versiones
+
+save_results guarda las métricas junto con el entorno (commit, Python,
+CPU); compare_results las contrasta con un JSON anterior y marca como
+regresión lo que empeoró más que la tolerancia.
+"""
+
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import time
+from typing import Any, Dict, List, Sequence, Tuple
+
+# Métricas donde más es mejor; el resto (latencias, bytes) mejor menos
+HIGHER_IS_BETTER = ("throughput_rps", "ok")
+
+# Diferencias menores a esto (en la unidad de la métrica) son ruido: una
+# etapa de 0.1ms que pasa a 0.2ms no es una regresión
+NOISE_FLOOR = 1.0
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def summarize(values: Sequence[float]) -> Dict[str, float]:
+    """Mediana, p95, p99, máximo y media (vacío -> {})"""
+    if not values:
+        return {}
+    ordered = sorted(values)
+
+    def percentile(p: float) -> float:
+        return ordered[min(len(ordered) - 1, int(len(ordered) * p))]
+
+    return {
+        "p50": statistics.median(ordered),
+        "p95": percentile(0.95),
+        "p99": percentile(0.99),
+        "max": ordered[-1],
+        "mean": statistics.fmean(ordered),
+    }
+
+
+def environment() -> Dict[str, Any]:
+    """Dónde se midió: sin esto dos JSON no son comparables"""
+    try:
+        commit = subprocess.run(
+            ["git", "-C", ROOT, "rev-parse", "--short", "HEAD"],
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return {
+        "commit": commit,
+        "python": sys.version.split()[0],
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "created_at": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+    }
+
+
+def save_results(
+    path: str, benchmark: str, results: Dict[str, Any], **sections: Any
+) -> None:
+    """
+    Escribe {"benchmark", "environment", ...sections, "results"}
+
+    Solo "results" entra en compare_results: lo que no debe marcar
+    regresiones (parámetros de la corrida, contadores) va en sections.
+    """
+    folder = os.path.dirname(path)
+    if folder:
+        os.makedirs(folder, exist_ok=True)
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(
+            {
+                "benchmark": benchmark,
+                "environment": environment(),
+                **sections,
+                "results": results,
+            },
+            f,
+            ensure_ascii=False,
+            indent=2,
+        )
+    print(f"\nResultados en {path}")
+
+
+def compare_results(
+    baseline_path: str,
+    results: Dict[str, Any],
+    tolerance: float,
+    only: Tuple[str, ...] = (),
+) -> List[str]:
+    """
+    Imprime la diferencia con un JSON anterior; retorna las regresiones
+
+    Compara los números que están en los dos (anidados con "."). Una
+    regresión es empeorar más de tolerance (0.2 = 20%) y más de NOISE_FLOOR.
+    only limita a las claves que terminan así (p. ej. ("p50",)).
+    """
+    with open(baseline_path, encoding="utf-8") as f:
+        baseline = json.load(f)
+
+    before, after = _flatten(baseline["results"]), _flatten(results)
+    print(f"\nContra {baseline_path} ({baseline['environment'].get('commit')})")
+    regressions = []
+    for key in sorted(before.keys() & after.keys()):
+        if only and not key.endswith(only):
+            continue
+        old, new = before[key], after[key]
+        if old == 0:
+            continue
+        change = (new - old) / abs(old)
+        worse = -change if key.endswith(HIGHER_IS_BETTER) else change
+        mark = ""
+        if worse > tolerance and abs(new - old) > NOISE_FLOOR:
+            mark = "  REGRESIÓN"
+            regressions.append(key)
+        print(f"  {key:<48}{old:>12.2f}{new:>12.2f}{change:>+9.0%}{mark}")
+    return regressions
+
+
+def _flatten(node: Any, prefix: str = "") -> Dict[str, float]:
+    if isinstance(node, dict):
+        flat: Dict[str, float] = {}
+        for key, value in node.items():
+            flat.update(_flatten(value, f"{prefix}{key}."))
+        return flat
+    if isinstance(node, (int, float)) and not isinstance(node, bool):
+        return {prefix[:-1]: float(node)}
+    return {}
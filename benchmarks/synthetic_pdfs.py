@@ -0,0 +1,267 @@
+"""
+Generador de CVs sintéticos en PDF
+
+Sin dependencias: arma el PDF a mano (Helvetica, texto extraíble con
+pypdf). Varía lo que pesa en el pipeline:
+- páginas: 1 a max_pages (la mayoría 1-2, algunos largos)
+- tamaño: algunos traen una "foto" (imagen sin comprimir de 50 KB a 3 MB)
+- perfil: developers (van al LLM) y otros (descarte del pre-screen)
+- datos: email, años de experiencia, GitHub, Perú o no
+
+Misma semilla, mismos PDFs: sirven para comparar corridas.
+
+Uso:
+    python -m benchmarks.synthetic_pdfs CARPETA [N] [--seed 0] [--max-pages 8]
+"""
+
+import argparse
+import os
+import random
+from typing import List, NamedTuple, Optional
+
+PAGE_WIDTH, PAGE_HEIGHT = 595, 842
+LINE_HEIGHT = 14
+LINES_PER_PAGE = (PAGE_HEIGHT - 100) // LINE_HEIGHT
+
+FIRST_NAMES = ("Lucía", "Mateo", "Valeria", "Diego", "Camila", "José", "Andrea", "Luis")
+LAST_NAMES = (
+    "Quispe",
+    "Mamani",
+    "García",
+    "Rojas",
+    "Flores",
+    "Torres",
+    "Díaz",
+    "Vargas",
+)
+PERU_CITIES = ("Lima", "Arequipa", "Trujillo", "Cusco", "Piura")
+OTHER_CITIES = ("Bogotá", "Santiago de Chile", "Buenos Aires", "Quito", "Madrid")
+COMPANIES = (
+    "Andina Tech",
+    "Grupo Pacífico",
+    "Nexo Digital",
+    "Banco del Sur",
+    "Logística Inca",
+)
+INSTITUTIONS = (
+    "Universidad Nacional de Ingeniería",
+    "Pontificia Universidad Católica del Perú",
+    "SENATI",
+    "Instituto Tecnológico Tecsup",
+    "Universidad de San Marcos",
+)
+
+DEV_ROLES = (
+    "Desarrollador Backend",
+    "Desarrollador Full Stack",
+    "Ingeniero de Software",
+)
+DEV_SKILLS = (
+    "Python", "FastAPI", "Django", "JavaScript", "TypeScript", "React", "Angular",
+    "Node.js", "PostgreSQL", "MongoDB", "Docker", "Kubernetes", "AWS", "Git",
+    "Redis", "CI/CD", "REST", "GraphQL", "Java", "Spring Boot",
+)  # fmt: skip
+DEV_BULLETS = (
+    "Diseñé e implementé APIs REST con {skill} y {skill2} para {users} usuarios",
+    "Reduje el tiempo de respuesta del servicio de pagos en {percent}%",
+    "Migré la base de datos a {skill} sin tiempo de inactividad",
+    "Automaticé despliegues con {skill} y pipelines de CI/CD",
+    "Lideré un equipo de {team} desarrolladores en un producto con {skill}",
+    "Escribí pruebas automatizadas y subí la cobertura al {percent}%",
+)
+OTHER_ROLES = ("Asistente Contable", "Vendedor de Tienda", "Recepcionista", "Cocinero")
+OTHER_SKILLS = (
+    "Atención al cliente", "Excel", "Caja", "Facturación", "Inventarios",
+    "Trabajo en equipo", "Cocina criolla", "Ventas", "Archivo documentario",
+)  # fmt: skip
+OTHER_BULLETS = (
+    "Atendí a un promedio de {users} clientes por día",
+    "Organicé el inventario semanal del almacén",
+    "Elaboré reportes de caja y cuadres diarios",
+    "Capacité a {team} nuevos compañeros del área",
+    "Mejoré la satisfacción de clientes en {percent}%",
+)
+
+
+class SyntheticPdf(NamedTuple):
+    filename: str
+    pages: int
+    developer: bool
+    data: bytes
+
+
+def generate_pdfs(count: int, seed: int = 0, max_pages: int = 8) -> List[SyntheticPdf]:
+    """count PDFs distintos (siempre los mismos para la misma semilla)"""
+    rng = random.Random(seed)
+    pdfs = []
+    for i in range(count):
+        pages = min(
+            max_pages, rng.choices((1, 2, 3, 4, 6, 10), (40, 30, 12, 8, 6, 4))[0]
+        )
+        image_bytes = rng.choices(
+            (0, rng.randint(50, 300) * 1024, rng.randint(1024, 3072) * 1024),
+            (70, 25, 5),
+        )[0]
+        developer = rng.random() < 0.75
+        lines = cv_lines(rng, developer, pages)
+        pdfs.append(
+            SyntheticPdf(
+                filename=f"cv-{seed}-{i:05d}.pdf",
+                pages=-(-len(lines) // LINES_PER_PAGE),
+                developer=developer,
+                data=build_pdf(lines, image_bytes, rng),
+            )
+        )
+    return pdfs
+
+
+def cv_lines(rng: random.Random, developer: bool, pages: int) -> List[str]:
+    """Texto del CV con las secciones que espera el pipeline, en pages páginas"""
+    first, last = rng.choice(FIRST_NAMES), rng.choice(LAST_NAMES)
+    peru = rng.random() < 0.7
+    roles, skills, bullets = (
+        (DEV_ROLES, DEV_SKILLS, DEV_BULLETS)
+        if developer
+        else (OTHER_ROLES, OTHER_SKILLS, OTHER_BULLETS)
+    )
+    user = f"{first}{last}".lower().encode("ascii", "ignore").decode()
+
+    lines = [
+        f"{first} {last}",
+        rng.choice(roles),
+        f"{user}{rng.randint(1, 99)}@gmail.com | +51 9{rng.randint(10**7, 10**8 - 1)}",
+        f"{rng.choice(PERU_CITIES if peru else OTHER_CITIES)}"
+        + (", Perú" if peru else ""),
+    ]
+    if developer and rng.random() < 0.6:
+        lines.append(f"https://github.com/{user}")
+    lines += ["", "RESUMEN", _sentence(rng, bullets, skills), ""]
+
+    lines.append("EXPERIENCIA")
+    year = 2025
+    target = pages * LINES_PER_PAGE - 12
+    while len(lines) < target - 10 and year > 1995:
+        start = year - rng.randint(1, 4)
+        end = "Actualidad" if year == 2025 else str(year)
+        lines += [f"{rng.choice(roles)} - {rng.choice(COMPANIES)}", f"{start} - {end}"]
+        lines += [
+            f"- {_sentence(rng, bullets, skills)}" for _ in range(rng.randint(2, 5))
+        ]
+        lines.append("")
+        year = start
+
+    # Los CVs largos siguen con proyectos hasta llenar las páginas
+    if len(lines) < target - 10:
+        lines.append("PROYECTOS")
+    while len(lines) < target - 10:
+        lines.append(f"- {_sentence(rng, bullets, skills)}")
+
+    lines += [
+        "EDUCACIÓN",
+        rng.choice(INSTITUTIONS),
+        f"{year - 5} - {year}",
+        "",
+        "HABILIDADES",
+        ", ".join(rng.sample(skills, min(len(skills), 8))),
+    ]
+    return lines
+
+
+def _sentence(rng: random.Random, bullets: tuple, skills: tuple) -> str:
+    skill, skill2 = rng.sample(skills, 2)
+    return rng.choice(bullets).format(
+        skill=skill,
+        skill2=skill2,
+        users=rng.randint(50, 50000),
+        percent=rng.randint(10, 80),
+        team=rng.randint(2, 12),
+    )
+
+
+def build_pdf(
+    lines: List[str], image_bytes: int = 0, rng: Optional[random.Random] = None
+) -> bytes:
+    """PDF 1.4 mínimo: una página cada LINES_PER_PAGE líneas y foto opcional"""
+    rng = rng or random.Random(0)
+    objects: List[bytes] = [
+        b"<< /Type /Catalog /Pages 2 0 R >>",
+        b"",  # Pages: se completa al final
+        b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica "
+        b"/Encoding /WinAnsiEncoding >>",
+    ]
+    image_id = None
+    if image_bytes:
+        side = max(1, int(image_bytes**0.5))
+        # Ruido: no comprime, el PDF pesa lo que dice image_bytes
+        objects.append(
+            b"<< /Type /XObject /Subtype /Image /Width %d /Height %d "
+            b"/ColorSpace /DeviceGray /BitsPerComponent 8 /Length %d >>\nstream\n"
+            % (side, side, side * side)
+            + rng.randbytes(side * side)
+            + b"\nendstream"
+        )
+        image_id = len(objects)
+
+    page_ids = []
+    for start in range(0, max(1, len(lines)), LINES_PER_PAGE):
+        content = [b"BT /F1 10 Tf %d TL 50 %d Td" % (LINE_HEIGHT, PAGE_HEIGHT - 50)]
+        for line in lines[start : start + LINES_PER_PAGE]:
+            content.append(b"(%s) Tj T*" % _escape(line))
+        content.append(b"ET")
+        resources = b"/Font << /F1 3 0 R >>"
+        if image_id is not None and start == 0:
+            content.append(b"q 90 0 0 90 460 700 cm /Im1 Do Q")
+            resources += b" /XObject << /Im1 %d 0 R >>" % image_id
+        stream = b"\n".join(content)
+        objects.append(
+            b"<< /Length %d >>\nstream\n%s\nendstream" % (len(stream), stream)
+        )
+        objects.append(
+            b"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 %d %d] "
+            b"/Resources << %s >> /Contents %d 0 R >>"
+            % (PAGE_WIDTH, PAGE_HEIGHT, resources, len(objects))
+        )
+        page_ids.append(len(objects))
+
+    kids = b" ".join(b"%d 0 R" % page_id for page_id in page_ids)
+    objects[1] = b"<< /Type /Pages /Kids [%s] /Count %d >>" % (kids, len(page_ids))
+
+    out = bytearray(b"%PDF-1.4\n%\xe2\xe3\xcf\xd3\n")
+    offsets = []
+    for number, body in enumerate(objects, start=1):
+        offsets.append(len(out))
+        out += b"%d 0 obj\n%s\nendobj\n" % (number, body)
+    xref = len(out)
+    out += b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1)
+    out += b"".join(b"%010d 00000 n \n" % offset for offset in offsets)
+    out += b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (
+        len(objects) + 1,
+        xref,
+    )
+    return bytes(out)
+
+
+def _escape(text: str) -> bytes:
+    raw = text.encode("cp1252", errors="replace")
+    return raw.replace(b"\\", b"\\\\").replace(b"(", b"\\(").replace(b")", b"\\)")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Genera CVs sintéticos en PDF")
+    parser.add_argument("folder")
+    parser.add_argument("count", nargs="?", type=int, default=100)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--max-pages", type=int, default=8)
+    args = parser.parse_args()
+
+    os.makedirs(args.folder, exist_ok=True)
+    pdfs = generate_pdfs(args.count, args.seed, args.max_pages)
+    for pdf in pdfs:
+        with open(os.path.join(args.folder, pdf.filename), "wb") as f:
+            f.write(pdf.data)
+    total = sum(len(pdf.data) for pdf in pdfs)
+    developers = sum(pdf.developer for pdf in pdfs)
+    print(
+        f"{len(pdfs)} PDFs en {args.folder}: {total / 1024 / 1024:.1f} MB, "
+        f"{sum(pdf.pages for pdf in pdfs)} páginas, {developers} developers"
+    )
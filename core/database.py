@@ -0,0 +1,22 @@
+import os
+import sqlite3
+
+
+def connect(db_path: str) -> sqlite3.Connection:
+    """
+    Abre una conexión SQLite lista para varios workers de uvicorn
+
+    - Crea la carpeta si no existe
+    - WAL: lectores no bloquean al escritor
+    - busy_timeout: espera en vez de fallar si otro proceso escribe
+    """
+    folder = os.path.dirname(db_path)
+    if folder:
+        os.makedirs(folder, exist_ok=True)
+
+    conn = sqlite3.connect(db_path, timeout=30, check_same_thread=False)
+    conn.row_factory = sqlite3.Row
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    conn.execute("PRAGMA busy_timeout=30000")
+    return conn
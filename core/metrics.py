@@ -0,0 +1,151 @@
+import os
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, Iterator, Optional, Tuple
+
+from prometheus_client import (
+    CONTENT_TYPE_LATEST,
+    CollectorRegistry,
+    Counter,
+    Gauge,
+    Histogram,
+    generate_latest,
+)
+
+# Etapas del pipeline: upload, extraction, similarity, llm, scoring, email, smtp
+STAGE_SECONDS = Histogram(
+    "cv_stage_duration_seconds",
+    "Duración de cada etapa del análisis",
+    ["stage"],
+    buckets=(0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 20, 30, 60),
+)
+STAGE_IN_FLIGHT = Gauge(
+    "cv_stage_in_flight",
+    "Operaciones en curso por etapa",
+    ["stage"],
+    multiprocess_mode="livesum",
+)
+STAGE_ERRORS = Counter(
+    "cv_stage_errors_total", "Errores por etapa y tipo de excepción", ["stage", "type"]
+)
+
+LLM_TOKENS = Counter(
+    "cv_llm_tokens_total", "Tokens de OpenAI (prompt, completion, cached)", ["kind"]
+)
+
+LLM_RETRIES = Counter(
+    "cv_llm_retries_total", "Reintentos de OpenAI por tipo de error", ["reason"]
+)
+LLM_HEDGES = Counter(
+    "cv_llm_hedges_total", "Requests hedge enviadas y ganadas", ["outcome"]
+)
+
+CASCADE_ESCALATIONS = Counter(
+    "cv_cascade_escalations_total",
+    "Análisis repetidos con el modelo fuerte, por motivo",
+    ["reason"],
+)
+
+NEAR_DUPLICATES = Counter(
+    "cv_near_duplicates_total",
+    "CVs casi idénticos a uno ya analizado: reutilizado o re-analizado y por qué",
+    ["outcome"],
+)
+
+COALESCED = Counter(
+    "cv_coalesced_total",
+    "Análisis y emails duplicados que se evitaron",
+    ["kind"],
+)
+
+PDF_PAGES = Histogram(
+    "cv_pdf_pages",
+    "Páginas por PDF procesado",
+    buckets=(1, 2, 3, 5, 10, 20, 50, 100),
+)
+PDF_CHARS = Histogram(
+    "cv_pdf_chars",
+    "Caracteres extraídos por PDF",
+    buckets=(200, 1000, 2500, 5000, 10000, 25000, 50000, 100000, 200000),
+)
+
+HTTP_SECONDS = Histogram(
+    "http_request_duration_seconds",
+    "Duración de las requests HTTP",
+    ["method", "route", "status"],
+)
+HTTP_IN_FLIGHT = Gauge(
+    "http_requests_in_flight", "Requests HTTP en curso", multiprocess_mode="livesum"
+)
+
+# Tiempos por etapa de la request actual (para el header Server-Timing)
+_request_timings: ContextVar[Optional[Dict[str, float]]] = ContextVar(
+    "request_timings", default=None
+)
+
+
+def start_request_timings() -> Dict[str, float]:
+    """Abre el registro de tiempos de la request (lo llama el middleware)"""
+    timings: Dict[str, float] = {}
+    _request_timings.set(timings)
+    return timings
+
+
+def _record(stage: str, seconds: float) -> None:
+    STAGE_SECONDS.labels(stage).observe(seconds)
+    timings = _request_timings.get()
+    if timings is not None:
+        # Suma: en un batch la misma etapa corre varias veces
+        timings[stage] = timings.get(stage, 0.0) + seconds
+
+
+@contextmanager
+def track_stage(stage: str) -> Iterator[None]:
+    """Mide una etapa: latencia, en curso y errores por tipo (sirve con await adentro)"""
+    in_flight = STAGE_IN_FLIGHT.labels(stage)
+    in_flight.inc()
+    start = time.perf_counter()
+    try:
+        yield
+    except Exception as e:
+        STAGE_ERRORS.labels(stage, type(e).__name__).inc()
+        raise
+    finally:
+        in_flight.dec()
+        _record(stage, time.perf_counter() - start)
+
+
+def record_tokens(prompt: int, completion: int, cached: int) -> None:
+    LLM_TOKENS.labels("prompt").inc(prompt)
+    LLM_TOKENS.labels("completion").inc(completion)
+    LLM_TOKENS.labels("cached").inc(cached)
+
+
+def record_pdf(pages: int, chars: int) -> None:
+    PDF_PAGES.observe(pages)
+    PDF_CHARS.observe(chars)
+
+
+def server_timing(timings: Dict[str, float], total: float) -> str:
+    """Header Server-Timing: etapa;dur=ms"""
+    parts = [f"{stage};dur={seconds * 1000:.1f}" for stage, seconds in timings.items()]
+    parts.append(f"total;dur={total * 1000:.1f}")
+    return ", ".join(parts)
+
+
+def render_metrics() -> Tuple[bytes, str]:
+    """
+    Exposición para /metrics
+
+    Con varios workers de uvicorn definir PROMETHEUS_MULTIPROC_DIR: se
+    agregan los valores de todos los procesos.
+    """
+    if os.getenv("PROMETHEUS_MULTIPROC_DIR"):
+        from prometheus_client import multiprocess
+
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+        return generate_latest(registry), CONTENT_TYPE_LATEST
+
+    return generate_latest(), CONTENT_TYPE_LATEST
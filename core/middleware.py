@@ -0,0 +1,210 @@
+import time
+from typing import Dict, Iterable, Optional
+
+import brotli
+from fastapi import HTTPException
+from starlette.datastructures import Headers
+from starlette.middleware.gzip import GZipResponder, IdentityResponder
+from starlette.responses import JSONResponse
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from core.metrics import (
+    HTTP_IN_FLIGHT,
+    HTTP_SECONDS,
+    server_timing,
+    start_request_timings,
+)
+
+
+class MaxBodySizeMiddleware:
+    """
+    Rechaza con 413 los bodies que superan max_bytes ANTES de bufferizarlos
+
+    Revisa Content-Length y además cuenta lo que llega (chunked encoding).
+    Solo aplica a las rutas indicadas.
+    """
+
+    DETAIL = "Archivo demasiado grande"
+
+    def __init__(self, app: ASGIApp, max_bytes: int, paths: Iterable[str]):
+        self.app = app
+        self.max_bytes = max_bytes
+        self.paths = set(paths)
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or scope["path"] not in self.paths:
+            await self.app(scope, receive, send)
+            return
+
+        for name, value in scope["headers"]:
+            if name == b"content-length":
+                try:
+                    too_large = int(value) > self.max_bytes
+                except ValueError:
+                    too_large = False
+                if too_large:
+                    await self._reject(scope, receive, send)
+                    return
+
+        received = 0
+
+        async def limited_receive() -> Message:
+            nonlocal received
+            message = await receive()
+            if message["type"] == "http.request":
+                received += len(message.get("body", b""))
+                if received > self.max_bytes:
+                    # FastAPI re-lanza HTTPException al parsear el body
+                    raise HTTPException(status_code=413, detail=self.DETAIL)
+            return message
+
+        await self.app(scope, limited_receive, send)
+
+    async def _reject(self, scope: Scope, receive: Receive, send: Send) -> None:
+        response = JSONResponse(status_code=413, content={"detail": self.DETAIL})
+        await response(scope, receive, send)
+
+
+class MetricsMiddleware:
+    """
+    Latencia y requests en curso por ruta + header Server-Timing
+
+    Server-Timing lleva lo que midió track_stage hasta que salen los
+    headers (en respuestas streaming, solo las etapas ya terminadas).
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        timings = start_request_timings()
+        start = time.perf_counter()
+        status_code = 500
+
+        async def send_with_timing(message: Message) -> None:
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+                header = server_timing(timings, time.perf_counter() - start)
+                message.setdefault("headers", [])
+                message["headers"] = list(message["headers"]) + [
+                    (b"server-timing", header.encode("latin-1"))
+                ]
+            await send(message)
+
+        HTTP_IN_FLIGHT.inc()
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            HTTP_IN_FLIGHT.dec()
+            # Ruta con plantilla (/jobs/{job_id}) para no explotar las series
+            route = scope.get("route")
+            HTTP_SECONDS.labels(
+                scope["method"],
+                getattr(route, "path", "unmatched"),
+                str(status_code),
+            ).observe(time.perf_counter() - start)
+
+
+class CompressionMiddleware:
+    """
+    Comprime con brotli o gzip según Accept-Encoding
+
+    Respeta los q-values ("br;q=0" excluye brotli); a igual q gana brotli.
+
+    Las respuestas chicas (< minimum_size) salen tal cual y SSE nunca se
+    comprime. En streaming (NDJSON del batch) cada bloque se vacía del
+    compresor al toque: el cliente recibe cada línea apenas termina.
+    """
+
+    def __init__(
+        self,
+        app: ASGIApp,
+        minimum_size: int = 1024,
+        gzip_level: int = 6,
+        brotli_quality: int = 4,
+    ):
+        self.app = app
+        self.minimum_size = minimum_size
+        self.gzip_level = gzip_level
+        self.brotli_quality = brotli_quality
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        encoding = preferred_encoding(Headers(scope=scope).get("accept-encoding", ""))
+        responder: ASGIApp
+        if encoding == "br":
+            responder = BrotliResponder(
+                self.app, self.minimum_size, quality=self.brotli_quality
+            )
+        elif encoding == "gzip":
+            responder = FlushingGZipResponder(
+                self.app, self.minimum_size, compresslevel=self.gzip_level
+            )
+        else:
+            responder = IdentityResponder(self.app, self.minimum_size)
+        await responder(scope, receive, send)
+
+
+def preferred_encoding(accept_encoding: str) -> Optional[str]:
+    """ "br", "gzip" o None (sin comprimir) según los tokens y q-values"""
+    qualities: Dict[str, float] = {}
+    for token in accept_encoding.split(","):
+        name, _, params = token.partition(";")
+        name = name.strip().lower()
+        if not name:
+            continue
+        quality = 1.0
+        for param in params.split(";"):
+            key, _, value = param.partition("=")
+            if key.strip().lower() == "q":
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        qualities[name] = quality
+
+    # "*" cubre lo que no se nombra
+    wildcard = qualities.get("*", 0.0)
+    br = qualities.get("br", wildcard)
+    gzip = qualities.get("gzip", wildcard)
+    if br > 0 and br >= gzip:
+        return "br"
+    if gzip > 0:
+        return "gzip"
+    return None
+
+
+class FlushingGZipResponder(GZipResponder):
+    """GZipResponder que no retiene los bloques de un streaming"""
+
+    def apply_compression(self, body: bytes, *, more_body: bool) -> bytes:
+        if more_body:
+            self.gzip_file.write(body)
+            self.gzip_file.flush()
+            body = self.gzip_buffer.getvalue()
+            self.gzip_buffer.seek(0)
+            self.gzip_buffer.truncate()
+            return body
+        return super().apply_compression(body, more_body=False)
+
+
+class BrotliResponder(IdentityResponder):
+    content_encoding = "br"
+
+    def __init__(self, app: ASGIApp, minimum_size: int, quality: int):
+        super().__init__(app, minimum_size)
+        self.compressor = brotli.Compressor(quality=quality)
+
+    def apply_compression(self, body: bytes, *, more_body: bool) -> bytes:
+        compressed = self.compressor.process(body)
+        if more_body:
+            return compressed + self.compressor.flush()
+        return compressed + self.compressor.finish()
@@ -0,0 +1,33 @@
+from typing import Any, Mapping, Optional
+
+from pydantic_core import to_json
+from starlette.responses import JSONResponse
+
+# Formato de include de Pydantic: {"campo": True, "anidado": {"campo": True}}
+Include = Optional[Mapping[str, Any]]
+
+
+def encode_json(content: Any, include: Include = None) -> bytes:
+    """
+    JSON compacto en UTF-8 con el serializador de pydantic-core (Rust)
+
+    Acepta modelos, dicts con modelos adentro y tipos básicos: el mismo
+    camino para respuestas, líneas NDJSON y eventos SSE.
+    """
+    return to_json(content, include=include)
+
+
+class FastJSONResponse(JSONResponse):
+    """
+    Respuesta JSON de un modelo ya validado
+
+    Devolverla desde el endpoint evita la segunda validación y el
+    jsonable_encoder de response_model. include proyecta campos (?fields=).
+    """
+
+    def __init__(self, content: Any, include: Include = None, **kwargs: Any):
+        self.include = include
+        super().__init__(content, **kwargs)
+
+    def render(self, content: Any) -> bytes:
+        return encode_json(content, self.include)
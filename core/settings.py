@@ -17,11 +17,239 @@ class Settings:
 
     OPENAI_API_KEY: str = os.getenv("OPENAI_API_KEY")
 
+    OPENAI_MODEL: str = os.getenv("OPENAI_MODEL", "gpt-4o-mini")
+
+    # Cascada: modelo fuerte para CVs dudosos. Apagada por defecto (vacío =
+    # solo OPENAI_MODEL); se activa con OPENAI_STRONG_MODEL=gpt-4o (cambia la
+    # key del cache, los análisis previos no se reutilizan)
+    OPENAI_STRONG_MODEL: str = os.getenv("OPENAI_STRONG_MODEL", "")
+
+    # Score en esta franja (o JSON incompleto) se repite con el modelo fuerte
+    CASCADE_SCORE_LOW: float = float(os.getenv("CASCADE_SCORE_LOW", "4.5"))
+
+    CASCADE_SCORE_HIGH: float = float(os.getenv("CASCADE_SCORE_HIGH", "6.5"))
+
+    # Vacío = API de OpenAI. Apuntar a benchmarks/fake_openai.py para pruebas
+    OPENAI_BASE_URL: str = os.getenv("OPENAI_BASE_URL") or None
+
+    # Versión del rubric (apps/bot/bot_prompts.py): v4 actual (schema estricto),
+    # v3 el mismo rubric con JSON libre, v0 el de bot_serviceV0
+    PROMPT_VERSION: str = os.getenv("PROMPT_VERSION", "v4")
+
+    # Capa de llamadas a OpenAI (por proceso: con N workers dividir la cuota)
+    LLM_MAX_CONCURRENCY: int = int(os.getenv("LLM_MAX_CONCURRENCY", "16"))
+
+    # 0 = sin límite
+    LLM_RPM: int = int(os.getenv("LLM_RPM", "500"))
+
+    LLM_TPM: int = int(os.getenv("LLM_TPM", "200000"))
+
+    # Ráfaga máxima (segundos de cuota acumulables en los buckets)
+    LLM_BURST_SECONDS: float = float(os.getenv("LLM_BURST_SECONDS", "10"))
+
+    LLM_MAX_RETRIES: int = int(os.getenv("LLM_MAX_RETRIES", "5"))
+
+    LLM_BACKOFF_SECONDS: float = float(os.getenv("LLM_BACKOFF_SECONDS", "0.5"))
+
+    LLM_MAX_BACKOFF_SECONDS: float = float(os.getenv("LLM_MAX_BACKOFF_SECONDS", "30"))
+
+    # Respuesta fuera del schema: veces que se le pide al modelo corregirla
+    LLM_SCHEMA_RETRIES: int = int(os.getenv("LLM_SCHEMA_RETRIES", "1"))
+
+    LLM_TIMEOUT_SECONDS: float = float(os.getenv("LLM_TIMEOUT_SECONDS", "60"))
+
+    # Hedge: duplica la llamada si tarda más que el p99 (mín. LLM_HEDGE_MIN_SECONDS)
+    LLM_HEDGE_ENABLED: bool = os.getenv("LLM_HEDGE_ENABLED", "False").lower() == "true"
+
+    LLM_HEDGE_MIN_SECONDS: float = float(os.getenv("LLM_HEDGE_MIN_SECONDS", "5"))
+
+    # Tope de tokens del CV dentro del prompt (se recorta por sección)
+    PROMPT_TOKEN_BUDGET: int = int(os.getenv("PROMPT_TOKEN_BUDGET", "3000"))
+
+    # Pre-screen local: bajo este umbral de confianza no se llama al LLM
+    SCREENING_ENABLED: bool = os.getenv("SCREENING_ENABLED", "True").lower() == "true"
+
+    SCREENING_THRESHOLD: float = float(os.getenv("SCREENING_THRESHOLD", "0.2"))
+
     MAILER_SERVICE: str = os.getenv("MAILER_SERVICE")
 
     MAILER_EMAIL: str = os.getenv("MAILER_EMAIL")
 
     MAILER_PASSWORD: str = os.getenv("MAILER_PASSWORD")
 
+    MAILER_PORT: int = int(os.getenv("MAILER_PORT", "587"))
+
+    MAILER_STARTTLS: bool = os.getenv("MAILER_STARTTLS", "True").lower() == "true"
+
+    # Outbox de emails (entrega en segundo plano)
+    OUTBOX_DB_PATH: str = os.getenv("OUTBOX_DB_PATH", "data/outbox.db")
+
+    OUTBOX_BATCH_SIZE: int = int(os.getenv("OUTBOX_BATCH_SIZE", "20"))
+
+    OUTBOX_MAX_ATTEMPTS: int = int(os.getenv("OUTBOX_MAX_ATTEMPTS", "6"))
+
+    OUTBOX_BACKOFF_SECONDS: float = float(os.getenv("OUTBOX_BACKOFF_SECONDS", "5"))
+
+    OUTBOX_MAX_BACKOFF_SECONDS: float = float(
+        os.getenv("OUTBOX_MAX_BACKOFF_SECONDS", "600")
+    )
+
+    OUTBOX_IDLE_SECONDS: float = float(os.getenv("OUTBOX_IDLE_SECONDS", "60"))
+
+    OUTBOX_POLL_SECONDS: float = float(os.getenv("OUTBOX_POLL_SECONDS", "5"))
+
+    OUTBOX_SMTP_TIMEOUT: float = float(os.getenv("OUTBOX_SMTP_TIMEOUT", "30"))
+
+    # Lote tomado por un worker que murió: vuelve a pending tras este tiempo
+    # (cubre un lote entero de OUTBOX_BATCH_SIZE envíos lentos)
+    OUTBOX_LEASE_SECONDS: float = float(os.getenv("OUTBOX_LEASE_SECONDS", "900"))
+
+    # Cache de análisis (sha256 del PDF + versión del prompt + modelo)
+    CACHE_ENABLED: bool = os.getenv("CACHE_ENABLED", "True").lower() == "true"
+
+    CACHE_TTL_SECONDS: int = int(os.getenv("CACHE_TTL_SECONDS", "86400"))
+
+    CACHE_MAX_ENTRIES: int = int(os.getenv("CACHE_MAX_ENTRIES", "1000"))
+
+    CACHE_MAX_BYTES: int = int(os.getenv("CACHE_MAX_BYTES", str(20 * 1024 * 1024)))
+
+    # Vacío = solo memoria. Con ruta, los workers y reinicios comparten hits
+    CACHE_DB_PATH: str = os.getenv("CACHE_DB_PATH", "data/cache.db")
+
+    # Análisis idénticos en paralelo: uno solo llama a OpenAI
+    SINGLEFLIGHT_ENABLED: bool = (
+        os.getenv("SINGLEFLIGHT_ENABLED", "True").lower() == "true"
+    )
+
+    # Vacío = solo dentro del worker. Con ruta, también entre workers de uvicorn
+    SINGLEFLIGHT_DB_PATH: str = os.getenv("SINGLEFLIGHT_DB_PATH", "")
+
+    SINGLEFLIGHT_LEASE_SECONDS: float = float(
+        os.getenv("SINGLEFLIGHT_LEASE_SECONDS", "300")
+    )
+
+    SINGLEFLIGHT_POLL_SECONDS: float = float(
+        os.getenv("SINGLEFLIGHT_POLL_SECONDS", "0.5")
+    )
+
+    # El email de aceptación sale una vez por PDF dentro de esta ventana
+    EMAIL_DEDUPE_SECONDS: float = float(os.getenv("EMAIL_DEDUPE_SECONDS", "86400"))
+
+    # CVs casi idénticos (typo, teléfono nuevo): reutiliza el análisis anterior
+    NEAR_DUP_ENABLED: bool = os.getenv("NEAR_DUP_ENABLED", "True").lower() == "true"
+
+    NEAR_DUP_DB_PATH: str = os.getenv("NEAR_DUP_DB_PATH", "data/near_dup.db")
+
+    # Jaccard mínimo (estimado con MinHash) sobre shingles de 3 palabras
+    NEAR_DUP_THRESHOLD: float = float(os.getenv("NEAR_DUP_THRESHOLD", "0.9"))
+
+    # Tope de firmas guardadas (las más viejas se borran; 0 = sin tope)
+    NEAR_DUP_MAX_DOCUMENTS: int = int(os.getenv("NEAR_DUP_MAX_DOCUMENTS", "50000"))
+
+    # Antigüedad máxima de un análisis reutilizable (0 = sin vencimiento)
+    NEAR_DUP_TTL_SECONDS: float = float(
+        os.getenv("NEAR_DUP_TTL_SECONDS", str(30 * 86400))
+    )
+
+    # Uploads: tope de tamaño y umbral para volcar a disco
+    UPLOAD_MAX_BYTES: int = int(os.getenv("UPLOAD_MAX_BYTES", str(10 * 1024 * 1024)))
+
+    UPLOAD_SPILL_BYTES: int = int(os.getenv("UPLOAD_SPILL_BYTES", str(1024 * 1024)))
+
+    UPLOAD_CHUNK_BYTES: int = int(os.getenv("UPLOAD_CHUNK_BYTES", str(64 * 1024)))
+
+    # Batch de CVs
+    BATCH_CONCURRENCY: int = int(os.getenv("BATCH_CONCURRENCY", "4"))
+
+    BATCH_MAX_FILES: int = int(os.getenv("BATCH_MAX_FILES", "500"))
+
+    BATCH_MAX_FILE_BYTES: int = int(
+        os.getenv("BATCH_MAX_FILE_BYTES", str(20 * 1024 * 1024))
+    )
+
+    # Tope del batch entero (PDFs + zips descomprimidos) y del body HTTP
+    BATCH_MAX_BYTES: int = int(os.getenv("BATCH_MAX_BYTES", str(100 * 1024 * 1024)))
+
+    # Compresión de respuestas (brotli o gzip según Accept-Encoding)
+    COMPRESSION_MIN_BYTES: int = int(os.getenv("COMPRESSION_MIN_BYTES", "1024"))
+
+    COMPRESSION_GZIP_LEVEL: int = int(os.getenv("COMPRESSION_GZIP_LEVEL", "6"))
+
+    # 4-5: buena relación tamaño/CPU para respuestas dinámicas (11 es offline)
+    COMPRESSION_BROTLI_QUALITY: int = int(os.getenv("COMPRESSION_BROTLI_QUALITY", "4"))
+
+    # Extracción de PDF en pool de procesos
+    PDF_WORKERS: int = int(os.getenv("PDF_WORKERS", str(os.cpu_count() or 1)))
+
+    PDF_MAX_PAGES: int = int(os.getenv("PDF_MAX_PAGES", "50"))
+
+    PDF_MAX_CHARS: int = int(os.getenv("PDF_MAX_CHARS", "200000"))
+
+    PDF_TIMEOUT_SECONDS: float = float(os.getenv("PDF_TIMEOUT_SECONDS", "20"))
+
+    PDF_PAGES_PER_TASK: int = int(os.getenv("PDF_PAGES_PER_TASK", "8"))
+
+    # Reciclar cada worker tras N tareas (acota fugas de memoria de pypdf)
+    PDF_RECYCLE_AFTER_DOCS: int = int(os.getenv("PDF_RECYCLE_AFTER_DOCS", "200"))
+
+    PDF_WORKER_MAX_MEMORY_MB: int = int(os.getenv("PDF_WORKER_MAX_MEMORY_MB", "1024"))
+
+    # Ingesta incremental de carpetas (python -m apps.bot.bot_ingest y /feedback-cv)
+    INGEST_DIR: str = os.getenv("INGEST_DIR", "pdf")
+
+    INGEST_DB_PATH: str = os.getenv("INGEST_DB_PATH", "data/ingest.db")
+
+    INGEST_CONCURRENCY: int = int(os.getenv("INGEST_CONCURRENCY", "4"))
+
+    # Modo bulk offline con la Batch API (python -m apps.bot.bot_bulk)
+    BULK_DB_PATH: str = os.getenv("BULK_DB_PATH", "data/bulk.db")
+
+    # JSONL emitidos (y resultados del backend local)
+    BULK_DIR: str = os.getenv("BULK_DIR", "data/bulk")
+
+    # openai | local (stand-in que corre el JSONL contra OPENAI_BASE_URL)
+    BULK_BACKEND: str = os.getenv("BULK_BACKEND", "openai")
+
+    # Tope de la Batch API por archivo
+    BULK_MAX_REQUESTS_PER_FILE: int = int(
+        os.getenv("BULK_MAX_REQUESTS_PER_FILE", "50000")
+    )
+
+    BULK_POLL_SECONDS: float = float(os.getenv("BULK_POLL_SECONDS", "60"))
+
+    # Fallos por pedido antes de dejar de emitirlo (queda failed)
+    BULK_MAX_ATTEMPTS: int = int(os.getenv("BULK_MAX_ATTEMPTS", "3"))
+
+    # Historial de candidatos para GET /candidates (vacío = no se guarda)
+    CANDIDATES_DB_PATH: str = os.getenv("CANDIDATES_DB_PATH", "data/candidates.db")
+
+    CANDIDATES_MAX_PAGE: int = int(os.getenv("CANDIDATES_MAX_PAGE", "100"))
+
+    # Al arrancar, en segundo plano: import de openai, workers de PDF y tokenizer
+    WARMUP_ENABLED: bool = os.getenv("WARMUP_ENABLED", "False").lower() == "true"
+
+    # Cola de análisis en segundo plano
+    JOBS_DB_PATH: str = os.getenv("JOBS_DB_PATH", "data/jobs.db")
+
+    JOB_WORKERS: int = int(os.getenv("JOB_WORKERS", "2"))
+
+    JOB_QUEUE_MAXSIZE: int = int(os.getenv("JOB_QUEUE_MAXSIZE", "100"))
+
+    # Un job running sin renovar este tiempo (worker muerto) se retoma
+    JOB_LEASE_SECONDS: float = float(os.getenv("JOB_LEASE_SECONDS", "300"))
+
+    # Sin trabajo, cada cuánto se busca en la base (jobs de otros workers)
+    JOB_POLL_SECONDS: float = float(os.getenv("JOB_POLL_SECONDS", "5"))
+
+    # PDFs de los jobs pendientes, uno por sha256 (se borran al terminar)
+    JOBS_DIR: str = os.getenv("JOBS_DIR", "data/jobs")
+
+    # Intentos por job antes de quedar failed (backoff exponencial + jitter)
+    JOB_MAX_ATTEMPTS: int = int(os.getenv("JOB_MAX_ATTEMPTS", "3"))
+
+    JOB_BACKOFF_SECONDS: float = float(os.getenv("JOB_BACKOFF_SECONDS", "10"))
+
+    JOB_MAX_BACKOFF_SECONDS: float = float(os.getenv("JOB_MAX_BACKOFF_SECONDS", "300"))
+
 
 settings = Settings()
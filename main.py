@@ -1,10 +1,22 @@
-import os
+import asyncio
+from contextlib import asynccontextmanager
 
 from fastapi import APIRouter, FastAPI
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
+from fastapi.responses import Response
 
+from apps.bot.bot_ingest import DirectoryIngestor, ManifestStore
+from apps.bot.bot_jobs import JobQueue, JobStore
+from apps.bot.bot_outbox import EmailSender
 from apps.bot.bot_router import router as bot_router
+from apps.bot.bot_service import BotService
+from core.metrics import render_metrics
+from core.middleware import (
+    CompressionMiddleware,
+    MaxBodySizeMiddleware,
+    MetricsMiddleware,
+)
+from core.settings import settings
 
 router = APIRouter()
 
@@ -16,10 +28,76 @@ origins = [
 ]
 
 
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Servicios: se crean al arrancar (no al importar) y llegan por Depends
+    service = BotService()
+    job_queue = JobQueue(
+        service,
+        JobStore(
+            settings.JOBS_DB_PATH,
+            settings.JOBS_DIR,
+            lease_seconds=settings.JOB_LEASE_SECONDS,
+        ),
+        workers=settings.JOB_WORKERS,
+        maxsize=settings.JOB_QUEUE_MAXSIZE,
+        poll_seconds=settings.JOB_POLL_SECONDS,
+    )
+    email_sender = EmailSender(service.outbox)
+    app.state.service = service
+    app.state.job_queue = job_queue
+    app.state.ingestor = DirectoryIngestor(
+        service,
+        ManifestStore(settings.INGEST_DB_PATH),
+        concurrency=settings.INGEST_CONCURRENCY,
+    )
+
+    # Workers de la cola de análisis (toman también los jobs pendientes)
+    await job_queue.start()
+    # Entrega del outbox de emails
+    await email_sender.start()
+    # tiktoken en un hilo (puede bajar el BPE): nunca en el event loop
+    tokenizer = asyncio.create_task(service.load_tokenizer())
+    # Sin bloquear el arranque: la app atiende mientras se calienta
+    warm_up = (
+        asyncio.create_task(service.warm_up()) if settings.WARMUP_ENABLED else None
+    )
+    yield
+    tokenizer.cancel()
+    if warm_up is not None:
+        warm_up.cancel()
+    await job_queue.stop()
+    await email_sender.stop()
+    service.pdf_engine.shutdown()
+
+
 app = FastAPI(
     title="Api Resume IA",
     description="Api con IA Openai para vereficacion de cvs",
     version="1.0.0",
+    lifespan=lifespan,
+)
+
+# Lo más interno: comprime el body que arma la app (NDJSON del batch incluido)
+app.add_middleware(
+    CompressionMiddleware,
+    minimum_size=settings.COMPRESSION_MIN_BYTES,
+    gzip_level=settings.COMPRESSION_GZIP_LEVEL,
+    brotli_quality=settings.COMPRESSION_BROTLI_QUALITY,
+)
+
+# Corta uploads gigantes antes de que se parseen (margen para el multipart).
+# Va antes que CORS para que el 413 también lleve headers CORS
+app.add_middleware(
+    MaxBodySizeMiddleware,
+    max_bytes=settings.UPLOAD_MAX_BYTES + 64 * 1024,
+    paths=["/api/bot/analyze-cv", "/api/bot/analyze-cv/stream", "/api/bot/jobs"],
+)
+# El batch tiene su propio tope (más ~1 KB de multipart/zip por archivo)
+app.add_middleware(
+    MaxBodySizeMiddleware,
+    max_bytes=settings.BATCH_MAX_BYTES + settings.BATCH_MAX_FILES * 1024,
+    paths=["/api/bot/analyze-cv/batch"],
 )
 
 app.add_middleware(
@@ -30,4 +108,14 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Último en agregarse = el más externo: mide también los 413 y CORS
+app.add_middleware(MetricsMiddleware)
+
 app.include_router(bot_router, prefix="/api/bot", tags=["BOT CV"])
+
+
+@app.get("/metrics", include_in_schema=False)
+def metrics():
+    """Métricas en formato Prometheus"""
+    body, content_type = render_metrics()
+    return Response(content=body, media_type=content_type)
@@ -0,0 +1,95 @@
+"""
+Fixtures comunes
+
+Cada test corre con sus bases SQLite en tmp_path (nunca las de data/) y,
+si lo pide, contra benchmarks/fake_openai.py levantado en un hilo.
+"""
+
+import os
+import random
+import socket
+import sys
+import threading
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+# Antes de importar settings: sin credenciales reales
+os.environ.setdefault("OPENAI_API_KEY", "sk-test")
+os.environ.setdefault("MAILER_EMAIL", "test@example.com")
+
+import pytest  # noqa: E402
+import uvicorn  # noqa: E402
+
+from benchmarks import fake_openai  # noqa: E402
+from benchmarks.synthetic_pdfs import build_pdf, cv_lines  # noqa: E402
+from core.settings import settings  # noqa: E402
+
+DB_SETTINGS = (
+    "OUTBOX_DB_PATH",
+    "CACHE_DB_PATH",
+    "NEAR_DUP_DB_PATH",
+    "INGEST_DB_PATH",
+    "BULK_DB_PATH",
+    "CANDIDATES_DB_PATH",
+    "JOBS_DB_PATH",
+)
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+@pytest.fixture(autouse=True)
+def isolated_settings(tmp_path, monkeypatch):
+    """Bases en tmp_path; el test ajusta el resto con monkeypatch.setattr"""
+    for name in DB_SETTINGS:
+        monkeypatch.setattr(settings, name, str(tmp_path / f"{name.lower()}.db"))
+    monkeypatch.setattr(settings, "BULK_DIR", str(tmp_path / "bulk"))
+    monkeypatch.setattr(settings, "JOBS_DIR", str(tmp_path / "jobs"))
+    return settings
+
+
+@pytest.fixture
+def pdf_bytes() -> bytes:
+    """CV de developer de una página: pypdf tarda pocos ms en leerlo"""
+    rng = random.Random(0)
+    return build_pdf(cv_lines(rng, True, 1), rng=rng)
+
+
+@pytest.fixture
+def fake_openai_server(monkeypatch):
+    """
+    OpenAI falso en un hilo; retorna el módulo para ajustar TTFT, tasas y stats
+
+    settings.OPENAI_BASE_URL ya apunta a él.
+    """
+    port = free_port()
+    server = uvicorn.Server(
+        uvicorn.Config(
+            fake_openai.app,
+            host="127.0.0.1",
+            port=port,
+            log_level="warning",
+            ws="none",
+        )
+    )
+    thread = threading.Thread(target=server.run, daemon=True)
+    thread.start()
+    deadline = time.monotonic() + 10
+    while not server.started:
+        if time.monotonic() > deadline:
+            raise RuntimeError("El OpenAI falso no arrancó")
+        time.sleep(0.01)
+
+    fake_openai.reset()
+    monkeypatch.setattr(fake_openai, "TOKEN_DELAY", 0.0)
+    monkeypatch.setattr(settings, "OPENAI_BASE_URL", f"http://127.0.0.1:{port}/v1")
+    try:
+        yield fake_openai
+    finally:
+        server.should_exit = True
+        thread.join(timeout=10)
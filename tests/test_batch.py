@@ -0,0 +1,95 @@
+"""
+/analyze-cv/batch con un zip: cada PDF se descomprime recién cuando se procesa
+"""
+
+import asyncio
+import io
+import json
+import os
+import random
+import tempfile
+import zipfile
+from typing import List
+
+import httpx
+
+from apps.bot import bot_router
+from benchmarks.synthetic_pdfs import build_pdf, cv_lines
+from core.settings import settings
+
+
+def _zip() -> bytes:
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, "w") as archive:
+        for seed in range(3):
+            rng = random.Random(seed)
+            archive.writestr(
+                f"cvs/cv{seed}.pdf", build_pdf(cv_lines(rng, True, 1), rng=rng)
+            )
+        archive.writestr("cvs/roto.pdf", b"no soy un pdf")
+        archive.writestr("cvs/notas.txt", b"se ignora")
+    return buffer.getvalue()
+
+
+async def _post(body: bytes) -> List[dict]:
+    from main import app
+
+    transport = httpx.ASGITransport(app=app)
+    async with app.router.lifespan_context(app), httpx.AsyncClient(
+        transport=transport, base_url="http://test", timeout=30
+    ) as client:
+        files = {"files": ("cvs.zip", body, "application/zip")}
+        response = await client.post("/api/bot/analyze-cv/batch", files=files)
+        assert response.status_code == 200, response.text
+        return [json.loads(line) for line in response.text.splitlines()]
+
+
+def test_zip_members_are_extracted_one_at_a_time(
+    fake_openai_server, tmp_path, monkeypatch
+):
+    monkeypatch.setattr(fake_openai_server, "TTFT", 0.0)
+    monkeypatch.setattr(settings, "OPENAI_STRONG_MODEL", "")
+    monkeypatch.setattr(settings, "BATCH_CONCURRENCY", 1)
+    spill_dir = tmp_path / "spill"
+    spill_dir.mkdir()
+    monkeypatch.setattr(tempfile, "tempdir", str(spill_dir))
+
+    # Con concurrencia 1 el temporal del CV anterior ya se borró
+    on_disk = []
+    ingest_upload = bot_router.ingest_upload
+
+    async def spy(file, **kwargs):
+        on_disk.append(len(os.listdir(spill_dir)))
+        return await ingest_upload(file, **kwargs)
+
+    monkeypatch.setattr(bot_router, "ingest_upload", spy)
+    lines = asyncio.run(_post(_zip()))
+
+    by_name = {line["filename"]: line for line in lines}
+    assert sorted(by_name) == [
+        "cvs/cv0.pdf",
+        "cvs/cv1.pdf",
+        "cvs/cv2.pdf",
+        "cvs/roto.pdf",
+    ]
+    assert all(by_name[f"cvs/cv{seed}.pdf"]["status"] == "ok" for seed in range(3))
+    assert by_name["cvs/roto.pdf"]["status"] == "error"
+    assert on_disk == [0, 0, 0, 0]
+    assert os.listdir(spill_dir) == []
+
+
+def test_zip_limits_are_checked_before_extracting(monkeypatch):
+    monkeypatch.setattr(settings, "BATCH_MAX_FILES", 2)
+    from main import app
+
+    async def post() -> httpx.Response:
+        transport = httpx.ASGITransport(app=app)
+        async with app.router.lifespan_context(app), httpx.AsyncClient(
+            transport=transport, base_url="http://test"
+        ) as client:
+            files = {"files": ("cvs.zip", _zip(), "application/zip")}
+            return await client.post("/api/bot/analyze-cv/batch", files=files)
+
+    response = asyncio.run(post())
+    assert response.status_code == 400
+    assert "Máximo 2 CVs" in response.json()["detail"]
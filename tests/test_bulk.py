@@ -0,0 +1,65 @@
+"""
+Modo bulk de punta a punta con el backend local y el OpenAI falso
+"""
+
+import asyncio
+
+import pytest
+
+from apps.bot.bot_bulk import BulkRunner, BulkStore
+from apps.bot.bot_cache import AnalysisCache
+from apps.bot.bot_service import BotService
+from core.settings import settings
+
+
+@pytest.mark.parametrize(
+    "strong_model, model, cached",
+    [
+        # Sin cascada: mismo modelo que la API
+        ("", "gpt-4o-mini", True),
+        # Con cascada: el modelo rápido con un score que no escala (7.25)
+        ("gpt-4o", "gpt-4o-mini", True),
+        # Con cascada: la API nunca responde solo con el modelo fuerte
+        ("gpt-4o", "gpt-4o", False),
+    ],
+)
+def test_ingest_caches_only_what_the_api_would_answer(
+    fake_openai_server, pdf_bytes, tmp_path, monkeypatch, strong_model, model, cached
+):
+    monkeypatch.setattr(settings, "OPENAI_MODEL", "gpt-4o-mini")
+    monkeypatch.setattr(settings, "OPENAI_STRONG_MODEL", strong_model)
+    folder = tmp_path / "cvs"
+    folder.mkdir()
+    (folder / "cv.pdf").write_bytes(pdf_bytes)
+
+    service = BotService()
+    runner = BulkRunner(service, BulkStore(settings.BULK_DB_PATH), model, 2)
+    try:
+        assert asyncio.run(runner.prepare(str(folder)))["prepared"] == 1
+        runner.emit()
+        runner.submit("local")
+        summary = runner.ingest(wait=True)
+    finally:
+        service.pdf_engine.shutdown()
+
+    assert summary["done"] == 1
+    assert summary["not_cached"] == (0 if cached else 1)
+    key = AnalysisCache.make_key(
+        service.hash_pdf(pdf_bytes), service.template.version, service.cache_model
+    )
+    assert (service.cache.get(key) is not None) == cached
+
+
+def test_failed_requests_stop_being_emitted_after_max_attempts(monkeypatch):
+    monkeypatch.setattr(settings, "BULK_MAX_ATTEMPTS", 2)
+    store = BulkStore(settings.BULK_DB_PATH)
+    store.add("cv-1", "/tmp/cv.pdf", "cv.pdf", "abc", "gpt-4o-mini", body="{}")
+
+    for attempt in range(2):
+        assert [cid for cid, _ in store.pending()] == ["cv-1"]
+        store.mark_emitted(["cv-1"], f"requests-{attempt}.jsonl")
+        store.fail("cv-1", "Error de la API: 500")
+
+    assert list(store.pending()) == []
+    request = store.get("cv-1")
+    assert request["status"] == "failed" and request["attempts"] == 2
@@ -0,0 +1,141 @@
+"""
+AnalysisCache (LRU en memoria + SQLite) y DELETE /api/bot/cache
+"""
+
+import asyncio
+from typing import Tuple
+
+import httpx
+
+from apps.bot import bot_cache
+from apps.bot.bot_cache import AnalysisCache
+from apps.bot.bot_similarity import fingerprint
+
+CV_TEXT = (
+    "Juan Pérez\njuan@example.com\n\nEXPERIENCIA\nDesarrollador backend en Lima, "
+    "Python y FastAPI desde 2019.\n\nHABILIDADES\nPython, Docker, PostgreSQL\n\n"
+    "EDUCACIÓN\nIngeniería de Sistemas, UNI"
+)
+
+
+async def _clear(tmp_path) -> dict:
+    from main import app
+
+    transport = httpx.ASGITransport(app=app)
+    async with app.router.lifespan_context(app), httpx.AsyncClient(
+        transport=transport, base_url="http://test"
+    ) as client:
+        service = app.state.service
+        ingestor = app.state.ingestor
+        cv_fingerprint = fingerprint(CV_TEXT, 5)
+
+        service.cache.set("abc", {"overall_score": 7}, "v", "m")
+        service.near_duplicates.add(
+            cv_fingerprint, service._near_version(), {"overall_score": 7}
+        )
+        # Otra versión del prompt: no se toca
+        service.near_duplicates.add(cv_fingerprint, "v0:otro", {"overall_score": 5})
+        path = str(tmp_path / "cv.pdf")
+        ingestor.store.save(
+            path, 1.0, 10, "abc", "abc" + ingestor._key_suffix(), result={"x": 1}
+        )
+
+        version = service._near_version()
+        assert service.near_duplicates.lookup(cv_fingerprint, version) is not None
+
+        response = await client.delete("/api/bot/cache")
+        assert response.status_code == 200, response.text
+
+        assert service.cache.get("abc") is None
+        assert service.near_duplicates.lookup(cv_fingerprint, version) is None
+        assert service.near_duplicates.lookup(cv_fingerprint, "v0:otro") is not None
+        assert ingestor.store.get(path) is None
+        return response.json()
+
+
+def test_clear_cache_also_forgets_near_duplicates_and_manifest(tmp_path):
+    body = asyncio.run(_clear(tmp_path))
+    assert body == {"removed": 1, "near_duplicates": 1, "ingest_manifest": 1}
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def _cache(monkeypatch, db_path=None, **kwargs) -> Tuple[AnalysisCache, Clock]:
+    clock = Clock()
+    monkeypatch.setattr(bot_cache.time, "time", clock)
+    options = {"ttl_seconds": 60, "max_entries": 100, "max_bytes": 10_000}
+    options.update(kwargs)
+    return AnalysisCache(db_path=db_path, **options), clock
+
+
+def test_lru_evicts_the_least_recently_used(monkeypatch):
+    cache, _ = _cache(monkeypatch, max_entries=2)
+    cache.set("a", {"n": 1}, "v", "m")
+    cache.set("b", {"n": 2}, "v", "m")
+    # Leer "a" la vuelve la más reciente: sale "b"
+    assert cache.get("a") == {"n": 1}
+    cache.set("c", {"n": 3}, "v", "m")
+
+    assert cache.get("b") is None
+    assert cache.get("a") == {"n": 1}
+    assert cache.get("c") == {"n": 3}
+    assert list(cache._memory) == ["a", "c"]
+
+
+def test_entries_expire_after_the_ttl(monkeypatch):
+    cache, clock = _cache(monkeypatch)
+    cache.set("a", {"n": 1}, "v", "m")
+
+    clock.now += 59
+    assert cache.get("a") == {"n": 1}
+    clock.now += 1
+    assert cache.get("a") is None
+    assert "a" not in cache._memory and cache._memory_bytes == 0
+
+
+def test_byte_cap_evicts_and_skips_oversized_values(monkeypatch):
+    value = {"text": "x" * 40}
+    size = len(bot_cache.json.dumps(value))
+    cache, _ = _cache(monkeypatch, max_bytes=size * 2)
+    for key in ("a", "b", "c"):
+        cache.set(key, value, "v", "m")
+
+    assert list(cache._memory) == ["b", "c"]
+    assert cache._memory_bytes == size * 2
+
+    # Más grande que todo el cache: no entra ni expulsa a nadie
+    cache.set("big", {"text": "x" * size * 2}, "v", "m")
+    assert list(cache._memory) == ["b", "c"]
+
+
+def test_sqlite_tier_is_shared_and_promoted(monkeypatch, tmp_path):
+    db_path = str(tmp_path / "cache.db")
+    writer, clock = _cache(monkeypatch, db_path=db_path)
+    writer.set("a", {"n": 1}, "v", "m")
+
+    # Otro worker: no lo tiene en memoria, lo lee de SQLite y lo promueve
+    reader = AnalysisCache(60, 100, 10_000, db_path=db_path)
+    assert "a" not in reader._memory
+    assert reader.get("a") == {"n": 1}
+    assert "a" in reader._memory
+
+    # Lo promovido conserva el vencimiento de SQLite (no uno nuevo)
+    clock.now += 60
+    assert reader.get("a") is None
+
+
+def test_purge_stale_keeps_only_the_current_version(monkeypatch, tmp_path):
+    cache, _ = _cache(monkeypatch, db_path=str(tmp_path / "cache.db"))
+    cache.set("current", {"n": 1}, "v2", "m")
+    cache.set("old_prompt", {"n": 2}, "v1", "m")
+    cache.set("old_model", {"n": 3}, "v2", "otro")
+
+    assert cache.purge_stale("v2", "m") == 2
+    rows = cache._db.execute("SELECT key FROM analysis_cache").fetchall()
+    assert [row["key"] for row in rows] == ["current"]
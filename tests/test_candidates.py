@@ -0,0 +1,199 @@
+"""
+Ranking de candidatos: paginación por cursor, filtros y migración de la tabla
+"""
+
+import asyncio
+import base64
+import json
+import sqlite3
+
+import httpx
+import pytest
+
+from apps.bot import bot_candidates
+from apps.bot.bot_candidates import SCORE_COLUMNS, CandidateStore, InvalidCursorError
+from core.settings import settings
+
+SCORES = {
+    "education_score": 7,
+    "format_score": 8,
+    "experience_score": 6,
+    "skills_score": 9,
+    "extras_score": 5,
+}
+
+
+def test_table_from_before_sub_scores_is_migrated_and_backfilled(tmp_path):
+    db_path = str(tmp_path / "candidates.db")
+    db = sqlite3.connect(db_path)
+    db.execute("""
+        CREATE TABLE candidates (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            pdf_sha256 TEXT NOT NULL UNIQUE, filename TEXT, candidate_email TEXT,
+            overall_score REAL NOT NULL, is_valid_candidate INTEGER NOT NULL,
+            is_software_developer INTEGER NOT NULL, is_from_peru INTEGER NOT NULL,
+            has_github INTEGER NOT NULL, years_experience INTEGER NOT NULL,
+            model_tier TEXT, result TEXT NOT NULL, created_at REAL NOT NULL
+        )
+        """)
+    result = {"overall_score": 7.1, "has_github": True, **SCORES}
+    db.execute(
+        "INSERT INTO candidates VALUES "
+        "(1, 'abc', 'cv.pdf', NULL, 7.1, 1, 1, 1, 1, 3, 'fast', ?, 0)",
+        (json.dumps(result),),
+    )
+    db.commit()
+    db.close()
+
+    store = CandidateStore(db_path)
+    (row,) = store.scoring_inputs()
+    assert row == (1, 1, 7.1, *(float(SCORES[c]) for c in SCORE_COLUMNS))
+
+    # Reabrir no vuelve a migrar ni pisa los valores
+    CandidateStore(db_path)
+    assert store.scoring_inputs() == [row]
+
+
+def _fill(store: CandidateStore, monkeypatch, count: int = 25) -> None:
+    """Muchos empates de score; created_at = 1000 + i"""
+    for i in range(count):
+        monkeypatch.setattr(bot_candidates.time, "time", lambda i=i: 1000.0 + i)
+        store.save(
+            f"sha{i}",
+            f"cv{i}.pdf",
+            {
+                "overall_score": (6.0, 7.5, 8.0)[i % 3],
+                "is_valid_candidate": i % 3 != 0,
+                "is_software_developer": i % 5 != 0,
+                "is_from_peru": i % 2 == 0,
+                "has_github": i % 4 == 0,
+                "years_experience": i % 7,
+                **SCORES,
+            },
+        )
+
+
+def _pages(store: CandidateStore, limit: int, **filters) -> list:
+    pages, cursor = [], None
+    while True:
+        page, cursor = store.top(limit, cursor, **filters)
+        pages.append([candidate["id"] for candidate in page])
+        if cursor is None:
+            return pages
+
+
+def _ranking(store: CandidateStore, **filters) -> list:
+    page, cursor = store.top(1000, **filters)
+    assert cursor is None
+    return page
+
+
+def test_pages_follow_score_then_id_with_ties(tmp_path, monkeypatch):
+    store = CandidateStore(str(tmp_path / "candidates.db"))
+    _fill(store, monkeypatch)
+
+    ranking = _ranking(store)
+    assert [(c["overall_score"], c["id"]) for c in ranking] == sorted(
+        ((c["overall_score"], c["id"]) for c in ranking), reverse=True
+    )
+    pages = _pages(store, 4)
+    assert [len(page) for page in pages] == [4, 4, 4, 4, 4, 4, 1]
+    assert [i for page in pages for i in page] == [c["id"] for c in ranking]
+
+
+def test_cursor_is_stable_when_rows_are_added(tmp_path, monkeypatch):
+    store = CandidateStore(str(tmp_path / "candidates.db"))
+    _fill(store, monkeypatch)
+    expected = [c["id"] for c in _ranking(store)]
+
+    first, cursor = store.top(5)
+    # Llegan CVs nuevos con el mismo score que la página ya vista
+    for i in range(3):
+        store.save(f"new{i}", None, {"overall_score": 8.0, **SCORES})
+    seen = [c["id"] for c in first]
+    while cursor is not None:
+        page, cursor = store.top(5, cursor)
+        seen.extend(c["id"] for c in page)
+
+    # Los nuevos tienen id mayor: quedan antes del cursor, sin repetir ni saltar
+    assert seen == expected
+
+
+@pytest.mark.parametrize(
+    "filters",
+    [
+        {"has_github": True},
+        {"is_from_peru": False, "min_score": 7.5},
+        {"is_software_developer": True, "min_years": 3},
+        {"uploaded_after": 1005, "uploaded_before": 1015},
+    ],
+)
+def test_filters_apply_to_every_page(tmp_path, monkeypatch, filters):
+    store = CandidateStore(str(tmp_path / "candidates.db"))
+    _fill(store, monkeypatch)
+
+    def matches(candidate) -> bool:
+        for name, value in filters.items():
+            if name == "min_score" and candidate["overall_score"] < value:
+                return False
+            if name == "min_years" and candidate["years_experience"] < value:
+                return False
+            if name == "uploaded_after" and candidate["created_at"] < value:
+                return False
+            if name == "uploaded_before" and candidate["created_at"] >= value:
+                return False
+            if name.startswith(("is_", "has_")) and candidate[name] != value:
+                return False
+        return True
+
+    expected = [c["id"] for c in _ranking(store) if matches(c)]
+    assert expected
+    assert len(expected) < 25
+    pages = _pages(store, 3, **filters)
+    assert [i for page in pages for i in page] == expected
+
+
+@pytest.mark.parametrize(
+    "cursor",
+    [
+        "!!!",
+        base64.urlsafe_b64encode(b"no es json").decode(),
+        base64.urlsafe_b64encode(b"[7.5]").decode(),
+        base64.urlsafe_b64encode(b"[null, 3]").decode(),
+        base64.urlsafe_b64encode(b'{"score": 7.5}').decode(),
+    ],
+)
+def test_malformed_cursor_is_rejected(tmp_path, cursor):
+    store = CandidateStore(str(tmp_path / "candidates.db"))
+    with pytest.raises(InvalidCursorError):
+        store.top(5, cursor)
+
+
+def test_candidates_endpoint_pages_and_rejects_bad_cursors(monkeypatch):
+    from main import app
+
+    store = CandidateStore(settings.CANDIDATES_DB_PATH)
+    _fill(store, monkeypatch, count=7)
+
+    async def run() -> list:
+        transport = httpx.ASGITransport(app=app)
+        async with app.router.lifespan_context(app), httpx.AsyncClient(
+            transport=transport, base_url="http://test"
+        ) as client:
+            bad = await client.get("/api/bot/candidates", params={"cursor": "x@y"})
+            assert bad.status_code == 400
+            assert bad.json()["detail"] == "Cursor inválido"
+
+            ids, params = [], {"limit": 3, "min_score": 7.5}
+            while True:
+                response = await client.get("/api/bot/candidates", params=params)
+                assert response.status_code == 200, response.text
+                body = response.json()
+                ids.extend(item["id"] for item in body["items"])
+                if body["next_cursor"] is None:
+                    return ids
+                params["cursor"] = body["next_cursor"]
+
+    ids = asyncio.run(run())
+    assert len(ids) == 4
+    assert ids == [c["id"] for c in _ranking(store, min_score=7.5)]
@@ -0,0 +1,159 @@
+"""
+Compactación del texto del CV: presupuesto por prioridad, encabezados/pies
+repetidos y estimación de tokens sin tiktoken
+"""
+
+import sys
+
+import pytest
+
+from apps.bot import bot_compaction
+from apps.bot.bot_compaction import (
+    PAGE_BREAK,
+    compact_cv_text,
+    count_tokens,
+    remove_repeated_edges,
+    segment_sections,
+    truncate_to_tokens,
+)
+
+MODEL = "gpt-4o-mini"
+
+CV_TEXT = "\n".join(
+    [
+        "Juan Pérez",
+        "juan@example.com | Lima",
+        "",
+        "EXPERIENCIA",
+        "Desarrollador backend en Acme desde 2019, APIs con Python y FastAPI.",
+        "Migración de monolito a servicios con colas y PostgreSQL.",
+        "",
+        "IDIOMAS",
+        "Inglés avanzado, portugués básico.",
+        "",
+        "HABILIDADES",
+        "Python, Docker, PostgreSQL, Redis, Kubernetes, Terraform.",
+        "Pruebas con pytest, CI con GitHub Actions.",
+        "",
+        "EDUCACIÓN",
+        "Ingeniería de Sistemas, Universidad Nacional de Ingeniería.",
+    ]
+)
+
+
+@pytest.fixture
+def without_tiktoken(monkeypatch):
+    """import tiktoken falla: se usa la estimación de ~4 caracteres/token"""
+    monkeypatch.setitem(sys.modules, "tiktoken", None)
+    bot_compaction._encoding.cache_clear()
+    yield
+    bot_compaction._encoding.cache_clear()
+
+
+def _tokens(sections: list) -> dict:
+    return {name: count_tokens(body, MODEL) for name, body in sections}
+
+
+def test_without_tiktoken_tokens_are_estimated(without_tiktoken):
+    assert bot_compaction.load_encoding(MODEL) is False
+    assert count_tokens("", MODEL) == 0
+    assert count_tokens("abcd", MODEL) == 1
+    assert count_tokens("abcde", MODEL) == 2
+
+    text = "primera línea\nsegunda línea\ntercera línea"
+    # 5 tokens = 20 caracteres: se corta en el último salto de línea
+    assert truncate_to_tokens(text, 5, MODEL) == "primera línea"
+    assert truncate_to_tokens(text, 100, MODEL) == text
+    assert truncate_to_tokens(text, 0, MODEL) == ""
+
+
+def test_text_within_budget_is_not_truncated(without_tiktoken):
+    result = compact_cv_text(CV_TEXT, 10_000, MODEL)
+    assert result.truncated == []
+    assert [name for name, _ in result.sections] == [
+        "header",
+        "experience",
+        "other",
+        "skills",
+        "education",
+    ]
+    assert result.tokens_after == count_tokens(result.text, MODEL)
+
+
+def test_budget_is_spent_by_section_priority(without_tiktoken):
+    tokens = _tokens(segment_sections(CV_TEXT))
+    first_skills = (
+        "HABILIDADES\nPython, Docker, PostgreSQL, Redis, Kubernetes, Terraform."
+    )
+    # Alcanza justo para header, experiencia y la 1ra línea de habilidades
+    budget = tokens["header"] + tokens["experience"] + count_tokens(first_skills, MODEL)
+
+    result = compact_cv_text(CV_TEXT, budget, MODEL)
+    assert result.tokens_after <= budget
+    assert result.tokens_before == count_tokens(CV_TEXT, MODEL)
+    assert result.truncated == ["skills", "education", "other"]
+
+    # Lo que entra completo no se toca y el orden del documento se conserva
+    kept = dict(result.sections)
+    assert [name for name, _ in result.sections] == ["header", "experience", "skills"]
+    assert kept["header"] == "Juan Pérez\njuan@example.com | Lima"
+    assert kept["experience"] == dict(segment_sections(CV_TEXT))["experience"]
+    assert kept["skills"] == first_skills
+    assert "IDIOMAS" not in result.text and "EDUCACIÓN" not in result.text
+
+
+def test_lower_priority_section_before_a_higher_one_keeps_its_place(
+    without_tiktoken,
+):
+    tokens = _tokens(segment_sections(CV_TEXT))
+    # Todo menos 'other' (IDIOMAS), que va entre experiencia y habilidades
+    budget = sum(tokens.values()) - tokens["other"]
+
+    result = compact_cv_text(CV_TEXT, budget, MODEL)
+    assert result.truncated == ["other"]
+    assert [name for name, _ in result.sections] == [
+        "header",
+        "experience",
+        "skills",
+        "education",
+    ]
+
+
+def test_repeated_headers_and_footers_are_removed():
+    pages = [
+        "Juan Pérez - CV\nEXPERIENCIA\nAcme 2019\nconfidencial",
+        "Juan Pérez - CV\nGlobex 2016\nInitech 2014\nconfidencial",
+        "Juan Pérez - CV\nEDUCACIÓN\nUNI\nconfidencial",
+    ]
+    assert remove_repeated_edges(pages) == [
+        # La 1ra aparición se conserva
+        "Juan Pérez - CV\nEXPERIENCIA\nAcme 2019\nconfidencial",
+        "Globex 2016\nInitech 2014",
+        "EDUCACIÓN\nUNI",
+    ]
+
+
+def test_repeated_lines_in_the_middle_of_a_page_are_kept():
+    body = "\n".join(f"línea {i}" for i in range(10))
+    pages = [
+        f"cabecera\n{body}\nPython",
+        f"cabecera\n{body}\nPython",
+    ]
+    cleaned = remove_repeated_edges(pages)
+    # 'línea 5' se repite pero no está en el borde de la página
+    assert "línea 5" in cleaned[1]
+    assert "cabecera" not in cleaned[1]
+    assert remove_repeated_edges(pages[:1]) == pages[:1]
+
+
+def test_compaction_drops_page_numbers_and_repeated_edges(without_tiktoken):
+    pages = [
+        "Juan Pérez\njuan@example.com\n\nEXPERIENCIA\nAcme 2019\n\nPágina 1 de 2",
+        "Juan Pérez\njuan@example.com\n\nHABILIDADES\nPython, Docker\n\n2 / 2",
+    ]
+    result = compact_cv_text(PAGE_BREAK.join(pages), 10_000, MODEL)
+    assert result.text == (
+        "Juan Pérez\njuan@example.com\n\nEXPERIENCIA\nAcme 2019\n\n"
+        "HABILIDADES\nPython, Docker"
+    )
+    assert result.tokens_after < result.tokens_before
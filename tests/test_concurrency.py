@@ -0,0 +1,107 @@
+"""
+N uploads simultáneos a /analyze-cv no se serializan
+
+Con el pipeline async (AsyncOpenAI, PDF fuera del event loop) el total
+queda cerca de UNA latencia del LLM falso, no de N. SQLite bloqueado por
+otro worker tampoco frena el event loop.
+"""
+
+import asyncio
+import sqlite3
+import threading
+import time
+
+import httpx
+
+from apps.bot.bot_cache import AnalysisCache
+from core.settings import settings
+
+UPLOADS = 8
+LLM_LATENCY = 1.0
+
+
+async def _upload_concurrently(pdf_bytes: bytes) -> float:
+    from main import app
+
+    transport = httpx.ASGITransport(app=app)
+    # ASGITransport no corre el lifespan: los servicios se crean acá
+    async with app.router.lifespan_context(app), httpx.AsyncClient(
+        transport=transport, base_url="http://test", timeout=30
+    ) as client:
+
+        async def upload() -> None:
+            files = {"file": ("cv.pdf", pdf_bytes, "application/pdf")}
+            response = await client.post("/api/bot/analyze-cv", files=files)
+            assert response.status_code == 200, response.text
+
+        # La primera request paga el pool de PDF y el import de openai
+        await upload()
+        start = time.perf_counter()
+        await asyncio.gather(*(upload() for _ in range(UPLOADS)))
+        return time.perf_counter() - start
+
+
+def test_concurrent_uploads_take_one_llm_latency(
+    fake_openai_server, pdf_bytes, monkeypatch
+):
+    fake_openai_server.TTFT = LLM_LATENCY
+    # Mismo PDF N veces: sin cache, single-flight ni near-dup para que
+    # cada upload llegue de verdad al LLM
+    monkeypatch.setattr(settings, "CACHE_ENABLED", False)
+    monkeypatch.setattr(settings, "SINGLEFLIGHT_ENABLED", False)
+    monkeypatch.setattr(settings, "NEAR_DUP_ENABLED", False)
+    monkeypatch.setattr(settings, "OPENAI_STRONG_MODEL", "")
+    monkeypatch.setattr(settings, "LLM_MAX_CONCURRENCY", UPLOADS)
+
+    elapsed = asyncio.run(_upload_concurrently(pdf_bytes))
+
+    assert fake_openai_server.stats["requests"] == UPLOADS + 1
+    # Serializado serían UPLOADS * LLM_LATENCY (8s)
+    assert elapsed < 2 * LLM_LATENCY, f"{elapsed:.2f}s para {UPLOADS} uploads"
+
+
+def test_locked_database_does_not_stall_the_event_loop(pdf_bytes):
+    from apps.bot.bot_service import BotService
+
+    service = BotService()
+    cv_text = "Ana Díaz\nana@example.com\nDesarrolladora Python " * 20
+    result = service.build_result(
+        {"is_software_developer": True, "has_github": True, "skills_score": 9},
+        cv_text,
+        3,
+    )
+    sha256 = service.hash_pdf(pdf_bytes)
+    key = AnalysisCache.make_key(sha256, service.template.version, service.cache_model)
+    service.cache.set(key, result.model_dump(), "v", "m")
+
+    # Otro worker escribe en el outbox y no suelta el lock por un rato
+    locker = sqlite3.connect(settings.OUTBOX_DB_PATH, check_same_thread=False)
+    locker.execute("BEGIN IMMEDIATE")
+    threading.Timer(0.5, locker.commit).start()
+
+    async def run() -> float:
+        gaps = []
+        done = asyncio.Event()
+
+        async def ticker() -> None:
+            last = time.perf_counter()
+            while not done.is_set():
+                await asyncio.sleep(0.01)
+                now = time.perf_counter()
+                gaps.append(now - last)
+                last = now
+
+        tick = asyncio.create_task(ticker())
+        processed, cache_hit = await service.process_cv(pdf_bytes, sha256)
+        done.set()
+        await tick
+        assert cache_hit and processed.email_sent
+        return max(gaps)
+
+    try:
+        worst_gap = asyncio.run(run())
+    finally:
+        locker.close()
+        service.pdf_engine.shutdown()
+    # El enqueue esperó el lock (~0.5s) en un hilo: el loop siguió atendiendo
+    assert worst_gap < 0.2, f"event loop frenado {worst_gap:.2f}s"
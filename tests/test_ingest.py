@@ -0,0 +1,169 @@
+"""
+Ingesta incremental de una carpeta contra el manifest
+"""
+
+import asyncio
+import hashlib
+import os
+from types import SimpleNamespace
+
+from apps.bot.bot_ingest import DirectoryIngestor, ManifestStore
+from apps.bot.bot_schemas import CVFeedbackResponse
+from benchmarks.fake_openai import FAKE_ANALYSIS
+
+
+class FakeService:
+    """Lo que usa DirectoryIngestor de BotService, contando las llamadas"""
+
+    def __init__(self):
+        self.template = SimpleNamespace(version="v4")
+        self.cache_model = "gpt-4o-mini"
+        self.hashed = []
+        self.analyzed = []
+        self.broken = set()
+
+    def hash_pdf(self, path: str) -> str:
+        self.hashed.append(os.path.basename(path))
+        with open(path, "rb") as f:
+            return hashlib.sha256(f.read()).hexdigest()
+
+    async def analyze_cv_cached(self, path: str, sha256: str):
+        name = os.path.basename(path)
+        self.analyzed.append(name)
+        if name in self.broken:
+            raise Exception("PDF corrupto")
+        result = CVFeedbackResponse(
+            **FAKE_ANALYSIS,
+            overall_score=7.0,
+            is_valid_candidate=True,
+            years_experience=3,
+        )
+        return result, False
+
+    def record_candidate(self, result, sha256: str, filename: str) -> None:
+        pass
+
+
+def _setup(tmp_path):
+    folder = tmp_path / "cvs"
+    (folder / "sub").mkdir(parents=True)
+    (folder / "a.pdf").write_bytes(b"%PDF-1.4 a")
+    (folder / "sub" / "b.pdf").write_bytes(b"%PDF-1.4 b")
+    (folder / "notas.txt").write_text("no es un PDF")
+    service = FakeService()
+    store = ManifestStore(str(tmp_path / "ingest.db"))
+    return folder, service, store, DirectoryIngestor(service, store, concurrency=2)
+
+
+def _reset(service: FakeService) -> None:
+    service.hashed.clear()
+    service.analyzed.clear()
+
+
+def _ingest(ingestor: DirectoryIngestor, folder) -> dict:
+    return asyncio.run(ingestor.ingest_folder(str(folder)))
+
+
+def test_unchanged_files_are_not_even_read(tmp_path):
+    folder, service, store, ingestor = _setup(tmp_path)
+    first = _ingest(ingestor, folder)
+    assert first == {
+        "scanned": 2,
+        "unchanged": 0,
+        "analyzed": 2,
+        "failed": 0,
+        "removed": 0,
+    }
+    assert sorted(service.analyzed) == ["a.pdf", "b.pdf"]
+
+    _reset(service)
+    second = _ingest(ingestor, folder)
+    assert second["unchanged"] == 2 and second["analyzed"] == 0
+    # mtime y tamaño iguales: ni se hashea
+    assert service.hashed == [] and service.analyzed == []
+
+
+def test_touched_file_with_the_same_content_only_updates_the_manifest(tmp_path):
+    folder, service, store, ingestor = _setup(tmp_path)
+    _ingest(ingestor, folder)
+    path = str(folder / "a.pdf")
+    stat = os.stat(path)
+    os.utime(path, (stat.st_atime, stat.st_mtime + 60))
+
+    _reset(service)
+    summary = _ingest(ingestor, folder)
+    assert summary["unchanged"] == 2 and summary["analyzed"] == 0
+    assert service.hashed == ["a.pdf"] and service.analyzed == []
+    assert store.get(path)["mtime"] == stat.st_mtime + 60
+
+    # El manifest ya tiene el mtime nuevo: la siguiente corrida no lo lee
+    _reset(service)
+    _ingest(ingestor, folder)
+    assert service.hashed == []
+
+
+def test_changed_content_is_analyzed_again(tmp_path):
+    folder, service, store, ingestor = _setup(tmp_path)
+    _ingest(ingestor, folder)
+    path = folder / "a.pdf"
+    stat = os.stat(path)
+    path.write_bytes(b"%PDF-1.4 A")  # mismo tamaño
+    os.utime(path, (stat.st_atime, stat.st_mtime + 60))
+
+    _reset(service)
+    summary = _ingest(ingestor, folder)
+    assert summary["analyzed"] == 1 and summary["unchanged"] == 1
+    assert service.analyzed == ["a.pdf"]
+    assert store.get(str(path))["sha256"] == hashlib.sha256(b"%PDF-1.4 A").hexdigest()
+
+
+def test_invalidate_reanalyzes_everything(tmp_path):
+    folder, service, store, ingestor = _setup(tmp_path)
+    _ingest(ingestor, folder)
+    # Otra versión del prompt: no se toca
+    store.save(str(tmp_path / "otra" / "c.pdf"), 1.0, 1, "abc", "abc:v3:gpt-4o")
+
+    assert ingestor.invalidate() == 2
+    assert store.get(str(tmp_path / "otra" / "c.pdf")) is not None
+
+    _reset(service)
+    summary = _ingest(ingestor, folder)
+    assert summary["analyzed"] == 2
+    assert sorted(service.analyzed) == ["a.pdf", "b.pdf"]
+
+
+def test_new_prompt_version_marks_everything_pending(tmp_path):
+    folder, service, store, ingestor = _setup(tmp_path)
+    _ingest(ingestor, folder)
+    service.template.version = "v5"
+
+    _reset(service)
+    assert _ingest(ingestor, folder)["analyzed"] == 2
+
+
+def test_deleted_files_leave_the_manifest(tmp_path):
+    folder, service, store, ingestor = _setup(tmp_path)
+    _ingest(ingestor, folder)
+    os.remove(folder / "sub" / "b.pdf")
+
+    summary = _ingest(ingestor, folder)
+    assert summary["removed"] == 1 and summary["scanned"] == 1
+    assert store.get(str(folder / "sub" / "b.pdf")) is None
+    assert list(store.entries(str(folder))) == [str(folder / "a.pdf")]
+
+
+def test_failed_file_is_retried_on_the_next_run(tmp_path):
+    folder, service, store, ingestor = _setup(tmp_path)
+    service.broken.add("b.pdf")
+    summary = _ingest(ingestor, folder)
+    assert summary["analyzed"] == 1 and summary["failed"] == 1
+    entry = store.get(str(folder / "sub" / "b.pdf"))
+    assert entry["status"] == "failed" and entry["error"] == "PDF corrupto"
+
+    # Mismo archivo sin tocar: igual se reintenta
+    _reset(service)
+    service.broken.clear()
+    summary = _ingest(ingestor, folder)
+    assert summary["analyzed"] == 1 and summary["unchanged"] == 1
+    assert service.analyzed == ["b.pdf"]
+    assert store.get(str(folder / "sub" / "b.pdf"))["status"] == "done"
@@ -0,0 +1,250 @@
+"""
+Cola de jobs con varios workers sobre la misma base
+
+Cada JobStore es un worker de uvicorn distinto (owner propio).
+"""
+
+import asyncio
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+from types import SimpleNamespace
+
+from apps.bot.bot_jobs import JobQueue, JobStore
+from core.settings import settings
+
+PDF = b"%PDF-1.4 cv"
+PDF_SHA256 = hashlib.sha256(PDF).hexdigest()
+
+
+def _store(db_path: str, **kwargs) -> JobStore:
+    return JobStore(db_path, settings.JOBS_DIR, **kwargs)
+
+
+async def _wait_status(store: JobStore, ids, status: str, timeout: float = 10) -> None:
+    deadline = time.monotonic() + timeout
+    while any(store.get(i)["status"] != status for i in ids):
+        assert time.monotonic() < deadline, [store.get(i) for i in ids]
+        await asyncio.sleep(0.02)
+
+
+def test_each_job_is_claimed_once_across_workers(tmp_path):
+    db_path = str(tmp_path / "jobs.db")
+    workers = [_store(db_path) for _ in range(4)]
+    created = {workers[0].create(f"cv{i}.pdf", PDF, PDF_SHA256) for i in range(50)}
+
+    claimed = [[] for _ in workers]
+
+    def drain(index: int) -> None:
+        while True:
+            job_id = workers[index].claim_next()
+            if job_id is None:
+                return
+            claimed[index].append(job_id)
+
+    threads = [threading.Thread(target=drain, args=(i,)) for i in range(len(workers))]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    everything = [job_id for ids in claimed for job_id in ids]
+    assert sorted(everything) == sorted(created)
+
+
+def test_running_job_is_not_recovered_until_its_lease_expires(tmp_path):
+    db_path = str(tmp_path / "jobs.db")
+    alive = _store(db_path, lease_seconds=60)
+    other = _store(db_path, lease_seconds=60)
+    job_id = alive.create("cv.pdf", PDF, PDF_SHA256)
+
+    assert alive.claim_next() == job_id
+    # Otro worker que arranca no le roba el job a uno vivo
+    assert other.claim_next() is None
+
+    dead = _store(db_path, lease_seconds=0.05)
+    second = dead.create("cv2.pdf", PDF, PDF_SHA256)
+    assert dead.claim_next() == second
+    time.sleep(0.1)
+    # Lease vencido sin renovar: lo retoma otro y el muerto ya no lo cierra
+    assert other.claim_next() == second
+    dead.mark_done(second, {"overall_score": 1})
+    assert other.get(second)["status"] == "running"
+
+
+def test_jobs_table_from_before_leases_is_migrated(tmp_path):
+    db_path = str(tmp_path / "jobs.db")
+    db = sqlite3.connect(db_path)
+    db.execute("""
+        CREATE TABLE jobs (
+            id TEXT PRIMARY KEY, status TEXT NOT NULL, filename TEXT, pdf BLOB,
+            result TEXT, error TEXT, created_at REAL NOT NULL,
+            updated_at REAL NOT NULL
+        )
+        """)
+    db.execute(
+        "INSERT INTO jobs VALUES ('old', 'running', 'cv.pdf', x'25', NULL, NULL, 0, 0)"
+    )
+    db.commit()
+    db.close()
+
+    store = _store(db_path)
+    # Quedó running sin dueño al apagar: se retoma con el PDF de la base
+    assert store.claim_next() == "old"
+    assert store.get_pdf("old") == b"%"
+    assert store.get("old")["attempts"] == 0
+
+
+def test_queue_runs_each_job_once_with_two_workers(tmp_path):
+    db_path = str(tmp_path / "jobs.db")
+    calls = []
+
+    async def process_cv(pdf, pdf_sha256=None, filename=None):
+        calls.append(filename)
+        await asyncio.sleep(0.01)
+        return SimpleNamespace(model_dump=lambda: {"filename": filename}), False
+
+    service = SimpleNamespace(process_cv=process_cv)
+
+    async def run() -> JobStore:
+        queues = [
+            JobQueue(service, _store(db_path), workers=2, maxsize=100) for _ in range(2)
+        ]
+        for queue in queues:
+            await queue.start()
+        ids = [
+            await queues[i % 2].submit(f"cv{i}.pdf", PDF, PDF_SHA256) for i in range(20)
+        ]
+        store = queues[0].store
+        await _wait_status(store, ids, "done")
+        for queue in queues:
+            await queue.stop()
+        return store
+
+    asyncio.run(run())
+    assert sorted(calls) == sorted(f"cv{i}.pdf" for i in range(20))
+
+
+def test_job_pdf_lives_on_disk_until_the_job_ends(tmp_path):
+    db_path = str(tmp_path / "jobs.db")
+    spilled = tmp_path / "upload.pdf"
+    spilled.write_bytes(PDF)
+    seen = []
+
+    async def process_cv(pdf, pdf_sha256=None, filename=None):
+        # Llega la ruta del archivo por contenido, no bytes de la base
+        seen.append((pdf, pdf_sha256))
+        return SimpleNamespace(model_dump=lambda: {"ok": True}), False
+
+    async def run() -> JobStore:
+        queue = JobQueue(SimpleNamespace(process_cv=process_cv), _store(db_path), 1, 10)
+        first = await queue.submit("a.pdf", str(spilled), PDF_SHA256)
+        second = await queue.submit("b.pdf", PDF, PDF_SHA256)
+        path = os.path.join(settings.JOBS_DIR, f"{PDF_SHA256}.pdf")
+        assert os.listdir(settings.JOBS_DIR) == [f"{PDF_SHA256}.pdf"]
+        row = queue.store._db.execute(
+            "SELECT pdf FROM jobs WHERE id = ?", (first,)
+        ).fetchone()
+        assert row["pdf"] is None
+
+        await queue.start()
+        await _wait_status(queue.store, [first, second], "done")
+        await queue.stop()
+        assert seen == [(path, PDF_SHA256)] * 2
+        return queue.store
+
+    asyncio.run(run())
+    assert os.listdir(settings.JOBS_DIR) == []
+
+
+def test_failed_job_is_retried_with_backoff_then_fails(tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "JOB_MAX_ATTEMPTS", 3)
+    monkeypatch.setattr(settings, "JOB_BACKOFF_SECONDS", 0.05)
+    calls = []
+
+    async def process_cv(pdf, pdf_sha256=None, filename=None):
+        calls.append(time.monotonic())
+        raise Exception("contenido rechazado")
+
+    async def run() -> dict:
+        queue = JobQueue(
+            SimpleNamespace(process_cv=process_cv),
+            _store(str(tmp_path / "jobs.db")),
+            workers=1,
+            maxsize=10,
+            poll_seconds=0.02,
+        )
+        await queue.start()
+        job_id = await queue.submit("cv.pdf", PDF, PDF_SHA256)
+        await _wait_status(queue.store, [job_id], "failed")
+        await queue.stop()
+        return queue.store.get(job_id)
+
+    job = asyncio.run(run())
+    assert job["attempts"] == 3
+    assert job["error"] == "contenido rechazado"
+    assert len(calls) == 3
+    # Entre intentos hubo backoff (jitter: al menos la mitad del delay)
+    assert calls[1] - calls[0] >= 0.025
+    assert calls[2] - calls[1] >= 0.05
+    assert os.listdir(settings.JOBS_DIR) == []
+
+
+def test_job_that_recovers_is_done_after_a_retry(tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "JOB_BACKOFF_SECONDS", 0.01)
+    calls = []
+
+    async def process_cv(pdf, pdf_sha256=None, filename=None):
+        calls.append(filename)
+        if len(calls) == 1:
+            raise Exception("timeout de OpenAI")
+        return SimpleNamespace(model_dump=lambda: {"ok": True}), False
+
+    async def run() -> dict:
+        queue = JobQueue(
+            SimpleNamespace(process_cv=process_cv),
+            _store(str(tmp_path / "jobs.db")),
+            workers=1,
+            maxsize=10,
+            poll_seconds=0.02,
+        )
+        await queue.start()
+        job_id = await queue.submit("cv.pdf", PDF, PDF_SHA256)
+        await _wait_status(queue.store, [job_id], "done")
+        await queue.stop()
+        return queue.store.get(job_id)
+
+    job = asyncio.run(run())
+    assert job["attempts"] == 1
+    assert job["result"] == {"ok": True}
+
+
+def test_post_jobs_copies_the_upload_and_returns_202(fake_openai_server, pdf_bytes):
+    import httpx
+
+    from main import app
+
+    async def run() -> dict:
+        transport = httpx.ASGITransport(app=app)
+        async with app.router.lifespan_context(app), httpx.AsyncClient(
+            transport=transport, base_url="http://test"
+        ) as client:
+            files = {"file": ("cv.pdf", pdf_bytes, "application/pdf")}
+            response = await client.post("/api/bot/jobs", files=files)
+            assert response.status_code == 202, response.text
+            job = response.json()
+            # Un worker libre puede tomarlo antes de que se lea de vuelta
+            assert job["status"] in ("queued", "running") and job["attempts"] == 0
+
+            deadline = time.monotonic() + 20
+            while job["status"] != "done":
+                assert time.monotonic() < deadline, job
+                await asyncio.sleep(0.05)
+                job = (await client.get(f"/api/bot/jobs/{job['job_id']}")).json()
+            return job
+
+    job = asyncio.run(run())
+    assert job["result"]["overall_score"] > 0
+    assert os.listdir(settings.JOBS_DIR) == []
@@ -0,0 +1,190 @@
+"""
+LLMClient contra el OpenAI falso
+"""
+
+import asyncio
+import time
+from email.utils import formatdate
+
+import httpx
+import openai
+import pytest
+
+from apps.bot.bot_llm import (
+    LLMClient,
+    LLMUnavailableError,
+    TokenBucket,
+    _retry_after_seconds,
+)
+from core.settings import settings
+
+MESSAGES = [{"role": "user", "content": "Analiza este CV"}]
+
+
+def _client(max_concurrency: int, **kwargs) -> LLMClient:
+    from openai import AsyncOpenAI
+
+    options = {
+        "rpm": 0,
+        "tpm": 0,
+        "max_retries": 0,
+        "backoff_seconds": 0.1,
+        "max_backoff_seconds": 1,
+    }
+    options.update(kwargs)
+    return LLMClient(
+        AsyncOpenAI(
+            api_key="sk-test", base_url=settings.OPENAI_BASE_URL, max_retries=0
+        ),
+        max_concurrency=max_concurrency,
+        **options,
+    )
+
+
+def test_stream_holds_its_slot_until_consumed(fake_openai_server, monkeypatch):
+    monkeypatch.setattr(fake_openai_server, "TTFT", 0.0)
+    monkeypatch.setattr(fake_openai_server, "TOKEN_DELAY", 0.002)
+    llm = _client(max_concurrency=1)
+    spans = []
+
+    async def consume() -> None:
+        async with llm.stream(model="fake", messages=MESSAGES) as stream:
+            start = time.monotonic()
+            async for _ in stream:
+                pass
+            spans.append((start, time.monotonic()))
+
+    async def run() -> None:
+        await asyncio.gather(consume(), consume())
+        assert not llm.semaphore.locked()
+
+    asyncio.run(run())
+    (first_start, first_end), (second_start, _) = sorted(spans)
+    # Con un solo lugar el segundo stream arranca cuando termina el primero
+    assert second_start >= first_end
+
+
+def test_stream_closed_early_releases_its_slot(fake_openai_server):
+    llm = _client(max_concurrency=1)
+
+    async def run() -> None:
+        async with llm.stream(model="fake", messages=MESSAGES) as stream:
+            async for _ in stream:
+                # El cliente se desconecta tras el primer chunk
+                break
+        assert not llm.semaphore.locked()
+        async with llm.stream(model="fake", messages=MESSAGES) as stream:
+            chunks = [chunk async for chunk in stream]
+        assert chunks
+
+    asyncio.run(asyncio.wait_for(run(), timeout=10))
+    assert fake_openai_server.stats["requests"] == 2
+
+
+def _rate_limit_error(headers) -> openai.RateLimitError:
+    request = httpx.Request("POST", "http://test/v1/chat/completions")
+    response = httpx.Response(429, headers=headers, request=request)
+    return openai.RateLimitError("429", response=response, body=None)
+
+
+@pytest.mark.parametrize(
+    "headers, expected",
+    [
+        ({"retry-after-ms": "1500"}, 1.5),
+        ({"retry-after": "3"}, 3.0),
+        ({"retry-after-ms": "x", "retry-after": "2"}, 2.0),
+        ({}, None),
+    ],
+)
+def test_retry_after_headers(headers, expected):
+    assert _retry_after_seconds(_rate_limit_error(headers)) == expected
+
+
+def test_retry_after_as_http_date():
+    headers = {"retry-after": formatdate(time.time() + 30, usegmt=True)}
+    # El header tiene resolución de segundos
+    assert 28.5 <= _retry_after_seconds(_rate_limit_error(headers)) <= 30
+
+
+def test_429_waits_the_retry_after_and_then_succeeds(fake_openai_server, monkeypatch):
+    monkeypatch.setattr(fake_openai_server, "TTFT", 0.0)
+    monkeypatch.setattr(fake_openai_server, "TOKEN_DELAY", 0.0)
+    # Una request por segundo en el servidor, sin límite en el cliente
+    monkeypatch.setattr(fake_openai_server, "RPM", 60)
+    monkeypatch.setattr(fake_openai_server, "WINDOW", 1)
+    llm = _client(max_concurrency=4, max_retries=3)
+
+    async def run() -> float:
+        await llm.create(model="fake", messages=MESSAGES)
+        start = time.monotonic()
+        await llm.create(model="fake", messages=MESSAGES)
+        return time.monotonic() - start
+
+    elapsed = asyncio.run(run())
+    assert fake_openai_server.stats["rate_limited"] == 1
+    assert fake_openai_server.stats["requests"] == 3
+    # retry-after-ms ~1s (más hasta 0.25s de jitter), no el backoff de 0.1s
+    assert 0.8 <= elapsed < 2.5
+
+
+def test_429_after_the_last_retry_is_unavailable(fake_openai_server, monkeypatch):
+    monkeypatch.setattr(fake_openai_server, "ERROR_RATE", 1.0)
+    llm = _client(max_concurrency=1, max_retries=1, max_backoff_seconds=0.05)
+
+    with pytest.raises(LLMUnavailableError) as info:
+        asyncio.run(llm.create(model="fake", messages=MESSAGES))
+    assert "RateLimitError" in str(info.value)
+    assert info.value.retry_after > 0
+    assert fake_openai_server.stats["requests"] == 2
+
+
+def test_quota_exhausted_is_not_retried(fake_openai_server, monkeypatch):
+    monkeypatch.setattr(fake_openai_server, "QUOTA_EXHAUSTED", True)
+    llm = _client(max_concurrency=1, max_retries=5)
+
+    with pytest.raises(openai.RateLimitError) as info:
+        asyncio.run(llm.create(model="fake", messages=MESSAGES))
+    assert info.value.code == "insufficient_quota"
+    assert fake_openai_server.stats["requests"] == 1
+
+
+def test_rpm_bucket_spaces_requests_without_429(fake_openai_server, monkeypatch):
+    monkeypatch.setattr(fake_openai_server, "TTFT", 0.0)
+    monkeypatch.setattr(fake_openai_server, "TOKEN_DELAY", 0.0)
+    # 120/min con ráfaga de 1 s: dos de inmediato, la tercera espera ~0.5 s
+    llm = _client(max_concurrency=4, rpm=120, burst_seconds=1)
+
+    async def run() -> float:
+        start = time.monotonic()
+        await asyncio.gather(
+            *(llm.create(model="fake", messages=MESSAGES) for _ in range(3))
+        )
+        return time.monotonic() - start
+
+    elapsed = asyncio.run(run())
+    assert elapsed >= 0.4
+    assert fake_openai_server.stats["rate_limited"] == 0
+    assert fake_openai_server.stats["requests"] == 3
+
+
+def test_token_bucket_waits_for_refill_and_charges_overruns():
+    async def run() -> None:
+        # 10 tokens/s, cabe 1 s de cuota
+        bucket = TokenBucket(per_minute=600, burst_seconds=1)
+        start = time.monotonic()
+        await bucket.acquire(10)
+        assert time.monotonic() - start < 0.1
+
+        await bucket.acquire(5)
+        assert 0.4 <= time.monotonic() - start < 0.8
+
+        # El consumo real superó la estimación en 5: hay que esperar ~1 s
+        bucket.adjust(-5)
+        start = time.monotonic()
+        await bucket.acquire(5)
+        assert 0.9 <= time.monotonic() - start < 1.4
+
+        # Sin saldo: try_acquire (el del hedge) no espera
+        assert not bucket.try_acquire(1)
+
+    asyncio.run(run())
@@ -0,0 +1,77 @@
+"""
+/metrics expone las etapas del análisis y cada respuesta trae Server-Timing
+"""
+
+import asyncio
+import re
+from typing import Dict
+
+import httpx
+from prometheus_client.parser import text_string_to_metric_families
+
+from core.metrics import server_timing
+from core.settings import settings
+
+STAGES = ["upload", "extraction", "llm", "scoring"]
+
+
+def _stage_counts(text: str) -> Dict[str, float]:
+    """Observaciones por etapa de cv_stage_duration_seconds"""
+    counts = {}
+    for family in text_string_to_metric_families(text):
+        if family.name != "cv_stage_duration_seconds":
+            continue
+        for sample in family.samples:
+            if sample.name.endswith("_count"):
+                counts[sample.labels["stage"]] = sample.value
+    return counts
+
+
+async def _requests(pdf_bytes: bytes) -> dict:
+    from main import app
+
+    transport = httpx.ASGITransport(app=app)
+    async with app.router.lifespan_context(app), httpx.AsyncClient(
+        transport=transport, base_url="http://test", timeout=30
+    ) as client:
+        before = await client.get("/metrics")
+        files = {"file": ("cv.pdf", pdf_bytes, "application/pdf")}
+        analysis = await client.post("/api/bot/analyze-cv", files=files)
+        after = await client.get("/metrics")
+        return {"before": before, "analysis": analysis, "after": after}
+
+
+def test_server_timing_lists_stages_and_total():
+    header = server_timing({"extraction": 0.0123, "llm": 1.5}, 1.6)
+    assert header == "extraction;dur=12.3, llm;dur=1500.0, total;dur=1600.0"
+
+
+def test_metrics_and_server_timing_through_the_app(
+    fake_openai_server, pdf_bytes, monkeypatch
+):
+    monkeypatch.setattr(fake_openai_server, "TTFT", 0.0)
+    monkeypatch.setattr(settings, "OPENAI_STRONG_MODEL", "")
+    responses = asyncio.run(_requests(pdf_bytes))
+
+    analysis = responses["analysis"]
+    assert analysis.status_code == 200, analysis.text
+    timings = {}
+    for part in analysis.headers["server-timing"].split(", "):
+        match = re.fullmatch(r"(\w+);dur=(\d+\.\d)", part)
+        assert match, part
+        timings[match.group(1)] = float(match.group(2))
+    assert set(STAGES) <= set(timings)
+    assert list(timings)[-1] == "total"
+    assert timings["llm"] <= timings["total"]
+
+    after = responses["after"]
+    assert after.status_code == 200
+    assert after.headers["content-type"].startswith("text/plain")
+    # Los histogramas son del proceso: se compara contra antes de la request
+    before = _stage_counts(responses["before"].text)
+    counts = _stage_counts(after.text)
+    for stage in STAGES:
+        assert counts[stage] >= before.get(stage, 0) + 1, stage
+    assert 'http_request_duration_seconds_count{method="POST"' in after.text
+    assert 'route="/api/bot/analyze-cv",status="200"' in after.text
+    assert "server-timing" in responses["before"].headers
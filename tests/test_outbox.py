@@ -0,0 +1,242 @@
+"""
+Entrega del outbox contra un SMTP real (aiosmtpd en un hilo)
+"""
+
+import asyncio
+import sqlite3
+import threading
+import time
+
+import pytest
+from aiosmtpd.controller import Controller
+from aiosmtpd.smtp import AuthResult
+
+from apps.bot.bot_outbox import EmailOutbox, EmailSender
+from core.settings import settings
+from tests.conftest import free_port
+
+PASSWORD = "secreto"
+
+
+class Inbox:
+    """Handler de aiosmtpd: guarda los mensajes recibidos"""
+
+    def __init__(self):
+        self.messages = []
+
+    async def handle_DATA(self, server, session, envelope):
+        self.messages.append(envelope)
+        return "250 OK"
+
+
+def authenticate(server, session, envelope, mechanism, auth_data):
+    ok = auth_data.login == settings.MAILER_EMAIL.encode() and (
+        auth_data.password == PASSWORD.encode()
+    )
+    return AuthResult(success=ok)
+
+
+@pytest.fixture
+def smtp_server(monkeypatch):
+    inbox = Inbox()
+    port = free_port()
+    controller = Controller(
+        inbox,
+        hostname="127.0.0.1",
+        port=port,
+        authenticator=authenticate,
+        auth_require_tls=False,
+    )
+    controller.start()
+    monkeypatch.setattr(settings, "MAILER_SERVICE", "127.0.0.1")
+    monkeypatch.setattr(settings, "MAILER_PORT", port)
+    monkeypatch.setattr(settings, "MAILER_STARTTLS", False)
+    monkeypatch.setattr(settings, "MAILER_PASSWORD", PASSWORD)
+    monkeypatch.setattr(settings, "OUTBOX_BACKOFF_SECONDS", 0.05)
+    try:
+        yield inbox
+    finally:
+        controller.stop()
+
+
+async def _wait_sent(outbox: EmailOutbox, ids, timeout: float = 10) -> None:
+    deadline = time.monotonic() + timeout
+    while any(outbox.get(i)["status"] != "sent" for i in ids):
+        assert time.monotonic() < deadline, [outbox.get(i) for i in ids]
+        await asyncio.sleep(0.02)
+
+
+def test_sender_delivers_queued_emails(smtp_server):
+    outbox = EmailOutbox(settings.OUTBOX_DB_PATH)
+
+    async def run() -> None:
+        sender = EmailSender(outbox)
+        await sender.start()
+        ids = [
+            outbox.enqueue(f"user{i}@example.com", "Tu análisis", "<p>ok</p>")
+            for i in range(3)
+        ]
+        await _wait_sent(outbox, ids)
+        await sender.stop()
+
+    asyncio.run(run())
+    recipients = sorted(m.rcpt_tos[0] for m in smtp_server.messages)
+    assert recipients == [f"user{i}@example.com" for i in range(3)]
+
+
+def test_sender_survives_errors_in_its_loop(smtp_server):
+    outbox = EmailOutbox(settings.OUTBOX_DB_PATH)
+    claim_due = outbox.claim_due
+    failures = []
+
+    def flaky_claim_due(limit):
+        # Las dos primeras vueltas la base está bloqueada por otro worker
+        if len(failures) < 2:
+            failures.append(limit)
+            raise sqlite3.OperationalError("database is locked")
+        return claim_due(limit)
+
+    outbox.claim_due = flaky_claim_due
+
+    async def run() -> None:
+        sender = EmailSender(outbox)
+        message_id = outbox.enqueue("user@example.com", "Tu análisis", "<p>ok</p>")
+        await sender.start()
+        await _wait_sent(outbox, [message_id])
+        assert not sender._task.done()
+        await sender.stop()
+
+    asyncio.run(run())
+    assert len(failures) == 2
+    assert len(smtp_server.messages) == 1
+
+
+def test_each_email_is_claimed_by_one_sender(tmp_path):
+    db_path = str(tmp_path / "outbox.db")
+    senders = [EmailOutbox(db_path) for _ in range(4)]
+    created = {
+        senders[0].enqueue(f"user{i}@example.com", "Asunto", "<p>ok</p>")
+        for i in range(60)
+    }
+    claimed = [[] for _ in senders]
+
+    def drain(index: int) -> None:
+        while True:
+            batch = senders[index].claim_due(5)
+            if not batch:
+                return
+            claimed[index].extend(item["id"] for item in batch)
+
+    threads = [threading.Thread(target=drain, args=(i,)) for i in range(len(senders))]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    everything = [message_id for ids in claimed for message_id in ids]
+    assert sorted(everything) == sorted(created)
+
+
+def test_expired_claim_goes_back_to_pending(tmp_path):
+    db_path = str(tmp_path / "outbox.db")
+    dead = EmailOutbox(db_path, lease_seconds=0.05)
+    alive = EmailOutbox(db_path)
+    message_id = dead.enqueue("user@example.com", "Asunto", "<p>ok</p>")
+
+    assert [item["id"] for item in dead.claim_due(10)] == [message_id]
+    assert dead.get(message_id)["status"] == "sending"
+    # Mientras el lease está vivo nadie más lo toma
+    assert alive.claim_due(10) == []
+
+    time.sleep(0.1)
+    assert [item["id"] for item in alive.claim_due(10)] == [message_id]
+    # El worker muerto ya no puede cerrarlo
+    dead.mark_sent([message_id])
+    assert alive.get(message_id)["status"] == "sending"
+    alive.mark_sent([message_id])
+    assert alive.get(message_id)["status"] == "sent"
+
+
+def test_outbox_table_from_before_leases_is_migrated(tmp_path):
+    db_path = str(tmp_path / "outbox.db")
+    db = sqlite3.connect(db_path)
+    db.execute("""
+        CREATE TABLE outbox (
+            id INTEGER PRIMARY KEY AUTOINCREMENT, to_email TEXT NOT NULL,
+            subject TEXT NOT NULL, body TEXT NOT NULL,
+            status TEXT NOT NULL DEFAULT 'pending',
+            attempts INTEGER NOT NULL DEFAULT 0, next_attempt_at REAL NOT NULL,
+            last_error TEXT, created_at REAL NOT NULL, sent_at REAL
+        )
+        """)
+    db.execute(
+        "INSERT INTO outbox (to_email, subject, body, next_attempt_at, created_at) "
+        "VALUES ('user@example.com', 'Asunto', '<p>ok</p>', 0, 0)"
+    )
+    db.commit()
+    db.close()
+
+    outbox = EmailOutbox(db_path)
+    assert [item["to_email"] for item in outbox.claim_due(10)] == ["user@example.com"]
+
+
+def test_sender_records_the_whole_batch_at_once(smtp_server, monkeypatch):
+    monkeypatch.setattr(settings, "OUTBOX_BATCH_SIZE", 10)
+    outbox = EmailOutbox(settings.OUTBOX_DB_PATH)
+    ids = [
+        outbox.enqueue(f"user{i}@example.com", "Tu análisis", "<p>ok</p>")
+        for i in range(5)
+    ]
+    recorded = []
+    mark_sent = outbox.mark_sent
+
+    def spy(message_ids):
+        recorded.append(list(message_ids))
+        mark_sent(message_ids)
+
+    outbox.mark_sent = spy
+
+    async def run() -> None:
+        sender = EmailSender(outbox)
+        await sender.start()
+        await _wait_sent(outbox, ids)
+        await sender.stop()
+
+    asyncio.run(run())
+    assert [batch for batch in recorded if batch] == [ids]
+    assert len(smtp_server.messages) == 5
+
+
+def test_failed_email_releases_its_dedupe_key(tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "OUTBOX_MAX_ATTEMPTS", 2)
+    outbox = EmailOutbox(str(tmp_path / "outbox.db"))
+    first = outbox.enqueue(
+        "user@example.com", "Asunto", "<p>ok</p>", "acceptance:abc", 3600
+    )
+    # Mientras está pendiente la clave sigue reservada
+    assert (
+        outbox.enqueue(
+            "user@example.com", "Asunto", "<p>ok</p>", "acceptance:abc", 3600
+        )
+        is None
+    )
+
+    outbox.claim_due(10)
+    outbox.mark_retry([(first, 0, "timeout")])
+    assert outbox.get(first)["status"] == "pending"
+    assert (
+        outbox.enqueue(
+            "user@example.com", "Asunto", "<p>ok</p>", "acceptance:abc", 3600
+        )
+        is None
+    )
+
+    outbox._db.execute("UPDATE outbox SET next_attempt_at = 0")
+    outbox._db.commit()
+    outbox.claim_due(10)
+    outbox.mark_retry([(first, 1, "timeout")])
+    assert outbox.get(first)["status"] == "failed"
+    second = outbox.enqueue(
+        "user@example.com", "Asunto", "<p>ok</p>", "acceptance:abc", 3600
+    )
+    assert second is not None and second != first
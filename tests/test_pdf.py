@@ -0,0 +1,70 @@
+"""
+Extracción de PDF en procesos worker
+"""
+
+import asyncio
+import time
+
+import pytest
+
+from apps.bot.bot_pdf import PdfExtractionEngine, PdfExtractionError
+
+
+def _engine(**overrides) -> PdfExtractionEngine:
+    options = dict(
+        workers=2,
+        max_pages=50,
+        max_chars=200_000,
+        timeout_seconds=10,
+        pages_per_task=8,
+        recycle_after=200,
+    )
+    options.update(overrides)
+    return PdfExtractionEngine(**options)
+
+
+def test_extracts_text_and_reports_unreadable_pdfs(pdf_bytes):
+    engine = _engine()
+
+    async def run():
+        text = await engine.extract(pdf_bytes)
+        with pytest.raises(PdfExtractionError):
+            await engine.extract(b"%PDF-1.4 basura")
+        return text
+
+    try:
+        text = asyncio.run(run())
+    finally:
+        engine.shutdown()
+    assert text
+    # Un PDF ilegible no cuesta un worker
+    assert all(worker.alive for worker in engine._idle)
+
+
+def test_timeout_kills_only_the_stuck_worker(pdf_bytes):
+    engine = _engine()
+
+    async def run():
+        await engine.warm_up()
+        loop = asyncio.get_running_loop()
+        threads = engine._dispatcher()
+        healthy = {worker.process.pid for worker in engine._idle}
+
+        # Un documento colgado en un worker mientras el otro sigue extrayendo
+        stuck = loop.run_in_executor(
+            threads, engine._call, time.monotonic() + 0.5, time.sleep, 30
+        )
+        text = await engine.extract(pdf_bytes)
+        with pytest.raises(TimeoutError):
+            await stuck
+        return healthy, text
+
+    try:
+        healthy, text = asyncio.run(run())
+        survivors = {worker.process.pid for worker in engine._idle}
+    finally:
+        engine.shutdown()
+    assert text
+    assert len(healthy) == 2
+    # Se reemplazó un solo worker; el que extraía sigue siendo el mismo
+    assert len(healthy & survivors) == 1
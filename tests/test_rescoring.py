@@ -0,0 +1,89 @@
+"""
+Re-scoring vectorizado: mismo resultado que calculate_overall_score, bit a bit
+"""
+
+import random
+from types import SimpleNamespace
+
+import numpy as np
+import pytest
+
+from apps.bot.bot_candidates import SCORE_COLUMNS, CandidateStore
+from apps.bot.bot_prompts import PROMPT_TEMPLATES
+from apps.bot.bot_rescoring import _round2, rescore_candidates, score_matrix
+from apps.bot.bot_service import BotService
+
+# Valores que el LLM devuelve de verdad más bordes: > 10, 0 y decimales raros
+SUB_SCORES = [0, 0.5, 1, 3.3, 5, 6.25, 7, 7.5, 8.15, 8.5, 9, 9.95, 10, 11, 12.5]
+
+
+def _overall(template, analysis) -> float:
+    # Solo usa self.template: no hace falta levantar el servicio
+    return BotService.calculate_overall_score(
+        SimpleNamespace(template=template), analysis
+    )
+
+
+def _analyses(seed: int, count: int) -> list:
+    rng = random.Random(seed)
+    analyses = []
+    for _ in range(count):
+        analysis = {column: rng.choice(SUB_SCORES) for column in SCORE_COLUMNS}
+        if rng.random() < 0.5:
+            # Decimales arbitrarios: caen cerca de empates x.xx5 al ponderar
+            column = rng.choice(SCORE_COLUMNS)
+            analysis[column] = round(rng.uniform(0, 10), rng.choice((1, 2, 3)))
+        analysis["has_github"] = rng.random() < 0.6
+        analyses.append(analysis)
+    return analyses
+
+
+@pytest.mark.parametrize("version", sorted(PROMPT_TEMPLATES))
+def test_score_matrix_matches_calculate_overall_score(version):
+    template = PROMPT_TEMPLATES[version]
+    analyses = _analyses(seed=len(version), count=5000)
+    scores = np.array(
+        [[analysis[key] for key in template.weights] for analysis in analyses],
+        dtype=np.float64,
+    )
+    has_github = np.array([analysis["has_github"] for analysis in analyses])
+
+    vectorized = score_matrix(
+        scores, has_github, list(template.weights.values()), template.github_penalty
+    )
+    expected = [_overall(template, analysis) for analysis in analyses]
+    assert vectorized.tolist() == expected
+
+
+def test_round2_matches_python_round_near_ties():
+    rng = np.random.default_rng(0)
+    values = np.concatenate(
+        [
+            # Todos los empates x.xx5 entre 0 y 10 y sus vecinos
+            np.arange(0, 10, 0.005),
+            np.arange(0, 10, 0.005) + 1e-12,
+            np.arange(0, 10, 0.005) - 1e-12,
+            rng.uniform(0, 10, 20000),
+        ]
+    )
+    assert _round2(values).tolist() == [round(value, 2) for value in values.tolist()]
+
+
+def test_rescore_with_the_same_weights_changes_nothing(tmp_path):
+    template = PROMPT_TEMPLATES["v4"]
+    store = CandidateStore(str(tmp_path / "candidates.db"))
+    for i, analysis in enumerate(_analyses(seed=1, count=300)):
+        analysis["overall_score"] = _overall(template, analysis)
+        store.save(f"sha{i}", None, analysis)
+
+    summary = rescore_candidates(store, template.weights, template.github_penalty)
+    assert summary["candidates"] == 300
+    assert summary["changed"] == 0
+
+    # Sin penalización por GitHub: cambian justo los que no tienen GitHub
+    summary = rescore_candidates(store, template.weights, 0.0, dry_run=True)
+    without_github = sum(
+        1 for row in store.scoring_inputs() if not row[1] and row[2] < 10
+    )
+    assert summary["changed"] <= without_github
+    assert summary["changed"] > 0
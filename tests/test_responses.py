@@ -0,0 +1,137 @@
+"""
+Formato público de las respuestas: orden de claves, ?fields= y compresión
+"""
+
+import asyncio
+import gzip
+import json
+
+import brotli
+import httpx
+import pytest
+
+from apps.bot.bot_schemas import CVFeedbackResponse
+from core.middleware import preferred_encoding
+from core.settings import settings
+
+# Orden de las claves antes de CVAnalysis (los clientes lo ven en el JSON)
+PUBLIC_KEYS = [
+    "overall_score",
+    "is_valid_candidate",
+    "is_university_graduate",
+    "is_software_developer",
+    "is_from_peru",
+    "has_github",
+    "has_portfolio",
+    "years_experience",
+    "candidate_email",
+    "email_sent",
+    "education_score",
+    "format_score",
+    "experience_score",
+    "skills_score",
+    "extras_score",
+    "positive_points",
+    "improvements",
+    "critical_errors",
+    "suggestions",
+    "education_institution",
+    "professional_summary",
+]
+
+
+def test_response_keys_keep_their_public_order():
+    assert list(CVFeedbackResponse.model_fields)[: len(PUBLIC_KEYS)] == PUBLIC_KEYS
+
+
+@pytest.mark.parametrize(
+    "header, expected",
+    [
+        ("", None),
+        ("identity", None),
+        ("gzip", "gzip"),
+        ("br", "br"),
+        ("gzip, deflate, br", "br"),
+        ("br;q=0, gzip", "gzip"),
+        ("br; q=0.0, gzip;q=0.5", "gzip"),
+        ("br;q=0.4, gzip;q=0.8", "gzip"),
+        ("gzip;q=0.5, br;q=0.5", "br"),
+        ("gzip;q=0, br;q=0", None),
+        ("*", "br"),
+        ("*;q=0.5, br;q=0", "gzip"),
+        ("abr, brotli", None),
+        ("BR;Q=1", "br"),
+    ],
+)
+def test_preferred_encoding_honours_tokens_and_q_values(header, expected):
+    assert preferred_encoding(header) == expected
+
+
+async def _requests(pdf_bytes: bytes) -> dict:
+    from main import app
+
+    transport = httpx.ASGITransport(app=app)
+    async with app.router.lifespan_context(app), httpx.AsyncClient(
+        transport=transport, base_url="http://test", timeout=30
+    ) as client:
+        files = {"file": ("cv.pdf", pdf_bytes, "application/pdf")}
+        full = await client.post("/api/bot/analyze-cv", files=files)
+        picked = await client.post(
+            "/api/bot/analyze-cv",
+            files=files,
+            params={"fields": "overall_score, has_github"},
+        )
+        unknown = await client.post(
+            "/api/bot/analyze-cv", files=files, params={"fields": "overall,salario"}
+        )
+
+        # Sin descomprimir: se mira el body tal cual sale del middleware
+        encoded = {}
+        for header in ("br", "br;q=0, gzip", "gzip;q=0, br;q=0"):
+            async with client.stream(
+                "GET", "/openapi.json", headers={"Accept-Encoding": header}
+            ) as response:
+                encoded[header] = (
+                    response.headers.get("content-encoding"),
+                    b"".join([chunk async for chunk in response.aiter_raw()]),
+                )
+        return {
+            "full": full,
+            "picked": picked,
+            "unknown": unknown,
+            "encoded": encoded,
+        }
+
+
+def test_fields_and_compression_through_the_app(
+    fake_openai_server, pdf_bytes, monkeypatch
+):
+    monkeypatch.setattr(fake_openai_server, "TTFT", 0.0)
+    monkeypatch.setattr(settings, "OPENAI_STRONG_MODEL", "")
+    responses = asyncio.run(_requests(pdf_bytes))
+
+    full = responses["full"]
+    assert full.status_code == 200, full.text
+    assert list(full.json())[: len(PUBLIC_KEYS)] == PUBLIC_KEYS
+
+    picked = responses["picked"]
+    assert picked.status_code == 200, picked.text
+    assert picked.json() == {
+        "overall_score": full.json()["overall_score"],
+        "has_github": full.json()["has_github"],
+    }
+
+    unknown = responses["unknown"]
+    assert unknown.status_code == 400
+    assert "overall, salario" in unknown.json()["detail"]
+
+    encoded = responses["encoded"]
+    encoding, body = encoded["br"]
+    assert encoding == "br"
+    assert json.loads(brotli.decompress(body))["openapi"]
+    encoding, body = encoded["br;q=0, gzip"]
+    assert encoding == "gzip"
+    assert json.loads(gzip.decompress(body))["openapi"]
+    encoding, body = encoded["gzip;q=0, br;q=0"]
+    assert encoding is None
+    assert json.loads(body)["openapi"]
@@ -0,0 +1,69 @@
+"""
+Índice de casi duplicados: firma con el pre-screen ya hecho y tope de firmas
+"""
+
+from apps.bot import bot_similarity
+from apps.bot.bot_screening import screen_cv
+from apps.bot.bot_similarity import NearDuplicateIndex, fingerprint
+
+CV_TEXT = (
+    "Juan Pérez\njuan@example.com\n\nEXPERIENCIA\nDesarrollador backend en Lima, "
+    "Python y FastAPI desde 2019. github.com/juanperez\n\nHABILIDADES\nPython, "
+    "Docker, PostgreSQL\n\nEDUCACIÓN\nIngeniería de Sistemas, UNI"
+)
+VERSION = "v1:gpt-4o-mini"
+
+
+def _index(tmp_path, **kwargs) -> NearDuplicateIndex:
+    return NearDuplicateIndex(str(tmp_path / "near.db"), 0.9, **kwargs)
+
+
+def test_fingerprint_reuses_the_screening(monkeypatch):
+    screening = screen_cv(CV_TEXT)
+    expected = fingerprint(CV_TEXT, 5)
+
+    def fail(text):
+        raise AssertionError("screen_cv corrió otra vez")
+
+    monkeypatch.setattr(bot_similarity, "screen_cv", fail)
+    cv_fingerprint = fingerprint(CV_TEXT, 5, screening)
+    assert cv_fingerprint.signals == expected.signals
+    assert cv_fingerprint.signals["has_github"] is True
+    assert cv_fingerprint.sections == expected.sections
+
+
+def test_add_keeps_only_the_newest_documents(tmp_path):
+    index = _index(tmp_path, max_documents=2)
+    prints = [
+        fingerprint(CV_TEXT.replace("2019", str(year)), 5)
+        for year in (2015, 2017, 2019)
+    ]
+    ids = [index.add(fp, VERSION, {"n": n}) for n, fp in enumerate(prints)]
+
+    rows = index._db.execute("SELECT id FROM near_documents ORDER BY id").fetchall()
+    assert [row["id"] for row in rows] == ids[1:]
+    orphans = index._db.execute(
+        "SELECT COUNT(*) FROM near_buckets WHERE document_id = ?", (ids[0],)
+    ).fetchone()[0]
+    assert orphans == 0
+    assert index.lookup(prints[2], VERSION).result == {"n": 2}
+
+
+def test_expired_documents_are_not_reused_and_get_evicted(tmp_path, monkeypatch):
+    index = _index(tmp_path, ttl_seconds=60)
+    cv_fingerprint = fingerprint(CV_TEXT, 5)
+
+    monkeypatch.setattr(bot_similarity.time, "time", lambda: 1000.0)
+    old_id = index.add(cv_fingerprint, VERSION, {"n": 0})
+    assert index.lookup(cv_fingerprint, VERSION) is not None
+
+    monkeypatch.setattr(bot_similarity.time, "time", lambda: 1061.0)
+    assert index.lookup(cv_fingerprint, VERSION) is None
+
+    index.add(fingerprint(CV_TEXT + " Kubernetes", 5), VERSION, {"n": 1})
+    assert (
+        index._db.execute(
+            "SELECT COUNT(*) FROM near_documents WHERE id = ?", (old_id,)
+        ).fetchone()[0]
+        == 0
+    )
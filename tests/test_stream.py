@@ -0,0 +1,144 @@
+"""
+Streaming del análisis: parser incremental y /analyze-cv/stream
+"""
+
+import asyncio
+import json
+import random
+from typing import Any, Dict, List
+
+import httpx
+import pytest
+
+from apps.bot.bot_stream import IncrementalJSONParser
+from core.settings import settings
+
+# Escapes, caracteres de estructura dentro de strings, listas de objetos,
+# listas vacías y escalares de todo tipo
+DOCUMENT = """{
+  "is_software_developer": true,
+  "has_portfolio" : false,
+  "education_institution": null,
+  "professional_summary": "Dijo \\"hola\\", usó {llaves}, [corchetes]: y \\\\ \\n\\u00e9",
+  "experience_score": 7.5,
+  "years": -3,
+  "positive_points": ["Código en GitHub", "Coma, dentro", "Cierre ] falso"],
+  "critical_errors": [],
+  "projects": [{"name": "api", "tags": ["python", "fastapi"]}, {"name": "bot"}],
+  "scores": [1, 2.5, true, null],
+  "clave \\"rara\\"": {"anidado": {"x": [1, {"y": "}"}]}},
+  "suggestions": ["Última"]
+}"""
+
+
+def _expected(document: Dict[str, Any]) -> List[tuple]:
+    events = []
+    for name, value in document.items():
+        if isinstance(value, list):
+            events.extend(
+                ("item", {"name": name, "index": index, "value": item})
+                for index, item in enumerate(value)
+            )
+        events.append(("field", {"name": name, "value": value}))
+    return events
+
+
+@pytest.mark.parametrize("seed", range(25))
+def test_parser_emits_every_field_whatever_the_chunk_boundaries(seed):
+    rng = random.Random(seed)
+    parser = IncrementalJSONParser()
+    events = []
+    position = 0
+    while position < len(DOCUMENT):
+        size = rng.randint(1, 12)
+        events.extend(parser.feed(DOCUMENT[position : position + size]))
+        position += size
+
+    assert events == _expected(json.loads(DOCUMENT))
+    assert parser.done
+    assert json.loads(parser.buffer) == json.loads(DOCUMENT)
+
+
+def test_parser_one_character_at_a_time():
+    parser = IncrementalJSONParser()
+    events = [event for char in DOCUMENT for event in parser.feed(char)]
+    assert events == _expected(json.loads(DOCUMENT))
+
+
+def test_parser_emits_list_items_before_the_list_closes():
+    parser = IncrementalJSONParser()
+    assert parser.feed('{"improvements": ["Uno", "Dos"') == [
+        ("item", {"name": "improvements", "index": 0, "value": "Uno"})
+    ]
+    assert parser.feed(', {"a": 1') == [
+        ("item", {"name": "improvements", "index": 1, "value": "Dos"})
+    ]
+    assert parser.feed("}") == [
+        ("item", {"name": "improvements", "index": 2, "value": {"a": 1}})
+    ]
+    assert parser.feed("]}") == [
+        ("field", {"name": "improvements", "value": ["Uno", "Dos", {"a": 1}]})
+    ]
+
+
+def test_parser_ignores_text_after_the_root_object():
+    parser = IncrementalJSONParser()
+    events = parser.feed('{"a": 1}\n{"b": 2}')
+    assert events == [("field", {"name": "a", "value": 1})]
+    assert parser.done
+
+
+def _parse_sse(body: str) -> List[tuple]:
+    events = []
+    for block in body.strip().split("\n\n"):
+        lines = dict(line.split(": ", 1) for line in block.splitlines())
+        events.append((lines["event"], json.loads(lines["data"])))
+    return events
+
+
+async def _stream_twice(pdf_bytes: bytes) -> List[List[tuple]]:
+    from main import app
+
+    transport = httpx.ASGITransport(app=app)
+    async with app.router.lifespan_context(app), httpx.AsyncClient(
+        transport=transport, base_url="http://test", timeout=30
+    ) as client:
+        bodies = []
+        for _ in range(2):
+            files = {"file": ("cv.pdf", pdf_bytes, "application/pdf")}
+            response = await client.post("/api/bot/analyze-cv/stream", files=files)
+            assert response.status_code == 200, response.text
+            assert response.headers["content-type"].startswith("text/event-stream")
+            bodies.append(_parse_sse(response.text))
+        return bodies
+
+
+def test_stream_endpoint_sends_fields_items_then_result(
+    fake_openai_server, pdf_bytes, monkeypatch
+):
+    monkeypatch.setattr(fake_openai_server, "TTFT", 0.0)
+    monkeypatch.setattr(settings, "OPENAI_STRONG_MODEL", "")
+    first, second = asyncio.run(_stream_twice(pdf_bytes))
+
+    # Los datos locales salen antes que el primer token del modelo
+    assert [data["name"] for _, data in first[:2]] == [
+        "years_experience",
+        "candidate_email",
+    ]
+    # Después, el análisis del modelo en el orden en que se genera
+    assert first[2:-1] == _expected(fake_openai_server.FAKE_ANALYSIS)
+
+    event, data = first[-1]
+    assert event == "result"
+    assert data["cache"] == "MISS"
+    assert data["result"]["overall_score"] > 0
+    assert (
+        data["result"]["positive_points"]
+        == fake_openai_server.FAKE_ANALYSIS["positive_points"]
+    )
+
+    # El mismo PDF otra vez: solo el resultado, desde el cache
+    assert [event for event, _ in second] == ["result"]
+    assert second[0][1]["cache"] == "HIT"
+    assert second[0][1]["result"] == data["result"]
+    assert fake_openai_server.stats["requests"] == 1